@@ -0,0 +1,3 @@
+"""
+Throughput benchmarks for the backup and restore pipeline.
+"""
@@ -0,0 +1,337 @@
+"""
+Benchmark the backup and restore pipeline on synthetic dumps and compare the results against a baseline.
+
+Every case runs in its own Python process so that its peak RSS is measured
+in isolation. Usage::
+
+    python -m benchmarks.run --size-mb 256 --entropy 0.3
+    python -m benchmarks.run --save-baseline        # record the current machine's numbers
+    python -m benchmarks.run --cases compress:zstd restore_stream
+
+The exit status is 1 when a case is slower or uses more memory than the
+baseline allows, so the suite can gate CI jobs running on fixed hardware.
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.synthetic import MB, write_dump
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_ROOT = BENCH_DIR.parent
+FAKE_BIN_DIR = BENCH_DIR / "bin"
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+BENCH_DATABASE = "benchdb"
+BENCH_BUCKET = "dbbackup-bench"
+
+
+def available_codecs() -> list[str]:
+    """
+    Return the installed codecs that actually compress, i.e. every registered one except 'none'.
+    """
+    from dbbackup.core.compressor import CODECS
+    return sorted(name for name, codec in CODECS.items() if codec.extension and codec.is_available())
+
+
+def available_ciphers() -> list[str]:
+    """
+    Return the encryption algorithms, or none without the optional cryptography package.
+    """
+    from dbbackup.core.encryption import ALGORITHMS, is_available
+    return list(ALGORITHMS) if is_available() else []
+
+
+def default_cases(codecs: list[str]) -> list[str]:
+    """
+    Return every case in the order they run; decompression reuses the files compression leaves behind.
+    """
+    return ([f"compress:{codec}" for codec in codecs] + [f"decompress:{codec}" for codec in codecs]
+            + [f"encrypt:{algorithm}" for algorithm in available_ciphers()]
+            + ["store_local", "upload_s3", "backup_stream", "restore_stream"])
+
+
+def _bench_config(settings: dict, workdir: Path):
+    """
+    Build a configuration rooted in the benchmark working directory.
+    """
+    from dbbackup.core.config_loader import Config
+    return Config.model_validate({
+        "app": {"app_name": "bench", "version": "0"},
+        "database": {
+            "type": settings["dialect"], "host": "localhost", "port": 5432,
+            "user": "bench", "password": "bench", "default_databases": [BENCH_DATABASE],
+        },
+        "paths": {
+            "backup_dir": str(workdir / "backups"),
+            "log_dir": str(workdir / "logs"),
+            "temp_dir": str(workdir / "temp"),
+        },
+        "runtime": {"streaming": True, "max_concurrent_jobs": 1},
+        "aws": {"s3_bucket": BENCH_BUCKET, "endpoint_url": settings["s3_endpoint"]},
+        "compression": {"method": settings["backup_codec"]},
+    })
+
+
+def _s3_stand_in(settings: dict):
+    """
+    Return a context manager providing the S3 stand-in: the given endpoint, or moto's in-process mock.
+    """
+    import boto3
+    from contextlib import contextmanager, nullcontext
+
+    @contextmanager
+    def stand_in():
+        if settings["s3_endpoint"]:
+            mock = nullcontext()
+        else:
+            from moto import mock_aws  # Only needed without an external endpoint such as MinIO
+            os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+            os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+            mock = mock_aws()
+        with mock:
+            client = boto3.client("s3", region_name="us-east-1", endpoint_url=settings["s3_endpoint"])
+            try:
+                client.create_bucket(Bucket=BENCH_BUCKET)
+            except client.exceptions.BucketAlreadyOwnedByYou:
+                pass
+            yield
+    return stand_in()
+
+
+def run_case(case: str, settings: dict) -> dict:
+    """
+    Run one benchmark case in the current process.
+
+    Args:
+        case (str): Case name, e.g. 'compress:zstd' or 'restore_stream'
+        settings (dict): Benchmark settings shared by all cases
+
+    Returns:
+        dict: Seconds, bytes processed, throughput and any case-specific figures
+    """
+    from dbbackup.core.compressor import Compressor, get_codec
+    from dbbackup.core.logger import get_logger
+    from dbbackup.core.metrics import MetricsRecorder
+
+    workdir = Path(settings["workdir"])
+    dump_path = workdir / "dump.sql"
+    dump_size = dump_path.stat().st_size
+    logger = get_logger("dbbackup.bench", log_dir=str(workdir / "logs"), level=logging.WARNING)
+    extra: dict = {}
+
+    def compressed(codec_name: str) -> Path:
+        path = workdir / f"dump.sql{get_codec(codec_name).extension}"
+        if not path.exists():
+            Compressor(logger, method=codec_name).compress_file(str(dump_path))
+        return path
+
+    started = time.perf_counter()
+    kind, _, codec_name = case.partition(":")
+    if kind == "compress":
+        path = Compressor(logger, method=codec_name).compress_file(str(dump_path))
+        processed = dump_size
+        extra["ratio"] = round(dump_size / os.path.getsize(path), 3)
+    elif kind == "decompress":
+        path = compressed(codec_name)
+        started = time.perf_counter()
+        processed = 0
+        with open(path, "rb") as f:
+            reader = get_codec(codec_name).open_reader(f)
+            while chunk := reader.read(MB):
+                processed += len(chunk)
+    elif kind == "encrypt":
+        from dbbackup.core.encryption import BackupCipher
+        cipher = BackupCipher(os.urandom(32), codec_name)
+        with open(dump_path, "rb") as f_in, open(workdir / "dump.sql.enc", "wb") as f_out:
+            writer = cipher.encryptor(f_out)
+            while chunk := f_in.read(MB):
+                writer.write(chunk)
+            writer.finish()
+        processed = dump_size
+    elif case == "store_local":
+        from dbbackup.core.storages.local import LocalStorage
+        LocalStorage(str(workdir / "local"), logger).save_backup(str(dump_path), "copy.sql")
+        processed = dump_size
+    elif case == "upload_s3":
+        from dbbackup.core.storages.s3 import S3Storage
+        config = _bench_config(settings, workdir)
+        with _s3_stand_in(settings):
+            storage = S3Storage.from_config(config.aws, logger)
+            started = time.perf_counter()
+            if not storage.upload_backup(str(dump_path), "bench/dump.sql"):
+                raise RuntimeError("Upload to the S3 stand-in failed")
+        processed = dump_size
+    elif case == "backup_stream":
+        from dbbackup.core.backup import DatabaseBackup
+        config = _bench_config(settings, workdir)
+        with _s3_stand_in(settings):
+            db_backup = DatabaseBackup(config, logger)
+            started = time.perf_counter()
+            summary = db_backup.run([BENCH_DATABASE])
+        if not summary.results[0].succeeded:
+            raise RuntimeError(f"Streaming backup failed: {summary.results[0].error}")
+        processed = sum(s.bytes_out for s in db_backup.metrics.stages() if s.stage == "dump")
+        extra["stages"] = db_backup.metrics.to_dict()["stages"]
+    elif case == "restore_stream":
+        from dbbackup.core.restore import DatabaseRestore
+        config = _bench_config(settings, workdir)
+        path = compressed(settings["backup_codec"])
+        restore = DatabaseRestore(config, logger)
+        started = time.perf_counter()
+        restore.run(BENCH_DATABASE, str(path))
+        processed = sum(s.bytes_out for s in restore.metrics.stages() if s.stage == "restore")
+        if not processed:
+            raise RuntimeError("Streaming restore did not deliver any data")
+    else:
+        raise ValueError(f"Unknown benchmark case '{case}'")
+    seconds = time.perf_counter() - started
+
+    usage = MetricsRecorder().resource_usage()
+    return {
+        "case": case,
+        "seconds": round(seconds, 3),
+        "bytes": processed,
+        "mb_s": round(processed / MB / seconds, 2) if seconds > 0 else 0.0,
+        "peak_rss_mb": round(usage.get("peak_rss_bytes", 0) / MB, 1),
+        "children_peak_rss_mb": round(usage.get("children_peak_rss_bytes", 0) / MB, 1),
+        **extra,
+    }
+
+
+def _spawn_case(case: str, settings: dict) -> dict:
+    """
+    Run a case in a fresh interpreter and return its result.
+    """
+    env = os.environ.copy()
+    env["PATH"] = f"{FAKE_BIN_DIR}{os.pathsep}{env.get('PATH', '')}"
+    env["DBBENCH_SIZE_MB"] = str(settings["size_mb"])
+    env["DBBENCH_ENTROPY"] = str(settings["entropy"])
+    env["DBBENCH_SEED"] = str(settings["seed"])
+    env["DBBENCH_DUMP_FILE"] = str(Path(settings["workdir"]) / "dump.sql")
+    proc = subprocess.run(
+        [sys.executable, "-m", "benchmarks.run", "--worker", case, "--settings", json.dumps(settings)],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        return {"case": case, "error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed"}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def compare(results: list[dict], baseline: dict, tolerance: float, memory_tolerance: float) -> list[str]:
+    """
+    Compare results against a baseline.
+
+    Args:
+        results (list[dict]): Results of this run
+        baseline (dict): Baseline document with a 'results' mapping of case to result
+        tolerance (float): Allowed relative throughput drop, e.g. 0.15
+        memory_tolerance (float): Allowed relative peak RSS growth
+
+    Returns:
+        list[str]: One message per regression
+    """
+    regressions = []
+    for result in results:
+        reference = baseline.get("results", {}).get(result["case"])
+        if not reference or "error" in result:
+            continue
+        result["baseline_mb_s"] = reference["mb_s"]
+        if result["mb_s"] < reference["mb_s"] * (1 - tolerance):
+            regressions.append(f"{result['case']}: {result['mb_s']} MB/s is below the baseline {reference['mb_s']} MB/s")
+        if result["peak_rss_mb"] > reference["peak_rss_mb"] * (1 + memory_tolerance):
+            regressions.append(f"{result['case']}: peak RSS {result['peak_rss_mb']} MB exceeds "
+                               f"the baseline {reference['peak_rss_mb']} MB")
+    return regressions
+
+
+def _print_table(results: list[dict]):
+    print(f"{'case':<20} {'MB/s':>9} {'baseline':>9} {'change':>8} {'peak RSS MB':>12} {'child RSS MB':>13}")
+    for result in results:
+        if "error" in result:
+            print(f"{result['case']:<20} error: {result['error']}")
+            continue
+        reference = result.get("baseline_mb_s")
+        change = f"{(result['mb_s'] / reference - 1) * 100:+.1f}%" if reference else "-"
+        print(f"{result['case']:<20} {result['mb_s']:>9.1f} {reference or '-':>9} {change:>8} "
+              f"{result['peak_rss_mb']:>12.1f} {result['children_peak_rss_mb']:>13.1f}")
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the backup/restore pipeline on synthetic dumps")
+    parser.add_argument("--size-mb", type=float, default=256, help="Synthetic dump size in MiB")
+    parser.add_argument("--entropy", type=float, default=0.5, help="Random share of each row, 0.0 to 1.0")
+    parser.add_argument("--dialect", choices=["postgresql", "mysql"], default="postgresql")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--codecs", nargs="+", help="Codecs to benchmark (default: all installed)")
+    parser.add_argument("--backup-codec", help="Codec of the streaming backup and restore cases")
+    parser.add_argument("--cases", nargs="+", help="Cases to run (default: all)")
+    parser.add_argument("--s3-endpoint", help="S3-compatible endpoint, e.g. a local MinIO (default: moto in-process)")
+    parser.add_argument("--workdir", help="Working directory (default: a temporary directory)")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="Baseline file to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Write this run's results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed throughput drop")
+    parser.add_argument("--memory-tolerance", type=float, default=0.25, help="Allowed peak RSS growth")
+    parser.add_argument("--output", help="Also write the results as JSON to this file")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--settings", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    if args.worker:
+        print(json.dumps(run_case(args.worker, json.loads(args.settings))))
+        return 0
+
+    codecs = args.codecs or available_codecs()
+    backup_codec = args.backup_codec or ("zstd" if "zstd" in available_codecs() else "gzip")
+    cases = args.cases or default_cases(codecs)
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="dbbackup-bench-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    settings = {
+        "size_mb": args.size_mb, "entropy": args.entropy, "dialect": args.dialect, "seed": args.seed,
+        "backup_codec": backup_codec, "s3_endpoint": args.s3_endpoint, "workdir": str(workdir),
+    }
+
+    try:
+        size = write_dump(str(workdir / "dump.sql"), int(args.size_mb * MB), args.entropy, args.dialect, args.seed)
+        print(f"Synthetic {args.dialect} dump: {size / MB:.1f} MiB, entropy {args.entropy}")
+        results = [_spawn_case(case, settings) for case in cases]
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    baseline_path = Path(args.baseline)
+    regressions = []
+    if baseline_path.exists() and not args.save_baseline:
+        baseline = json.loads(baseline_path.read_text())
+        if {k: baseline.get("settings", {}).get(k) for k in ("size_mb", "entropy", "dialect")} != \
+                {k: settings[k] for k in ("size_mb", "entropy", "dialect")}:
+            print(f"Warning: baseline {baseline_path} was recorded with different settings")
+        regressions = compare(results, baseline, args.tolerance, args.memory_tolerance)
+    _print_table(results)
+
+    document = {"settings": {k: v for k, v in settings.items() if k != "workdir"}, "results": {
+        result["case"]: result for result in results if "error" not in result}}
+    if args.output:
+        Path(args.output).write_text(json.dumps(document, indent=2))
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps(document, indent=2))
+        print(f"Baseline written: {baseline_path}")
+
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    failed = [result["case"] for result in results if "error" in result]
+    return 1 if regressions or failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+"""
+Generate synthetic SQL dumps and act as fake mysqldump/pg_dump/mysql/psql binaries.
+
+The dumps look like real plain-format dumps (COPY blocks for PostgreSQL,
+extended INSERT statements for MySQL). ``entropy`` controls how
+compressible they are: 0 produces highly repetitive rows, 1 fills the
+payload column with random data.
+"""
+
+import argparse
+import base64
+import os
+import random
+import shutil
+import sys
+from typing import Iterator
+
+MB = 1024 * 1024
+BLOCK_SIZE = 1 * MB
+
+_WORDS = [
+    "alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel", "india", "juliet",
+    "kilo", "lima", "mike", "november", "oscar", "papa", "quebec", "romeo", "sierra", "tango",
+]
+
+
+def generate_dump(size: int, entropy: float = 0.5, dialect: str = "postgresql", seed: int = 0,
+                  rows_per_table: int = 100_000) -> Iterator[bytes]:
+    """
+    Yield a synthetic plain SQL dump of roughly ``size`` bytes in blocks of about 1 MiB.
+
+    Args:
+        size (int): Approximate dump size in bytes
+        entropy (float): Share of random payload per row, from 0.0 to 1.0
+        dialect (str): 'postgresql' or 'mysql'
+        seed (int): Seed making the output reproducible
+        rows_per_table (int): Rows before a new table starts
+
+    Yields:
+        bytes: Consecutive blocks of the dump
+    """
+    if not 0.0 <= entropy <= 1.0:
+        raise ValueError("entropy must be between 0.0 and 1.0")
+    rng = random.Random(seed)
+    payload_len = 64
+    random_len = int(payload_len * entropy)
+    mysql = dialect == "mysql"
+
+    produced = 0
+    row_id = 0
+    table = -1
+    block: list[bytes] = []
+    block_size = 0
+    header = b"-- MySQL dump (synthetic)\n" if mysql else b"--\n-- PostgreSQL database dump (synthetic)\n--\n"
+    block.append(header)
+    block_size += len(header)
+
+    while produced + block_size < size:
+        if row_id % rows_per_table == 0:
+            if table >= 0 and not mysql:
+                block.append(b"\\.\n\n")
+            table += 1
+            ddl = (f"CREATE TABLE bench_{table} (id bigint, name text, payload text, amount numeric);\n"
+                   if not mysql else
+                   f"CREATE TABLE `bench_{table}` (`id` bigint, `name` text, `payload` text, `amount` decimal(12,2));\n")
+            block.append(ddl.encode())
+            if not mysql:
+                block.append(f"COPY public.bench_{table} (id, name, payload, amount) FROM stdin;\n".encode())
+            block_size += sum(len(part) for part in block[-2:])
+
+        # Random characters for a batch of rows come from one randbytes call
+        noise = base64.b64encode(rng.randbytes(random_len * 1000)).replace(b"/", b"_") if random_len else b""
+        rows = []
+        for i in range(1000):
+            row_id += 1
+            name = f"{_WORDS[row_id % 20]} {_WORDS[(row_id // 20) % 20]}"
+            filler = "x" * (payload_len - random_len)
+            payload = noise[i * random_len:(i + 1) * random_len].decode() + filler
+            amount = f"{(row_id * 7919) % 100000 / 100:.2f}"
+            if mysql:
+                rows.append(f"({row_id},'{name}','{payload}',{amount})")
+            else:
+                rows.append(f"{row_id}\t{name}\t{payload}\t{amount}\n")
+            if row_id % rows_per_table == 0:
+                break
+        data = (f"INSERT INTO `bench_{table}` VALUES {','.join(rows)};\n" if mysql else "".join(rows)).encode()
+        block.append(data)
+        block_size += len(data)
+
+        if block_size >= BLOCK_SIZE:
+            yield b"".join(block)
+            produced += block_size
+            block, block_size = [], 0
+
+    if not mysql:
+        block.append(b"\\.\n")
+    yield b"".join(block)
+
+
+def write_dump(path: str, size: int, entropy: float = 0.5, dialect: str = "postgresql", seed: int = 0) -> int:
+    """
+    Write a synthetic dump to a file.
+
+    Returns:
+        int: Number of bytes written
+    """
+    written = 0
+    with open(path, "wb") as f:
+        for block in generate_dump(size, entropy, dialect, seed):
+            f.write(block)
+            written += len(block)
+    return written
+
+
+def fake_dump_main(dialect: str, argv: list[str]) -> int:
+    """
+    Entry point of the fake mysqldump/pg_dump binaries.
+
+    The dump goes to stdout, or to the file given with ``-f``/``--file``
+    (pg_dump) or ``--result-file`` (mysqldump). Size, entropy and seed come
+    from ``DBBENCH_SIZE_MB``, ``DBBENCH_ENTROPY`` and ``DBBENCH_SEED``; when
+    ``DBBENCH_DUMP_FILE`` names a pre-generated dump it is replayed instead,
+    so the generator's own speed does not bound the measured pipeline. Every
+    other argument is accepted and ignored.
+    """
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("-f", "--file")
+    parser.add_argument("--result-file")
+    args, _ = parser.parse_known_args(argv)
+    size = int(float(os.environ.get("DBBENCH_SIZE_MB", "64")) * MB)
+    entropy = float(os.environ.get("DBBENCH_ENTROPY", "0.5"))
+    seed = int(os.environ.get("DBBENCH_SEED", "0"))
+
+    target = args.file or args.result_file
+    replay = os.environ.get("DBBENCH_DUMP_FILE")
+    if replay:
+        with open(replay, "rb") as source, (open(target, "wb") if target else os.fdopen(1, "wb", closefd=False)) as out:
+            shutil.copyfileobj(source, out, BLOCK_SIZE)
+        return 0
+    if target:
+        write_dump(target, size, entropy, dialect, seed)
+        return 0
+    out = sys.stdout.buffer
+    for block in generate_dump(size, entropy, dialect, seed):
+        out.write(block)
+    out.flush()
+    return 0
+
+
+def fake_client_main(argv: list[str]) -> int:
+    """
+    Entry point of the fake mysql/psql/pg_restore binaries: read stdin to the end and discard it.
+    """
+    source = sys.stdin.buffer
+    while source.read(BLOCK_SIZE):
+        pass
+    return 0
@@ -3,6 +3,7 @@ Define and parse command-line arguments for the database backup tool.
 """
 
 import argparse
+from datetime import datetime
 from typing import List
 
 
@@ -20,6 +21,11 @@ def parse_args() -> argparse.Namespace:
         "  python main.py restore --database mydb1 --file backup.sql\n"
         "  python main.py verify --all\n"
         "  python main.py list                   # List available backups\n"
+        "  python main.py list --refresh         # Rescan local and S3 backups instead of using the cache\n"
+        "  python main.py prune --dry-run        # Show backups outside the retention policy\n"
+        "  python main.py archive                # Continuously archive binlogs/WAL\n"
+        "  python main.py restore --database mydb1 --until '2025-06-01 12:00:00'\n"
+        "  python main.py restore --database mydb1 --tables orders order_items\n"
     )
 
     parser = argparse.ArgumentParser(
@@ -34,21 +40,42 @@ def parse_args() -> argparse.Namespace:
     group.add_argument("--restore", action="store_true", help="Restore database from backup")
     group.add_argument("--verify", action="store_true", help="Verify backup files")
     group.add_argument("--list", action="store_true", help="List available backups")
+    group.add_argument("--prune", action="store_true", help="Delete backups outside the retention policy")
+    group.add_argument("--archive", action="store_true", help="Continuously archive binlogs or WAL for point-in-time recovery")
+    group.add_argument("--daemon", action="store_true", help="Run scheduled backups from daemon.schedules until stopped")
+    group.add_argument("--archive-wal", metavar="PATH", help="Archive one WAL file (PostgreSQL archive_command %%p)")
+    group.add_argument("--restore-wal", nargs=2, metavar=("NAME", "PATH"),
+                       help="Restore one archived WAL file (PostgreSQL restore_command %%f %%p)")
     group.add_argument("--init", action="store_true", help="Initialize project directories and sample config")
 
     # Database selection
     parser.add_argument(
-        "--databases", nargs="+", help="List of databases to backup"
+        "--databases", nargs="+", help="List of databases to backup or prune"
     )
     parser.add_argument(
         "--database", help="Target database to restore or verify"
     )
+    parser.add_argument(
+        "--all", action="store_true", help="Verify all local and S3 backups"
+    )
 
     # File selection
     parser.add_argument(
         "--file", help="Specify backup file for restore or verify"
     )
 
+    parser.add_argument(
+        "--tables", nargs="+", help="Restore only these tables (schema.table for PostgreSQL) from the backup"
+    )
+
+    parser.add_argument(
+        "--refresh", action="store_true", help="Rescan local and S3 backups instead of using the cached list"
+    )
+
+    parser.add_argument(
+        "--until", type=datetime.fromisoformat, help="Restore to this point in time (YYYY-MM-DD HH:MM:SS)"
+    )
+
     # Runtime options
     parser.add_argument(
         "--dry-run", action="store_true", help="Simulate commands without executing"
@@ -57,5 +84,20 @@ def parse_args() -> argparse.Namespace:
         "--verbose", action="store_true", help="Enable verbose logging"
     )
 
+    # Compression options
+    parser.add_argument(
+        "--compression", help="Compression codec: gzip, pgzip, xz, zstd, lz4 or none"
+    )
+    parser.add_argument(
+        "--compression-level", type=int, help="Compression level for the selected codec"
+    )
+
     args = parser.parse_args()
+    if args.compression:
+        # Imported only when a codec is given, so --help stays light
+        from dbbackup.core.compressor import get_codec
+        try:
+            args.compression = get_codec(args.compression).name
+        except ValueError as e:
+            parser.error(f"argument --compression: {e}")
     return args
\ No newline at end of file
@@ -0,0 +1,493 @@
+"""
+Continuously archive MySQL binlogs and PostgreSQL WAL, and replay them for point-in-time recovery.
+"""
+
+import os
+import re
+import shlex
+import shutil
+import logging
+import tarfile
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import IO, Iterator, Optional
+from dbbackup.core.compressor import CODECS, Compressor, codec_for_path
+from dbbackup.core.encryption import BackupCipher, is_encrypted
+from dbbackup.core.executor import CommandExecutor
+from dbbackup.core.integrity import SUPPORTED_ALGORITHMS, HashingReader, manifest_path, read_manifest, write_manifest
+from dbbackup.core.mysql_parallel import TablesArchive, is_tables_backup
+from dbbackup.core.storages.dedup import DedupStorage, is_dedup_backup
+from dbbackup.core.storages.s3 import S3Storage
+from dbbackup.utils.paths import ensure_directory
+
+# Hidden so backup listings and retention never mistake archived logs for backups
+ARCHIVE_DIRNAME = ".pitr"
+S3_ARCHIVE_PREFIX = ".pitr/"
+
+# Binlog coordinates mysqldump writes with --source-data=2 (or the older --master-data=2)
+_BINLOG_POSITION = re.compile(rb"(?:MASTER|SOURCE)_LOG_FILE='(?P<file>[^']+)',\s*(?:MASTER|SOURCE)_LOG_POS=(?P<pos>\d+)")
+# Decompressed bytes of a dump searched for the binlog coordinates
+POSITION_SEARCH_LIMIT = 1024 * 1024
+# WAL segment a base backup starts in, as written to its backup_label
+_WAL_START = re.compile(rb"START WAL LOCATION: \S+ \(file (?P<file>[0-9A-F]{24})\)")
+_WAL_SEGMENT = re.compile(r"[0-9A-F]{24}")
+
+
+class LogArchiver:
+    """
+    Archive transaction logs so a restore can roll forward past the last full backup.
+
+    MySQL binlogs are pulled with ``mysqlbinlog --read-from-remote-server
+    --raw --stop-never`` and PostgreSQL WAL with ``pg_receivewal``, or pushed
+    by the server's ``archive_command``. Each completed file is compressed
+    with the configured codec, stored under ``pitr.archive_dir`` with a
+    checksum manifest and uploaded to S3 under ``.pitr/<type>/``.
+    """
+
+    def __init__(self, config, logger: logging.Logger):
+        """
+        Initialize LogArchiver.
+
+        Args:
+            config: Application configuration object
+            logger (logging.Logger): Logger instance
+        """
+        self.config = config
+        self.logger = logger
+        self.db_type = config.database.type.lower()
+        self.archive_dir = Path(config.pitr.archive_dir or Path(config.paths.backup_dir) / ARCHIVE_DIRNAME)
+        self.spool_dir = Path(config.pitr.spool_dir or Path(config.paths.temp_dir) / "pitr_spool")
+        self.executor = CommandExecutor(logger, dry_run=config.runtime.dry_run)
+        self.compressor = Compressor(logger, method=config.compression.method, level=config.compression.level,
+                                     threads=config.compression.threads)
+        self.s3_storage = S3Storage.from_config(config.aws, logger) if config.aws is not None else None
+        ensure_directory(self.archive_dir, logger)
+
+    def archive_file(self, source_path: str) -> bool:
+        """
+        Compress, store and upload one completed binlog or WAL file.
+
+        Suitable as PostgreSQL's ``archive_command``: archiving a file again
+        with identical content succeeds, while a different file under an
+        existing name fails instead of overwriting the archived copy.
+
+        Args:
+            source_path (str): Path to the completed log file
+
+        Returns:
+            bool: True if the file is archived locally and, with an aws section, in S3
+        """
+        source = Path(source_path)
+        if not source.is_file():
+            self.logger.error(f"Log file to archive not found: {source_path}")
+            return False
+        target = self.archive_dir / f"{source.name}{self.compressor.extension()}"
+        algorithm = self.config.verification.algorithm
+
+        partial = target.with_name(f".{target.name}.partial")
+        try:
+            with open(source, "rb") as f_in, open(partial, "wb") as f_out:
+                reader = HashingReader(f_in, algorithm)
+                self.compressor.compress_stream(reader, f_out)
+                f_out.flush()
+                os.fsync(f_out.fileno())
+            checksum = reader.checksum
+            existing = read_manifest(str(target)) if target.exists() else None
+            if existing is not None:
+                partial.unlink()
+                if existing != checksum:
+                    self.logger.error(f"Refusing to overwrite archived log {target.name} with different content")
+                    return False
+            else:
+                os.replace(partial, target)
+                write_manifest(str(target), checksum)
+        except OSError as e:
+            self.logger.error(f"Failed to archive {source.name}: {e}")
+            partial.unlink(missing_ok=True)
+            return False
+
+        key = f"{S3_ARCHIVE_PREFIX}{self.db_type}/{target.name}"
+        if self.s3_storage is not None and not self.s3_storage.upload_backup(str(target), key,
+                                                                             metadata={"checksum": checksum}):
+            return False
+        self.logger.info(f"Archived {source.name}")
+        return True
+
+    def fetch(self, name: str, target_path: str) -> bool:
+        """
+        Restore one archived log file, decompressed, to a path.
+
+        Suitable as PostgreSQL's ``restore_command``. The local archive is
+        tried first, then S3. A missing file returns False without an error,
+        since recovery asks for files beyond the end of the archive.
+
+        Args:
+            name (str): Log file name, e.g. '000000010000000000000003' or 'binlog.000012'
+            target_path (str): Where to write the decompressed file
+
+        Returns:
+            bool: True if the file was restored
+        """
+        archived = self._find_local(name)
+        downloaded = None
+        if archived is None:
+            key = next((obj.key for obj in self._list_s3() if Path(obj.key).name.startswith(f"{name}.")
+                        or Path(obj.key).name == name), None)
+            if key is None:
+                self.logger.debug(f"Archived log not found: {name}")
+                return False
+            ensure_directory(Path(self.config.paths.temp_dir), self.logger)
+            downloaded = Path(tempfile.mkdtemp(prefix="pitr_", dir=self.config.paths.temp_dir)) / Path(key).name
+            if not self.s3_storage.download_backup(key, str(downloaded)):
+                shutil.rmtree(downloaded.parent, ignore_errors=True)
+                return False
+            archived = downloaded
+
+        target = Path(target_path)
+        partial = target.with_name(f".{target.name}.partial")
+        try:
+            with open(archived, "rb") as f_in, open(partial, "wb") as f_out:
+                shutil.copyfileobj(codec_for_path(str(archived)).open_reader(f_in), f_out, 1024 * 1024)
+            os.replace(partial, target)
+            return True
+        except OSError as e:
+            self.logger.error(f"Failed to restore archived log {name}: {e}")
+            partial.unlink(missing_ok=True)
+            return False
+        finally:
+            if downloaded is not None:
+                shutil.rmtree(downloaded.parent, ignore_errors=True)
+
+    def list_archived(self) -> list[str]:
+        """
+        List the names of archived log files, locally and in S3, in log order.
+        """
+        names = {_strip_codec(path.name) for path in self.archive_dir.iterdir()
+                 if path.is_file() and not path.name.startswith(".")}
+        names.update(_strip_codec(Path(obj.key).name) for obj in self._list_s3())
+        return sorted(names)
+
+    def first_needed_log(self, backup_path: str, cipher: Optional[BackupCipher] = None,
+                         dedup_storage: Optional[DedupStorage] = None) -> Optional[str]:
+        """
+        Return the first archived log a point-in-time restore from a backup needs.
+
+        For MySQL this is the binlog of the coordinates recorded in the dump,
+        for PostgreSQL the WAL segment named in the ``backup_label`` of a base
+        backup. Logical PostgreSQL dumps never replay WAL.
+
+        Args:
+            backup_path (str): Local backup file
+            cipher (Optional[BackupCipher]): Cipher to read an encrypted backup with
+            dedup_storage (Optional[DedupStorage]): Chunk store to read a deduplicated backup from
+
+        Returns:
+            Optional[str]: Log file name, or None if the backup cannot be rolled forward
+
+        Raises:
+            ValueError: If the coordinates cannot be read, e.g. from an xbstream backup
+            OSError, tarfile.TarError: If the backup cannot be read
+        """
+        name = Path(backup_path).name
+        if self.db_type == "postgresql":
+            return read_wal_start(backup_path, cipher) if ".base.tar" in name else None
+        if ".xbstream" in name:
+            raise ValueError(f"Binlog coordinates of xbstream backup {name} are not read")
+        if is_dedup_backup(backup_path):
+            if dedup_storage is None:
+                raise ValueError(f"No chunk store to read deduplicated backup {name} from")
+            position = parse_binlog_position(dedup_storage.open_reader(backup_path).read(POSITION_SEARCH_LIMIT))
+        else:
+            position = read_binlog_position(backup_path, cipher)
+        return position[0] if position is not None else None
+
+    def expire(self, first_needed: str) -> int:
+        """
+        Delete archived logs that come before ``first_needed``, locally and in S3.
+
+        S3 objects are removed with batched deletes. Files that are not
+        binlogs of the same series or WAL segments, such as timeline history
+        files, are kept.
+
+        Args:
+            first_needed (str): Oldest log file still needed, e.g. 'binlog.000012'
+
+        Returns:
+            int: Number of deleted log files, counting local and S3 copies
+        """
+        def expired(name: str) -> bool:
+            name = _strip_codec(name)
+            if self.db_type == "mysql":
+                return (_same_series(name, first_needed) and name.rsplit(".", 1)[-1].isdigit()
+                        and _sequence(name) < _sequence(first_needed))
+            return bool(_WAL_SEGMENT.fullmatch(name)) and name < first_needed
+
+        local = [path for path in self.archive_dir.iterdir()
+                 if path.is_file() and not path.name.startswith(".") and expired(path.name)]
+        for path in local:
+            path.unlink(missing_ok=True)
+            for algorithm in SUPPORTED_ALGORITHMS:
+                manifest_path(str(path), algorithm).unlink(missing_ok=True)
+        keys = [obj.key for obj in self._list_s3() if expired(Path(obj.key).name)]
+        deleted = self.s3_storage.delete_backups(keys) if keys else []
+        if local or deleted:
+            self.logger.info(f"Expired archived logs before {first_needed}: {len(local)} local, "
+                             f"{len(deleted)} in S3")
+        return len(local) + len(deleted)
+
+    def run(self, stop: Optional[threading.Event] = None):
+        """
+        Stream logs from the server and archive every completed file until stopped.
+
+        The receiver is restarted after it exits, resuming from the newest
+        file in the spool directory, or of the archive.
+
+        Args:
+            stop (Optional[threading.Event]): Event ending the loop, e.g. set by a signal handler
+        """
+        stop = stop or threading.Event()
+        ensure_directory(self.spool_dir, self.logger)
+        self.logger.info(f"Continuous {self.db_type} log archiving started, spooling to {self.spool_dir}")
+        process = None
+        try:
+            while not stop.is_set():
+                if process is None or process.poll() is not None:
+                    if process is not None:
+                        self.logger.warning(f"Log receiver exited with code {process.returncode}, restarting")
+                    process = self._start_receiver()
+                    if process is None:
+                        return  # Dry run
+                self.ship_completed()
+                stop.wait(self.config.pitr.poll_interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if process is not None and process.poll() is None:
+                process.terminate()
+                process.wait()
+            self.ship_completed()
+            self.logger.info("Continuous log archiving stopped")
+
+    def ship_completed(self) -> int:
+        """
+        Archive the completed files in the spool directory and remove them from it.
+
+        Returns:
+            int: Number of archived files
+        """
+        shipped = 0
+        for path in self._completed_spool_files():
+            if self.archive_file(str(path)):
+                path.unlink(missing_ok=True)
+                shipped += 1
+        return shipped
+
+    def replay_mysql(self, db_name: str, backup_path: str, until: datetime, source_db: Optional[str] = None,
+                     cipher: Optional[BackupCipher] = None):
+        """
+        Roll a restored MySQL database forward to a point in time.
+
+        Binlogs are replayed from the coordinates recorded in the dump up to
+        ``until``, restricted to events of the database the backup was taken
+        from. When it was restored under another name, those events are
+        rewritten to ``db_name``.
+
+        Args:
+            db_name (str): Database that was just restored from ``backup_path``
+            backup_path (str): Full backup the database was restored from
+            until (datetime): Last point in time to replay, in server time
+            source_db (Optional[str]): Database the backup was taken from, if not ``db_name``
+            cipher (Optional[BackupCipher]): Cipher to read an encrypted backup with
+
+        Raises:
+            RuntimeError: If the dump has no binlog coordinates or archived binlogs are missing
+        """
+        position = read_binlog_position(backup_path, cipher)
+        if position is None:
+            raise RuntimeError(f"No binlog coordinates in {backup_path}; back up with pitr enabled "
+                               f"or add {self.config.pitr.mysql_position_option} to the mysqldump options")
+        start_file, start_pos = position
+        names = [name for name in self.list_archived() if _same_series(name, start_file) and name >= start_file]
+        if not names or names[0] != start_file:
+            raise RuntimeError(f"Binlog {start_file} is not in the archive")
+        _check_contiguous(names)
+
+        ensure_directory(Path(self.config.paths.temp_dir), self.logger)
+        work_dir = tempfile.mkdtemp(prefix=f"replay_{db_name}_", dir=self.config.paths.temp_dir)
+        try:
+            paths = [os.path.join(work_dir, name) for name in names]
+            for name, path in zip(names, paths):
+                if not self.fetch(name, path):
+                    raise RuntimeError(f"Failed to fetch archived binlog {name}")
+
+            db = self.config.database
+            env = os.environ.copy()
+            env["MYSQL_PWD"] = db.password
+            decode = ["mysqlbinlog", f"--start-position={start_pos}", f"--stop-datetime={until:%Y-%m-%d %H:%M:%S}"]
+            if source_db and source_db != db_name:
+                # mysqlbinlog rewrites first, then filters on the rewritten name
+                decode.append(f"--rewrite-db={source_db}->{db_name}")
+            decode += [f"--database={db_name}", *paths]
+            apply = ["mysql", "-h", db.host, "-P", str(db.port), "-u", db.user, db_name]
+            self.logger.info(f"Replaying {len(names)} binlog(s) from {start_file}:{start_pos} until {until}")
+            with self.executor.stream(decode, env=env) as events:
+                self.executor.feed(apply, events, env=env)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _start_receiver(self):
+        """
+        Start mysqlbinlog or pg_receivewal writing into the spool directory.
+        """
+        db = self.config.database
+        env = os.environ.copy()
+        if self.db_type == "mysql":
+            env["MYSQL_PWD"] = db.password
+            args = ["mysqlbinlog", "--read-from-remote-server", "--raw", "--stop-never",
+                    "-h", db.host, "-P", str(db.port), "-u", db.user,
+                    f"--result-file={self.spool_dir}{os.sep}", self._first_binlog(env)]
+        elif self.db_type == "postgresql":
+            env["PGPASSWORD"] = db.password
+            args = ["pg_receivewal", "-D", str(self.spool_dir), "-h", db.host, "-p", str(db.port), "-U", db.user]
+            slot = self.config.pitr.pg_slot
+            if slot:
+                # A replication slot keeps the server from recycling WAL the archiver has not received yet
+                self.executor.run(shlex.join(["pg_receivewal", "--create-slot", "--if-not-exists", "-S", slot,
+                                              "-h", db.host, "-p", str(db.port), "-U", db.user]), env=env)
+                args += ["-S", slot]
+        else:
+            raise RuntimeError(f"Unsupported database type: {self.db_type}")
+        return self.executor.start(args, env=env)
+
+    def _first_binlog(self, env: dict) -> str:
+        """
+        Return the binlog to start streaming from: the one being received, the newest archived, or the oldest on the server.
+        """
+        spooled = sorted(path.name for path in self.spool_dir.iterdir() if path.is_file())
+        if spooled:
+            return spooled[-1]
+        if self.config.pitr.mysql_start_binlog:
+            return self.config.pitr.mysql_start_binlog
+        archived = self.list_archived()
+        if archived:
+            return archived[-1]
+        db = self.config.database
+        command = shlex.join(["mysql", "-h", db.host, "-P", str(db.port), "-u", db.user, "-N", "-e", "SHOW BINARY LOGS"])
+        output = self.executor.run(command, capture_output=True, env=env)
+        if not output:
+            raise RuntimeError("The server has no binary logs; enable log_bin for point-in-time recovery")
+        return output.splitlines()[0].split()[0]
+
+    def _completed_spool_files(self) -> list[Path]:
+        """
+        Return spool files the receiver has finished writing, oldest first.
+        """
+        if not self.spool_dir.is_dir():
+            return []
+        files = sorted(path for path in self.spool_dir.iterdir() if path.is_file() and not path.name.startswith("."))
+        if self.db_type == "mysql":
+            return files[:-1]  # mysqlbinlog is still appending to the newest file
+        return [path for path in files if not path.name.endswith(".partial")]
+
+    def _find_local(self, name: str) -> Optional[Path]:
+        for path in self.archive_dir.glob(f"{name}*"):
+            if path.is_file() and _strip_codec(path.name) == name:
+                return path
+        return None
+
+    def _list_s3(self):
+        if self.s3_storage is None:
+            return []
+        return self.s3_storage.list_backup_objects(prefix=f"{S3_ARCHIVE_PREFIX}{self.db_type}/", include_hidden=True)
+
+
+def read_binlog_position(backup_path: str, cipher: Optional[BackupCipher] = None) -> Optional[tuple[str, int]]:
+    """
+    Read the binlog coordinates mysqldump recorded at the top of a dump, or the manifest of a ``tables`` backup.
+
+    Args:
+        backup_path (str): Path to a possibly compressed MySQL dump
+        cipher (Optional[BackupCipher]): Cipher to read an encrypted dump with
+
+    Returns:
+        Optional[tuple[str, int]]: Binlog file name and position, or None if the dump has none
+    """
+    if is_tables_backup(backup_path):
+        binlog = TablesArchive(backup_path).manifest["binlog"]
+        return (binlog["file"], binlog["position"]) if binlog else None
+    with open_backup(backup_path, cipher) as reader:
+        return parse_binlog_position(reader.read(POSITION_SEARCH_LIMIT))
+
+
+def parse_binlog_position(head: bytes) -> Optional[tuple[str, int]]:
+    """
+    Find the binlog coordinates in the first bytes of a mysqldump.
+    """
+    match = _BINLOG_POSITION.search(head)
+    if not match:
+        return None
+    return match["file"].decode(), int(match["pos"])
+
+
+def read_wal_start(backup_path: str, cipher: Optional[BackupCipher] = None) -> Optional[str]:
+    """
+    Read the WAL segment a base backup starts in from the ``backup_label`` in its tar.
+
+    Args:
+        backup_path (str): Path to a possibly compressed ``pg_basebackup -F t`` tar
+        cipher (Optional[BackupCipher]): Cipher to read an encrypted backup with
+
+    Returns:
+        Optional[str]: WAL segment name, or None if the tar has no backup_label
+    """
+    with open_backup(backup_path, cipher) as reader, tarfile.open(fileobj=reader, mode="r|") as tar:
+        for member in tar:
+            if os.path.normpath(member.name) == "backup_label":
+                match = _WAL_START.search(tar.extractfile(member).read())
+                return match["file"].decode() if match else None
+    return None
+
+
+@contextmanager
+def open_backup(backup_path: str, cipher: Optional[BackupCipher]) -> Iterator[IO[bytes]]:
+    """
+    Open a backup file as a stream of its decrypted, decompressed content.
+
+    Raises:
+        ValueError: If the backup is encrypted and no cipher is given
+    """
+    with open(backup_path, "rb") as f:
+        source = f
+        if is_encrypted(backup_path):
+            if cipher is None:
+                raise ValueError(f"{backup_path} is encrypted and no encryption key is configured")
+            source = cipher.open_reader(f)
+        yield codec_for_path(backup_path).open_reader(source)
+
+
+def _strip_codec(name: str) -> str:
+    for codec in CODECS.values():
+        if codec.extension and name.endswith(codec.extension):
+            return name[:-len(codec.extension)]
+    return name
+
+
+def _same_series(name: str, reference: str) -> bool:
+    return name.rsplit(".", 1)[0] == reference.rsplit(".", 1)[0]
+
+
+def _sequence(name: str) -> int:
+    return int(name.rsplit(".", 1)[1])
+
+
+def _check_contiguous(names: list[str]):
+    """
+    Ensure binlog sequence numbers have no gaps, which would silently skip transactions.
+    """
+    numbers = [_sequence(name) for name in names]
+    for previous, current in zip(numbers, numbers[1:]):
+        if current != previous + 1:
+            raise RuntimeError(f"Binlog archive has a gap between sequence {previous} and {current}")
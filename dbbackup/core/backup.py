@@ -1,94 +1,756 @@
 """
 Handle database backup operations with compression and storage integration.
 """
+import asyncio
 import os
+import shlex
+import shutil
 import logging
-from datetime import datetime
-from dbbackup.core.executor import CommandExecutor
+import tarfile
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+from dbbackup.core.block_index import BlockIndexBuilder, index_path
+from dbbackup.core.catalog import BackupCatalog, CatalogEntry
+from dbbackup.core.encryption import ENCRYPTED_EXTENSION, BackupCipher
+from dbbackup.core.executor import AsyncCommandExecutor, CommandExecutor
+from dbbackup.core.journal import STAGE_COMPRESSED, JobJournal, JournalCollector, JournalJob
+from dbbackup.core.metrics import MetricsRecorder
+from dbbackup.core.mysql_parallel import MySQLParallelDumper, pack_dump
+from dbbackup.core.integrity import HashingReader, HashingWriter, format_checksum, new_hash, write_manifest
+from dbbackup.core.storages.backends import StorageFanout
+from dbbackup.core.storages.dedup import DEDUP_EXTENSION, DedupStorage
 from dbbackup.core.storages.local import LocalStorage
 from dbbackup.core.storages.s3 import S3Storage
-from dbbackup.utils.timeutils import generate_timestamped_filename
-from dbbackup.core.compressor import Compressor
+from dbbackup.core.pipeline import TeeWriter, run_async_pipeline
+from dbbackup.core.scheduler import AsyncJobScheduler, JobScheduler, RunSummary
+from dbbackup.utils.paths import ensure_directory
+from dbbackup.utils.timeutils import generate_backup_key, generate_timestamped_filename
+from dbbackup.core.compressor import CHUNK_SIZE, Compressor, codec_for_path
+
+# pg_dump format name -> (pg_dump -F letter, file extension)
+PG_DUMP_FORMATS = {
+    "plain": ("p", "sql"),
+    "custom": ("c", "dump"),
+    "directory": ("d", "dir"),
+    "tar": ("t", "tar"),
+}
+# Formats whose files are already compressed; the configured codec is skipped for them
+PRECOMPRESSED_FORMATS = {"custom", "directory", "tables"}
+# Formats dumped into a directory, which are packed into a tar and cannot be streamed
+DIRECTORY_FORMATS = {"directory", "tables"}
+# Database type -> (physical backup format, file extension)
+PHYSICAL_FORMATS = {
+    "postgresql": ("basebackup", "base.tar"),
+    "mysql": ("xbstream", "xbstream"),
+}
+# Backup format -> file extension
+BACKUP_EXTENSIONS = {
+    **{name: extension for name, (_, extension) in PG_DUMP_FORMATS.items()},
+    **dict(PHYSICAL_FORMATS.values()),
+    "tables": "tables",
+}
 
 class DatabaseBackup:
     """
     Handles database backup operations including compression and storage.
     """
-    def __init__(self, config, logger: logging.Logger):
+    def __init__(self, config, logger: logging.Logger, metrics: MetricsRecorder | None = None,
+                 journal: JobJournal | None = None, destinations: StorageFanout | None = None):
         self.config = config
         self.logger = logger
         self.executor = CommandExecutor(logger, dry_run=config.runtime.dry_run)
-        
+        self.async_executor = AsyncCommandExecutor(logger, dry_run=config.runtime.dry_run)
+
+        # A long-running caller shares one recorder, one journal and one set of destinations
+        # between several instances
+        self.metrics = metrics or MetricsRecorder("backup")
+
         # Initialize storage handlers
-        self.local_storage = LocalStorage(config.paths.backup_dir, logger)
-        self.s3_storage = S3Storage(
-            bucket_name=config.aws.s3_bucket,
-            logger=logger,
-            aws_region=config.aws.region
-        )
-        
+        self.local_storage = LocalStorage(config.paths.backup_dir, logger, metrics=self.metrics)
+        self.journal = None
+        if config.journal.enabled:
+            self.journal = journal or JobJournal.for_backup_dir(config.paths.backup_dir, logger)
+        self.s3_storage = None
+        if config.aws is not None:
+            self.s3_storage = S3Storage.from_config(config.aws, logger, metrics=self.metrics, journal=self.journal)
+        self._destinations = destinations
+        self._destinations_lock = threading.Lock()
+
+        self.catalog = BackupCatalog.for_backup_dir(config.paths.backup_dir, logger)
+        self.dedup_storage = DedupStorage.from_config(config, logger) if config.dedup.enabled else None
+
+        # Backups are encrypted between the compressor and the storages
+        self.cipher = BackupCipher.from_config(config.encryption) if config.encryption.enabled else None
+
         # Initialize compressor
-        self.compressor = Compressor(logger)
-        
-    def run(self, databases: list[str] | None = None):
+        self.compressor = Compressor(
+            logger,
+            method=config.compression.method,
+            level=config.compression.level,
+            threads=config.compression.threads,
+            metrics=self.metrics
+        )
+
+    def run(self, databases: list[str] | None = None) -> RunSummary:
         """
         Run backup for selected databases.
 
+        Up to ``runtime.max_concurrent_jobs`` databases are dumped, compressed
+        and uploaded at the same time, on a thread pool or, with
+        ``runtime.engine: asyncio``, on one event loop with per-job timeouts.
+        A failing database does not stop the others. Per-stage metrics of
+        the run are logged and exported where ``metrics`` is configured.
+        With the job journal enabled, what interrupted runs left behind is
+        garbage-collected first.
+
         Args:
             databases (list[str] | None): List of database names. If None, use defaults.
+
+        Returns:
+            RunSummary: Per-database status and wall time
         """
+        if self._physical():
+            # A physical backup copies the whole instance, so it runs as a single job
+            label = self.config.database.physical.label
+            if databases and databases != [label]:
+                self.logger.info(f"Physical backups copy the whole instance; backing up as '{label}'")
+            databases = [label]
         if not databases:
             databases = self.config.database.default_databases or ['all']
-        
-        for db_name in databases:
-            self._backup_single_database(db_name)
-            
-    def _backup_single_database(self, db_name: str):
+
+        runtime = self.config.runtime
+        self.collect_garbage()
+        if runtime.engine == "asyncio":
+            async_scheduler = AsyncJobScheduler(self.logger, max_concurrency=runtime.max_concurrent_jobs,
+                                                timeout=runtime.job_timeout)
+            summary = async_scheduler.run(databases, self._measured_job_async)
+        else:
+            scheduler = JobScheduler(self.logger, max_workers=runtime.max_concurrent_jobs)
+            summary = scheduler.run(databases, self.backup_database)
+
+        for result in summary.results:
+            self.metrics.record_job(result.name, result.succeeded, result.duration)
+        self.metrics.log_summary(self.logger)
+        self.metrics.write_reports(self.logger, self.config.metrics.textfile_dir, self.config.metrics.report_dir)
+        return summary
+
+    @property
+    def destinations(self) -> StorageFanout:
+        """
+        Destinations every backup is copied to, opened on first use.
+        """
+        with self._destinations_lock:
+            if self._destinations is None:
+                self._destinations = StorageFanout.from_config(self.config, self.logger, self.metrics,
+                                                               self.local_storage, self.s3_storage)
+            return self._destinations
+
+    def collect_garbage(self):
+        """
+        Remove what interrupted runs left behind and no run can resume, if the job journal is enabled.
+        """
+        if self.journal is not None and not self.config.runtime.dry_run:
+            JournalCollector(self.config, self.logger, self.journal, self.s3_storage).run()
+
+    def backup_database(self, db_name: str) -> Optional[str]:
+        """
+        Back up one database with every recorded stage labelled with its name.
+
+        Args:
+            db_name (str): Database name
+
+        Returns:
+            Optional[str]: Where the backup was stored, or None if it failed
+        """
+        with self.metrics.database(db_name):
+            return self._backup_single_database(db_name)
+
+    async def _measured_job_async(self, db_name: str) -> Optional[str]:
+        """
+        Asyncio counterpart of ``backup_database``.
+        """
+        with self.metrics.database(db_name):
+            return await self._backup_single_database_async(db_name)
+
+    def _backup_single_database(self, db_name: str) -> Optional[str]:
         """
         Backup a single database, compress it, and save to storage.
+
+        In streaming mode the dump is compressed and written to every storage
+        as it is produced. With deduplication enabled, plain dumps are stored
+        as content-defined chunks. Otherwise the dump is written to a private
+        working directory under ``temp_dir`` so concurrent jobs never share
+        temporary files. If the compressed backup cannot be stored, the
+        directory is kept and the next run for the database stores it
+        instead of dumping again.
+
+        Returns:
+            Optional[str]: Name of the stored backup file, or None on failure
+        """
+        if self._physical():
+            return self._stream_backup(db_name)  # pg_basebackup and xtrabackup write the backup to stdout
+
+        if self.dedup_storage is not None:
+            if self._dump_format() == "plain":
+                return self._dedup_backup(db_name)
+            self.logger.info(f"Deduplication only applies to plain dumps, storing {db_name} as a regular backup")
+
+        if self.config.runtime.streaming:
+            if self._dump_format() not in DIRECTORY_FORMATS:
+                return self._stream_backup(db_name)
+            self.logger.info(f"Directory dump formats cannot be streamed, using a working directory for {db_name}")
+
+        job = self._claim_interrupted(db_name)
+        if job is not None:
+            return self._resume_backup(job)
+
+        ensure_directory(Path(self.config.paths.temp_dir), self.logger)
+        work_dir = tempfile.mkdtemp(prefix=f"{db_name}_", dir=self.config.paths.temp_dir)
+        job_id = None
+        if self.journal is not None and not self.config.runtime.dry_run:
+            job_id = self.journal.start_job(db_name, datetime.now(), work_dir)
+        stored = None
+        try:
+            stored = self._dump_compress_store(db_name, work_dir, job_id)
+            return stored
+        finally:
+            if stored is None and self._keep_for_resume(job_id):
+                self.logger.warning(f"Compressed backup of {db_name} kept in {work_dir} for the next run")
+            else:
+                if job_id is not None:
+                    self.journal.finish_job(job_id)
+                shutil.rmtree(work_dir, ignore_errors=True)
+                self.logger.debug(f"Temporary backup directory removed: {work_dir}")
+
+    def _claim_interrupted(self, db_name: str) -> Optional[JournalJob]:
+        """
+        Take over an interrupted job of a database whose compressed backup is still complete.
+        """
+        if self.journal is None or self.config.runtime.dry_run:
+            return None
+        since = datetime.now() - timedelta(hours=self.config.journal.max_age_hours)
+        job = self.journal.claim_resumable(db_name, since)
+        if job is not None and not os.path.isfile(job.backup_path):
+            self.logger.warning(f"Interrupted backup of {db_name} is gone from {job.work_dir}, dumping again")
+            self.journal.finish_job(job.id)
+            shutil.rmtree(job.work_dir, ignore_errors=True)
+            return None
+        return job
+
+    def _resume_backup(self, job: JournalJob) -> Optional[str]:
         """
+        Store the compressed backup of an interrupted job instead of dumping the database again.
+        """
+        self.logger.info(f"Resuming interrupted backup of {job.database} taken at {job.created_at}: "
+                         f"{job.backup_path}")
+        stored = self._store_backup(job.database, job.created_at, job.backup_path, job.format, job.codec,
+                                    job.checksum, job.target_key)
+        if stored is None:
+            self.journal.release_job(job.id)
+            self.logger.warning(f"Compressed backup of {job.database} kept in {job.work_dir} for the next run")
+        else:
+            self.journal.finish_job(job.id)
+            shutil.rmtree(job.work_dir, ignore_errors=True)
+        return stored
+
+    def _keep_for_resume(self, job_id: Optional[int]) -> bool:
+        """
+        Leave an unfinished job in the journal if its compressed backup is complete.
+        """
+        if job_id is None:
+            return False
+        job = self.journal.get_job(job_id)
+        if job is None or job.stage != STAGE_COMPRESSED:
+            return False
+        self.journal.release_job(job_id)
+        return True
+
+    def _dump_command(self, db_name: str) -> tuple[list[str], dict] | None:
+        """
+        Build the dump command for the configured database type.
+
+        The password is passed through the environment, never on the command line.
+
+        Returns:
+            tuple[list[str], dict] | None: Command arguments and environment, or None if unsupported
+        """
+        if self._physical():
+            return self._physical_command()
+        db = self.config.database
+        db_type = db.type.lower()
+        env = os.environ.copy()
+        if db_type == "mysql":
+            env["MYSQL_PWD"] = db.password
+            options = list(db.dump.mysql.options)
+            if self.config.pitr.enabled:
+                # Record the binlog coordinates of the snapshot so restores can roll forward from it
+                position_option = self.config.pitr.mysql_position_option
+                options += [opt for opt in ("--single-transaction", position_option)
+                            if opt.split("=")[0] not in {o.split("=")[0] for o in options}]
+            return ["mysqldump", "-h", db.host, "-P", str(db.port), "-u", db.user,
+                    *options, db_name], env
+        if db_type == "postgresql":
+            env["PGPASSWORD"] = db.password
+            pg = db.dump.postgresql
+            args = ["pg_dump", "-h", db.host, "-p", str(db.port), "-U", db.user, "-F", PG_DUMP_FORMATS[pg.format][0]]
+            if pg.format == "directory" and pg.jobs > 1:
+                args += ["-j", str(pg.jobs)]
+            return args + [*pg.options, db_name], env
+        self.logger.error(f"Unsupported database type: {db_type}")
+        return None
+
+    def _physical_command(self) -> tuple[list[str], dict] | None:
+        """
+        Build the hot backup command of the instance, writing a tar or xbstream archive to stdout.
+
+        Returns:
+            tuple[list[str], dict] | None: Command arguments and environment, or None if unsupported
+        """
+        db = self.config.database
+        physical = db.physical
+        db_type = db.type.lower()
+        env = os.environ.copy()
+        if db_type == "postgresql":
+            env["PGPASSWORD"] = db.password
+            # With -X fetch the tar includes the WAL needed to make the copy consistent
+            return ["pg_basebackup", "-h", db.host, "-p", str(db.port), "-U", db.user,
+                    "-D", "-", "-F", "t", "-X", "fetch", "--checkpoint=fast", *physical.options], env
+        if db_type == "mysql":
+            env["MYSQL_PWD"] = db.password
+            ensure_directory(Path(self.config.paths.temp_dir), self.logger)
+            return [physical.mysql_tool, "--backup", "--stream=xbstream", f"--parallel={physical.jobs}",
+                    f"--target-dir={self.config.paths.temp_dir}", f"--host={db.host}", f"--port={db.port}",
+                    f"--user={db.user}", *physical.options], env
+        self.logger.error(f"Unsupported database type: {db_type}")
+        return None
+
+    def _physical(self) -> bool:
+        """
+        Return True when backups are physical copies of the instance instead of logical dumps.
+        """
+        return self.config.database.backup_mode == "physical"
+
+    def _dump_format(self) -> str:
+        """
+        Return the dump format in use: a pg_dump format name, 'plain' or 'tables' for MySQL, or a physical format.
+        """
+        if self._physical():
+            return PHYSICAL_FORMATS.get(self.config.database.type.lower(), ("plain",))[0]
+        if self.config.database.type.lower() == "postgresql":
+            return self.config.database.dump.postgresql.format
+        return self.config.database.dump.mysql.format
+
+    def _index_builder(self) -> Optional[BlockIndexBuilder]:
+        """
+        Return a block index builder for plain dumps, whose tables can then be restored one by one.
+
+        Encrypted backups get no index; their chunks do not line up with codec frames.
+        """
+        if self._dump_format() != "plain" or self.cipher is not None:
+            return None
+        return BlockIndexBuilder(self.config.database.type.lower(), self._dump_codec())
+
+    def _save_index(self, index: Optional[BlockIndexBuilder], backup_path: str):
+        """
+        Write the block index of a stored backup next to it.
+        """
+        if index is None:
+            return
+        try:
+            index.finish().save(index_path(backup_path))
+        except Exception as e:
+            # The backup is still complete; selective restores fall back to scanning it
+            self.logger.warning(f"Block index not written for {backup_path}: {e}")
+
+    def _dump_codec(self) -> str:
+        """
+        Return the codec applied to the dump, skipping formats pg_dump already compressed.
+        """
+        return "none" if self._dump_format() in PRECOMPRESSED_FORMATS else self.compressor.method
+
+    def _dump_compress_store(self, db_name: str, work_dir: str, job_id: Optional[int] = None) -> Optional[str]:
+        """
+        Dump a database into ``work_dir``, compress it and hand it to the storages.
+
+        Once the compressed file is complete, the journal job ``job_id`` is
+        moved to the 'compressed' stage with everything needed to store it.
+        """
+        dump_format = self._dump_format()
+        created = datetime.now()
         timestamped_filename = generate_timestamped_filename(
-            prefix=self.config.app.name,
+            prefix=self.config.app.app_name,
             db_name=db_name,
-            extension="sql",
-            logger=self.logger
+            extension=BACKUP_EXTENSIONS[dump_format],
+            logger=self.logger,
+            timestamp=created
         )
-        
-        backup_path = os.path.join(self.config.paths.temp_dir,timestamped_filename)
-        
-        # Backup command (secure password handling)
-        db_type = self.config.database.type.lower()
+
+        backup_path = os.path.join(work_dir, timestamped_filename)
+
+        if dump_format == "tables":
+            run_dump = lambda: self._dump_tables(db_name, backup_path)
+        else:
+            dump = self._dump_command(db_name)
+            if dump is None:
+                return None
+            args, env = dump
+            output_args = ["-f", backup_path] if args[0] == "pg_dump" else [f"--result-file={backup_path}"]
+            run_dump = lambda: self.executor.run(shlex.join(args + output_args), env=env)
         try:
-            if db_type == "mysql":
-                cmd = f"mysqldump -h {self.config.database.host} -P {self.config.database.port} " \
-                      f"-u {self.config.database.user} {db_name} > {backup_path}"
-                env = os.environ.copy()
-                env["MYSQL_PWD"] = self.config.database.password
-                self.executor.run(cmd, env=env)
-
-            elif db_type == "postgresql":
-                cmd = f"PGPASSWORD={self.config.database.password} pg_dump -h {self.config.database.host} " \
-                      f"-p {self.config.database.port} -U {self.config.database.user} {db_name} -f {backup_path}"
-                self.executor.run(cmd)
-                
-            else:
-                self.logger.error(f"Unsupported database type: {db_type}")
-                return
-            
+            with self.metrics.stage("dump") as dump_stage:
+                run_dump()
         except Exception as e:
             self.logger.error(f"Backup failed for {db_name}: {e}")
-            return
-        
+            return None
+
+        if self.config.runtime.dry_run:
+            self.logger.info(f"[DRY-RUN] Skipping compression and storage for {db_name}")
+            return timestamped_filename
+
         self.logger.info(f"Database backup created: {backup_path}")
-        
-        # Compress backup
-        compressed_file = self.compressor.compress_file(backup_path)
-        
-        # Save to storage
-        self.local_storage.save_backup(compressed_file, os.path.basename(compressed_file))
-        self.s3_storage.upload_backup(compressed_file, os.path.basename(compressed_file))
-        
-        # Optionally, remove temp file
-        if os.path.exists(backup_path):
-            os.remove(backup_path)
-            self.logger.debug(f"Temporary backup file removed: {backup_path}")
\ No newline at end of file
+        dump_stage.bytes_out = _path_size(backup_path)
+
+        if dump_format == "directory":
+            backup_path = self._pack_directory(backup_path)
+        elif dump_format == "tables":
+            backup_path = pack_dump(backup_path)
+
+        # Compress backup, hashing the compressed bytes as they are written
+        algorithm = self.config.verification.algorithm
+        hasher = new_hash(algorithm)
+        index = self._index_builder()
+        compressed_file = self.compressor.compress_file(backup_path, method=self._dump_codec(), hasher=hasher,
+                                                        index=index, cipher=self.cipher)
+        codec = self._dump_codec()
+        if compressed_file == backup_path and self.compressor.extension(codec):
+            # Compression failed and the dump is stored as-is: the hasher saw part of the discarded
+            # output and the index frames do not match the dump
+            with open(compressed_file, "rb") as f:
+                reader = HashingReader(f, algorithm)
+                reader.drain()
+            checksum = reader.checksum
+            codec = codec_for_path(compressed_file).name
+        else:
+            checksum = format_checksum(algorithm, hasher.hexdigest())
+            if compressed_file == backup_path + self.compressor.extension(codec):
+                self._save_index(index, compressed_file)  # Moved next to the backup once it is stored
+
+        target_key = generate_backup_key(db_name, os.path.basename(compressed_file), created)
+        if job_id is not None:
+            self.journal.update_job(job_id, stage=STAGE_COMPRESSED, created_at=created, backup_path=compressed_file,
+                                    format=dump_format, codec=codec, checksum=checksum, target_key=target_key)
+        return self._store_backup(db_name, created, compressed_file, dump_format, codec, checksum, target_key)
+
+    def _store_backup(self, db_name: str, created: datetime, compressed_file: str, dump_format: str, codec: str,
+                      checksum: str, target_key: str) -> Optional[str]:
+        """
+        Copy a compressed backup to every destination, then write its manifest and block index and catalog it.
+
+        Returns:
+            Optional[str]: Name of the stored backup file, or None if a required destination failed
+        """
+        target_name = os.path.basename(compressed_file)
+        stored = self.destinations.store(compressed_file, target_key, metadata={"checksum": checksum})
+        if stored is None:
+            self.logger.error(f"Backup of {db_name} was not stored in every destination")
+            return None
+        s3_destination = self.destinations.s3_destination
+        local_path = str(self.local_storage.backup_dir / target_name)
+        write_manifest(local_path, checksum)
+        if index_path(compressed_file).is_file():
+            shutil.move(index_path(compressed_file), index_path(local_path))
+
+        self._record_backup(CatalogEntry(
+            database=db_name,
+            created_at=created,
+            filename=target_name,
+            codec=codec,
+            format=dump_format,
+            size=os.path.getsize(compressed_file),
+            checksum=checksum,
+            local_path=local_path,
+            s3_key=target_key if s3_destination is not None and s3_destination.name in stored else None,
+        ))
+        return target_name
+
+    def _stream_backup(self, db_name: str) -> Optional[str]:
+        """
+        Pipe the dump through the compressor straight into every destination.
+
+        No uncompressed or intermediate file is written; each compressed byte
+        is written once to the backup directory and once to every other
+        destination.
+        """
+        created, codec, target_name, target_key = self._stream_target(db_name)
+
+        dump = self._dump_command(db_name)
+        if dump is None:
+            return None
+        args, env = dump
+
+        if self.config.runtime.dry_run:
+            self.logger.info(f"[DRY-RUN] Command not executed: {shlex.join(args)} | {codec} > {target_name}")
+            return target_name
+
+        try:
+            tee = self.destinations.open_writers(target_key)
+        except Exception as e:
+            self.logger.error(f"Could not open backup destinations for {db_name}: {e}")
+            return None
+
+        hashing = HashingWriter(tee, self.config.verification.algorithm)
+        sink = self._encrypting(hashing)
+        index = self._index_builder()
+        try:
+            with self.executor.stream(args, env=env) as stdout:
+                bytes_in, bytes_out = self.compressor.compress_stream(stdout, sink, method=codec,
+                                                                      read_stage="dump", index=index)
+            sink.commit()
+        except Exception as e:
+            sink.abort()
+            self.logger.error(f"Streaming backup failed for {db_name}: {e}")
+            return None
+
+        self.logger.info(f"Streaming backup of {db_name} completed: {bytes_in} bytes dumped, {bytes_out} bytes stored")
+        self._record_stream(db_name, created, codec, target_name, target_key, tee, hashing)
+        self._save_index(index, str(tee.writers[0].target_path))
+        return target_name
+
+    async def _backup_single_database_async(self, db_name: str) -> Optional[str]:
+        """
+        Asyncio counterpart of ``_backup_single_database``, used by the asyncio engine.
+
+        Dumps are always streamed through the async pipeline. Deduplicated
+        and directory-format (pg_dump directory, MySQL tables) backups have
+        no async path; they run unchanged on the default thread pool and
+        cannot be interrupted by the job timeout.
+
+        Returns:
+            Optional[str]: Name of the stored backup file, or None on failure
+        """
+        dump_format = self._dump_format()
+        if dump_format in DIRECTORY_FORMATS or (self.dedup_storage is not None and dump_format == "plain"):
+            return await asyncio.to_thread(self._backup_single_database, db_name)
+        return await self._stream_backup_async(db_name)
+
+    async def _stream_backup_async(self, db_name: str) -> Optional[str]:
+        """
+        Stream a dump through separate read, compress and upload stages.
+
+        The stages are joined by bounded queues, so a slow upload throttles
+        the dump. Plain dumps get the same block index as ``_stream_backup``.
+        If the job is cancelled, for example by its timeout, the
+        dump is killed and every destination is aborted.
+        """
+        created, codec, target_name, target_key = self._stream_target(db_name)
+
+        dump = self._dump_command(db_name)
+        if dump is None:
+            return None
+        args, env = dump
+
+        if self.config.runtime.dry_run:
+            self.logger.info(f"[DRY-RUN] Command not executed: {shlex.join(args)} | {codec} > {target_name}")
+            return target_name
+
+        try:
+            tee = await asyncio.to_thread(self.destinations.open_writers, target_key)
+        except Exception as e:
+            self.logger.error(f"Could not open backup destinations for {db_name}: {e}")
+            return None
+
+        hashing = HashingWriter(tee, self.config.verification.algorithm)
+        sink = self._encrypting(hashing)
+        index = self._index_builder()
+        compressor = self.compressor.compressobj(codec, index)
+        try:
+            async with self.async_executor.stream(args, env=env) as stdout:
+                bytes_in, bytes_out = await run_async_pipeline(stdout, compressor, sink, metrics=self.metrics)
+            await asyncio.to_thread(sink.commit)
+        except asyncio.CancelledError:
+            await asyncio.to_thread(sink.abort)
+            self.logger.error(f"Streaming backup of {db_name} cancelled")
+            raise
+        except Exception as e:
+            await asyncio.to_thread(sink.abort)
+            self.logger.error(f"Streaming backup failed for {db_name}: {e}")
+            return None
+
+        self.logger.info(f"Streaming backup of {db_name} completed: {bytes_in} bytes dumped, {bytes_out} bytes stored")
+        self._record_stream(db_name, created, codec, target_name, target_key, tee, hashing)
+        await asyncio.to_thread(self._save_index, index, str(tee.writers[0].target_path))
+        return target_name
+
+    def _stream_target(self, db_name: str) -> tuple[datetime, str, str, str]:
+        """
+        Name a streamed backup.
+
+        Returns:
+            tuple[datetime, str, str, str]: Creation time, codec, file name and S3 key
+        """
+        codec = self._dump_codec()
+        created = datetime.now()
+        target_name = generate_timestamped_filename(
+            prefix=self.config.app.app_name,
+            db_name=db_name,
+            extension=BACKUP_EXTENSIONS[self._dump_format()] + self.compressor.extension(codec)
+            + (ENCRYPTED_EXTENSION if self.cipher is not None else ""),
+            logger=self.logger,
+            timestamp=created
+        )
+        return created, codec, target_name, generate_backup_key(db_name, target_name, created)
+
+    def _encrypting(self, hashing: HashingWriter):
+        """
+        Put the encryption stage in front of the hashing writer of a streamed backup, if configured.
+        """
+        if self.cipher is None:
+            return hashing
+        return self.cipher.encryptor(hashing, self.metrics)
+
+    def _record_stream(self, db_name: str, created: datetime, codec: str, target_name: str, target_key: str,
+                       tee: TeeWriter, hashing: HashingWriter):
+        """
+        Write the checksum manifest of a committed streamed backup and record it in the catalog.
+        """
+        local_writer, s3_writer = tee.writers[0], self.destinations.s3_writer(tee)
+        write_manifest(str(local_writer.target_path), hashing.checksum)
+        self._record_backup(CatalogEntry(
+            database=db_name,
+            created_at=created,
+            filename=target_name,
+            codec=codec,
+            format=self._dump_format(),
+            size=tee.bytes_written,
+            checksum=hashing.checksum,
+            local_path=str(local_writer.target_path),
+            s3_key=target_key if s3_writer is not None else None,
+            etag=s3_writer.etag if s3_writer is not None else None,
+        ))
+
+    def _dedup_backup(self, db_name: str) -> Optional[str]:
+        """
+        Stream a plain dump into the dedup chunk store.
+
+        Only chunks that no earlier backup stored are written and uploaded,
+        together with the backup's manifest. New chunks are recorded as
+        pending uploads as soon as they are stored, so chunks whose upload
+        fails or never starts are uploaded by the next deduplicated backup.
+        The chunk store only lives in the backup directory and the bucket of
+        the aws section, so other destinations receive no deduplicated backups.
+        """
+        created = datetime.now()
+        target_name = generate_timestamped_filename(
+            prefix=self.config.app.app_name,
+            db_name=db_name,
+            extension=PG_DUMP_FORMATS["plain"][1] + DEDUP_EXTENSION,
+            logger=self.logger,
+            timestamp=created
+        )
+        target_key = generate_backup_key(db_name, target_name, created)
+
+        dump = self._dump_command(db_name)
+        if dump is None:
+            return None
+        args, env = dump
+
+        if self.config.runtime.dry_run:
+            self.logger.info(f"[DRY-RUN] Command not executed: {shlex.join(args)} | dedup > {target_name}")
+            return target_name
+
+        algorithm = self.config.verification.algorithm
+        manifest_path = self.local_storage.backup_dir / target_name
+        writer = self.dedup_storage.open_writer(manifest_path, db_name, created, algorithm,
+                                                pending=self.s3_storage is not None)
+        try:
+            with self.metrics.stage("dedup") as dedup_stage:
+                with self.executor.stream(args, env=env) as stdout:
+                    while chunk := stdout.read(CHUNK_SIZE):
+                        writer.write(chunk)
+                writer.commit()
+                dedup_stage.bytes_in, dedup_stage.bytes_out = writer.bytes_in, writer.bytes_stored
+        except Exception as e:
+            writer.abort()
+            self.logger.error(f"Dedup backup failed for {db_name}: {e}")
+            return None
+
+        hasher = new_hash(algorithm)
+        hasher.update(manifest_path.read_bytes())
+        checksum = format_checksum(algorithm, hasher.hexdigest())
+        write_manifest(str(manifest_path), checksum)
+
+        if self.s3_storage is not None:
+            chunk_paths = self.dedup_storage.pending_uploads()
+            chunk_uploads = [(str(path), self.dedup_storage.chunk_key(path)) for path in chunk_paths]
+            if not self.s3_storage.upload_backups(chunk_uploads):
+                self.logger.error(f"Backup of {db_name} was not stored in every destination")
+                return None
+            self.dedup_storage.clear_pending(chunk_paths)
+            if not self.s3_storage.upload_backup(str(manifest_path), target_key, metadata={"checksum": checksum}):
+                self.logger.error(f"Backup of {db_name} was not stored in every destination")
+                return None
+
+        self.logger.info(f"Dedup backup of {db_name} completed: {writer.bytes_in} bytes dumped, "
+                         f"{writer.bytes_stored} bytes of new chunks stored")
+        self._record_backup(CatalogEntry(
+            database=db_name,
+            created_at=created,
+            filename=target_name,
+            codec="dedup",
+            format="plain",
+            size=manifest_path.stat().st_size,
+            checksum=checksum,
+            local_path=str(manifest_path),
+            s3_key=target_key if self.s3_storage is not None else None,
+        ))
+        return target_name
+
+    def _record_backup(self, entry: CatalogEntry):
+        """
+        Record a stored backup in the catalog.
+
+        A catalog failure is logged but does not fail the backup; the file
+        is adopted by the next directory import.
+        """
+        try:
+            self.catalog.record(entry)
+        except Exception as e:
+            self.logger.error(f"Failed to record {entry.filename} in the backup catalog: {e}")
+
+    def _dump_tables(self, db_name: str, dump_dir: str):
+        """
+        Dump a MySQL database table by table over parallel connections into ``dump_dir``.
+        """
+        if self.config.runtime.dry_run:
+            self.logger.info(f"[DRY-RUN] Parallel table dump of {db_name} not executed")
+            return
+        MySQLParallelDumper(self.config, self.logger, self.compressor).dump(db_name, dump_dir)
+
+    def _pack_directory(self, dump_dir: str) -> str:
+        """
+        Pack a pg_dump directory-format dump into a single uncompressed tar file.
+
+        The files inside are already compressed by pg_dump, so the archive is
+        stored as-is and unpacked again by restore for a parallel pg_restore.
+
+        Returns:
+            str: Path to the ``.dir.tar`` archive
+        """
+        archive_path = f"{dump_dir}.tar"
+        with tarfile.open(archive_path, "w") as tar:
+            tar.add(dump_dir, arcname=os.path.basename(dump_dir))
+        shutil.rmtree(dump_dir, ignore_errors=True)
+        self.logger.debug(f"Directory dump packed: {archive_path}")
+        return archive_path
+
+
+def _path_size(path: str) -> int:
+    """
+    Return the size of a file, or the total size of the files in a directory.
+    """
+    if os.path.isdir(path):
+        return sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file())
+    return os.path.getsize(path)
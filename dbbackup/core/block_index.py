@@ -0,0 +1,435 @@
+"""
+Block index of plain SQL dumps, used to restore single tables without replaying the whole dump.
+
+While a plain mysqldump or pg_dump stream is compressed, it is split into
+sections at the object header comments both tools write (``-- Table
+structure for table ...``, ``-- Name: ...; Type: ...``). At a section boundary
+a new codec frame is started once the current frame holds FRAME_BYTES, so
+every frame can be decompressed on its own. The index records where each
+frame starts in the compressed file and where each section starts in the
+dump; a selective restore seeks to the frame before a section and
+decompresses only from there.
+"""
+
+import bisect
+import json
+import re
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import IO, Callable, Iterable, Iterator, Optional
+
+INDEX_VERSION = 1
+# Minimum uncompressed size of a frame before a section boundary starts a new one
+FRAME_BYTES = 16 * 1024 * 1024
+# Bytes after a header line that are inspected to find the table an object belongs to
+LOOKAHEAD = 4096
+READ_SIZE = 1024 * 1024
+
+_MYSQL_KINDS = {
+    b"Table structure for table": "TABLE",
+    b"Dumping data for table": "TABLE DATA",
+    b"Temporary view structure for view": "VIEW",
+    b"Final view structure for view": "VIEW",
+}
+_MYSQL_HEADER = re.compile(rb"-- (" + b"|".join(_MYSQL_KINDS) + rb") `((?:[^`]|``)+)`$")
+_MYSQL_DATABASE_HEADER = re.compile(rb"-- Dumping (events|routines) for database ")
+_PG_HEADER = re.compile(rb"-- (?:Data for )?Name: (.+?); Type: (.+?); Schema: (.+?); Owner: ")
+_PG_COPY = re.compile(rb"\nCOPY [^\n]* FROM stdin;\n")
+_PG_INDEX_TABLE = re.compile(rb"\bON (?:ONLY )?([^\s(]+)")
+_PG_OWNED_BY = re.compile(rb"\bOWNED BY ([^\s;]+)\.[^.\s;]+;")
+_PG_IDENTITY_TABLE = re.compile(rb"\bALTER TABLE (?:ONLY )?([^\s]+) ALTER COLUMN ")
+_PG_IDENTIFIER = re.compile(r'"((?:[^"]|"")*)"|([^."]+)')
+_TOC_ENTRY = re.compile(r"^\d+; \d+ \d+ (?P<entry>.+)$")
+
+# pg_dump object types whose tag starts with the name of the table they belong to
+_PG_TABLE_TAGGED = {"TABLE", "TABLE DATA", "CONSTRAINT", "FK CONSTRAINT", "DEFAULT", "TRIGGER", "POLICY", "RULE",
+                    "ROW SECURITY"}
+
+
+@dataclass
+class Section:
+    """
+    One object of a dump: its header comment up to the next object's header.
+    """
+    kind: str
+    schema: Optional[str]
+    name: str
+    table: Optional[str]
+    offset: int
+    length: int = 0
+
+
+@dataclass
+class BlockIndex:
+    """
+    Frames of a compressed dump and the sections of the uncompressed dump.
+    """
+    dialect: str
+    codec: str
+    frames: list[tuple[int, int]]
+    sections: list[Section]
+
+    def save(self, path: Path):
+        """
+        Write the index as JSON.
+        """
+        data = {"version": INDEX_VERSION, "dialect": self.dialect, "codec": self.codec,
+                "frames": self.frames, "sections": [asdict(section) for section in self.sections]}
+        path.write_text(json.dumps(data, separators=(",", ":")))
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["BlockIndex"]:
+        """
+        Read an index written by :meth:`save`, or return None if there is none.
+        """
+        if not path.is_file():
+            return None
+        data = json.loads(path.read_text())
+        if data.get("version") != INDEX_VERSION:
+            return None
+        return cls(data["dialect"], data["codec"], [tuple(frame) for frame in data["frames"]],
+                   [Section(**section) for section in data["sections"]])
+
+    def select(self, tables: Iterable[str]) -> list[tuple[int, int]]:
+        """
+        Return the merged uncompressed ranges of the dump header and of every section of ``tables``.
+
+        Args:
+            tables (Iterable[str]): Table names, optionally schema-qualified for PostgreSQL
+
+        Returns:
+            list[tuple[int, int]]: Sorted ``(start, end)`` byte ranges
+        """
+        wanted = [_split_table(table) for table in tables]
+        ranges = []
+        for section in self.sections:
+            if section.kind != "PREAMBLE" and not _matches(section, wanted):
+                continue
+            if ranges and ranges[-1][1] == section.offset:
+                ranges[-1] = (ranges[-1][0], section.offset + section.length)
+            else:
+                ranges.append((section.offset, section.offset + section.length))
+        return ranges
+
+    def missing(self, tables: Iterable[str]) -> list[str]:
+        """
+        Return the requested tables the dump does not define.
+        """
+        defined = [section for section in self.sections if section.kind == "TABLE"]
+        return [table for table in tables if not any(_matches(section, [_split_table(table)]) for section in defined)]
+
+    def frame_for(self, offset: int) -> tuple[int, int]:
+        """
+        Return the compressed and uncompressed start of the last frame starting at or before ``offset``.
+        """
+        starts = [start for _, start in self.frames]
+        return self.frames[bisect.bisect_right(starts, offset) - 1]
+
+
+class SectionScanner:
+    """
+    Find the object sections of a plain mysqldump or pg_dump stream as it is read.
+
+    Only header comments are parsed; pg_dump COPY data is skipped without
+    looking at its rows.
+    """
+    def __init__(self, dialect: str):
+        self.dialect = dialect
+        self.sections = [Section("PREAMBLE", None, "", None, 0)]
+        self._buffer = b"\n"  # A virtual newline, so a header on the first line is found too
+        self._base = -1
+        self.settled = 0  # No section can start before this dump offset any more
+        self._pos = 0
+        self._in_copy = False
+        self._owned: dict[tuple[Optional[str], str], str] = {}
+
+    def feed(self, data: bytes, final: bool = False) -> list[int]:
+        """
+        Scan the next part of the dump.
+
+        Args:
+            data (bytes): Next bytes of the dump
+            final (bool): Whether this is the end of the dump
+
+        Returns:
+            list[int]: Dump offsets of the sections found, in order
+        """
+        self._buffer += data
+        return self._scan(final)
+
+    def finish(self, total: int) -> list[Section]:
+        """
+        Scan the rest of the dump and return all sections with their lengths.
+
+        Args:
+            total (int): Size of the dump in bytes
+        """
+        self._scan(final=True)
+        ends = [section.offset for section in self.sections[1:]] + [total]
+        for section, end in zip(self.sections, ends):
+            section.length = end - section.offset
+            if section.table is None and section.kind in ("SEQUENCE", "SEQUENCE SET"):
+                section.table = self._owned.get((section.schema, section.name))
+        return self.sections
+
+    def _scan(self, final: bool) -> list[int]:
+        buffer, starts = self._buffer, []
+        keep_from = None
+        while True:
+            if self._in_copy:
+                end = buffer.find(b"\n\\.\n", self._pos)
+                if end < 0:
+                    break
+                self._in_copy = False
+                self._pos = end + 3
+                continue
+            start = buffer.find(b"\n-- ", self._pos)
+            if start < 0:
+                break
+            line_end = buffer.find(b"\n", start + 1)
+            if not final and (line_end < 0 or len(buffer) - line_end < LOOKAHEAD):
+                keep_from = start  # Wait for the rest of the header and the statement after it
+                break
+            if line_end < 0:
+                line_end = len(buffer)
+            section = self._parse(buffer[start + 1:line_end], buffer[line_end:line_end + LOOKAHEAD],
+                                  self._base + start + 1)
+            if section is not None:
+                self.sections.append(section)
+                starts.append(section.offset)
+                if self.dialect == "postgresql" and section.kind == "TABLE DATA":
+                    copy = _PG_COPY.search(buffer, line_end, line_end + LOOKAHEAD)
+                    if copy:
+                        self._in_copy = True
+                        line_end = copy.end() - 1
+            self._pos = line_end
+
+        if keep_from is None:
+            keep_from = max(self._pos, len(buffer) - 3)  # A marker may straddle the next chunk
+        self._buffer = buffer[keep_from:]
+        self._base += keep_from
+        self.settled = self._base + 1
+        self._pos = max(0, self._pos - keep_from)
+        return starts
+
+    def _parse(self, line: bytes, following: bytes, offset: int) -> Optional[Section]:
+        if self.dialect == "mysql":
+            match = _MYSQL_HEADER.match(line)
+            if match:
+                kind, name = _MYSQL_KINDS[match[1]], match[2].decode().replace("``", "`")
+                return Section(kind, None, name, name if kind != "VIEW" else None, offset)
+            match = _MYSQL_DATABASE_HEADER.match(line)
+            return Section(match[1].decode().upper(), None, "", None, offset) if match else None
+
+        match = _PG_HEADER.match(line)
+        if not match:
+            return None
+        name, kind, schema = (part.decode() for part in match.groups())
+        schema = None if schema == "-" else schema
+        body = following.split(b"\n-- ", 1)[0]
+        return Section(kind, schema, name, self._pg_table(kind, schema, name, body), offset)
+
+    def _pg_table(self, kind: str, schema: Optional[str], name: str, body: bytes) -> Optional[str]:
+        """
+        Return the table a pg_dump object belongs to, from its tag or its statement.
+        """
+        if kind in _PG_TABLE_TAGGED:
+            return name.split(" ", 1)[0]
+        if kind in ("COMMENT", "ACL"):
+            target, _, rest = name.partition(" ")
+            return rest.split(".", 1)[0] if target in ("TABLE", "COLUMN") else None
+        if kind == "INDEX":
+            match = _PG_INDEX_TABLE.search(body)
+            return _unqualify(match[1]) if match else None
+        if kind in ("SEQUENCE", "SEQUENCE OWNED BY"):
+            match = (_PG_OWNED_BY if kind == "SEQUENCE OWNED BY" else _PG_IDENTITY_TABLE).search(body)
+            if match:
+                self._owned[(schema, name)] = _unqualify(match[1])
+                return self._owned[(schema, name)]
+        return None
+
+
+class BlockIndexBuilder:
+    """
+    Build the block index of a dump while it is compressed.
+
+    The compressor passes every chunk through :meth:`split` and starts a new
+    codec frame between the returned pieces, reporting the compressed offset
+    of each new frame through :meth:`frame_started`.
+    """
+    def __init__(self, dialect: str, codec: str, frame_bytes: int = FRAME_BYTES):
+        self.codec = codec
+        self.frame_bytes = frame_bytes
+        self.scanner = SectionScanner(dialect)
+        self.frames = [(0, 0)]
+        self.position = 0
+        self._released = 0
+        self._held = b""
+        self._frame_start = 0
+        self._pending: list[int] = []
+
+    def split(self, chunk: bytes, final: bool = False) -> list[bytes]:
+        """
+        Return the dump bytes that are ready to compress, split where a new frame should start.
+
+        A section is only recognised once the lines after its header have
+        been read, so the bytes where one may still start are held back until
+        the next call. The call with ``final`` set releases the rest.
+
+        Args:
+            chunk (bytes): Next bytes of the dump
+            final (bool): Whether this is the end of the dump
+        """
+        boundaries = []
+        for start in self.scanner.feed(chunk, final):
+            if start - self._frame_start >= self.frame_bytes:
+                boundaries.append(start)
+                self._frame_start = start
+        self._pending += boundaries
+        self.position += len(chunk)
+        self._held += chunk
+        release = len(self._held) if final else self.scanner.settled - self._released
+        data, self._held = self._held[:release], self._held[release:]
+        pieces, previous = [], 0
+        for boundary in boundaries:
+            pieces.append(data[previous:boundary - self._released])
+            previous = boundary - self._released
+        pieces.append(data[previous:])
+        self._released += release
+        return pieces
+
+    def frame_started(self, compressed_offset: int):
+        """
+        Record that the frame for the next pending boundary starts at ``compressed_offset``.
+        """
+        self.frames.append((compressed_offset, self._pending.pop(0)))
+
+    def finish(self) -> BlockIndex:
+        """
+        Return the completed index.
+        """
+        sections = self.scanner.finish(self.position)
+        frames = self.frames
+        if self.codec == "none":
+            frames = [(section.offset, section.offset) for section in sections]  # Every offset is seekable
+        return BlockIndex(self.scanner.dialect, self.codec, frames, sections)
+
+
+def scan_dump(reader: IO[bytes], dialect: str, codec: str) -> BlockIndex:
+    """
+    Build an index with a single frame by reading a whole decompressed dump.
+
+    Used for backups taken without an index; restoring from it decompresses
+    the dump from the start again, skipping the unwanted sections.
+    """
+    scanner = SectionScanner(dialect)
+    total = 0
+    while chunk := reader.read(READ_SIZE):
+        scanner.feed(chunk)
+        total += len(chunk)
+    return BlockIndex(dialect, codec, [(0, 0)], scanner.finish(total))
+
+
+def read_ranges(open_at: Callable[[int], IO[bytes]], index: BlockIndex,
+                ranges: list[tuple[int, int]]) -> Iterator[bytes]:
+    """
+    Yield the bytes of the given dump ranges, decompressing from the closest frame.
+
+    Args:
+        open_at (Callable[[int], IO[bytes]]): Returns a decompressing reader
+            starting at a compressed offset
+        index (BlockIndex): Index of the dump
+        ranges (list[tuple[int, int]]): Sorted uncompressed ``(start, end)`` ranges
+
+    Raises:
+        ValueError: If the dump ends before a range does
+    """
+    reader, position = None, 0
+    for start, end in ranges:
+        compressed, frame_start = index.frame_for(start)
+        if reader is None or frame_start > position:
+            reader, position = open_at(compressed), frame_start
+        while position < end:
+            data = reader.read(min(READ_SIZE, end - position if position >= start else start - position))
+            if not data:
+                raise ValueError(f"Dump ended at byte {position}, expected {end}")
+            position += len(data)
+            if position > start:
+                yield data[max(0, len(data) - (position - start)):]
+
+
+class ChunkReader:
+    """
+    Read-only stream over an iterator of byte chunks.
+    """
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        self._buffer = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+def select_toc_entries(toc: str, schema: BlockIndex, tables: Iterable[str]) -> list[str]:
+    """
+    Return the lines of a ``pg_restore -l`` listing that belong to ``tables``.
+
+    Schema objects are attributed to tables through the sections of the
+    archive's schema-only script (``pg_restore -s``), which also covers
+    indexes, whose listing entries do not name their table. Table data and
+    owned sequence values are matched by name.
+
+    Args:
+        toc (str): Output of ``pg_restore -l``
+        schema (BlockIndex): Index of the archive's schema-only script
+        tables (Iterable[str]): Table names, optionally schema-qualified
+
+    Returns:
+        list[str]: Listing lines to pass to ``pg_restore -L``
+    """
+    wanted = [_split_table(table) for table in tables]
+    sections = [section for section in schema.sections if _matches(section, wanted)]
+    prefixes = {f"{section.kind} {section.schema or '-'} {section.name} " for section in sections}
+    data_kinds = {"TABLE": "TABLE DATA", "SEQUENCE": "SEQUENCE SET"}
+    prefixes |= {f"{data_kinds[section.kind]} {section.schema or '-'} {section.name} "
+                 for section in sections if section.kind in data_kinds}
+    return [line for line in toc.splitlines()
+            if (match := _TOC_ENTRY.match(line)) and any(match["entry"].startswith(p) for p in prefixes)]
+
+
+def index_path(backup_path: str) -> Path:
+    """
+    Return the path of the hidden block index next to a backup file.
+    """
+    path = Path(backup_path)
+    return path.with_name(f".{path.name}.index")
+
+
+def _split_table(table: str) -> tuple[Optional[str], str]:
+    schema, _, name = table.rpartition(".")
+    return schema or None, name
+
+
+def _matches(section: Section, wanted: list[tuple[Optional[str], str]]) -> bool:
+    return section.table is not None and any(
+        section.table == name and (schema is None or section.schema == schema) for schema, name in wanted)
+
+
+def _unqualify(name: bytes) -> str:
+    """
+    Return the last part of a possibly quoted, schema-qualified PostgreSQL name.
+    """
+    parts = [quoted.replace('""', '"') if quoted else plain
+             for quoted, plain in _PG_IDENTIFIER.findall(name.decode())]
+    return parts[-1] if parts else name.decode()
@@ -0,0 +1,271 @@
+"""
+Persistent SQLite catalog of completed backups for indexed lookups.
+"""
+
+import logging
+import sqlite3
+from contextlib import closing
+from dataclasses import dataclass, fields
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+from dbbackup.core.compressor import codec_for_path
+from dbbackup.core.encryption import ENCRYPTED_EXTENSION
+from dbbackup.utils.timeutils import parse_timestamped_filename
+
+# Hidden so LocalStorage.list_backups never reports it as a backup
+CATALOG_FILENAME = ".catalog.sqlite3"
+
+# Extension (without codec suffix) -> dump format
+_FORMAT_EXTENSIONS = [("dir.tar", "directory"), ("tables.tar", "tables"), ("base.tar", "basebackup"), ("xbstream", "xbstream"),
+                      ("dump", "custom"), ("tar", "tar"), ("sql", "plain")]
+
+
+@dataclass
+class CatalogEntry:
+    """
+    A backup recorded in the catalog.
+    """
+    database: str
+    created_at: datetime
+    filename: str
+    codec: str = "none"
+    format: str = "plain"
+    size: int = 0
+    checksum: Optional[str] = None
+    local_path: Optional[str] = None
+    s3_key: Optional[str] = None
+    etag: Optional[str] = None
+    verify_status: Optional[str] = None
+    verified_at: Optional[datetime] = None
+    id: Optional[int] = None
+
+
+_COLUMNS = {
+    "database": "TEXT NOT NULL",
+    "created_at": "TEXT NOT NULL",
+    "filename": "TEXT NOT NULL",
+    "codec": "TEXT NOT NULL DEFAULT 'none'",
+    "format": "TEXT NOT NULL DEFAULT 'plain'",
+    "size": "INTEGER NOT NULL DEFAULT 0",
+    "checksum": "TEXT",
+    "local_path": "TEXT",
+    "s3_key": "TEXT",
+    "etag": "TEXT",
+    "verify_status": "TEXT",
+    "verified_at": "TEXT",
+}
+
+
+class BackupCatalog:
+    """
+    Index of backups stored in an SQLite database inside the backup directory.
+
+    Each operation opens its own connection, so one catalog instance can be
+    shared by concurrent backup jobs.
+    """
+
+    def __init__(self, db_path: str, logger: logging.Logger):
+        """
+        Initialize BackupCatalog and create or upgrade its schema.
+
+        Args:
+            db_path (str): Path to the SQLite database file
+            logger (logging.Logger): Logger instance
+        """
+        self.db_path = Path(db_path)
+        self.logger = logger
+        self._init_schema()
+
+    @classmethod
+    def for_backup_dir(cls, backup_dir: str, logger: logging.Logger) -> "BackupCatalog":
+        """
+        Open the catalog that lives in a backup directory.
+        """
+        return cls(str(Path(backup_dir) / CATALOG_FILENAME), logger)
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.db_path, timeout=30)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def _init_schema(self):
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS backups (id INTEGER PRIMARY KEY AUTOINCREMENT)")
+            existing = {row["name"] for row in conn.execute("PRAGMA table_info(backups)")}
+            for column, definition in _COLUMNS.items():
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE backups ADD COLUMN {column} {definition}")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_backups_database_created ON backups (database, created_at)")
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_backups_filename ON backups (filename)")
+
+    def record(self, entry: CatalogEntry) -> int:
+        """
+        Insert a backup, replacing any previous record with the same filename.
+
+        Args:
+            entry (CatalogEntry): Backup to record
+
+        Returns:
+            int: Row id of the recorded backup
+        """
+        values = {f.name: getattr(entry, f.name) for f in fields(CatalogEntry) if f.name != "id"}
+        values["created_at"] = entry.created_at.isoformat(timespec="seconds")
+        if entry.verified_at:
+            values["verified_at"] = entry.verified_at.isoformat(timespec="seconds")
+        columns = ", ".join(values)
+        placeholders = ", ".join(f":{name}" for name in values)
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute(f"INSERT OR REPLACE INTO backups ({columns}) VALUES ({placeholders})", values)
+            entry.id = cursor.lastrowid
+        self.logger.debug(f"Catalog entry recorded: {entry.filename}")
+        return entry.id
+
+    def latest(self, database: str, before: Optional[datetime] = None) -> Optional[CatalogEntry]:
+        """
+        Return the most recent backup of a database.
+
+        Args:
+            database (str): Database name
+            before (Optional[datetime]): Only consider backups created at or before this time
+
+        Returns:
+            Optional[CatalogEntry]: Latest backup, or None if there is none
+        """
+        if before is not None:
+            entries = self._query("WHERE database = ? AND created_at <= ? ORDER BY created_at DESC, id DESC LIMIT 1",
+                                  (database, before.isoformat(timespec="seconds")))
+            return entries[0] if entries else None
+        entries = self._query("WHERE database = ? ORDER BY created_at DESC, id DESC LIMIT 1", (database,))
+        return entries[0] if entries else None
+
+    def list_backups(self, database: Optional[str] = None) -> list[CatalogEntry]:
+        """
+        List recorded backups, newest first.
+
+        Args:
+            database (Optional[str]): Restrict to one database
+
+        Returns:
+            list[CatalogEntry]: Matching backups
+        """
+        if database:
+            return self._query("WHERE database = ? ORDER BY created_at DESC, id DESC", (database,))
+        return self._query("ORDER BY database, created_at DESC, id DESC")
+
+    def find(self, filename: Optional[str] = None, s3_key: Optional[str] = None) -> Optional[CatalogEntry]:
+        """
+        Look up a backup by file name or S3 key.
+
+        Args:
+            filename (Optional[str]): Backup file name
+            s3_key (Optional[str]): S3 object key
+
+        Returns:
+            Optional[CatalogEntry]: Matching backup, or None
+        """
+        if filename:
+            entries = self._query("WHERE filename = ?", (Path(filename).name,))
+        elif s3_key:
+            entries = self._query("WHERE s3_key = ?", (s3_key,))
+        else:
+            entries = []
+        return entries[0] if entries else None
+
+    def mark_verified(self, entry_id: int, status: str, verified_at: Optional[datetime] = None):
+        """
+        Store the outcome of the latest verification of a backup.
+
+        Args:
+            entry_id (int): Row id of the backup
+            status (str): Verification status ('ok' or 'failed')
+            verified_at (Optional[datetime]): Verification time, defaults to now
+        """
+        verified_at = (verified_at or datetime.now()).isoformat(timespec="seconds")
+        with closing(self._connect()) as conn, conn:
+            conn.execute("UPDATE backups SET verify_status = ?, verified_at = ? WHERE id = ?",
+                         (status, verified_at, entry_id))
+
+    def remove(self, entry_id: int):
+        """
+        Delete a backup record.
+
+        Args:
+            entry_id (int): Row id of the backup
+        """
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM backups WHERE id = ?", (entry_id,))
+
+    def remove_many(self, entry_ids: list[int]):
+        """
+        Delete several backup records in one transaction.
+
+        Args:
+            entry_ids (list[int]): Row ids of the backups
+        """
+        with closing(self._connect()) as conn, conn:
+            conn.executemany("DELETE FROM backups WHERE id = ?", [(entry_id,) for entry_id in entry_ids])
+
+    def import_directory(self, backup_dir: str, prefix: str) -> int:
+        """
+        Record backup files in a directory that are not in the catalog yet.
+
+        Used once to adopt backups created before the catalog existed.
+        Only files whose name matches the ``prefix_db_timestamp.ext``
+        pattern are imported.
+
+        Args:
+            backup_dir (str): Directory containing backup files
+            prefix (str): Filename prefix (the application name)
+
+        Returns:
+            int: Number of imported backups
+        """
+        known = {entry.filename for entry in self.list_backups()}
+        imported = 0
+        for path in sorted(Path(backup_dir).iterdir()):
+            if not path.is_file() or path.name.startswith(".") or path.name in known:
+                continue
+            parsed = parse_timestamped_filename(path.name, prefix)
+            if parsed is None:
+                continue
+            database, created_at, extension = parsed
+            codec = codec_for_path(str(path))
+            self.record(CatalogEntry(
+                database=database,
+                created_at=created_at,
+                filename=path.name,
+                codec=codec.name,
+                format=_format_from_extension(extension, codec.extension),
+                size=path.stat().st_size,
+                local_path=str(path),
+            ))
+            imported += 1
+        if imported:
+            self.logger.info(f"Imported {imported} existing backup(s) into the catalog")
+        return imported
+
+    def _query(self, clause: str, params: tuple = ()) -> list[CatalogEntry]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute(f"SELECT * FROM backups {clause}", params).fetchall()
+        return [_entry_from_row(row) for row in rows]
+
+
+def _entry_from_row(row: sqlite3.Row) -> CatalogEntry:
+    values = {f.name: row[f.name] for f in fields(CatalogEntry)}
+    values["created_at"] = datetime.fromisoformat(values["created_at"])
+    if values["verified_at"]:
+        values["verified_at"] = datetime.fromisoformat(values["verified_at"])
+    return CatalogEntry(**values)
+
+
+def _format_from_extension(extension: str, codec_extension: str) -> str:
+    extension = extension.removesuffix(ENCRYPTED_EXTENSION)
+    if codec_extension and extension.endswith(codec_extension):
+        extension = extension[:-len(codec_extension)]
+    for suffix, dump_format in _FORMAT_EXTENSIONS:
+        if extension.endswith(suffix):
+            return dump_format
+    return "plain"
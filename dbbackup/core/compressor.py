@@ -1,45 +1,544 @@
 """
-Handle compression of backup files (gzip by default).
+Handle compression of backup files through a registry of pluggable codecs.
+
+Supported codecs: gzip (default), pgzip (block-parallel gzip), xz, zstd and
+lz4. zstd and lz4 need the optional ``zstandard`` and ``lz4`` packages.
 """
 import gzip
-import shutil 
+import lzma
+import os
+import time
+import zlib
 import logging
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
+from typing import IO, Callable
+from dbbackup.core.encryption import ENCRYPTED_EXTENSION
+from dbbackup.core.metrics import MetricsRecorder
+
+# Read size used when streaming data through a compressor
+CHUNK_SIZE = 1024 * 1024
+
+
+class Codec:
+    """
+    Base class for compression codecs.
+
+    Subclasses provide an incremental compressor (``compress``/``flush``
+    object) and a decompressing file reader. Concatenated frames must be
+    readable as one stream.
+    """
+    name = ""
+    extension = ""
+    magic = b""
+    default_level: int | None = None
+
+    def is_available(self) -> bool:
+        """
+        Return True if the libraries this codec depends on are installed.
+        """
+        return True
+
+    def compressobj(self, level: int | None = None, threads: int = 1):
+        """
+        Return an object with ``compress(bytes) -> bytes`` and ``flush() -> bytes``.
+        """
+        raise NotImplementedError
+
+    def open_reader(self, fileobj: IO[bytes]) -> IO[bytes]:
+        """
+        Wrap a binary file object in a reader yielding decompressed data.
+        """
+        raise NotImplementedError
+
+
+class NoneCodec(Codec):
+    """
+    Identity codec for data that is stored as-is.
+    """
+    name = "none"
+
+    class _Passthrough:
+        def compress(self, data: bytes) -> bytes:
+            return data
+
+        def flush(self) -> bytes:
+            return b""
+
+    def compressobj(self, level=None, threads=1):
+        return self._Passthrough()
+
+    def open_reader(self, fileobj):
+        return fileobj
+
+
+class GzipCodec(Codec):
+    """
+    Single-threaded gzip using the standard library.
+    """
+    name = "gzip"
+    extension = ".gz"
+    magic = b"\x1f\x8b"
+    default_level = 6
+
+    def compressobj(self, level=None, threads=1):
+        level = self.default_level if level is None else level
+        return zlib.compressobj(level, zlib.DEFLATED, 31)  # 31 selects the gzip container
+
+    def open_reader(self, fileobj):
+        return gzip.GzipFile(fileobj=fileobj, mode="rb")
+
+
+class _ParallelGzipCompressor:
+    """
+    Compress fixed-size blocks as independent gzip members on a thread pool.
+
+    zlib releases the GIL while compressing, so blocks are compressed on
+    all workers at once. Output order is preserved and at most two blocks
+    per worker are in flight.
+    """
+
+    def __init__(self, level: int, threads: int, block_size: int):
+        self.level = level
+        self.block_size = block_size
+        self.max_pending = threads * 2
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="dbbackup-pgzip")
+        self._pending: deque[Future] = deque()
+        self._buffer = bytearray()
+
+    def compress(self, data: bytes) -> bytes:
+        self._buffer += data
+        while len(self._buffer) >= self.block_size:
+            self._submit(bytes(self._buffer[:self.block_size]))
+            del self._buffer[:self.block_size]
+        return self._drain(block=False)
+
+    def flush(self) -> bytes:
+        if self._buffer or not self._pending:
+            self._submit(bytes(self._buffer))
+            self._buffer.clear()
+        output = self._drain(block=True)
+        self._pool.shutdown()
+        return output
+
+    def _submit(self, block: bytes):
+        self._pending.append(self._pool.submit(gzip.compress, block, self.level, mtime=0))
+
+    def _drain(self, block: bool) -> bytes:
+        output = bytearray()
+        while self._pending and (block or self._pending[0].done() or len(self._pending) > self.max_pending):
+            output += self._pending.popleft().result()
+        return bytes(output)
+
+
+class ParallelGzipCodec(GzipCodec):
+    """
+    Block-parallel gzip producing standard multi-member gzip output.
+
+    The output is decompressible by gzip, zcat and pigz and shares the
+    ``.gz`` extension with the plain gzip codec.
+    """
+    name = "pgzip"
+    block_size = 1024 * 1024
+
+    def compressobj(self, level=None, threads=1):
+        level = self.default_level if level is None else level
+        return _ParallelGzipCompressor(level, max(1, threads), self.block_size)
+
+
+class XzCodec(Codec):
+    """
+    xz (LZMA2) using the standard library.
+    """
+    name = "xz"
+    extension = ".xz"
+    magic = b"\xfd7zXZ\x00"
+    default_level = 6
+
+    def compressobj(self, level=None, threads=1):
+        level = self.default_level if level is None else level
+        return lzma.LZMACompressor(format=lzma.FORMAT_XZ, preset=level)
+
+    def open_reader(self, fileobj):
+        return lzma.LZMAFile(fileobj, mode="rb")
+
+
+class ZstdCodec(Codec):
+    """
+    Zstandard with native multi-threaded compression.
+    """
+    name = "zstd"
+    extension = ".zst"
+    magic = b"\x28\xb5\x2f\xfd"
+    default_level = 3
+
+    def is_available(self):
+        try:
+            import zstandard  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def compressobj(self, level=None, threads=1):
+        import zstandard
+        level = self.default_level if level is None else level
+        return zstandard.ZstdCompressor(level=level, threads=threads if threads > 1 else 0).compressobj()
+
+    def open_reader(self, fileobj):
+        import zstandard
+        return zstandard.ZstdDecompressor().stream_reader(fileobj, read_across_frames=True)
+
+
+class Lz4Codec(Codec):
+    """
+    LZ4 frame format, trading ratio for very high speed.
+    """
+    name = "lz4"
+    extension = ".lz4"
+    magic = b"\x04\x22\x4d\x18"
+    default_level = 0
+
+    class _FrameCompressor:
+        def __init__(self, level: int):
+            import lz4.frame
+            self._compressor = lz4.frame.LZ4FrameCompressor(compression_level=level)
+            self._started = False
+
+        def compress(self, data: bytes) -> bytes:
+            header = b""
+            if not self._started:
+                header = self._compressor.begin()
+                self._started = True
+            return header + self._compressor.compress(data)
+
+        def flush(self) -> bytes:
+            header = b"" if self._started else self._compressor.begin()
+            self._started = True
+            return header + self._compressor.flush()
+
+    def is_available(self):
+        try:
+            import lz4.frame  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def compressobj(self, level=None, threads=1):
+        return self._FrameCompressor(self.default_level if level is None else level)
+
+    def open_reader(self, fileobj):
+        import lz4.frame
+        return lz4.frame.LZ4FrameFile(fileobj, mode="rb")
+
+
+CODECS: dict[str, Codec] = {}
+
+
+def register_codec(codec: Codec):
+    """
+    Register a codec under its name, replacing any codec with the same name.
+
+    Args:
+        codec (Codec): Codec instance
+    """
+    CODECS[codec.name] = codec
+
+
+for _codec in (NoneCodec(), GzipCodec(), ParallelGzipCodec(), XzCodec(), ZstdCodec(), Lz4Codec()):
+    register_codec(_codec)
+
+
+def get_codec(name: str) -> Codec:
+    """
+    Look up a codec by name.
+
+    Args:
+        name (str): Codec name
+
+    Returns:
+        Codec: Registered codec
+
+    Raises:
+        ValueError: If the codec is unknown or its library is not installed
+    """
+    codec = CODECS.get(name.lower())
+    if codec is None:
+        raise ValueError(f"Unsupported compression method '{name}'. Available: {', '.join(sorted(CODECS))}")
+    if not codec.is_available():
+        raise ValueError(f"Compression method '{name}' requires an optional package that is not installed")
+    return codec
+
+
+def codec_for_path(file_path: str) -> Codec:
+    """
+    Determine the codec of a backup from its file extension, falling back to magic bytes.
+
+    For an encrypted backup this is the codec of the data inside, named by
+    the extension before ``.enc``.
+
+    Args:
+        file_path (str): Path to the backup file
+
+    Returns:
+        Codec: Matching codec, or the identity codec for uncompressed files
+    """
+    path = Path(file_path)
+    encrypted = path.suffix.lower() == ENCRYPTED_EXTENSION
+    if encrypted:
+        path = path.with_suffix("")
+    suffix = path.suffix.lower()
+    for codec in CODECS.values():  # Registration order: gzip wins over pgzip for '.gz'
+        if codec.extension and codec.extension == suffix:
+            return codec
+
+    if not encrypted and path.is_file():
+        with open(path, "rb") as f:
+            head = f.read(8)
+        for codec in CODECS.values():
+            if codec.magic and head.startswith(codec.magic):
+                return codec
+    return CODECS["none"]
+
+
+class _HashingSink:
+    """
+    Forward writes to a file while updating a hash object.
+    """
+
+    def __init__(self, sink, hasher):
+        self.sink = sink
+        self.hasher = hasher
+
+    def write(self, data: bytes):
+        self.hasher.update(data)
+        self.sink.write(data)
+
+
+class FramedCompressor:
+    """
+    Incremental compressor that starts a new codec frame wherever a block index splits the stream.
+
+    The index builder holds back the tail of each chunk until it knows
+    whether a frame starts there, so output can lag behind input until
+    :meth:`flush`.
+    """
+
+    def __init__(self, new_compressor: Callable[[], object], index):
+        """
+        Initialize FramedCompressor.
+
+        Args:
+            new_compressor (Callable[[], object]): Returns a fresh codec compressor for each frame
+            index: BlockIndexBuilder deciding where codec frames restart
+        """
+        self.new_compressor = new_compressor
+        self.index = index
+        self.bytes_out = 0
+        self._compressor = new_compressor()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._feed(data, final=False)
+
+    def flush(self) -> bytes:
+        data = self._feed(b"", final=True)
+        return data + self._emit(self._compressor.flush())
+
+    def _feed(self, data: bytes, final: bool) -> bytes:
+        out = []
+        for number, piece in enumerate(self.index.split(data, final=final)):
+            if number:
+                out.append(self._emit(self._compressor.flush()))
+                self._compressor = self.new_compressor()
+                self.index.frame_started(self.bytes_out)
+            if piece:
+                out.append(self._emit(self._compressor.compress(piece)))
+        return b"".join(out)
+
+    def _emit(self, data: bytes) -> bytes:
+        self.bytes_out += len(data)
+        return data
+
+
+def _hash_file(path: Path, hasher, chunk_size: int = CHUNK_SIZE):
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            hasher.update(chunk)
+
+
+def _scan_file(path: Path, index, chunk_size: int = CHUNK_SIZE):
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            index.split(chunk)
+    index.split(b"", final=True)
+
 
 class Compressor:
     """
     Compressor class to compress files before storage.
     """
-    def __init__(self, logger: logging.Logger):
+    def __init__(self, logger: logging.Logger, method: str = "gzip", level: int | None = None, threads: int = 0,
+                 metrics: MetricsRecorder | None = None):
+        """
+        Initialize Compressor.
+
+        Args:
+            logger (logging.Logger): Logger instance
+            method (str): Default codec name
+            level (int | None): Compression level, or None for the codec default
+            threads (int): Worker threads for multi-threaded codecs (0 = all CPUs)
+            metrics (MetricsRecorder | None): Recorder receiving the 'compress' stage
+        """
         self.logger = logger
-        
-    def compress_file(self, file_path: str, method: str ="gzip"):
+        self.method = method
+        self.level = level
+        self.threads = threads or os.cpu_count() or 1
+        self.metrics = metrics or MetricsRecorder()
+
+    def extension(self, method: str | None = None) -> str:
+        """
+        Return the file extension recorded for a codec (e.g. '.zst').
+        """
+        return get_codec(method or self.method).extension
+
+    def compressobj(self, method: str | None = None, index=None):
+        """
+        Return an incremental compressor configured with this instance's level and threads.
+
+        With an ``index`` builder, a new codec frame is started wherever it
+        splits the stream, so the output can be decompressed from each frame
+        boundary.
+        """
+        codec = get_codec(method or self.method)
+        if index is not None:
+            return FramedCompressor(lambda: codec.compressobj(self.level, self.threads), index)
+        return codec.compressobj(self.level, self.threads)
+
+    def compress_file(self, file_path: str, method: str | None = None, hasher=None, index=None, cipher=None):
         """
         Compress a given file and return the path to the compressed file.
 
+        With a ``cipher`` the compressed stream is encrypted as it is written,
+        into a file ending in ``.enc``. The file is then always rewritten, even
+        with the ``none`` codec, and a failure raises instead of returning the
+        unencrypted input.
+
         Args:
             file_path (str): Path to the file to compress.
-            method (str): Compression method ('gzip' supported).
+            method (str | None): Codec name, defaults to the configured method.
+            hasher: Optional hash object updated with the bytes of the returned file. If compression
+                fails and the input file is returned, it has seen part of the discarded output and
+                must not be used; hash the input file with a new hash object instead
+            index: Optional BlockIndexBuilder deciding where codec frames restart
+            cipher: Optional BackupCipher encrypting the output
 
         Returns:
             str: Path to the compressed file.
         """
         path = Path(file_path)
-        
+        method = method or self.method
+
         if not path.is_file():
             self.logger.error(f"Cannot compress non-existent file: {file_path}")
             return file_path    # Return original if not exist
-        
-        if method.lower() == "gzip":
-            compressed_path = path.with_suffix(path.suffix + ".gz")
-            try:
-                with open(path, "rb") as f_in, gzip.open(compressed_path, "wb") as f_out:
-                    shutil.copyfileobj(f_in, f_out)
-                self.logger.info(f"File compressed: {compressed_path}")
-                return str(compressed_path)
-            except Exception as e:
-                self.logger.error(f"Compression failed for {file_path}: {e}")
-                return str(path)
-        else:
-            self.logger.warning(f"Unsupported compression method '{method}', skipping compression.")
-            return str(path)                  
\ No newline at end of file
+
+        try:
+            codec = get_codec(method)
+        except ValueError as e:
+            self.logger.warning(f"{e}, skipping compression.")
+            codec = None
+        if cipher is not None and codec is None:
+            codec = CODECS["none"]
+        if cipher is None and (codec is None or not codec.extension):
+            if hasher is not None:
+                _hash_file(path, hasher)
+            if index is not None:
+                _scan_file(path, index)
+            return str(path)
+
+        compressed_path = path.with_suffix(path.suffix + codec.extension + (ENCRYPTED_EXTENSION if cipher else ""))
+        try:
+            with open(path, "rb") as f_in, open(compressed_path, "wb") as f_out:
+                sink = _HashingSink(f_out, hasher) if hasher is not None else f_out
+                if cipher is not None:
+                    sink = cipher.encryptor(sink, self.metrics)
+                self.compress_stream(f_in, sink, codec.name, index=index)
+                if cipher is not None:
+                    sink.finish()
+            self.logger.info(f"File compressed with {codec.name}{' and encrypted' if cipher else ''}: "
+                             f"{compressed_path}")
+            return str(compressed_path)
+        except Exception as e:
+            self.logger.error(f"Compression failed for {file_path}: {e}")
+            compressed_path.unlink(missing_ok=True)
+            if cipher is not None:
+                raise
+            return str(path)
+
+    def compress_stream(self, source: IO[bytes], sink, method: str | None = None,
+                        chunk_size: int = CHUNK_SIZE, read_stage: str | None = None, index=None) -> tuple[int, int]:
+        """
+        Compress a binary stream into a writer chunk by chunk.
+
+        Time spent inside the codec is recorded as the 'compress' stage.
+        Time spent waiting for the source can be recorded under ``read_stage``,
+        e.g. 'dump' when the source is a dump command's stdout. With an
+        ``index`` builder, a new codec frame is started wherever it splits the
+        stream, so the output can be decompressed from each frame boundary.
+
+        Args:
+            source (IO[bytes]): Stream to read uncompressed data from
+            sink: Object with a ``write(bytes)`` method receiving compressed data
+            method (str | None): Codec name, defaults to the configured method.
+            chunk_size (int): Number of bytes read per iteration
+            read_stage (str | None): Stage name for the time spent reading the source
+            index: Optional BlockIndexBuilder deciding where codec frames restart
+
+        Returns:
+            tuple[int, int]: Bytes read and bytes written
+
+        Raises:
+            ValueError: If the compression method is not supported
+        """
+        compressor = self.compressobj(method, index)
+        bytes_in = bytes_out = 0
+        read_seconds = compress_seconds = 0.0
+        while True:
+            started = time.perf_counter()
+            chunk = source.read(chunk_size)
+            read_done = time.perf_counter()
+            read_seconds += read_done - started
+            bytes_in += len(chunk)
+            data = compressor.compress(chunk) if chunk else compressor.flush()
+            compress_seconds += time.perf_counter() - read_done
+            if data:
+                sink.write(data)
+                bytes_out += len(data)
+            if not chunk:
+                break
+        self.metrics.record("compress", compress_seconds, bytes_in, bytes_out)
+        if read_stage:
+            self.metrics.record(read_stage, read_seconds, bytes_out=bytes_in)
+        self.logger.debug(f"Stream compressed with {method or self.method}: {bytes_in} -> {bytes_out} bytes")
+        return bytes_in, bytes_out
+
+    def decompress_stream(self, source: IO[bytes], sink, method: str,
+                          chunk_size: int = CHUNK_SIZE) -> int:
+        """
+        Decompress a binary stream into a writer chunk by chunk.
+
+        Args:
+            source (IO[bytes]): Stream of compressed data
+            sink: Object with a ``write(bytes)`` method receiving decompressed data
+            method (str): Codec name
+            chunk_size (int): Number of bytes written per iteration
+
+        Returns:
+            int: Bytes written
+        """
+        reader = get_codec(method).open_reader(source)
+        bytes_out = 0
+        while chunk := reader.read(chunk_size):
+            sink.write(chunk)
+            bytes_out += len(chunk)
+        return bytes_out
@@ -6,7 +6,12 @@ import yaml
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, field_validator, Field
+from pydantic import BaseModel, field_validator, model_validator, Field
+from dbbackup.core.compressor import CODECS
+from dbbackup.core.encryption import ALGORITHMS
+from dbbackup.core.integrity import SUPPORTED_ALGORITHMS
+from dbbackup.core.storages.backends import BACKENDS, PRIMARY_DESTINATION
+from dbbackup.utils.cron import CronSchedule
 from dbbackup.utils.paths import ensure_directory
 
 # Pydantic Models for Validation
@@ -14,6 +19,61 @@ class AppConfig(BaseModel):
     app_name: str
     version: str
     
+class PostgresDumpConfig(BaseModel):
+    format: str = "plain"
+    jobs: int = 1
+    options: list[str] = []
+
+    @field_validator("format")
+    def validate_format(cls, v):
+        """
+        Normalize the pg_dump format name (accepts pg_dump's one-letter aliases).
+        """
+        aliases = {"p": "plain", "c": "custom", "d": "directory", "t": "tar"}
+        v = aliases.get(v.lower(), v.lower())
+        if v not in aliases.values():
+            raise ValueError(f"Unsupported pg_dump format '{v}'. Use plain, custom, directory or tar.")
+        return v
+
+class MySQLDumpConfig(BaseModel):
+    format: str = "plain"
+    options: list[str] = []
+    jobs: int = Field(4, ge=1)
+    chunk_rows: int = Field(1_000_000, ge=1)
+    defer_indexes: bool = True
+
+    @field_validator("format")
+    def validate_format(cls, v):
+        """
+        Ensure the MySQL dump format is a single mysqldump file or parallel per-table files.
+        """
+        if v.lower() not in ("plain", "tables"):
+            raise ValueError(f"Unsupported MySQL dump format '{v}'. Use plain or tables.")
+        return v.lower()
+
+class DumpConfig(BaseModel):
+    postgresql: PostgresDumpConfig = PostgresDumpConfig()
+    mysql: MySQLDumpConfig = MySQLDumpConfig()
+
+class RestoreConfig(BaseModel):
+    allow_drop: bool = False
+
+class PhysicalBackupConfig(BaseModel):
+    label: str = "instance"
+    mysql_tool: str = "xtrabackup"
+    jobs: int = Field(4, ge=1)
+    options: list[str] = []
+    data_dir: str | None = None
+
+    @field_validator("mysql_tool")
+    def validate_mysql_tool(cls, v):
+        """
+        Ensure the MySQL hot backup tool is supported.
+        """
+        if v.lower() not in ("xtrabackup", "mariabackup"):
+            raise ValueError(f"Unsupported physical backup tool '{v}'. Use xtrabackup or mariabackup.")
+        return v.lower()
+
 class DatabaseConfig(BaseModel):
     type: str
     host: str
@@ -21,6 +81,19 @@ class DatabaseConfig(BaseModel):
     user: str
     password: str = Field(..., description="Database password (from ENV variable preferred)")
     default_databases: list[str] = []
+    backup_mode: str = "logical"
+    dump: DumpConfig = DumpConfig()
+    physical: PhysicalBackupConfig = PhysicalBackupConfig()
+    restore: RestoreConfig = RestoreConfig()
+
+    @field_validator("backup_mode")
+    def validate_backup_mode(cls, v):
+        """
+        Ensure the backup mode is logical (dump tools) or physical (hot copy of the instance).
+        """
+        if v.lower() not in ("logical", "physical"):
+            raise ValueError(f"Unsupported backup mode '{v}'. Use logical or physical.")
+        return v.lower()
     
     @field_validator("password", mode="before")
     def load_password_from_env(cls, v):
@@ -43,17 +116,227 @@ class RuntimeConfig(BaseModel):
     dry_run: bool =False
     verbose: bool = False
     max_concurrent_jobs: int = 1
+    streaming: bool = False
+    engine: str = "threads"
+    job_timeout: float | None = Field(None, gt=0)
+
+    @field_validator("engine")
+    def validate_engine(cls, v):
+        """
+        Ensure the execution engine is supported.
+        """
+        if v.lower() not in ("threads", "asyncio"):
+            raise ValueError(f"Unsupported engine '{v}'. Use threads or asyncio.")
+        return v.lower()
     
+class CompressionConfig(BaseModel):
+    method: str = "gzip"
+    level: int | None = None
+    threads: int = 0
+
+    @field_validator("method")
+    def validate_method(cls, v):
+        """
+        Ensure the compression method is a registered codec.
+        """
+        if v.lower() not in CODECS:
+            raise ValueError(f"Unsupported compression method '{v}'. Available: {', '.join(sorted(CODECS))}")
+        return v.lower()
+
+class VerificationConfig(BaseModel):
+    algorithm: str = "sha256"
+    workers: int = Field(4, ge=1)
+
+    @field_validator("algorithm")
+    def validate_algorithm(cls, v):
+        """
+        Ensure the checksum algorithm is supported.
+        """
+        if v.lower() not in SUPPORTED_ALGORITHMS:
+            raise ValueError(f"Unsupported checksum algorithm '{v}'. Use {', '.join(SUPPORTED_ALGORITHMS)}.")
+        return v.lower()
+
+class DedupConfig(BaseModel):
+    enabled: bool = False
+    store_dir: str | None = None
+    min_chunk_kb: int = Field(256, ge=1)
+    avg_chunk_kb: int = 1024
+    max_chunk_kb: int = 4096
+    chunker: str = "auto"
+
+    @field_validator("chunker")
+    def validate_chunker(cls, v):
+        """
+        Ensure the chunker is supported.
+        """
+        if v.lower() not in ("auto", "fastcdc", "lines"):
+            raise ValueError(f"Unsupported chunker '{v}'. Use auto, fastcdc or lines.")
+        return v.lower()
+
+    @model_validator(mode="after")
+    def validate_chunk_sizes(self):
+        """
+        Ensure the chunk sizes are ordered min < avg < max.
+        """
+        if not self.min_chunk_kb < self.avg_chunk_kb < self.max_chunk_kb:
+            raise ValueError("Dedup chunk sizes must satisfy min_chunk_kb < avg_chunk_kb < max_chunk_kb")
+        return self
+
+class EncryptionConfig(BaseModel):
+    enabled: bool = False
+    algorithm: str = "aes-256-gcm"
+    key_file: str | None = None
+    key_env: str = "DBBACKUP_ENCRYPTION_KEY"
+    chunk_kb: int = Field(1024, ge=4, le=65536)
+
+    @field_validator("algorithm")
+    def validate_algorithm(cls, v):
+        """
+        Ensure the encryption algorithm is supported.
+        """
+        if v.lower() not in ALGORITHMS:
+            raise ValueError(f"Unsupported encryption algorithm '{v}'. Use {', '.join(ALGORITHMS)}.")
+        return v.lower()
+
+class MetricsConfig(BaseModel):
+    textfile_dir: str | None = None
+    report_dir: str | None = None
+
+class RetentionConfig(BaseModel):
+    keep_last: int = Field(1, ge=1)
+    daily: int = Field(7, ge=0)
+    weekly: int = Field(4, ge=0)
+    monthly: int = Field(12, ge=0)
+    yearly: int = Field(0, ge=0)
+
+class PITRConfig(BaseModel):
+    enabled: bool = False
+    archive_dir: str | None = None
+    spool_dir: str | None = None
+    poll_interval: float = Field(5.0, gt=0)
+    mysql_start_binlog: str | None = None
+    mysql_position_option: str = "--source-data=2"
+    pg_slot: str | None = "dbbackup"
+
+class JournalConfig(BaseModel):
+    enabled: bool = True
+    max_age_hours: float = Field(24, gt=0)
+
+class ListingConfig(BaseModel):
+    cache_ttl: float = Field(300, ge=0)
+    full_refresh_every: int = Field(12, ge=1)
+
+class ScheduleConfig(BaseModel):
+    database: str
+    cron: str
+    host: str | None = None
+    port: int | None = None
+
+    @field_validator("cron")
+    def validate_cron(cls, v):
+        """
+        Ensure the cron expression parses.
+        """
+        CronSchedule(v)
+        return v
+
+class DaemonConfig(BaseModel):
+    schedules: list[ScheduleConfig] = []
+    max_concurrent_jobs: int = Field(2, ge=1)
+    max_jobs_per_host: int = Field(1, ge=1)
+    stagger_seconds: int = Field(300, ge=0)
+    max_load: float | None = Field(None, gt=0)
+    max_io_pressure: float | None = Field(None, gt=0)
+    check_interval: float = Field(30, gt=0)
+
 class AWSConfig(BaseModel):
     s3_bucket: str
     region: str = "us-east-1"
+    endpoint_url: str | None = None
+    multipart_threshold_mb: int = 64
+    multipart_chunksize_mb: int = Field(64, ge=5)
+    max_concurrency: int = Field(10, ge=1)
+    max_bandwidth_mb: float | None = None
+    max_attempts: int = 5
+    retry_mode: str = "standard"
+
+class DestinationConfig(BaseModel):
+    name: str
+    type: str
+    concurrency: int = Field(2, ge=1)
+    required: bool = True
+    path: str | None = None
+    bucket: str | None = None
+    endpoint_url: str | None = None
+    region: str | None = None
+    profile: str | None = None
+    host: str | None = None
+    port: int = 22
+    user: str | None = None
+    key_file: str | None = None
+    password_env: str | None = None
+    known_hosts: str | None = None
+
+    @field_validator("type")
+    def validate_type(cls, v):
+        """
+        Ensure the destination type is a registered storage backend.
+        """
+        if v.lower() not in BACKENDS:
+            raise ValueError(f"Unsupported destination type '{v}'. Use {', '.join(sorted(BACKENDS))}.")
+        return v.lower()
+
+    @model_validator(mode="after")
+    def validate_settings(self):
+        """
+        Ensure the settings the destination type needs are present.
+        """
+        required = {"local": ["path"], "nfs": ["path"], "minio": ["endpoint_url", "bucket"], "sftp": ["host", "path"]}
+        missing = [field for field in required.get(self.type, []) if getattr(self, field) is None]
+        if missing:
+            raise ValueError(f"Destination '{self.name}' of type {self.type} needs {', '.join(missing)}")
+        return self
     
 class Config(BaseModel):
     app: AppConfig
     database: DatabaseConfig
     paths: PathsConfig
     runtime: RuntimeConfig
-    aws: AWSConfig
+    aws: AWSConfig | None = None
+    destinations: list[DestinationConfig] | None = None
+    compression: CompressionConfig = CompressionConfig()
+    verification: VerificationConfig = VerificationConfig()
+    dedup: DedupConfig = DedupConfig()
+    encryption: EncryptionConfig = EncryptionConfig()
+    metrics: MetricsConfig = MetricsConfig()
+    retention: RetentionConfig = RetentionConfig()
+    pitr: PITRConfig = PITRConfig()
+    journal: JournalConfig = JournalConfig()
+    listing: ListingConfig = ListingConfig()
+    daemon: DaemonConfig = DaemonConfig()
+
+    @model_validator(mode="after")
+    def validate_encryption(self):
+        """
+        Ensure encryption is not combined with deduplication, whose chunks would be stored unencrypted.
+        """
+        if self.encryption.enabled and self.dedup.enabled:
+            raise ValueError("Encryption cannot be combined with dedup; deduplicated chunks are not encrypted")
+        return self
+
+    @model_validator(mode="after")
+    def validate_destinations(self):
+        """
+        Ensure destination names are unique and S3 destinations have a bucket.
+        """
+        names = [PRIMARY_DESTINATION] + [destination.name for destination in self.destinations or []]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Destination names must be unique and '{PRIMARY_DESTINATION}' is reserved "
+                             "for the backup directory")
+        for destination in self.destinations or []:
+            if destination.type == "s3" and destination.bucket is None and self.aws is None:
+                raise ValueError(f"Destination '{destination.name}' needs a bucket or the aws section")
+        return self
     
 # Configuration Loader Function
 def load_config(config_path: str = "config/config.yaml", logger: logging.Logger | None = None) -> Config:
@@ -0,0 +1,271 @@
+"""
+Long-running backup daemon with per-database cron schedules and resource-aware dispatch.
+"""
+
+import logging
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+from dbbackup.core.backup import DatabaseBackup
+from dbbackup.core.journal import JobJournal
+from dbbackup.core.metrics import MetricsRecorder
+from dbbackup.core.storages.backends import StorageFanout
+from dbbackup.core.storages.local import LocalStorage
+from dbbackup.core.storages.s3 import S3Storage
+from dbbackup.utils.cron import CronSchedule
+
+PSI_IO_PATH = Path("/proc/pressure/io")
+# Seconds between garbage collections of the job journal
+GC_INTERVAL = 3600
+
+
+@dataclass
+class ScheduledJob:
+    """
+    A database backed up on a cron schedule, with its next start time.
+    """
+    database: str
+    host: str
+    port: int
+    schedule: CronSchedule
+    offset: timedelta
+    due: datetime
+
+    @property
+    def key(self) -> tuple[str, str, int]:
+        return self.database, self.host, self.port
+
+    def advance(self, now: datetime):
+        """
+        Move ``due`` to the next scheduled start after ``now``.
+        """
+        self.due = self.schedule.next_after(now) + self.offset
+
+
+class ResourceGate:
+    """
+    Hold back new jobs while the machine is busy.
+
+    Load is the 1-minute load average per CPU; IO pressure is the share of
+    the last 10 seconds in which some task stalled on IO (Linux PSI). A
+    check whose source is unavailable is skipped.
+    """
+
+    def __init__(self, logger: logging.Logger, max_load: float | None = None,
+                 max_io_pressure: float | None = None, psi_path: Path = PSI_IO_PATH):
+        """
+        Initialize ResourceGate.
+
+        Args:
+            logger (logging.Logger): Logger instance
+            max_load (float | None): Highest load average per CPU that still allows a start
+            max_io_pressure (float | None): Highest IO pressure (percent) that still allows a start
+            psi_path (Path): PSI file to read IO pressure from
+        """
+        self.logger = logger
+        self.max_load = max_load
+        self.max_io_pressure = max_io_pressure
+        self.psi_path = psi_path
+
+    def busy(self) -> Optional[str]:
+        """
+        Return why no job should start now, or None if one may.
+        """
+        if self.max_load is not None:
+            load = os.getloadavg()[0] / (os.cpu_count() or 1)
+            if load > self.max_load:
+                return f"load {load:.2f} per CPU above {self.max_load}"
+        if self.max_io_pressure is not None:
+            pressure = self.io_pressure()
+            if pressure is not None and pressure > self.max_io_pressure:
+                return f"IO pressure {pressure:.1f}% above {self.max_io_pressure}%"
+        return None
+
+    def io_pressure(self) -> Optional[float]:
+        """
+        Return the ``some avg10`` IO pressure in percent, or None without PSI support.
+        """
+        try:
+            for line in self.psi_path.read_text().splitlines():
+                kind, *values = line.split()
+                if kind == "some":
+                    return float(dict(value.split("=") for value in values)["avg10"])
+        except (OSError, ValueError, KeyError):
+            pass
+        return None
+
+
+class BackupDaemon:
+    """
+    Run scheduled backups from one long-lived process.
+
+    Every schedule entry is backed up when its cron expression fires, plus
+    a fixed offset derived from the database name that spreads entries firing
+    at the same minute over ``stagger_seconds``. Due jobs wait in a queue
+    until a global slot and a slot for their database host are free and the
+    resource gate allows a start. One DatabaseBackup per host stays alive
+    between runs, so clients, the catalog and S3 connections are reused;
+    all of them share the destinations and their worker limits.
+    """
+
+    def __init__(self, config, logger: logging.Logger):
+        """
+        Initialize BackupDaemon.
+
+        Args:
+            config: Application configuration
+            logger (logging.Logger): Logger instance
+        """
+        self.config = config
+        self.logger = logger
+        daemon = config.daemon
+        self.gate = ResourceGate(logger, daemon.max_load, daemon.max_io_pressure)
+        self.metrics = MetricsRecorder("backup")
+        # Last run of every database, exported as the textfile
+        self.last_runs = MetricsRecorder("backup")
+        self._export_lock = threading.Lock()
+        # One journal for every host, so garbage collection sees the jobs all of them are running
+        self.journal = JobJournal.for_backup_dir(config.paths.backup_dir, logger) if config.journal.enabled else None
+        s3_storage = None
+        if config.aws is not None:
+            s3_storage = S3Storage.from_config(config.aws, logger, metrics=self.metrics, journal=self.journal)
+        self.destinations = StorageFanout.from_config(config, logger, self.metrics,
+                                                      LocalStorage(config.paths.backup_dir, logger, self.metrics),
+                                                      s3_storage)
+        self.jobs = [self._scheduled_job(entry, datetime.now()) for entry in daemon.schedules]
+        self._backups: dict[tuple[str, int], DatabaseBackup] = {}
+        self._queue: list[ScheduledJob] = []
+        self._running: dict[tuple[str, str, int], Future] = {}
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._waiting_reason: Optional[str] = None
+
+    def run(self):
+        """
+        Dispatch scheduled backups until :meth:`stop` is called, then wait for running jobs.
+        """
+        if not self.jobs:
+            self.logger.error("No backup schedules configured under daemon.schedules")
+            return
+        for job in sorted(self.jobs, key=lambda job: job.due):
+            self.logger.info(f"Backup of {job.database} on {job.host} scheduled '{job.schedule.expression}', "
+                             f"next at {job.due:%Y-%m-%d %H:%M:%S}")
+        daemon = self.config.daemon
+        last_gc = 0.0
+        with ThreadPoolExecutor(max_workers=daemon.max_concurrent_jobs, thread_name_prefix="dbbackup-daemon") as pool:
+            while not self._stop.is_set():
+                if time.monotonic() - last_gc >= GC_INTERVAL:
+                    self._backup_for(self.jobs[0]).collect_garbage()
+                    last_gc = time.monotonic()
+                self.tick(pool, datetime.now())
+                self._wake.wait(self._sleep_seconds(datetime.now()))
+                self._wake.clear()
+            if self._running:
+                self.logger.info(f"Waiting for {len(self._running)} running backup(s) to finish")
+        self.destinations.close()
+        self.logger.info("Backup daemon stopped")
+
+    def stop(self):
+        """
+        Stop dispatching new jobs; safe to call from a signal handler.
+        """
+        self._stop.set()
+        self._wake.set()
+
+    def tick(self, pool: ThreadPoolExecutor, now: datetime):
+        """
+        Queue the jobs that are due and start as many queued jobs as the limits allow.
+        """
+        self._running = {key: future for key, future in self._running.items() if not future.done()}
+        for job in sorted(self.jobs, key=lambda job: job.due):
+            if job.due > now:
+                continue
+            if job.key in self._running or job in self._queue:
+                self.logger.warning(f"Backup of {job.database} is still running or queued, skipping the run due "
+                                    f"at {job.due:%Y-%m-%d %H:%M:%S}")
+            else:
+                self._queue.append(job)
+            job.advance(now)
+
+        daemon = self.config.daemon
+        for job in list(self._queue):
+            if len(self._running) >= daemon.max_concurrent_jobs:
+                break
+            if sum(key[1] == job.host for key in self._running) >= daemon.max_jobs_per_host:
+                continue
+            reason = self.gate.busy()
+            if reason:
+                if reason != self._waiting_reason:
+                    self.logger.info(f"Holding back {len(self._queue)} backup(s): {reason}")
+                self._waiting_reason = reason
+                break
+            self._waiting_reason = None
+            self._queue.remove(job)
+            future = pool.submit(self._run_job, job)
+            future.add_done_callback(lambda _: self._wake.set())
+            self._running[job.key] = future
+
+    def _run_job(self, job: ScheduledJob) -> Optional[str]:
+        """
+        Back up one database on the warm DatabaseBackup of its host and export the metrics.
+
+        The job's measurements are taken out of the shared recorder, so the
+        JSON report is named after this run's start and holds only this run.
+        The textfile holds the last run of every database.
+        """
+        self.logger.info(f"Starting scheduled backup of {job.database} on {job.host}")
+        started_at = datetime.now()
+        started = time.monotonic()
+        output = None
+        try:
+            output = self._backup_for(job).backup_database(job.database)
+        except Exception as e:
+            self.logger.error(f"Scheduled backup of {job.database} failed: {e}")
+        duration = time.monotonic() - started
+        self.metrics.record_job(job.database, output is not None, duration)
+        if output is None:
+            self.logger.error(f"Scheduled backup of {job.database} failed after {duration:.2f}s")
+        else:
+            self.logger.info(f"Scheduled backup of {job.database} finished in {duration:.2f}s: {output}")
+        run = self.metrics.take(job.database, started_at)
+        run.write_reports(self.logger, report_dir=self.config.metrics.report_dir)
+        with self._export_lock:
+            self.last_runs.replace(run)
+            self.last_runs.write_reports(self.logger, textfile_dir=self.config.metrics.textfile_dir)
+        return output
+
+    def _backup_for(self, job: ScheduledJob) -> DatabaseBackup:
+        """
+        Return the long-lived DatabaseBackup connecting to the job's database host.
+        """
+        key = (job.host, job.port)
+        if key not in self._backups:
+            config = self.config.model_copy(deep=True)
+            config.database.host, config.database.port = key
+            self._backups[key] = DatabaseBackup(config, self.logger, metrics=self.metrics, journal=self.journal,
+                                                destinations=self.destinations)
+        return self._backups[key]
+
+    def _scheduled_job(self, entry, now: datetime) -> ScheduledJob:
+        host = entry.host or self.config.database.host
+        port = entry.port or self.config.database.port
+        # A stable offset per database, so restarts keep the same spread
+        stagger = self.config.daemon.stagger_seconds
+        offset = timedelta(seconds=zlib.crc32(f"{entry.database}@{host}".encode()) % stagger if stagger else 0)
+        schedule = CronSchedule(entry.cron)
+        return ScheduledJob(entry.database, host, port, schedule, offset, schedule.next_after(now) + offset)
+
+    def _sleep_seconds(self, now: datetime) -> float:
+        """
+        Return how long to wait before the next job is due or the queue should be checked again.
+        """
+        if self._queue:
+            return self.config.daemon.check_interval
+        next_due = min(job.due for job in self.jobs)
+        return min(max(0.0, (next_due - now).total_seconds()), self.config.daemon.check_interval)
@@ -2,9 +2,16 @@
 Safely execute shell commands with logging, error handling, and dry-run support.
 """
 
+import asyncio
+import shlex
 import subprocess
 import logging
-from typing import Optional
+import tempfile
+from contextlib import asynccontextmanager, contextmanager
+from typing import IO, AsyncIterator, Iterator, Optional
+
+# Bytes of stderr kept from an async command for the error log
+STDERR_TAIL = 64 * 1024
 
 
 class CommandExecutor:
@@ -62,4 +69,260 @@ class CommandExecutor:
             raise RuntimeError(f"Command execution failed: {e}")
         except Exception as ex:
             self.logger.error(f"Unexpected error executing command: {command} -> {ex}")
-            raise RuntimeError(f"Command execution error: {ex}")
\ No newline at end of file
+            raise RuntimeError(f"Command execution error: {ex}")
+
+    @contextmanager
+    def stream(self, args: list[str], env: dict | None = None) -> Iterator[IO[bytes]]:
+        """
+        Start a command and yield its stdout as a binary stream.
+
+        The command is executed without a shell. Its stderr is spooled to a
+        temporary file so a chatty process can never block on a full pipe.
+
+        Args:
+            args (list[str]): Command and arguments
+            env (dict | None): Optional environment variables
+
+        Yields:
+            IO[bytes]: The command's stdout
+
+        Raises:
+            RuntimeError: If the command cannot be started or exits with a non-zero code
+        """
+        command = shlex.join(args)
+        self.logger.debug(f"Streaming command: {command}")
+
+        with tempfile.TemporaryFile() as stderr:
+            try:
+                process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=stderr, env=env)
+            except OSError as ex:
+                self.logger.error(f"Unexpected error executing command: {command} -> {ex}")
+                raise RuntimeError(f"Command execution error: {ex}")
+
+            try:
+                yield process.stdout
+            except BaseException:
+                process.kill()
+                process.wait()
+                raise
+            finally:
+                process.stdout.close()
+
+            returncode = process.wait()
+            if returncode != 0:
+                stderr.seek(0)
+                message = stderr.read().decode(errors="replace").strip()
+                self.logger.error(f"Command failed with exit code {returncode}: {command}")
+                self.logger.error(f"stderr: {message or 'N/A'}")
+                raise RuntimeError(f"Command execution failed with exit code {returncode}: {command}")
+
+    def feed(self, args: list[str], source: IO[bytes], env: dict | None = None,
+             chunk_size: int = 1024 * 1024) -> int:
+        """
+        Run a command and stream a binary source into its stdin.
+
+        At most ``chunk_size`` bytes plus the OS pipe buffer are held in
+        memory, whatever the size of the source.
+
+        Args:
+            args (list[str]): Command and arguments
+            source (IO[bytes]): Stream written to the command's stdin
+            env (dict | None): Optional environment variables
+            chunk_size (int): Number of bytes read from the source per write
+
+        Returns:
+            int: Number of bytes written to the command
+
+        Raises:
+            RuntimeError: If the command cannot be started or exits with a non-zero code
+        """
+        command = shlex.join(args)
+        self.logger.debug(f"Executing command with streamed input: {command}")
+
+        if self.dry_run:
+            self.logger.info(f"[DRY-RUN] Command not executed: {command}")
+            return 0
+
+        with tempfile.TemporaryFile() as stderr:
+            try:
+                process = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                                           stderr=stderr, env=env)
+            except OSError as ex:
+                self.logger.error(f"Unexpected error executing command: {command} -> {ex}")
+                raise RuntimeError(f"Command execution error: {ex}")
+
+            bytes_written = 0
+            try:
+                while chunk := source.read(chunk_size):
+                    process.stdin.write(chunk)
+                    bytes_written += len(chunk)
+            except BrokenPipeError:
+                pass  # The command exited early; its exit code explains why
+            except BaseException:
+                process.kill()
+                process.wait()
+                raise
+            finally:
+                try:
+                    process.stdin.close()
+                except BrokenPipeError:
+                    pass
+
+            returncode = process.wait()
+            if returncode != 0:
+                stderr.seek(0)
+                message = stderr.read().decode(errors="replace").strip()
+                self.logger.error(f"Command failed with exit code {returncode}: {command}")
+                self.logger.error(f"stderr: {message or 'N/A'}")
+                raise RuntimeError(f"Command execution failed with exit code {returncode}: {command}")
+            return bytes_written
+
+    def start(self, args: list[str], env: dict | None = None) -> Optional[subprocess.Popen]:
+        """
+        Start a long-running command in the background.
+
+        The command inherits stdout and stderr, so its messages end up next
+        to the tool's own console output. The caller owns the process.
+
+        Args:
+            args (list[str]): Command and arguments
+            env (dict | None): Optional environment variables
+
+        Returns:
+            Optional[subprocess.Popen]: The started process, or None in dry-run mode
+
+        Raises:
+            RuntimeError: If the command cannot be started
+        """
+        command = shlex.join(args)
+        self.logger.debug(f"Starting command: {command}")
+
+        if self.dry_run:
+            self.logger.info(f"[DRY-RUN] Command not executed: {command}")
+            return None
+
+        try:
+            return subprocess.Popen(args, stdin=subprocess.DEVNULL, env=env)
+        except OSError as ex:
+            self.logger.error(f"Unexpected error executing command: {command} -> {ex}")
+            raise RuntimeError(f"Command execution error: {ex}")
+
+
+class AsyncCommandExecutor:
+    """
+    Asyncio counterpart of CommandExecutor.
+
+    Commands run without a shell through ``asyncio.create_subprocess_exec``,
+    so many of them can be driven from one event loop without a thread each.
+    Cancelling the awaiting task kills the command.
+    """
+
+    def __init__(self, logger: logging.Logger, dry_run: bool = False):
+        """
+        Initialize AsyncCommandExecutor.
+
+        Args:
+            logger (logging.Logger): Logger instance
+            dry_run (bool): If True, commands are printed but not executed
+        """
+        self.logger = logger
+        self.dry_run = dry_run
+
+    async def run(self, args: list[str], capture_output: bool = False, env: dict | None = None) -> Optional[str]:
+        """
+        Execute a command and wait for it to exit.
+
+        Args:
+            args (list[str]): Command and arguments
+            capture_output (bool): Whether to capture stdout
+            env (dict | None): Optional environment variables
+
+        Returns:
+            Optional[str]: Command output if captured
+
+        Raises:
+            RuntimeError: If the command cannot be started or exits with a non-zero code
+        """
+        command = shlex.join(args)
+        self.logger.debug(f"Executing command: {command}")
+
+        if self.dry_run:
+            self.logger.info(f"[DRY-RUN] Command not executed: {command}")
+            return None
+
+        process = await self._spawn(args, command, env,
+                                    stdout=asyncio.subprocess.PIPE if capture_output else asyncio.subprocess.DEVNULL)
+        try:
+            stdout, stderr = await process.communicate()
+        except BaseException:
+            await self._kill(process)
+            raise
+        self._check(process.returncode, command, stderr)
+        if capture_output:
+            output = stdout.decode(errors="replace").strip()
+            self.logger.debug(f"Command output: {output}")
+            return output
+        return None
+
+    @asynccontextmanager
+    async def stream(self, args: list[str], env: dict | None = None) -> AsyncIterator[asyncio.StreamReader]:
+        """
+        Start a command and yield its stdout as an asyncio stream.
+
+        stderr is drained concurrently, keeping only its tail, so a chatty
+        process can never block on a full pipe.
+
+        Args:
+            args (list[str]): Command and arguments
+            env (dict | None): Optional environment variables
+
+        Yields:
+            asyncio.StreamReader: The command's stdout
+
+        Raises:
+            RuntimeError: If the command cannot be started or exits with a non-zero code
+        """
+        command = shlex.join(args)
+        self.logger.debug(f"Streaming command: {command}")
+
+        process = await self._spawn(args, command, env, stdout=asyncio.subprocess.PIPE)
+        stderr_tail = asyncio.create_task(_read_tail(process.stderr, STDERR_TAIL))
+        try:
+            yield process.stdout
+        except BaseException:
+            stderr_tail.cancel()
+            await self._kill(process)
+            raise
+        returncode = await process.wait()
+        self._check(returncode, command, await stderr_tail)
+
+    async def _spawn(self, args: list[str], command: str, env: dict | None, stdout) -> asyncio.subprocess.Process:
+        try:
+            return await asyncio.create_subprocess_exec(*args, stdout=stdout, stderr=asyncio.subprocess.PIPE, env=env)
+        except OSError as ex:
+            self.logger.error(f"Unexpected error executing command: {command} -> {ex}")
+            raise RuntimeError(f"Command execution error: {ex}")
+
+    async def _kill(self, process: asyncio.subprocess.Process):
+        if process.returncode is None:
+            process.kill()
+            await asyncio.shield(process.wait())
+
+    def _check(self, returncode: int, command: str, stderr: bytes):
+        if returncode != 0:
+            message = stderr.decode(errors="replace").strip()
+            self.logger.error(f"Command failed with exit code {returncode}: {command}")
+            self.logger.error(f"stderr: {message or 'N/A'}")
+            raise RuntimeError(f"Command execution failed with exit code {returncode}: {command}")
+
+
+async def _read_tail(stream: asyncio.StreamReader, limit: int) -> bytes:
+    """
+    Read a stream to the end, keeping only its last ``limit`` bytes.
+    """
+    tail = bytearray()
+    while chunk := await stream.read(65536):
+        tail += chunk
+        if len(tail) > limit:
+            del tail[:-limit]
+    return bytes(tail)
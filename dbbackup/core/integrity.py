@@ -0,0 +1,181 @@
+"""
+Checksums and manifests used to verify backup integrity.
+
+Checksums are computed on the data as it is written, so producing them
+never requires reading a backup back. They are stored as
+``algorithm:hexdigest`` strings.
+"""
+
+import hashlib
+import hmac
+from pathlib import Path
+from typing import IO, Optional
+
+SUPPORTED_ALGORITHMS = ("sha256", "blake2b", "blake3")
+
+
+def new_hash(algorithm: str = "sha256"):
+    """
+    Create a hash object for a supported algorithm.
+
+    Args:
+        algorithm (str): 'sha256', 'blake2b' or 'blake3' (needs the optional ``blake3`` package)
+
+    Returns:
+        Hash object with ``update()`` and ``hexdigest()``
+
+    Raises:
+        ValueError: If the algorithm is unknown or unavailable
+    """
+    algorithm = algorithm.lower()
+    if algorithm == "blake3":
+        try:
+            from blake3 import blake3
+        except ImportError:
+            raise ValueError("Checksum algorithm 'blake3' requires the optional 'blake3' package")
+        return blake3(max_threads=blake3.AUTO)
+    if algorithm not in SUPPORTED_ALGORITHMS:
+        raise ValueError(f"Unsupported checksum algorithm '{algorithm}'. Use {', '.join(SUPPORTED_ALGORITHMS)}.")
+    return hashlib.new(algorithm)
+
+
+def format_checksum(algorithm: str, hexdigest: str) -> str:
+    return f"{algorithm}:{hexdigest}"
+
+
+def parse_checksum(checksum: str) -> tuple[str, str]:
+    """
+    Split an ``algorithm:hexdigest`` string.
+    """
+    algorithm, _, hexdigest = checksum.partition(":")
+    return algorithm, hexdigest
+
+
+def checksums_match(expected: str, actual: str) -> bool:
+    return hmac.compare_digest(expected.lower(), actual.lower())
+
+
+class HashingWriter:
+    """
+    Writer wrapper that hashes every byte on its way to the wrapped writer.
+
+    ``commit`` and ``abort`` are forwarded when the wrapped writer has them,
+    so it can sit in front of a TeeWriter.
+    """
+
+    def __init__(self, sink, algorithm: str = "sha256"):
+        """
+        Initialize HashingWriter.
+
+        Args:
+            sink: Object with a ``write(bytes)`` method
+            algorithm (str): Checksum algorithm
+        """
+        self.sink = sink
+        self.algorithm = algorithm
+        self._hash = new_hash(algorithm)
+
+    def write(self, data: bytes):
+        self._hash.update(data)
+        self.sink.write(data)
+
+    def commit(self):
+        self.sink.commit()
+
+    def abort(self):
+        self.sink.abort()
+
+    @property
+    def checksum(self) -> str:
+        return format_checksum(self.algorithm, self._hash.hexdigest())
+
+
+class HashingReader:
+    """
+    Reader wrapper that hashes every byte read from the wrapped stream.
+    """
+
+    def __init__(self, source: IO[bytes], algorithm: str = "sha256"):
+        self.source = source
+        self.algorithm = algorithm
+        self.bytes_read = 0
+        self._hash = new_hash(algorithm)
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.source.read(size)
+        self._hash.update(data)
+        self.bytes_read += len(data)
+        return data
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def readable(self) -> bool:
+        return True
+
+    def drain(self, chunk_size: int = 1024 * 1024):
+        """
+        Read and hash whatever the consumer left unread.
+        """
+        while self.read(chunk_size):
+            pass
+
+    @property
+    def checksum(self) -> str:
+        return format_checksum(self.algorithm, self._hash.hexdigest())
+
+
+def manifest_path(backup_path: str, algorithm: str) -> Path:
+    """
+    Return the path of the hidden checksum manifest next to a backup file.
+    """
+    path = Path(backup_path)
+    return path.with_name(f".{path.name}.{algorithm}")
+
+
+def write_manifest(backup_path: str, checksum: str) -> Path:
+    """
+    Write a checksum manifest in ``sha256sum`` format next to a backup file.
+
+    Args:
+        backup_path (str): Path to the backup file
+        checksum (str): Checksum in ``algorithm:hexdigest`` form
+
+    Returns:
+        Path: Path to the manifest
+    """
+    algorithm, hexdigest = parse_checksum(checksum)
+    path = manifest_path(backup_path, algorithm)
+    path.write_text(f"{hexdigest}  {Path(backup_path).name}\n")
+    return path
+
+
+def read_manifest(backup_path: str) -> Optional[str]:
+    """
+    Read the checksum manifest of a backup file, if one exists.
+
+    Returns:
+        Optional[str]: Checksum in ``algorithm:hexdigest`` form, or None
+    """
+    for algorithm in SUPPORTED_ALGORITHMS:
+        path = manifest_path(backup_path, algorithm)
+        if path.is_file():
+            hexdigest = path.read_text().split()[0]
+            return format_checksum(algorithm, hexdigest)
+    return None
+
+
+def multipart_etag(part_etags: list[str]) -> str:
+    """
+    Compute the ETag S3 assigns to a completed multipart upload.
+
+    Args:
+        part_etags (list[str]): ETags of the uploaded parts, in part order
+
+    Returns:
+        str: ``md5(concatenated part digests)-N`` without quotes
+    """
+    digests = b"".join(bytes.fromhex(etag.strip('"')) for etag in part_etags)
+    return f"{hashlib.md5(digests).hexdigest()}-{len(part_etags)}"
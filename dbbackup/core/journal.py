@@ -0,0 +1,478 @@
+"""
+Persistent SQLite journal of running backup jobs and S3 multipart uploads.
+
+A job is recorded when its dump starts and moves to the 'compressed' stage
+once the compressed backup is complete in its working directory. If storing
+it fails or the process dies, the next run for the database finds the job
+and stores that file instead of dumping again. Multipart uploads are
+recorded with their upload ID and the ETag of every completed part, so an
+interrupted upload continues from the first missing part. Whatever no
+process can pick up any more is left to garbage collection.
+"""
+
+import logging
+import os
+import re
+import shutil
+import socket
+import sqlite3
+from contextlib import closing
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+from dbbackup.core.storages.dedup import S3_CHUNK_PREFIX
+from dbbackup.utils.timeutils import generate_backup_key, parse_timestamped_filename
+
+# Hidden so LocalStorage.list_backups never reports it as a backup
+JOURNAL_FILENAME = ".journal.sqlite3"
+
+STAGE_DUMP = "dump"
+STAGE_COMPRESSED = "compressed"
+
+# Names tempfile.mkdtemp gives the working directories of backup, restore and replay jobs
+_WORK_DIR_NAME = re.compile(r"_[a-z0-9_]{8}$")
+
+_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        database TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        stage TEXT NOT NULL,
+        work_dir TEXT NOT NULL,
+        backup_path TEXT,
+        format TEXT,
+        codec TEXT,
+        checksum TEXT,
+        target_key TEXT,
+        host TEXT NOT NULL,
+        pid INTEGER NOT NULL,
+        updated_at TEXT NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS uploads (
+        upload_id TEXT PRIMARY KEY,
+        key TEXT NOT NULL,
+        source TEXT,
+        size INTEGER,
+        mtime_ns INTEGER,
+        part_size INTEGER NOT NULL,
+        host TEXT NOT NULL,
+        pid INTEGER NOT NULL,
+        created_at TEXT NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS parts (
+        upload_id TEXT NOT NULL,
+        part_number INTEGER NOT NULL,
+        etag TEXT NOT NULL,
+        PRIMARY KEY (upload_id, part_number)
+    )""",
+]
+
+
+@dataclass
+class JournalJob:
+    """
+    A backup job recorded in the journal.
+    """
+    id: int
+    database: str
+    created_at: datetime
+    stage: str
+    work_dir: str
+    host: str
+    pid: int
+    updated_at: datetime
+    backup_path: Optional[str] = None
+    format: Optional[str] = None
+    codec: Optional[str] = None
+    checksum: Optional[str] = None
+    target_key: Optional[str] = None
+
+
+@dataclass
+class JournalUpload:
+    """
+    An S3 multipart upload recorded in the journal.
+
+    ``source`` is None for streamed uploads, which cannot be resumed.
+    """
+    upload_id: str
+    key: str
+    part_size: int
+    host: str
+    pid: int
+    created_at: datetime
+    source: Optional[str] = None
+    size: Optional[int] = None
+    mtime_ns: Optional[int] = None
+    parts: dict[int, str] = field(default_factory=dict)
+
+
+class JobJournal:
+    """
+    Journal of backup jobs and multipart uploads stored next to the catalog.
+
+    Each operation opens its own connection, so one journal instance can be
+    shared by concurrent backup jobs. Rows carry the host and PID of the
+    process working on them; a row is only taken over once that process is
+    gone, or, in this process, once the job or upload is no longer active.
+    """
+
+    def __init__(self, db_path: str, logger: logging.Logger):
+        """
+        Initialize JobJournal and create its schema.
+
+        Args:
+            db_path (str): Path to the SQLite database file
+            logger (logging.Logger): Logger instance
+        """
+        self.db_path = Path(db_path)
+        self.logger = logger
+        self.host = socket.gethostname()
+        self._active: set = set()
+        self._init_schema()
+
+    @classmethod
+    def for_backup_dir(cls, backup_dir: str, logger: logging.Logger) -> "JobJournal":
+        """
+        Open the journal that lives in a backup directory.
+        """
+        return cls(str(Path(backup_dir) / JOURNAL_FILENAME), logger)
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.db_path, timeout=30)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def _init_schema(self):
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            for statement in _SCHEMA:
+                conn.execute(statement)
+
+    def start_job(self, database: str, created_at: datetime, work_dir: str) -> int:
+        """
+        Record a backup job whose dump is starting.
+
+        Args:
+            database (str): Database name
+            created_at (datetime): Timestamp of the backup
+            work_dir (str): Working directory holding the job's files
+
+        Returns:
+            int: Job id
+        """
+        now = _now()
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                "INSERT INTO jobs (database, created_at, stage, work_dir, host, pid, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (database, _iso(created_at), STAGE_DUMP, work_dir, self.host, os.getpid(), now))
+        self._active.add(cursor.lastrowid)
+        return cursor.lastrowid
+
+    def update_job(self, job_id: int, **values):
+        """
+        Move a job to a new stage or store what the next stage needs.
+
+        Args:
+            job_id (int): Job id
+            **values: Columns to set, such as ``stage``, ``backup_path`` or ``checksum``
+        """
+        values = {column: _iso(value) if isinstance(value, datetime) else value for column, value in values.items()}
+        values["updated_at"] = _now()
+        assignments = ", ".join(f"{column} = :{column}" for column in values)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = :id", {**values, "id": job_id})
+
+    def get_job(self, job_id: int) -> Optional[JournalJob]:
+        """
+        Return a job, or None if it is finished.
+        """
+        jobs = self._query_jobs("WHERE id = ?", (job_id,))
+        return jobs[0] if jobs else None
+
+    def jobs(self) -> list[JournalJob]:
+        """
+        Return all unfinished jobs, oldest first.
+        """
+        return self._query_jobs("ORDER BY created_at, id")
+
+    def claim_resumable(self, database: str, since: datetime) -> Optional[JournalJob]:
+        """
+        Take over the newest interrupted job of a database whose compressed backup is complete.
+
+        Args:
+            database (str): Database name
+            since (datetime): Ignore backups created before this time
+
+        Returns:
+            Optional[JournalJob]: Claimed job, or None if there is nothing to resume
+        """
+        candidates = self._query_jobs("WHERE database = ? AND stage = ? AND created_at >= ? "
+                                      "ORDER BY created_at DESC, id DESC",
+                                      (database, STAGE_COMPRESSED, _iso(since)))
+        for job in candidates:
+            if self.is_live(job.id, job.host, job.pid):
+                continue
+            with closing(self._connect()) as conn, conn:
+                # Only one process wins if several try to take over the same job
+                cursor = conn.execute("UPDATE jobs SET host = ?, pid = ?, updated_at = ? "
+                                      "WHERE id = ? AND host = ? AND pid = ?",
+                                      (self.host, os.getpid(), _now(), job.id, job.host, job.pid))
+            if cursor.rowcount:
+                self._active.add(job.id)
+                return job
+        return None
+
+    def release_job(self, job_id: int):
+        """
+        Leave a job in the journal for a later run to resume.
+        """
+        self._active.discard(job_id)
+
+    def finish_job(self, job_id: int):
+        """
+        Remove a completed or abandoned job.
+        """
+        self._active.discard(job_id)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def start_upload(self, upload_id: str, key: str, part_size: int, source: Optional[str] = None,
+                     size: Optional[int] = None, mtime_ns: Optional[int] = None):
+        """
+        Record a multipart upload that was just created.
+
+        Args:
+            upload_id (str): S3 upload ID
+            key (str): Target object key
+            part_size (int): Size of every part but the last
+            source (Optional[str]): Uploaded file, None for a streamed upload
+            size (Optional[int]): Size of the uploaded file
+            mtime_ns (Optional[int]): Modification time of the uploaded file
+        """
+        with closing(self._connect()) as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO uploads (upload_id, key, source, size, mtime_ns, part_size, host, "
+                         "pid, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                         (upload_id, key, source, size, mtime_ns, part_size, self.host, os.getpid(), _now()))
+        self._active.add(upload_id)
+
+    def find_upload(self, key: str, source: str, size: int, mtime_ns: int) -> Optional[JournalUpload]:
+        """
+        Return an interrupted upload of the same file to the same key, taking it over.
+
+        Returns:
+            Optional[JournalUpload]: Upload with its completed parts, or None if there is none
+        """
+        uploads = self._query_uploads("WHERE key = ? AND source = ? AND size = ? AND mtime_ns = ?",
+                                      (key, source, size, mtime_ns))
+        for upload in uploads:
+            if self.is_live(upload.upload_id, upload.host, upload.pid):
+                continue
+            with closing(self._connect()) as conn, conn:
+                conn.execute("UPDATE uploads SET host = ?, pid = ? WHERE upload_id = ?",
+                             (self.host, os.getpid(), upload.upload_id))
+            self._active.add(upload.upload_id)
+            return upload
+        return None
+
+    def add_part(self, upload_id: str, part_number: int, etag: str):
+        """
+        Record a completed part of a multipart upload.
+        """
+        with closing(self._connect()) as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO parts (upload_id, part_number, etag) VALUES (?, ?, ?)",
+                         (upload_id, part_number, etag))
+
+    def release_upload(self, upload_id: str):
+        """
+        Leave an interrupted upload in the journal for a later attempt to resume.
+        """
+        self._active.discard(upload_id)
+
+    def uploads(self) -> list[JournalUpload]:
+        """
+        Return all unfinished uploads.
+        """
+        return self._query_uploads("ORDER BY created_at")
+
+    def finish_upload(self, upload_id: str):
+        """
+        Remove a completed or aborted upload and its parts.
+        """
+        self._active.discard(upload_id)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM parts WHERE upload_id = ?", (upload_id,))
+            conn.execute("DELETE FROM uploads WHERE upload_id = ?", (upload_id,))
+
+    def is_live(self, row_id, host: str, pid: int) -> bool:
+        """
+        Return True if a job or upload may still be in progress somewhere.
+
+        Rows of other hosts are assumed live; only their age lets garbage
+        collection remove them.
+        """
+        if host != self.host:
+            return True
+        if pid == os.getpid():
+            return row_id in self._active
+        return _process_exists(pid)
+
+    def _query_jobs(self, clause: str, params: tuple = ()) -> list[JournalJob]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute(f"SELECT * FROM jobs {clause}", params).fetchall()
+        jobs = []
+        for row in rows:
+            values = dict(row)
+            values["created_at"] = datetime.fromisoformat(values["created_at"])
+            values["updated_at"] = datetime.fromisoformat(values["updated_at"])
+            jobs.append(JournalJob(**values))
+        return jobs
+
+    def _query_uploads(self, clause: str, params: tuple = ()) -> list[JournalUpload]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute(f"SELECT * FROM uploads {clause}", params).fetchall()
+            uploads = []
+            for row in rows:
+                values = dict(row)
+                values["created_at"] = datetime.fromisoformat(values["created_at"])
+                parts = conn.execute("SELECT part_number, etag FROM parts WHERE upload_id = ?",
+                                     (values["upload_id"],))
+                uploads.append(JournalUpload(**values, parts={number: etag for number, etag in parts}))
+        return uploads
+
+
+class JournalCollector:
+    """
+    Remove what interrupted runs left behind and no later run can resume.
+
+    That is jobs whose process died before their backup was compressed,
+    jobs and uploads older than ``journal.max_age_hours``, multipart uploads
+    unknown to the journal that were started before that to a key this tool
+    writes (other hosts and tools may share the bucket), and, past the same
+    age, job working directories under ``temp_dir`` and ``.partial`` files in
+    the backup directory.
+    """
+
+    def __init__(self, config, logger: logging.Logger, journal: JobJournal, s3_storage):
+        """
+        Initialize JournalCollector.
+
+        Args:
+            config: Application configuration
+            logger (logging.Logger): Logger instance
+            journal (JobJournal): Journal of the backup directory
+            s3_storage (S3Storage | None): Storage whose bucket is checked for unfinished multipart uploads
+        """
+        self.config = config
+        self.logger = logger
+        self.journal = journal
+        self.s3_storage = s3_storage
+
+    def run(self) -> tuple[int, int, int]:
+        """
+        Collect garbage once.
+
+        Returns:
+            tuple[int, int, int]: Jobs, multipart uploads and temporary files removed
+        """
+        cutoff = datetime.now() - timedelta(hours=self.config.journal.max_age_hours)
+        jobs_removed, kept = self._collect_jobs(cutoff)
+        uploads_removed = self._collect_uploads(cutoff, {job.backup_path for job in kept if job.backup_path})
+        files_removed = self._collect_files(cutoff, {job.work_dir for job in kept})
+        if jobs_removed or uploads_removed or files_removed:
+            self.logger.info(f"Garbage collected {jobs_removed} interrupted job(s), {uploads_removed} multipart "
+                             f"upload(s) and {files_removed} temporary file(s)")
+        return jobs_removed, uploads_removed, files_removed
+
+    def _abandoned(self, row_id, host: str, pid: int, created_at: datetime, cutoff: datetime,
+                   resumable: bool) -> bool:
+        live = self.journal.is_live(row_id, host, pid)
+        if created_at < cutoff:
+            return not (live and host == self.journal.host)
+        return not live and not resumable
+
+    def _collect_jobs(self, cutoff: datetime) -> tuple[int, list[JournalJob]]:
+        removed, kept = 0, []
+        for job in self.journal.jobs():
+            if not self._abandoned(job.id, job.host, job.pid, job.created_at, cutoff,
+                                   job.stage == STAGE_COMPRESSED):
+                kept.append(job)
+                continue
+            shutil.rmtree(job.work_dir, ignore_errors=True)
+            self.journal.finish_job(job.id)
+            self.logger.debug(f"Interrupted {job.stage} job of {job.database} removed: {job.work_dir}")
+            removed += 1
+        return removed, kept
+
+    def _collect_uploads(self, cutoff: datetime, resumable_sources: set[str]) -> int:
+        journaled = {upload.upload_id: upload for upload in self.journal.uploads()}
+        abandoned = {upload_id for upload_id, upload in journaled.items()
+                     if self._abandoned(upload_id, upload.host, upload.pid, upload.created_at, cutoff,
+                                        upload.source in resumable_sources)}
+        cutoff_utc = datetime.now(timezone.utc) - timedelta(hours=self.config.journal.max_age_hours)
+        removed = 0
+        uploads = self.s3_storage.list_multipart_uploads() if self.s3_storage is not None else []
+        for upload in uploads:
+            known = journaled.pop(upload.upload_id, None)
+            stale = known is None and upload.initiated < cutoff_utc and self._owns_key(upload.key)
+            if stale or upload.upload_id in abandoned:
+                if self.s3_storage.abort_upload(upload.key, upload.upload_id):
+                    self.logger.debug(f"Multipart upload {upload.upload_id} of {upload.key} aborted")
+                    removed += 1
+        for upload_id in journaled.keys() & abandoned:
+            self.journal.finish_upload(upload_id)  # Already gone from S3
+        return removed
+
+    def _owns_key(self, key: str) -> bool:
+        """
+        Tell whether a key is one this tool writes: a backup, an archived log or a dedup chunk.
+        """
+        from dbbackup.core.archiver import S3_ARCHIVE_PREFIX  # The archiver imports the S3 storage, which imports us
+        if key.startswith((S3_CHUNK_PREFIX, S3_ARCHIVE_PREFIX)):
+            return True
+        parsed = parse_timestamped_filename(key, self.config.app.app_name)
+        return parsed is not None and key == generate_backup_key(parsed[0], key.rsplit("/", 1)[-1], parsed[1])
+
+    def _collect_files(self, cutoff: datetime, kept_dirs: set[str]) -> int:
+        candidates = []
+        temp_dir = Path(self.config.paths.temp_dir)
+        spool_dir = self.config.pitr.spool_dir
+        if temp_dir.is_dir():
+            candidates += [path for path in temp_dir.iterdir()
+                           if path.is_dir() and _WORK_DIR_NAME.search(path.name) and str(path) not in kept_dirs
+                           and str(path) != spool_dir]
+        candidates += Path(self.config.paths.backup_dir).glob(".*.partial")
+        removed = 0
+        for path in candidates:
+            try:
+                if datetime.fromtimestamp(path.stat().st_mtime) >= cutoff:
+                    continue
+                if path.is_dir():
+                    shutil.rmtree(path)
+                else:
+                    path.unlink()
+                removed += 1
+            except OSError as e:
+                self.logger.warning(f"Could not remove {path}: {e}")
+        return removed
+
+
+def _process_exists(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Owned by another user, but running
+    return True
+
+
+def _iso(moment: datetime) -> str:
+    return moment.isoformat(timespec="seconds")
+
+
+def _now() -> str:
+    return _iso(datetime.now())
@@ -0,0 +1,373 @@
+"""
+Cached, merged view of local and S3 backups for --list.
+
+The view is kept in a JSON file in the temp directory, outside the backup
+directory whose mtime it watches. A listing reads that file and stats the
+backup directory; the directory is rescanned only when its mtime changed.
+Once ``listing.cache_ttl`` seconds have passed since the bucket was last
+listed, every database prefix is listed from the last key seen there (S3
+``StartAfter``). Keys sort by date within a prefix, so only backups
+uploaded since the previous refresh are transferred. Such listings never
+see deletions: --prune removes the keys it deleted from the cache, and
+every ``listing.full_refresh_every`` TTLs the whole bucket is listed again,
+so objects deleted by other tools drop out too.
+"""
+
+import json
+import logging
+import os
+import posixpath
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+from dbbackup.core.catalog import CATALOG_FILENAME, BackupCatalog
+from dbbackup.core.compressor import codec_for_path
+from dbbackup.utils.timeutils import parse_timestamped_filename
+
+LIST_CACHE_FILENAME = "list_cache.json"
+
+# Bumped when the cache layout changes; older caches are discarded
+CACHE_VERSION = 2
+
+# Directory mtimes closer to now than this are not trusted: with coarse file
+# timestamps a file written in the same tick leaves the mtime unchanged
+RACY_MTIME_NS = 1_000_000_000
+
+
+@dataclass
+class ListedBackup:
+    """
+    A backup in the merged view of local and S3 storage.
+    """
+    database: str
+    filename: str
+    created_at: datetime
+    size: int = 0
+    codec: str = "none"
+    local: bool = False
+    s3_key: Optional[str] = None
+    verify_status: Optional[str] = None
+
+    @property
+    def location(self) -> str:
+        """
+        Where the backup is stored: 'local', 's3' or 'local+s3'.
+        """
+        return "+".join(name for name, stored in (("local", self.local), ("s3", self.s3_key)) if stored)
+
+
+class BackupIndex:
+    """
+    Merged listing of the backups in the backup directory and the S3 bucket, refreshed incrementally.
+    """
+
+    def __init__(self, config, logger: logging.Logger, s3_storage=None, cache_path: Optional[str] = None):
+        """
+        Initialize BackupIndex.
+
+        Args:
+            config: Loaded configuration object
+            logger (logging.Logger): Logger instance
+            s3_storage (S3Storage | None): S3 handler; by default created from the aws section
+                the first time S3 has to be listed
+            cache_path (Optional[str]): Cache file, defaults to ``<temp_dir>/list_cache.json``
+        """
+        self.config = config
+        self.logger = logger
+        self.backup_dir = Path(config.paths.backup_dir)
+        self.cache_path = Path(cache_path) if cache_path else Path(config.paths.temp_dir) / LIST_CACHE_FILENAME
+        self._s3_storage = s3_storage
+
+    @property
+    def s3_storage(self):
+        """
+        S3 handler, imported and created only when the bucket is listed.
+        """
+        if self._s3_storage is None and self.config.aws is not None:
+            from dbbackup.core.storages.s3 import S3Storage
+            self._s3_storage = S3Storage.from_config(self.config.aws, self.logger)
+        return self._s3_storage
+
+    def run(self, database: Optional[str] = None, refresh: bool = False) -> list[ListedBackup]:
+        """
+        Return the merged list of backups, refreshing the cache where it is stale.
+
+        Args:
+            database (Optional[str]): Restrict to one database
+            refresh (bool): List the bucket and the backup directory again instead of trusting the cache
+
+        Returns:
+            list[ListedBackup]: Backups ordered by database, newest first
+        """
+        state = self._load()
+        backups = {backup.filename: backup for backup in state.pop("backups")}
+        if refresh:
+            # Rebuild the local view from the directory and list the whole bucket; the cached S3
+            # entries are only replaced once that listing succeeded
+            backups = {filename: backup for filename, backup in backups.items() if backup.s3_key}
+            for backup in backups.values():
+                backup.local = False
+            state.update(s3_listed_at=0.0, s3_full_listed_at=0.0, backup_dir_mtime_ns=None, catalog_signature=None)
+        s3_due = (self.config.aws is not None
+                  and time.time() - state["s3_listed_at"] >= self.config.listing.cache_ttl)
+        new_objects = self._refresh_s3(backups, state) if s3_due else 0
+
+        mtime = self._dir_mtime()
+        if new_objects or mtime != state["backup_dir_mtime_ns"]:
+            self._refresh_local(backups, state, mtime, new_objects)
+        elif not s3_due:
+            self.logger.debug(f"Backup list served from cache {self.cache_path}")
+        if s3_due or state["changed"]:
+            self._save(state, backups)
+
+        selected = [backup for backup in backups.values() if database in (None, backup.database)]
+        selected.sort(key=lambda backup: backup.created_at, reverse=True)
+        selected.sort(key=lambda backup: backup.database)
+        return selected
+
+    def forget(self, s3_keys: list[str]):
+        """
+        Drop deleted S3 objects from the cached view.
+
+        Args:
+            s3_keys (list[str]): Keys deleted from the bucket
+        """
+        if not s3_keys or not self.cache_path.exists():
+            return
+        state = self._load()
+        backups = {backup.filename: backup for backup in state.pop("backups")}
+        _drop_s3_keys(backups, set(s3_keys))
+        self._save(state, backups)
+        self.logger.debug(f"Backup list cache forgot {len(s3_keys)} deleted S3 object(s)")
+
+    def _refresh_local(self, backups: dict[str, ListedBackup], state: dict, mtime: Optional[int],
+                       new_objects: int):
+        """
+        Sync the view with the backup directory and the catalog's verification results.
+
+        Opening the catalog changes the directory's mtime (SQLite creates and
+        removes its WAL files), so the catalog is read only when its files
+        changed or new backups appeared. The mtime taken before the scan is
+        recorded, unless it is too recent to be trusted.
+        """
+        added = self._scan_local(backups)
+        signature = self._catalog_signature()
+        if signature is not None and (added or new_objects or signature != state["catalog_signature"]):
+            catalog = BackupCatalog(str(self.backup_dir / CATALOG_FILENAME), self.logger)
+            entries = {entry.filename: entry for entry in catalog.list_backups()}
+            for backup in backups.values():
+                entry = entries.get(backup.filename)
+                if entry is not None:
+                    backup.codec = entry.codec
+                    backup.verify_status = entry.verify_status
+        state["catalog_signature"] = signature
+        racy = mtime is not None and time.time_ns() - mtime < RACY_MTIME_NS
+        state["backup_dir_mtime_ns"] = None if racy else mtime
+        state["changed"] = True
+
+    def _scan_local(self, backups: dict[str, ListedBackup]) -> int:
+        """
+        Mark the files in the backup directory as local, stat-ing only files not seen before.
+
+        Returns:
+            int: Number of files that were not local before
+        """
+        added = 0
+        try:
+            names = {entry.name for entry in os.scandir(self.backup_dir)
+                     if not entry.name.startswith(".") and entry.is_file()}
+        except FileNotFoundError:
+            names = set()
+        for filename in [filename for filename, backup in backups.items() if backup.local and filename not in names]:
+            backups[filename].local = False
+            if not backups[filename].s3_key:
+                del backups[filename]
+        for filename in names:
+            backup = backups.get(filename)
+            if backup is not None and backup.local:
+                continue
+            backup = backup or self._parse(filename)
+            if backup is None:
+                continue
+            try:
+                size = (self.backup_dir / filename).stat().st_size
+            except FileNotFoundError:
+                continue  # Deleted while scanning
+            backup.local, backup.size = True, size
+            backups[filename] = backup
+            added += 1
+        self.logger.debug(f"Backup directory scanned: {len(names)} file(s), {added} new")
+        return added
+
+    def _refresh_s3(self, backups: dict[str, ListedBackup], state: dict) -> int:
+        """
+        List each database prefix of the bucket after the last key seen there, or all of it when a full listing is due.
+
+        The cached S3 entries are replaced only once the bucket has been
+        listed; if listing fails they are kept, and the listing is retried
+        on the next run.
+
+        Returns:
+            int: Number of backup objects not listed before
+        """
+        from botocore.exceptions import BotoCoreError, ClientError  # Only loaded with an aws section
+
+        storage = self.s3_storage
+        listing = self.config.listing
+        full = time.time() - state["s3_full_listed_at"] >= listing.cache_ttl * listing.full_refresh_every
+        start_after = {} if full else dict(state["start_after"])
+        try:
+            objects = storage.list_backup_objects(prefixes=storage.list_database_prefixes(strict=True),
+                                                  start_after=start_after, strict=True)
+        except (BotoCoreError, ClientError) as e:
+            self.logger.warning(f"S3 listing failed, showing the cached S3 backups: {e}")
+            return 0
+        if full:
+            _drop_s3_keys(backups)
+        state["start_after"] = start_after
+        new_objects = 0
+        for obj in objects:
+            prefix = obj.key.split("/", 1)[0] + "/"
+            start_after[prefix] = max(start_after.get(prefix, ""), obj.key)
+            filename = posixpath.basename(obj.key)
+            backup = backups.get(filename) or self._parse(filename)
+            if backup is None:
+                continue
+            backups[filename] = backup
+            backup.s3_key = obj.key
+            if not backup.local:
+                backup.size = obj.size
+            new_objects += 1
+        state["s3_listed_at"] = time.time()
+        if full:
+            state["s3_full_listed_at"] = state["s3_listed_at"]
+        self.logger.debug(f"S3 listed {'in full' if full else 'after the cached keys'}: {new_objects} new backup(s)")
+        return new_objects
+
+    def _parse(self, filename: str) -> Optional[ListedBackup]:
+        parsed = parse_timestamped_filename(filename, self.config.app.app_name)
+        if parsed is None:
+            return None
+        database, created_at, _ = parsed
+        return ListedBackup(database=database, filename=filename, created_at=created_at,
+                            codec=codec_for_path(filename).name)
+
+    def _catalog_signature(self) -> Optional[list]:
+        """
+        Modification times and sizes of the catalog and its WAL file, None without a catalog.
+        """
+        signature = []
+        for suffix in ("", "-wal"):
+            try:
+                stat = (self.backup_dir / f"{CATALOG_FILENAME}{suffix}").stat()
+                signature.append([stat.st_mtime_ns, stat.st_size])
+            except FileNotFoundError:
+                if not suffix:
+                    return None
+                signature.append(None)
+        return signature
+
+    def _dir_mtime(self) -> Optional[int]:
+        try:
+            return self.backup_dir.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _new_state(self) -> dict:
+        return {
+            "version": CACHE_VERSION,
+            "backup_dir": str(self.backup_dir),
+            "s3_bucket": self.config.aws.s3_bucket if self.config.aws is not None else None,
+            "backup_dir_mtime_ns": None,
+            "catalog_signature": None,
+            "s3_listed_at": 0.0,
+            "s3_full_listed_at": 0.0,
+            "start_after": {},
+            "backups": [],
+            "changed": True,
+        }
+
+    def _load(self) -> dict:
+        """
+        Read the cache, starting over if it is missing, unreadable or belongs to other storage.
+        """
+        fresh = self._new_state()
+        try:
+            state = json.loads(self.cache_path.read_text())
+            if any(state.get(key) != fresh[key] for key in ("version", "backup_dir", "s3_bucket")):
+                return fresh
+            state["backups"] = [ListedBackup(**{**backup, "created_at": datetime.fromisoformat(backup["created_at"])})
+                                for backup in state["backups"]]
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            if self.cache_path.exists():
+                self.logger.warning(f"Discarding unreadable backup list cache {self.cache_path}: {e}")
+            return fresh
+        state["changed"] = False
+        return state
+
+    def _save(self, state: dict, backups: dict[str, ListedBackup]):
+        """
+        Write the cache atomically, so concurrent listings never read half a file.
+        """
+        state = {key: value for key, value in state.items() if key != "changed"}
+        state["backups"] = [{**asdict(backup), "created_at": backup.created_at.isoformat()}
+                            for backup in backups.values()]
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            partial = self.cache_path.with_name(f".{self.cache_path.name}.{os.getpid()}")
+            partial.write_text(json.dumps(state))
+            os.replace(partial, self.cache_path)
+        except OSError as e:
+            self.logger.warning(f"Could not write backup list cache {self.cache_path}: {e}")
+
+
+def _drop_s3_keys(backups: dict[str, ListedBackup], keys: Optional[set[str]] = None):
+    """
+    Forget the S3 copies with the given keys (all of them for None), and backups left stored nowhere.
+    """
+    for filename, backup in list(backups.items()):
+        if backup.s3_key and (keys is None or backup.s3_key in keys):
+            backup.s3_key = None
+            if not backup.local:
+                del backups[filename]
+
+
+def format_table(backups: list[ListedBackup], now: Optional[datetime] = None) -> list[str]:
+    """
+    Render backups as the lines of a table.
+
+    Args:
+        backups (list[ListedBackup]): Backups in display order
+        now (Optional[datetime]): Reference time for the age column, defaults to now
+
+    Returns:
+        list[str]: Header line followed by one line per backup
+    """
+    now = now or datetime.now()
+    lines = [f"{'DATABASE':<20} {'CREATED':<19} {'AGE':>7} {'SIZE':>10}  {'CODEC':<6} {'STORED':<8} "
+             f"{'VERIFIED':<8} FILENAME"]
+    for backup in backups:
+        lines.append(f"{backup.database:<20} {backup.created_at:%Y-%m-%d %H:%M:%S} "
+                     f"{_format_age((now - backup.created_at).total_seconds()):>7} {_format_size(backup.size):>10}  "
+                     f"{backup.codec:<6} {backup.location:<8} {backup.verify_status or '-':<8} {backup.filename}")
+    return lines
+
+
+def _format_size(size: int) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB", "TiB"):
+        if size < 1024 or unit == "TiB":
+            return f"{size} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def _format_age(seconds: float) -> str:
+    minutes = max(0, int(seconds // 60))
+    if minutes < 60:
+        return f"{minutes}m"
+    hours, minutes = divmod(minutes, 60)
+    if hours < 24:
+        return f"{hours}h{minutes:02d}m"
+    days, hours = divmod(hours, 24)
+    return f"{days}d{hours:02d}h"
@@ -6,7 +6,6 @@ import logging
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
 from typing import Optional
-from dbbackup.core.config_loader import PathsConfig
 
 def get_logger(
     name: str,
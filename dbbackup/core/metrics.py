@@ -0,0 +1,315 @@
+"""
+Collect per-stage timings, throughput and resource usage, and export them as OpenMetrics or JSON.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, Optional
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+MB = 1024 * 1024
+
+# Database the current job works on; set per job so storage and compressor hooks can label their stages
+_current_database: ContextVar[str] = ContextVar("dbbackup_metrics_database", default="")
+
+
+@dataclass
+class StageMetrics:
+    """
+    Aggregated measurements of one stage of one database.
+    """
+    database: str
+    stage: str
+    seconds: float = 0.0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    count: int = 0
+
+    @property
+    def throughput(self) -> float:
+        """
+        Bytes processed per second, using the input size or, for producers like the dump, the output size.
+        """
+        processed = self.bytes_in or self.bytes_out
+        return processed / self.seconds if self.seconds > 0 else 0.0
+
+    @property
+    def ratio(self) -> Optional[float]:
+        """
+        Input size divided by output size, e.g. the compression ratio.
+        """
+        return self.bytes_in / self.bytes_out if self.bytes_in and self.bytes_out else None
+
+
+class MetricsRecorder:
+    """
+    Thread-safe collector of stage measurements for one backup or restore run.
+
+    Components record stages through :meth:`stage` or :meth:`record`; the
+    database label comes from the surrounding :meth:`database` block, so a
+    storage handler or compressor never needs to know which job called it.
+    """
+
+    def __init__(self, operation: str = "backup", run_database: Optional[str] = None,
+                 started_at: Optional[datetime] = None):
+        """
+        Initialize MetricsRecorder.
+
+        Args:
+            operation (str): Operation label of the run ('backup' or 'restore')
+            run_database (Optional[str]): Database of a single-database run, added to the report name
+            started_at (Optional[datetime]): Start of the run, defaults to now
+        """
+        self.operation = operation
+        self.run_database = run_database
+        self.started_at = started_at or datetime.now()
+        self._stages: dict[tuple[str, str], StageMetrics] = {}
+        self._jobs: dict[str, tuple[bool, float]] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def database(self, name: str) -> Iterator[None]:
+        """
+        Label every stage recorded inside the block with a database name.
+        """
+        token = _current_database.set(name)
+        try:
+            yield
+        finally:
+            _current_database.reset(token)
+
+    @contextmanager
+    def stage(self, stage: str, bytes_in: int = 0, bytes_out: int = 0) -> Iterator[StageMetrics]:
+        """
+        Time a block and record it as a stage.
+
+        Byte counts known only at the end can be set on the yielded object.
+
+        Yields:
+            StageMetrics: Measurement that is added to the totals when the block exits
+        """
+        measurement = StageMetrics(_current_database.get(), stage, bytes_in=bytes_in, bytes_out=bytes_out)
+        started = time.perf_counter()
+        try:
+            yield measurement
+        finally:
+            self.record(stage, time.perf_counter() - started, measurement.bytes_in, measurement.bytes_out)
+
+    def record(self, stage: str, seconds: float, bytes_in: int = 0, bytes_out: int = 0,
+               database: Optional[str] = None):
+        """
+        Add a measurement to the totals of a stage.
+
+        Args:
+            stage (str): Stage name, e.g. 'dump', 'compress' or 'upload_s3'
+            seconds (float): Wall time spent in the stage
+            bytes_in (int): Bytes consumed by the stage
+            bytes_out (int): Bytes produced by the stage
+            database (Optional[str]): Database label, defaults to the current :meth:`database` block
+        """
+        database = _current_database.get() if database is None else database
+        with self._lock:
+            totals = self._stages.setdefault((database, stage), StageMetrics(database, stage))
+            totals.seconds += seconds
+            totals.bytes_in += bytes_in
+            totals.bytes_out += bytes_out
+            totals.count += 1
+
+    def record_job(self, database: str, succeeded: bool, seconds: float):
+        """
+        Record the outcome of a whole job.
+        """
+        with self._lock:
+            self._jobs[database] = (succeeded, seconds)
+
+    def take(self, database: str, started_at: datetime) -> "MetricsRecorder":
+        """
+        Move the stages and job outcome of one database into a recorder of its own.
+
+        A long-lived process records every job into one recorder; taking a
+        database out after each job keeps the next job's totals from adding
+        up with this one's.
+
+        Args:
+            database (str): Database whose measurements are moved
+            started_at (datetime): Start of the job, used to name its report
+
+        Returns:
+            MetricsRecorder: Recorder holding only that job's measurements
+        """
+        run = MetricsRecorder(self.operation, database, started_at)
+        with self._lock:
+            for key in [key for key in self._stages if key[0] == database]:
+                run._stages[key] = self._stages.pop(key)
+            if database in self._jobs:
+                run._jobs[database] = self._jobs.pop(database)
+        return run
+
+    def replace(self, run: "MetricsRecorder"):
+        """
+        Replace the measurements of the databases of another run with those of that run.
+
+        Used to keep the last run of every database for the textfile export.
+        """
+        with run._lock:
+            stages, jobs = dict(run._stages), dict(run._jobs)
+        databases = {database for database, _ in stages} | set(jobs)
+        with self._lock:
+            self._stages = {key: value for key, value in self._stages.items() if key[0] not in databases}
+            self._stages.update(stages)
+            self._jobs.update(jobs)
+
+    def stages(self) -> list[StageMetrics]:
+        """
+        Return the recorded stages sorted by database and stage.
+        """
+        with self._lock:
+            return sorted(self._stages.values(), key=lambda s: (s.database, s.stage))
+
+    def resource_usage(self) -> dict:
+        """
+        Return peak RSS and CPU time of this process and of its finished child processes.
+
+        Returns:
+            dict: Resource figures, empty where the platform does not provide them
+        """
+        if resource is None:
+            return {}
+        # ru_maxrss is in KiB on Linux and in bytes on macOS
+        scale = 1 if os.uname().sysname == "Darwin" else 1024
+        own = resource.getrusage(resource.RUSAGE_SELF)
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return {
+            "peak_rss_bytes": own.ru_maxrss * scale,
+            "children_peak_rss_bytes": children.ru_maxrss * scale,
+            "cpu_user_seconds": own.ru_utime,
+            "cpu_system_seconds": own.ru_stime,
+            "children_cpu_user_seconds": children.ru_utime,
+            "children_cpu_system_seconds": children.ru_stime,
+        }
+
+    def to_dict(self) -> dict:
+        """
+        Build the JSON run report.
+        """
+        with self._lock:
+            jobs = dict(self._jobs)
+        return {
+            "operation": self.operation,
+            **({"database": self.run_database} if self.run_database else {}),
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "finished_at": datetime.now().isoformat(timespec="seconds"),
+            "jobs": {name: {"succeeded": ok, "seconds": round(seconds, 3)} for name, (ok, seconds) in jobs.items()},
+            "stages": [
+                {
+                    **asdict(stage),
+                    "seconds": round(stage.seconds, 3),
+                    "throughput_mb_s": round(stage.throughput / MB, 2),
+                    "ratio": round(stage.ratio, 3) if stage.ratio else None,
+                }
+                for stage in self.stages()
+            ],
+            "resources": self.resource_usage(),
+        }
+
+    def to_openmetrics(self) -> str:
+        """
+        Render the measurements in the OpenMetrics text format.
+        """
+        operation = self.operation
+        lines = []
+
+        def family(name: str, help_text: str, samples: list[tuple[dict, float]]):
+            if not samples:
+                return
+            lines.append(f"# HELP dbbackup_{name} {help_text}")
+            lines.append(f"# TYPE dbbackup_{name} gauge")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{_escape(val)}"' for key, val in {"operation": operation, **labels}.items())
+                lines.append(f"dbbackup_{name}{{{label_text}}} {value:g}")
+
+        stages = self.stages()
+        labelled = [({"database": s.database, "stage": s.stage}, s) for s in stages]
+        family("stage_duration_seconds", "Wall time spent in a stage during the last run.",
+               [(labels, s.seconds) for labels, s in labelled])
+        family("stage_bytes_in", "Bytes consumed by a stage during the last run.",
+               [(labels, s.bytes_in) for labels, s in labelled])
+        family("stage_bytes_out", "Bytes produced by a stage during the last run.",
+               [(labels, s.bytes_out) for labels, s in labelled])
+        family("stage_throughput_bytes_per_second", "Throughput of a stage during the last run.",
+               [(labels, s.throughput) for labels, s in labelled])
+        family("compression_ratio", "Uncompressed size divided by compressed size.",
+               [({"database": s.database}, s.ratio) for s in stages if s.stage == "compress" and s.ratio])
+
+        with self._lock:
+            jobs = dict(self._jobs)
+        family("job_success", "1 if the last job of a database succeeded, 0 otherwise.",
+               [({"database": name}, float(ok)) for name, (ok, _) in jobs.items()])
+        family("job_duration_seconds", "Wall time of the last job of a database.",
+               [({"database": name}, seconds) for name, (_, seconds) in jobs.items()])
+
+        for key, value in self.resource_usage().items():
+            name = key.replace("_bytes", "").replace("_seconds", "")
+            unit = "bytes" if key.endswith("_bytes") else "seconds"
+            family(f"{name}_{unit}", f"{key.replace('_', ' ').capitalize()} of the last run.", [({}, value)])
+
+        family("last_run_timestamp_seconds", "Unix time the last run finished.", [({}, time.time())])
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write_reports(self, logger: logging.Logger, textfile_dir: Optional[str] = None,
+                      report_dir: Optional[str] = None):
+        """
+        Write the OpenMetrics textfile and the JSON run report where configured.
+
+        The textfile is replaced atomically, as node_exporter's textfile
+        collector requires. Export failures are logged and never fail the run.
+
+        Args:
+            logger (logging.Logger): Logger instance
+            textfile_dir (Optional[str]): Directory scanned by node_exporter, None to skip
+            report_dir (Optional[str]): Directory receiving timestamped JSON reports, None to skip
+        """
+        try:
+            if textfile_dir:
+                path = Path(textfile_dir) / f"dbbackup_{self.operation}.prom"
+                path.parent.mkdir(parents=True, exist_ok=True)
+                partial = path.with_name(f".{path.name}.{os.getpid()}")
+                partial.write_text(self.to_openmetrics())
+                os.replace(partial, path)
+                logger.debug(f"Metrics textfile written: {path}")
+            if report_dir:
+                name = "_".join(filter(None, (self.operation, self.run_database)))
+                path = Path(report_dir) / f"{name}_{self.started_at.strftime('%Y%m%d_%H%M%S')}.json"
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_text(json.dumps(self.to_dict(), indent=2))
+                logger.info(f"Run report written: {path}")
+        except OSError as e:
+            logger.error(f"Failed to write metrics: {e}")
+
+    def log_summary(self, logger: logging.Logger):
+        """
+        Log one line per database with the time and throughput of each stage.
+        """
+        by_database: dict[str, list[StageMetrics]] = {}
+        for stage in self.stages():
+            by_database.setdefault(stage.database or "-", []).append(stage)
+        for database, stages in by_database.items():
+            parts = [f"{s.stage} {s.seconds:.2f}s ({s.throughput / MB:.1f} MB/s)" for s in stages]
+            logger.info(f"{self.operation.capitalize()} stages for {database}: {', '.join(parts)}")
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,607 @@
+"""
+Parallel per-table MySQL dumps and loads, in the style of mydumper/myloader.
+
+A ``tables`` dump is a directory with a compressed schema file and one or
+more compressed data files per table, a file with views, routines and events,
+and ``manifest.json`` describing them. All data is read by worker connections
+sharing one consistent snapshot, so together the files are a point-in-time
+copy of the database. The directory is packed into an uncompressed
+``.tables.tar`` whose members are read in place by the loader.
+"""
+
+import io
+import json
+import logging
+import os
+import queue
+import re
+import shutil
+import tarfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import IO, Iterable, Iterator, Optional
+from dbbackup.core.compressor import Compressor, get_codec
+from dbbackup.core.executor import CommandExecutor
+from dbbackup.core.metrics import MetricsRecorder
+from dbbackup.utils.paths import ensure_directory
+
+MANIFEST_NAME = "manifest.json"
+TABLES_ARCHIVE_SUFFIX = ".tables.tar"
+
+# Session settings every generated file starts with, as in mysqldump output
+SESSION_HEADER = ("SET NAMES utf8mb4;\n"
+                  "SET time_zone = '+00:00';\n"
+                  "SET FOREIGN_KEY_CHECKS = 0;\n"
+                  "SET UNIQUE_CHECKS = 0;\n"
+                  "SET SQL_MODE = 'NO_AUTO_VALUE_ON_ZERO';\n")
+
+# Upper bound on one extended INSERT, well below the default max_allowed_packet
+INSERT_BATCH_BYTES = 1024 * 1024
+FETCH_ROWS = 1000
+
+INTEGER_TYPES = {"tinyint", "smallint", "mediumint", "int", "bigint"}
+
+_SECONDARY_INDEX = re.compile(r"^\s*(?:(UNIQUE|FULLTEXT|SPATIAL) )?KEY `(?:[^`]|``)*` \(`((?:[^`]|``)*)`")
+_AUTO_INCREMENT_COLUMN = re.compile(r"^\s*`((?:[^`]|``)*)` .*\bAUTO_INCREMENT\b")
+_ESCAPES = str.maketrans({"\\": "\\\\", "'": "\\'", "\0": "\\0", "\n": "\\n", "\r": "\\r", "\x1a": "\\Z"})
+
+
+def quote_identifier(name: str) -> str:
+    """
+    Quote a MySQL identifier with backticks.
+    """
+    return "`" + name.replace("`", "``") + "`"
+
+
+def sql_literal(value) -> str:
+    """
+    Render a value returned by MySQL Connector/Python as a MySQL literal.
+
+    Strings are escaped the way mysqldump escapes them, binary values are
+    written as hex literals and TIME values (returned as timedelta) keep
+    their sign and fractional seconds.
+    """
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, (int, Decimal)):
+        return str(value)
+    if isinstance(value, float):
+        return repr(value)
+    if isinstance(value, (bytes, bytearray)):
+        return f"X'{bytes(value).hex()}'" if value else "''"
+    if isinstance(value, timedelta):
+        sign = "-" if value < timedelta(0) else ""
+        value = abs(value)
+        minutes, seconds = divmod(value.days * 86400 + value.seconds, 60)
+        hours, minutes = divmod(minutes, 60)
+        fraction = f".{value.microseconds:06d}" if value.microseconds else ""
+        return f"'{sign}{hours:02d}:{minutes:02d}:{seconds:02d}{fraction}'"
+    if isinstance(value, datetime):
+        return f"'{value.isoformat(sep=' ')}'"
+    if isinstance(value, (date, time)):
+        return f"'{value.isoformat()}'"
+    if isinstance(value, (set, frozenset)):
+        value = ",".join(sorted(value))
+    return "'" + str(value).translate(_ESCAPES) + "'"
+
+
+def split_secondary_indexes(table: str, create_sql: str) -> tuple[str, list[str]]:
+    """
+    Move the secondary indexes out of a ``SHOW CREATE TABLE`` statement.
+
+    The table is then loaded with only its primary key, and the indexes are
+    built afterwards in one pass, which is much faster than maintaining them
+    row by row. Tables with foreign keys keep all their indexes, since the
+    constraints need them, as do indexes that lead with an AUTO_INCREMENT
+    column.
+
+    Args:
+        table (str): Table name
+        create_sql (str): CREATE TABLE statement as returned by the server
+
+    Returns:
+        tuple[str, list[str]]: The reduced CREATE TABLE statement and the
+        ALTER TABLE statements that add the removed indexes
+    """
+    lines = create_sql.split("\n")
+    close = next(i for i, line in enumerate(lines) if line.startswith(")"))
+    head, body, tail = lines[0], lines[1:close], lines[close:]
+    if any("FOREIGN KEY" in line for line in body):
+        return create_sql, []
+
+    auto_increment = {match[1] for line in body if (match := _AUTO_INCREMENT_COLUMN.match(line))}
+    kept, regular, fulltext = [], [], []
+    for line in body:
+        definition = line.strip().rstrip(",")
+        match = _SECONDARY_INDEX.match(line)
+        if match is None or match[2] in auto_increment:
+            kept.append(definition)
+        elif match[1] == "FULLTEXT":
+            fulltext.append(definition)
+        else:
+            regular.append(definition)
+    if not regular and not fulltext:
+        return create_sql, []
+
+    reduced = "\n".join([head, ",\n".join(f"  {definition}" for definition in kept), *tail])
+    quoted = quote_identifier(table)
+    statements = [f"ALTER TABLE {quoted} " + ", ".join(f"ADD {d}" for d in regular) + ";"] if regular else []
+    # InnoDB builds only one FULLTEXT index per ALTER TABLE
+    statements += [f"ALTER TABLE {quoted} ADD {definition};" for definition in fulltext]
+    return reduced, statements
+
+
+def key_ranges(low: int, high: int, chunks: int) -> list[tuple[int, int]]:
+    """
+    Split the integer key range ``[low, high]`` into at most ``chunks`` half-open ranges.
+    """
+    step = max(1, -(-(high - low + 1) // chunks))
+    return [(start, min(start + step, high + 1)) for start in range(low, high + 1, step)]
+
+
+def is_tables_backup(backup_path: str) -> bool:
+    """
+    Return True if a backup file is a packed ``tables`` dump.
+    """
+    return Path(backup_path).name.endswith(TABLES_ARCHIVE_SUFFIX)
+
+
+def pack_dump(dump_dir: str) -> str:
+    """
+    Pack a ``tables`` dump directory into an uncompressed tar, manifest first.
+
+    The files inside are already compressed, so the archive is stored as-is.
+    Members are flat and in manifest order, so a reader finds the manifest
+    in the first block.
+
+    Returns:
+        str: Path to the ``.tables.tar`` archive
+    """
+    archive_path = f"{dump_dir}.tar"
+    with tarfile.open(archive_path, "w") as tar:
+        tar.add(os.path.join(dump_dir, MANIFEST_NAME), arcname=MANIFEST_NAME)
+        for name in _manifest_files(read_dump_manifest(dump_dir)):
+            tar.add(os.path.join(dump_dir, name), arcname=name)
+    shutil.rmtree(dump_dir, ignore_errors=True)
+    return archive_path
+
+
+def read_dump_manifest(dump_dir: str) -> dict:
+    """
+    Read the manifest of an unpacked ``tables`` dump.
+    """
+    with open(os.path.join(dump_dir, MANIFEST_NAME)) as f:
+        return json.load(f)
+
+
+def _manifest_files(manifest: dict) -> list[str]:
+    names = []
+    for table in manifest["tables"]:
+        names += [table["schema"], *table["data"]] + ([table["triggers"]] if table["triggers"] else [])
+    return names + ([manifest["objects"]] if manifest["objects"] else [])
+
+
+class TablesArchive:
+    """
+    Random access to the members of a packed ``tables`` dump.
+
+    Member offsets are taken from the tar headers once, so each member can
+    then be read by any number of threads without scanning the archive.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        with tarfile.open(path, "r:") as tar:
+            self.members = {member.name: (member.offset_data, member.size) for member in tar}
+        with self.open_raw(MANIFEST_NAME) as f:
+            self.manifest = json.load(f)
+        self.codec = get_codec(self.manifest["codec"])
+
+    @contextmanager
+    def open_raw(self, name: str) -> Iterator[IO[bytes]]:
+        """
+        Open a member as stored in the archive.
+        """
+        offset, size = self.members[name]
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            yield _BoundedReader(f, size)
+
+    @contextmanager
+    def open(self, name: str) -> Iterator[IO[bytes]]:
+        """
+        Open a member and decompress it while it is read.
+        """
+        with self.open_raw(name) as raw:
+            yield self.codec.open_reader(raw)
+
+    def read_text(self, name: str) -> str:
+        """
+        Read a whole decompressed member as text.
+        """
+        with self.open(name) as f:
+            return f.read().decode()
+
+
+class _BoundedReader(io.RawIOBase):
+    """
+    Read at most ``size`` bytes from the current position of a file.
+    """
+    def __init__(self, f: IO[bytes], size: int):
+        self._f = f
+        self._remaining = size
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._f.read(min(len(buffer), self._remaining))
+        buffer[:len(data)] = data
+        self._remaining -= len(data)
+        return len(data)
+
+
+class MySQLParallelDumper:
+    """
+    Dump the tables of a MySQL database in parallel from one consistent snapshot.
+
+    Needs MySQL Connector/Python, the RELOAD privilege for the short global
+    read lock, and REPLICATION CLIENT to record the binlog position.
+    """
+    def __init__(self, config, logger: logging.Logger, compressor: Compressor):
+        self.config = config
+        self.logger = logger
+        self.compressor = compressor
+        self.options = config.database.dump.mysql
+
+    def dump(self, db_name: str, out_dir: str) -> dict:
+        """
+        Dump ``db_name`` into ``out_dir`` and write its manifest.
+
+        A global read lock is held only while the worker connections open
+        their snapshots and the binlog position is read; writes continue
+        during the dump itself. Tables that are not InnoDB are only
+        consistent with the rest if nothing writes to them meanwhile.
+
+        Args:
+            db_name (str): Database to dump
+            out_dir (str): Directory receiving the dump files
+
+        Returns:
+            dict: The manifest written to ``out_dir``
+        """
+        ensure_directory(Path(out_dir), self.logger)
+        coordinator = self._connect(db_name)
+        workers = []
+        try:
+            cursor = coordinator.cursor()
+            cursor.execute("FLUSH TABLES WITH READ LOCK")
+            try:
+                binlog = self._binlog_position(cursor)
+                for _ in range(self.options.jobs):
+                    worker = self._connect(db_name)
+                    workers.append(worker)
+                    worker_cursor = worker.cursor()
+                    worker_cursor.execute("SET SESSION TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+                    worker_cursor.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT")
+                    worker_cursor.close()
+            finally:
+                cursor.execute("UNLOCK TABLES")
+                cursor.close()
+            self.logger.info(f"Snapshot of {db_name} shared by {len(workers)} connections, binlog position {binlog}")
+            manifest = self._dump_snapshot(db_name, out_dir, workers, binlog)
+        finally:
+            for connection in [coordinator, *workers]:
+                connection.close()
+
+        with open(os.path.join(out_dir, MANIFEST_NAME), "w") as f:
+            json.dump(manifest, f, indent=2)
+        return manifest
+
+    def _connect(self, db_name: str):
+        """
+        Open a connection to ``db_name`` with the session settings of the dump files.
+        """
+        try:
+            import mysql.connector
+        except ImportError as e:
+            raise RuntimeError("The tables dump format requires mysql-connector-python") from e
+        db = self.config.database
+        connection = mysql.connector.connect(host=db.host, port=db.port, user=db.user, password=db.password,
+                                             database=db_name, charset="utf8mb4")
+        cursor = connection.cursor()
+        cursor.execute("SET time_zone = '+00:00'")
+        cursor.close()
+        return connection
+
+    def _binlog_position(self, cursor) -> Optional[dict]:
+        """
+        Read the binlog coordinates of the locked snapshot, or None if binary logging is off.
+        """
+        for statement in ("SHOW BINARY LOG STATUS", "SHOW MASTER STATUS"):  # The former replaced the latter in 8.4
+            try:
+                cursor.execute(statement)
+            except Exception:
+                continue
+            row = cursor.fetchone()
+            cursor.fetchall()
+            return {"file": row[0], "position": int(row[1])} if row else None
+        return None
+
+    def _dump_snapshot(self, db_name: str, out_dir: str, workers: list, binlog: Optional[dict]) -> dict:
+        """
+        Write the schema files, then dump every table chunk on the pool of snapshot connections.
+        """
+        meta = workers[0].cursor(buffered=True)
+        extension = ".sql" + self.compressor.extension()
+        tables, jobs = [], []
+        for number, (table, estimated_rows, engine) in enumerate(self._base_tables(meta, db_name), 1):
+            if engine != "InnoDB":
+                self.logger.warning(f"Table {db_name}.{table} uses {engine}; it is not covered by the snapshot")
+            prefix = f"t{number:05d}"
+            create_sql = self._show_create(meta, "TABLE", table, 1)
+            indexes = []
+            if self.options.defer_indexes:
+                create_sql, indexes = split_secondary_indexes(table, create_sql)
+            self._write(out_dir, f"{prefix}.schema{extension}", [SESSION_HEADER, create_sql, ";\n"])
+
+            triggers = self._triggers(meta, db_name, table)
+            if triggers:
+                self._write(out_dir, f"{prefix}.triggers{extension}", [SESSION_HEADER, *triggers])
+
+            columns, key = self._columns(meta, db_name, table)
+            ranges = self._key_ranges(meta, table, key, estimated_rows)
+            data = [f"{prefix}.{part:05d}{extension}" for part in range(len(ranges))]
+            jobs += [(table, columns, key, key_range, os.path.join(out_dir, name))
+                     for key_range, name in zip(ranges, data)]
+            tables.append({"name": table, "schema": f"{prefix}.schema{extension}", "data": data,
+                           "indexes": indexes, "triggers": f"{prefix}.triggers{extension}" if triggers else None})
+
+        objects = self._objects(meta, db_name)
+        if objects:
+            self._write(out_dir, f"objects{extension}", [SESSION_HEADER, *objects])
+        meta.close()
+
+        connections = queue.Queue()
+        for worker in workers:
+            connections.put(worker)
+        with ThreadPoolExecutor(max_workers=len(workers)) as pool:
+            rows = list(pool.map(lambda job: self._dump_chunk(connections, *job), jobs))
+        self.logger.info(f"Dumped {sum(rows)} rows of {len(tables)} tables from {db_name} in {len(jobs)} chunks")
+
+        row_counts = iter(rows)
+        for table in tables:
+            table["rows"] = sum(next(row_counts) for _ in table["data"])
+        return {
+            "version": 1,
+            "database": db_name,
+            "codec": self.compressor.method,
+            "binlog": binlog,
+            "tables": tables,
+            "objects": f"objects{extension}" if objects else None,
+        }
+
+    def _base_tables(self, cursor, db_name: str) -> list[tuple[str, int, str]]:
+        cursor.execute("SELECT TABLE_NAME, TABLE_ROWS, ENGINE FROM information_schema.TABLES "
+                       "WHERE TABLE_SCHEMA = %s AND TABLE_TYPE = 'BASE TABLE' ORDER BY TABLE_NAME", (db_name,))
+        return [(name, rows or 0, engine) for name, rows, engine in cursor.fetchall()]
+
+    def _show_create(self, cursor, kind: str, name: str, column: int) -> str:
+        cursor.execute(f"SHOW CREATE {kind} {quote_identifier(name)}")
+        return cursor.fetchone()[column]
+
+    def _columns(self, cursor, db_name: str, table: str) -> tuple[list[str], Optional[str]]:
+        """
+        Return the columns to dump (generated columns cannot be inserted) and the chunking key, if any.
+
+        Only a single-column integer primary key is used to split a table.
+        """
+        cursor.execute("SELECT COLUMN_NAME, DATA_TYPE, COLUMN_KEY, EXTRA FROM information_schema.COLUMNS "
+                       "WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s ORDER BY ORDINAL_POSITION", (db_name, table))
+        rows = cursor.fetchall()
+        columns = [name for name, _, _, extra in rows if "GENERATED" not in extra.upper()]
+        primary = [(name, data_type) for name, data_type, column_key, _ in rows if column_key == "PRI"]
+        key = primary[0][0] if len(primary) == 1 and primary[0][1].lower() in INTEGER_TYPES else None
+        return columns, key
+
+    def _key_ranges(self, cursor, table: str, key: Optional[str], estimated_rows: int) -> list:
+        chunks = -(-estimated_rows // self.options.chunk_rows)
+        if key is None or chunks < 2:
+            return [None]
+        cursor.execute(f"SELECT MIN({quote_identifier(key)}), MAX({quote_identifier(key)}) "
+                       f"FROM {quote_identifier(table)}")
+        low, high = cursor.fetchone()
+        if low is None:
+            return [None]
+        return key_ranges(int(low), int(high), chunks)
+
+    def _triggers(self, cursor, db_name: str, table: str) -> list[str]:
+        cursor.execute("SELECT TRIGGER_NAME FROM information_schema.TRIGGERS "
+                       "WHERE TRIGGER_SCHEMA = %s AND EVENT_OBJECT_TABLE = %s ORDER BY ACTION_ORDER",
+                       (db_name, table))
+        names = [name for (name,) in cursor.fetchall()]
+        return [self._compound(cursor, "TRIGGER", name, 2) for name in names]
+
+    def _objects(self, cursor, db_name: str) -> list[str]:
+        """
+        Return the CREATE statements of the views, routines and events of ``db_name``.
+        """
+        cursor.execute("SELECT TABLE_NAME FROM information_schema.VIEWS WHERE TABLE_SCHEMA = %s "
+                       "ORDER BY TABLE_NAME", (db_name,))
+        views = {name: self._show_create(cursor, "VIEW", name, 1) for (name,) in cursor.fetchall()}
+        statements = [f"{views[name]};\n" for name in _view_order(views)]
+
+        cursor.execute("SELECT ROUTINE_TYPE, ROUTINE_NAME FROM information_schema.ROUTINES "
+                       "WHERE ROUTINE_SCHEMA = %s ORDER BY ROUTINE_TYPE, ROUTINE_NAME", (db_name,))
+        statements += [self._compound(cursor, kind, name, 2) for kind, name in cursor.fetchall()]
+        cursor.execute("SELECT EVENT_NAME FROM information_schema.EVENTS WHERE EVENT_SCHEMA = %s "
+                       "ORDER BY EVENT_NAME", (db_name,))
+        statements += [self._compound(cursor, "EVENT", name, 3) for (name,) in cursor.fetchall()]
+        return statements
+
+    def _compound(self, cursor, kind: str, name: str, column: int) -> str:
+        """
+        Return a trigger, routine or event definition wrapped for the mysql client, with its sql_mode.
+        """
+        cursor.execute(f"SHOW CREATE {kind} {quote_identifier(name)}")
+        row = cursor.fetchone()
+        return (f"SET SESSION sql_mode = {sql_literal(row[1])};\n"
+                f"DELIMITER ;;\n{row[column]};;\nDELIMITER ;\n"
+                f"SET SQL_MODE = 'NO_AUTO_VALUE_ON_ZERO';\n")
+
+    def _dump_chunk(self, connections: queue.Queue, table: str, columns: list[str], key: Optional[str],
+                    key_range: Optional[tuple[int, int]], path: str) -> int:
+        """
+        Dump one table or key range as extended INSERT statements into a compressed file.
+
+        Returns:
+            int: Number of rows dumped
+        """
+        connection = connections.get()
+        try:
+            column_list = ", ".join(quote_identifier(column) for column in columns)
+            query = f"SELECT {column_list} FROM {quote_identifier(table)}"
+            params = ()
+            if key_range is not None:
+                query += f" WHERE {quote_identifier(key)} >= %s AND {quote_identifier(key)} < %s"
+                params = key_range
+            cursor = connection.cursor()
+            cursor.execute(query, params)
+            counter = [0]
+            self._write_file(path, self._insert_statements(cursor, table, column_list, counter))
+            cursor.close()
+            return counter[0]
+        finally:
+            connections.put(connection)
+
+    def _insert_statements(self, cursor, table: str, column_list: str, counter: list[int]) -> Iterator[str]:
+        yield SESSION_HEADER
+        prefix = f"INSERT INTO {quote_identifier(table)} ({column_list}) VALUES\n"
+        batch, size = [], 0
+        while rows := cursor.fetchmany(FETCH_ROWS):
+            for row in rows:
+                values = "(" + ",".join(sql_literal(value) for value in row) + ")"
+                if batch and size + len(values) > INSERT_BATCH_BYTES:
+                    yield prefix + ",\n".join(batch) + ";\n"
+                    batch, size = [], 0
+                batch.append(values)
+                size += len(values) + 2
+            counter[0] += len(rows)
+        if batch:
+            yield prefix + ",\n".join(batch) + ";\n"
+
+    def _write(self, out_dir: str, name: str, parts: Iterable[str]):
+        self._write_file(os.path.join(out_dir, name), parts)
+
+    def _write_file(self, path: str, parts: Iterable[str]):
+        """
+        Compress text into a file with the configured codec.
+        """
+        compressor = self.compressor.compressobj()
+        with open(path, "wb") as f:
+            for part in parts:
+                f.write(compressor.compress(part.encode()))
+            f.write(compressor.flush())
+
+
+def _view_order(views: dict[str, str]) -> list[str]:
+    """
+    Order views so that every view is created after the views it selects from.
+    """
+    ordered, visiting = [], set()
+
+    def visit(name: str):
+        if name in ordered or name in visiting:
+            return
+        visiting.add(name)
+        definition = views[name]
+        for other in views:
+            if other != name and quote_identifier(other) in definition:
+                visit(other)
+        ordered.append(name)
+
+    for name in views:
+        visit(name)
+    return ordered
+
+
+class MySQLParallelLoader:
+    """
+    Load a ``tables`` backup with parallel mysql client connections.
+    """
+    def __init__(self, config, logger: logging.Logger, executor: CommandExecutor, metrics: MetricsRecorder):
+        self.config = config
+        self.logger = logger
+        self.executor = executor
+        self.metrics = metrics
+        self.jobs = config.database.dump.mysql.jobs
+
+    def load(self, db_name: str, backup_path: str, tables: list[str] | None = None):
+        """
+        Restore a ``tables`` backup into ``db_name``.
+
+        Tables are created without their secondary indexes, their data files
+        are loaded by ``jobs`` parallel connections, then indexes and
+        triggers are added. With ``tables``, only those tables are restored
+        and everything else in the database is left untouched; views,
+        routines and events are only restored by a full load.
+
+        Args:
+            db_name (str): Database to load into
+            backup_path (str): Path to the ``.tables.tar`` backup
+            tables (list[str] | None): Names of the tables to restore, or None for all
+
+        Raises:
+            RuntimeError: If a requested table is not in the backup or a client fails
+        """
+        archive = TablesArchive(backup_path)
+        entries = archive.manifest["tables"]
+        if tables:
+            unknown = set(tables) - {entry["name"] for entry in entries}
+            if unknown:
+                raise RuntimeError(f"Tables not in {backup_path}: {', '.join(sorted(unknown))}")
+            entries = [entry for entry in entries if entry["name"] in tables]
+        self.logger.info(f"Loading {len(entries)} table(s) into {db_name} with {self.jobs} connections")
+
+        drop = self.config.database.restore.allow_drop
+        with self.metrics.stage("schema"):
+            self._parallel(lambda entry: self._run_sql(
+                db_name, ("DROP TABLE IF EXISTS " + quote_identifier(entry["name"]) + ";\n" if drop else "")
+                + archive.read_text(entry["schema"])), entries)
+
+        data = [name for entry in entries for name in entry["data"]]
+        stored = sum(archive.members[name][1] for name in data)
+        with self.metrics.stage("restore", bytes_in=stored) as restore_stage:
+            restore_stage.bytes_out = sum(self._parallel(lambda name: self._load_member(db_name, archive, name), data))
+
+        with self.metrics.stage("indexes"):
+            self._parallel(lambda entry: self._run_sql(db_name, SESSION_HEADER + "\n".join(entry["indexes"])),
+                           [entry for entry in entries if entry["indexes"]])
+        for entry in entries:
+            if entry["triggers"]:
+                self._run_sql(db_name, archive.read_text(entry["triggers"]))
+        if not tables and archive.manifest["objects"]:
+            self._run_sql(db_name, archive.read_text(archive.manifest["objects"]))
+
+    def _parallel(self, function, items: list) -> list:
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            return list(pool.map(function, items))
+
+    def _client(self, db_name: str) -> tuple[list[str], dict]:
+        db = self.config.database
+        env = os.environ.copy()
+        env["MYSQL_PWD"] = db.password
+        return ["mysql", "-h", db.host, "-P", str(db.port), "-u", db.user, db_name], env
+
+    def _run_sql(self, db_name: str, sql: str):
+        args, env = self._client(db_name)
+        self.executor.feed(args, io.BytesIO(sql.encode()), env=env)
+
+    def _load_member(self, db_name: str, archive: TablesArchive, name: str) -> int:
+        args, env = self._client(db_name)
+        with archive.open(name) as f:
+            return self.executor.feed(args, f, env=env)
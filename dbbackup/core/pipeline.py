@@ -0,0 +1,272 @@
+"""
+Streaming building blocks that move a dump from a process to every storage in one pass.
+"""
+
+import asyncio
+import contextvars
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Protocol
+from dbbackup.core.compressor import CHUNK_SIZE
+from dbbackup.core.metrics import MetricsRecorder
+
+# Chunks buffered between two async pipeline stages
+STAGE_QUEUE_DEPTH = 4
+
+
+class BackupWriter(Protocol):
+    """
+    Destination of a streamed backup. Implemented by the storage writers.
+    """
+
+    def write(self, data: bytes): ...
+
+    def commit(self): ...
+
+    def abort(self): ...
+
+
+class _Branch:
+    """
+    One writer of a TeeWriter, fed from a bounded queue by its own thread.
+    """
+
+    def __init__(self, writer: BackupWriter, name: str, required: bool, depth: int):
+        self.writer = writer
+        self.name = name
+        self.required = required
+        self.error: Exception | None = None
+        self._queue: queue.Queue = queue.Queue(depth)
+        self._thread: threading.Thread | None = None
+
+    def put(self, data: bytes):
+        """
+        Queue a chunk, starting the thread on the first one; blocks while the queue is full.
+        """
+        if self._thread is None:
+            context = contextvars.copy_context()  # Keeps the metrics' database label in the thread
+            self._thread = threading.Thread(target=context.run, args=(self._drain,), daemon=True,
+                                            name=f"dbbackup-tee-{self.name}")
+            self._thread.start()
+        self._queue.put(data)
+
+    def finish(self):
+        """
+        Wait until every queued chunk has been written or skipped after an error.
+        """
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _drain(self):
+        while (data := self._queue.get()) is not None:
+            if self.error is None:
+                try:
+                    self.writer.write(data)
+                except Exception as e:
+                    self.error = e
+
+
+class TeeWriter:
+    """
+    Duplicate a byte stream into several backup writers.
+
+    Each writer has its own thread and a queue of at most ``depth`` chunks,
+    so a slow destination only holds the stream back once its queue is
+    full. A backup is committed only when every required writer accepted
+    the full stream, otherwise all of them are aborted. An optional writer
+    that fails to open, write or commit is aborted, logged and dropped;
+    its slot in :attr:`writers` becomes None.
+    """
+
+    def __init__(self, writers: list[BackupWriter | None], logger: logging.Logger,
+                 required: list[bool] | None = None, names: list[str] | None = None,
+                 depth: int = STAGE_QUEUE_DEPTH):
+        """
+        Initialize TeeWriter.
+
+        Args:
+            writers (list[BackupWriter | None]): Writers receiving the stream; None for one that could not be opened
+            logger (logging.Logger): Logger instance
+            required (list[bool] | None): Whether a failure of each writer fails the backup; all by default
+            names (list[str] | None): Names of the writers' destinations used in logs
+            depth (int): Chunks queued for each writer
+        """
+        self.writers = writers
+        self.logger = logger
+        self.bytes_written = 0
+        required = required or [True] * len(writers)
+        names = names or [repr(writer) for writer in writers]
+        self._branches = [_Branch(writer, name, is_required, depth)
+                          for writer, name, is_required in zip(writers, names, required) if writer is not None]
+
+    @classmethod
+    def open(cls, factories: list[Callable[[], BackupWriter]], logger: logging.Logger,
+             required: list[bool] | None = None, names: list[str] | None = None) -> "TeeWriter":
+        """
+        Open a writer from each factory, aborting the already opened ones if a required one fails.
+
+        Args:
+            factories (list[Callable[[], BackupWriter]]): Callables returning writers
+            logger (logging.Logger): Logger instance
+            required (list[bool] | None): Whether each writer must open; all by default
+            names (list[str] | None): Names of the writers' destinations used in logs
+
+        Returns:
+            TeeWriter: Tee over all opened writers
+        """
+        required = required or [True] * len(factories)
+        names = names or [f"writer {position}" for position in range(len(factories))]
+        writers: list[BackupWriter | None] = []
+        for factory, is_required, name in zip(factories, required, names):
+            try:
+                writers.append(factory())
+            except Exception as e:
+                if is_required:
+                    cls(writers, logger).abort()
+                    raise
+                logger.warning(f"Optional destination '{name}' dropped from the backup: could not open it: {e}")
+                writers.append(None)
+        return cls(writers, logger, required, names)
+
+    def write(self, data: bytes):
+        """
+        Queue a chunk for every writer.
+
+        Raises:
+            Exception: The error of a required writer that failed to write
+        """
+        self._check_errors()
+        for branch in self._branches:
+            branch.put(data)
+        self.bytes_written += len(data)
+
+    def commit(self):
+        """
+        Wait for the queued chunks and commit all writers; abort the ones not yet committed if one fails.
+        """
+        for branch in self._branches:
+            branch.finish()
+        self._check_errors()
+        for branch in list(self._branches):
+            try:
+                branch.writer.commit()
+            except Exception as e:
+                if not branch.required:
+                    self._drop(branch, f"could not commit: {e}")
+                    continue
+                position = self._branches.index(branch)
+                TeeWriter([other.writer for other in self._branches[position + 1:]], self.logger).abort()
+                raise
+
+    def abort(self):
+        """
+        Abort all writers, logging rather than raising individual failures.
+        """
+        for branch in self._branches:
+            branch.finish()
+            self._abort_writer(branch.writer)
+
+    def _check_errors(self):
+        """
+        Raise the write error of a required writer and drop optional writers that failed.
+        """
+        for branch in list(self._branches):
+            if branch.error is None:
+                continue
+            if branch.required:
+                raise branch.error
+            branch.finish()
+            self._drop(branch, f"write failed: {branch.error}")
+
+    def _drop(self, branch: _Branch, reason: str):
+        self.logger.warning(f"Optional destination '{branch.name}' dropped from the backup: {reason}")
+        self._abort_writer(branch.writer)
+        self._branches.remove(branch)
+        self.writers[self.writers.index(branch.writer)] = None
+
+    def _abort_writer(self, writer: BackupWriter):
+        try:
+            writer.abort()
+        except Exception as e:
+            self.logger.error(f"Failed to abort backup writer {writer!r}: {e}")
+
+
+async def run_async_pipeline(source: asyncio.StreamReader, compressor, sink: BackupWriter,
+                             chunk_size: int = CHUNK_SIZE, depth: int = STAGE_QUEUE_DEPTH,
+                             metrics: MetricsRecorder | None = None) -> tuple[int, int]:
+    """
+    Move a stream through a read, a compress and a write stage connected by bounded queues.
+
+    Each stage is its own task and blocks when the queue after it is full.
+    A slow upload therefore slows down the dump instead of piling data up
+    in memory. At most ``depth`` chunks wait between two stages. Compression
+    and the blocking writes run on the default thread pool, so the event
+    loop stays free for the other jobs.
+
+    Args:
+        source (asyncio.StreamReader): Uncompressed input, e.g. a dump command's stdout
+        compressor: Incremental compressor with ``compress`` and ``flush``
+        sink (BackupWriter): Writer receiving the compressed data
+        chunk_size (int): Number of bytes read from the source per chunk
+        depth (int): Capacity of each queue between stages
+        metrics (MetricsRecorder | None): Recorder receiving the 'dump' and 'compress' stages
+
+    Returns:
+        tuple[int, int]: Bytes read and bytes written
+    """
+    raw: asyncio.Queue = asyncio.Queue(depth)
+    compressed: asyncio.Queue = asyncio.Queue(depth)
+    metrics = metrics or MetricsRecorder()
+    bytes_in = bytes_out = compressed_bytes = 0
+    read_seconds = compress_seconds = 0.0
+
+    async def read():
+        nonlocal bytes_in, read_seconds
+        while True:
+            started = time.perf_counter()
+            chunk = await source.read(chunk_size)
+            read_seconds += time.perf_counter() - started
+            if not chunk:
+                break
+            bytes_in += len(chunk)
+            await raw.put(chunk)
+        await raw.put(None)
+
+    async def compress():
+        nonlocal compress_seconds, compressed_bytes
+        flushed = False
+        while not flushed:
+            chunk = await raw.get()
+            started = time.perf_counter()
+            if chunk is None:
+                data = await asyncio.to_thread(compressor.flush)
+                flushed = True
+            else:
+                data = await asyncio.to_thread(compressor.compress, chunk)
+            compress_seconds += time.perf_counter() - started
+            if data:
+                compressed_bytes += len(data)
+                await compressed.put(data)
+        await compressed.put(None)
+
+    async def write():
+        nonlocal bytes_out
+        while (data := await compressed.get()) is not None:
+            await asyncio.to_thread(sink.write, data)
+            bytes_out += len(data)
+
+    tasks = [asyncio.create_task(stage()) for stage in (read, compress, write)]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    metrics.record("dump", read_seconds, bytes_out=bytes_in)
+    metrics.record("compress", compress_seconds, bytes_in, compressed_bytes)
+    return bytes_in, bytes_out
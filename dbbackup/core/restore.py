@@ -3,12 +3,36 @@ Restore databases from backup files.
 """
 
 import os
+import shlex
+import shutil
 import logging
+import sys
+import tarfile
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
 from pathlib import Path
+from dbbackup.core.archiver import LogArchiver, open_backup
+from dbbackup.core.block_index import (BlockIndex, ChunkReader, index_path, read_ranges, scan_dump,
+                                       select_toc_entries)
+from dbbackup.core.catalog import BackupCatalog
+from dbbackup.core.compressor import codec_for_path
+from dbbackup.core.encryption import ENCRYPTED_EXTENSION, BackupCipher, DecryptionError, is_encrypted
 from dbbackup.core.executor import CommandExecutor
+from dbbackup.core.metrics import MetricsRecorder
+from dbbackup.core.mysql_parallel import MySQLParallelLoader, is_tables_backup
+from dbbackup.core.storages.dedup import DedupStorage, is_dedup_backup
 from dbbackup.core.storages.local import LocalStorage
 from dbbackup.core.storages.s3 import S3Storage
-from dbbackup.utils.paths import validate_file_exists
+from dbbackup.utils.paths import ensure_directory, validate_file_exists
+from dbbackup.utils.timeutils import parse_timestamped_filename
+
+# File extension (without codec suffix) -> physical backup format
+PHYSICAL_EXTENSIONS = {".base.tar": "basebackup", ".xbstream": "xbstream"}
+
+# Repository root, the working directory restore_command switches to so main.py finds its configuration
+TOOL_DIR = Path(__file__).resolve().parents[2]
 
 class DatabaseRestore:
     """
@@ -26,18 +50,46 @@ class DatabaseRestore:
         self.config = config
         self.logger = logger
         self.executor = CommandExecutor(logger, dry_run=config.runtime.dry_run)
-        self.local_storage = LocalStorage(config.paths.backup_dir, logger)
-        self.s3_storage = S3Storage(config.aws.s3_bucket, logger, config.aws.region)
+        self.metrics = MetricsRecorder("restore")
+        self.local_storage = LocalStorage(config.paths.backup_dir, logger, metrics=self.metrics)
+        self.s3_storage = None
+        if config.aws is not None:
+            self.s3_storage = S3Storage.from_config(config.aws, logger, metrics=self.metrics)
+        self.catalog = BackupCatalog.for_backup_dir(config.paths.backup_dir, logger)
+        self.cipher = BackupCipher.from_config(config.encryption)
+        self._dedup_storage = None
         
-    def run(self, target_db: str, backup_file: str):
+    def run(self, target_db: str, backup_file: str, until: datetime | None = None,
+            tables: list[str] | None = None):
         """
         Restore a database from backup.
 
+        With ``until``, the newest backup taken at or before that time is
+        restored and archived binlogs are replayed on top of it up to ``until``,
+        or, for a PostgreSQL base backup, the server is set up to replay the
+        archived WAL up to ``until`` when it starts.
+
+        Physical backups restore the whole instance into
+        ``database.physical.data_dir``; ``target_db`` is then the backup label.
+
+        With ``tables``, only those tables (with their indexes, constraints,
+        triggers and data) are restored and the rest of the database is left
+        untouched. Plain dumps are read through their block index, pg_dump
+        archives through a filtered ``pg_restore -L`` list.
+
+        An encrypted backup is authenticated in a first pass and then
+        decrypted on the fly into the client, so nothing is restored unless
+        every chunk authenticates. Only backups the restore needs random
+        access to (uncompressed custom archives restored in parallel and
+        ``tables`` backups) are decrypted into ``temp_dir`` first.
+
         Args:
             target_db (str): Database name to restore
             backup_file (str, optional): Specific backup file
+            until (datetime | None): Point in time to recover to
+            tables (list[str] | None): Tables to restore instead of the whole database
         """
-        
+
         # Determine backup file to restore
         if backup_file:
             if not validate_file_exists(backup_file, self.logger):
@@ -45,52 +97,496 @@ class DatabaseRestore:
                 return
             backup_path = backup_file
         else:
-            # Attempt to get latest backup for the database from local
-            backups = [f for f in self.local_storage.list_backups() if target_db in f]
-            if not backups:
+            # Look up the latest local backup for the database in the catalog
+            backup_path = self._latest_local_backup(target_db, before=until)
+            if not backup_path:
                 self.logger.error(f"No backups found for database '{target_db}'")
                 return
-            backup_path = sorted(backups)[-1]  # Latest backup
-            
+
+        source_db = self._source_database(backup_path)
+        if is_encrypted(backup_path):
+            if self.cipher is None:
+                self.logger.error(f"Backup {backup_path} is encrypted; configure encryption.key_file or "
+                                  f"${self.config.encryption.key_env} to restore it")
+                return
+            try:
+                needs_copy = self._needs_decrypted_copy(backup_path)
+            except (DecryptionError, OSError) as e:
+                self.logger.error(f"Refusing to restore {backup_path}: {e}")
+                return
+            if needs_copy:
+                with self._decrypted(target_db, backup_path) as decrypted_path:
+                    if decrypted_path is not None:
+                        self._restore(target_db, decrypted_path, until, tables, source_db)
+                return
+            if not self._authenticated(target_db, backup_path):
+                return
+        self._restore(target_db, backup_path, until, tables, source_db)
+
+    def _restore(self, target_db: str, backup_path: str, until: datetime | None, tables: list[str] | None,
+                 source_db: str | None = None):
+        """
+        Restore a database from an authenticated or unencrypted backup file; see :meth:`run`.
+
+        ``source_db`` is the database the backup was taken from, whose binlog
+        events are replayed with ``until``.
+        """
+        physical_format = self._physical_format(backup_path)
+        db_type = self.config.database.type.lower()
+        if until is not None and db_type == "postgresql" and physical_format is None:
+            # WAL only applies to a physical copy of the cluster, never to a pg_dump restore
+            self.logger.error("PostgreSQL point-in-time recovery needs a physical base backup; "
+                              "WAL cannot be replayed on top of a logical dump")
+            return
+        if tables and physical_format is not None:
+            self.logger.error("Single tables cannot be restored from a physical backup")
+            return
+        if tables and until is not None:
+            self.logger.error("--tables cannot be combined with --until")
+            return
+        if until is not None and db_type == "mysql" and physical_format is None and source_db is None:
+            # Filtering binlogs on the wrong database would silently replay nothing
+            self.logger.error(f"Cannot tell which database {backup_path} was taken from, so its binlog "
+                              f"events cannot be replayed; restore a backup named by dbbackup or in the catalog")
+            return
+        if until is not None and physical_format == "xbstream":
+            self.logger.error("Point-in-time recovery from an xbstream backup is not automated; restore it, start "
+                              "the server and replay binlogs from the coordinates in xtrabackup_binlog_info")
+            return
+
         self.logger.info(f"Restoring database '{target_db}' from backup: {backup_path}")
         
         # Restore based on database type
-        db_type = self.config.database.type.lower()
-        if db_type == "mysql":
-            self._restore_mysql(target_db, backup_path)
-        elif db_type == "postgresql":
-            self._restore_postgresql(target_db, backup_path)
-        else:
-            self.logger.error(f"Unsupported database type: {db_type}")
+        started = time.monotonic()
+        succeeded = False
+        try:
+            with self.metrics.database(target_db):
+                if physical_format is not None:
+                    succeeded = self._restore_physical(backup_path, physical_format, until)
+                elif db_type == "mysql":
+                    self._restore_mysql(target_db, backup_path, tables)
+                    if until is not None:
+                        with self.metrics.stage("replay"):
+                            archiver = LogArchiver(self.config, self.logger)
+                            archiver.replay_mysql(target_db, backup_path, until, source_db, self.cipher)
+                    succeeded = True
+                elif db_type == "postgresql":
+                    self._restore_postgresql(target_db, backup_path, tables)
+                    succeeded = True
+                else:
+                    self.logger.error(f"Unsupported database type: {db_type}")
+        finally:
+            self.metrics.record_job(target_db, succeeded, time.monotonic() - started)
+            self.metrics.log_summary(self.logger)
+            self.metrics.write_reports(self.logger, self.config.metrics.textfile_dir, self.config.metrics.report_dir)
             
-    def _restore_mysql(self, db_name: str, backup_path: str):
+    def _needs_decrypted_copy(self, backup_path: str) -> bool:
+        """
+        Return True if restoring an encrypted backup needs random access to its plaintext.
+        """
+        if self.config.database.type.lower() == "mysql":
+            return is_tables_backup(Path(backup_path).name[:-len(ENCRYPTED_EXTENSION)])
+        if self._physical_format(backup_path) is not None:
+            return False
+        return self._pg_archive_format(backup_path) == "custom" and codec_for_path(backup_path).name == "none"
+
+    def _authenticated(self, target_db: str, backup_path: str) -> bool:
+        """
+        Authenticate a whole encrypted backup without writing its plaintext anywhere.
+
+        Returns:
+            bool: True if every chunk and the end of the stream authenticate
+        """
+        try:
+            with self.metrics.database(target_db), \
+                    self.metrics.stage("authenticate", bytes_in=os.path.getsize(backup_path)) as stage:
+                stage.bytes_out = self.cipher.authenticate_file(backup_path)
+        except (DecryptionError, OSError) as e:
+            self.logger.error(f"Refusing to restore {backup_path}: {e}")
+            return False
+        return True
+
+    @contextmanager
+    def _decrypted(self, target_db: str, backup_path: str):
+        """
+        Decrypt and authenticate a whole backup into ``temp_dir``, removing the copy afterwards.
+
+        Yields:
+            str | None: Path of the decrypted backup, or None if it could not be decrypted
+        """
+        ensure_directory(Path(self.config.paths.temp_dir), self.logger)
+        work_dir = tempfile.mkdtemp(prefix="decrypt_", dir=self.config.paths.temp_dir)
+        target = os.path.join(work_dir, Path(backup_path).name[:-len(ENCRYPTED_EXTENSION)])
+        try:
+            try:
+                with self.metrics.database(target_db), \
+                        self.metrics.stage("decrypt", bytes_in=os.path.getsize(backup_path)) as stage:
+                    stage.bytes_out = self.cipher.decrypt_file(backup_path, target)
+            except (DecryptionError, OSError) as e:
+                self.logger.error(f"Refusing to restore {backup_path}: {e}")
+                target = None
+            yield target
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _source_database(self, backup_path: str) -> str | None:
+        """
+        Return the database a backup was taken from, by its catalog entry or its file name.
+        """
+        entry = self.catalog.find(filename=backup_path)
+        if entry is not None:
+            return entry.database
+        parsed = parse_timestamped_filename(backup_path, self.config.app.app_name)
+        return parsed[0] if parsed is not None else None
+
+    def _latest_local_backup(self, target_db: str, before: datetime | None = None) -> str | None:
+        """
+        Find the newest local backup of a database through the catalog.
+
+        Backups made before the catalog existed are imported from the backup
+        directory the first time a database has no catalog entry.
+
+        Args:
+            target_db (str): Database name
+            before (datetime | None): Only consider backups created at or before this time
+
+        Returns:
+            str | None: Path to the backup file, or None if there is none
+        """
+        entry = self.catalog.latest(target_db, before=before)
+        if entry is None and self.catalog.import_directory(self.config.paths.backup_dir, self.config.app.app_name):
+            entry = self.catalog.latest(target_db, before=before)
+        if entry is None or not entry.local_path:
+            return None
+        return entry.local_path
+
+    def _restore_mysql(self, db_name: str, backup_path: str, tables: list[str] | None = None):
         """
         Restore MySQL database from backup file.
 
+        A ``tables`` backup is loaded over parallel connections; a mysqldump
+        file is streamed into one client. Either can be limited to some tables.
+
         Args:
             db_name (str): Database name
             backup_path (str): Path to backup file
+            tables (list[str] | None): Tables to restore, or None for the whole database
         """
         self.logger.info(f"MySQL restore initiated for database '{db_name}'")
+        if is_tables_backup(backup_path):
+            MySQLParallelLoader(self.config, self.logger, self.executor, self.metrics).load(db_name, backup_path, tables)
+            self.logger.info(f"MySQL restore completed for database '{db_name}'")
+            return
         env = os.environ.copy()
         env["MYSQL_PWD"] = self.config.database.password
 
-        cmd = f"mysql -h {self.config.database.host} -P {self.config.database.port} -u {self.config.database.user} {db_name} < {backup_path}"
-        self.executor.run(cmd, env=env)
+        args = ["mysql", "-h", self.config.database.host, "-P", str(self.config.database.port),
+                "-u", self.config.database.user, db_name]
+        if tables:
+            self._stream_tables_into(args, backup_path, tables, env)
+        else:
+            self._stream_into(args, backup_path, env)
         self.logger.info(f"MySQL restore completed for database '{db_name}'")
 
-    def _restore_postgresql(self, db_name: str, backup_path: str):
+    def _restore_postgresql(self, db_name: str, backup_path: str, tables: list[str] | None = None):
         """
         Restore PostgreSQL database from backup file.
 
+        Plain SQL dumps are streamed into psql. Custom, directory and tar
+        archives go through pg_restore, in parallel where the format allows it.
+
         Args:
             db_name (str): Database name
             backup_path (str): Path to backup file
+            tables (list[str] | None): Tables to restore, or None for the whole database
         """
         self.logger.info(f"PostgreSQL restore initiated for database '{db_name}'")
         env = os.environ.copy()
         env["PGPASSWORD"] = self.config.database.password
 
-        cmd = f"psql -h {self.config.database.host} -p {self.config.database.port} -U {self.config.database.user} -d {db_name} -f {backup_path}"
-        self.executor.run(cmd, env=env)
-        self.logger.info(f"PostgreSQL restore completed for database '{db_name}'")
\ No newline at end of file
+        archive_format = self._pg_archive_format(backup_path)
+        if archive_format == "plain":
+            args = ["psql", "-q", "-v", "ON_ERROR_STOP=1", "-h", self.config.database.host,
+                    "-p", str(self.config.database.port), "-U", self.config.database.user, "-d", db_name]
+            if tables:
+                self._stream_tables_into(args, backup_path, tables, env)
+            else:
+                self._stream_into(args, backup_path, env)
+        else:
+            self._pg_restore(db_name, backup_path, archive_format, env, tables)
+        self.logger.info(f"PostgreSQL restore completed for database '{db_name}'")
+
+    def _physical_format(self, backup_path: str) -> str | None:
+        """
+        Return the physical backup format of a backup from its name, or None for a logical dump.
+        """
+        name = self._plain_name(backup_path)
+        return next((fmt for extension, fmt in PHYSICAL_EXTENSIONS.items() if name.endswith(extension)), None)
+
+    def _restore_physical(self, backup_path: str, physical_format: str, until: datetime | None) -> bool:
+        """
+        Restore a physical backup into the configured, empty data directory.
+
+        A pg_basebackup tar is extracted as it is decompressed. An xbstream
+        archive is extracted with xbstream (mbstream for mariabackup) and
+        prepared, which applies the redo log copied during the backup. The
+        database server must be stopped; it is started by the operator
+        afterwards.
+
+        Args:
+            backup_path (str): Path to the backup file
+            physical_format (str): 'basebackup' or 'xbstream'
+            until (datetime | None): Recovery target time for a PostgreSQL base backup
+
+        Returns:
+            bool: True if the data directory is ready to start the server on
+        """
+        physical = self.config.database.physical
+        if not physical.data_dir:
+            self.logger.error("Set database.physical.data_dir to restore a physical backup")
+            return False
+        data_dir = Path(physical.data_dir)
+        if data_dir.exists() and any(data_dir.iterdir()):
+            self.logger.error(f"Data directory {data_dir} is not empty; stop the server and move it aside first")
+            return False
+        if self.config.runtime.dry_run:
+            self.logger.info(f"[DRY-RUN] Physical backup not restored into {data_dir}: {backup_path}")
+            return True
+        ensure_directory(data_dir, self.logger)
+
+        with self.metrics.stage("restore", bytes_in=os.path.getsize(backup_path)):
+            if physical_format == "basebackup":
+                with open_backup(backup_path, self.cipher) as reader, tarfile.open(fileobj=reader, mode="r|") as tar:
+                    tar.extractall(data_dir, filter="data")
+                data_dir.chmod(0o700)  # The PostgreSQL server refuses group- or world-accessible data directories
+            else:
+                extract_tool = "mbstream" if physical.mysql_tool == "mariabackup" else "xbstream"
+                with open_backup(backup_path, self.cipher) as reader:
+                    self.executor.feed([extract_tool, "-x", "-C", str(data_dir)], reader)
+        if physical_format == "xbstream":
+            with self.metrics.stage("prepare"):
+                self.executor.run(shlex.join([physical.mysql_tool, "--prepare", f"--target-dir={data_dir}"]))
+        if until is not None:
+            self._configure_pg_recovery(data_dir, until)
+        self.logger.info(f"Physical backup restored into {data_dir}; start the database server to use it")
+        return True
+
+    def _configure_pg_recovery(self, data_dir: Path, until: datetime):
+        """
+        Make a restored PostgreSQL data directory replay archived WAL up to a point in time on startup.
+        """
+        restore_command = (f"cd {shlex.quote(str(TOOL_DIR))} && {shlex.quote(sys.executable)} main.py "
+                           f'--restore-wal %f "$OLDPWD/%p"')
+        settings = {
+            "restore_command": restore_command,
+            "recovery_target_time": until.isoformat(sep=" "),
+            "recovery_target_action": "promote",
+        }
+        with open(data_dir / "postgresql.auto.conf", "a") as f:
+            for name, value in settings.items():
+                escaped = value.replace("'", "''")
+                f.write(f"{name} = '{escaped}'\n")
+        (data_dir / "recovery.signal").touch()
+        self.logger.info(f"Recovery configured: archived WAL is replayed up to {until} when the server starts")
+
+    def _pg_archive_format(self, backup_path: str) -> str:
+        """
+        Determine the pg_dump format of a backup from its name, falling back to the archive header.
+
+        Returns:
+            str: One of 'plain', 'custom', 'directory' or 'tar'
+        """
+        if is_dedup_backup(backup_path):
+            return "plain"
+        name = self._plain_name(backup_path)
+        if name.endswith(".dir.tar"):
+            return "directory"
+        if name.endswith(".dump"):
+            return "custom"
+        if name.endswith(".tar"):
+            return "tar"
+        with open_backup(backup_path, self.cipher) as reader:
+            if reader.read(5) == b"PGDMP":
+                return "custom"
+        return "plain"
+
+    def _plain_name(self, backup_path: str) -> str:
+        """
+        Return the file name of a backup without its encryption and codec extensions.
+        """
+        name = Path(backup_path).name
+        if is_encrypted(name):
+            name = name[:-len(ENCRYPTED_EXTENSION)]
+        codec = codec_for_path(backup_path)
+        if codec.extension and name.endswith(codec.extension):
+            name = name[:-len(codec.extension)]
+        return name
+
+    def _pg_restore(self, db_name: str, backup_path: str, archive_format: str, env: dict,
+                    tables: list[str] | None = None):
+        """
+        Restore a pg_dump archive with pg_restore.
+
+        Uncompressed custom archives are restored in place and directory
+        archives are unpacked into ``temp_dir``, both with ``-j`` parallel
+        jobs. Everything else is streamed through stdin, which pg_restore
+        can only process serially. Restoring ``tables`` needs a seekable
+        archive, so a compressed one is decompressed into ``temp_dir`` first.
+        """
+        db = self.config.database
+        jobs = db.dump.postgresql.jobs
+        args = ["pg_restore", "-h", db.host, "-p", str(db.port), "-U", db.user, "-d", db_name, "--exit-on-error"]
+        if db.restore.allow_drop:
+            args += ["--clean", "--if-exists"]
+        parallel = ["-j", str(jobs)] if jobs > 1 else []
+        codec = codec_for_path(backup_path)
+
+        if tables:
+            self._pg_restore_tables(db_name, backup_path, archive_format, env, args + parallel, tables)
+        elif archive_format == "custom" and codec.name == "none":
+            with self.metrics.stage("restore", bytes_in=os.path.getsize(backup_path)):
+                self.executor.run(shlex.join(args + parallel + [backup_path]), env=env)
+        elif archive_format == "directory":
+            ensure_directory(Path(self.config.paths.temp_dir), self.logger)
+            work_dir = tempfile.mkdtemp(prefix=f"restore_{db_name}_", dir=self.config.paths.temp_dir)
+            try:
+                with self.metrics.stage("unpack", bytes_in=os.path.getsize(backup_path)):
+                    dump_dir = self._unpack_directory(backup_path, work_dir)
+                with self.metrics.stage("restore", bytes_in=os.path.getsize(backup_path)):
+                    self.executor.run(shlex.join(args + parallel + ["-F", "d", dump_dir]), env=env)
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+        else:
+            format_letter = "c" if archive_format == "custom" else "t"
+            self._stream_into(args + ["-F", format_letter], backup_path, env)
+
+    def _pg_restore_tables(self, db_name: str, backup_path: str, archive_format: str, env: dict,
+                           args: list[str], tables: list[str]):
+        """
+        Restore only some tables of a pg_dump archive through a filtered ``pg_restore -L`` list.
+        """
+        if self.config.runtime.dry_run:
+            self.logger.info(f"[DRY-RUN] Tables {', '.join(tables)} not restored from {backup_path}")
+            return
+        ensure_directory(Path(self.config.paths.temp_dir), self.logger)
+        work_dir = tempfile.mkdtemp(prefix=f"restore_{db_name}_", dir=self.config.paths.temp_dir)
+        try:
+            codec = codec_for_path(backup_path)
+            with self.metrics.stage("unpack", bytes_in=os.path.getsize(backup_path)):
+                if archive_format == "directory":
+                    source = self._unpack_directory(backup_path, work_dir)
+                elif codec.name == "none" and not is_encrypted(backup_path):
+                    source = backup_path
+                else:
+                    source = os.path.join(work_dir, self._plain_name(backup_path))
+                    with open_backup(backup_path, self.cipher) as reader, open(source, "wb") as f_out:
+                        shutil.copyfileobj(reader, f_out)
+
+            toc = self.executor.run(shlex.join(["pg_restore", "-l", source]), capture_output=True, env=env)
+            with self.executor.stream(["pg_restore", "-s", source], env=env) as script:
+                schema = scan_dump(script, "postgresql", "none")
+            missing = schema.missing(tables)
+            if missing:
+                raise RuntimeError(f"Tables not in {backup_path}: {', '.join(missing)}")
+
+            list_path = os.path.join(work_dir, "restore.list")
+            with open(list_path, "w") as f:
+                f.write("\n".join(select_toc_entries(toc or "", schema, tables)) + "\n")
+            with self.metrics.stage("restore", bytes_in=os.path.getsize(backup_path)):
+                self.executor.run(shlex.join(args + ["-L", list_path, source]), env=env)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _unpack_directory(self, backup_path: str, work_dir: str) -> str:
+        """
+        Unpack a ``.dir.tar`` backup produced from a pg_dump directory-format dump.
+
+        Returns:
+            str: Path to the extracted dump directory
+        """
+        if self.config.runtime.dry_run:
+            self.logger.info(f"[DRY-RUN] Archive not unpacked: {backup_path}")
+            return work_dir
+        with open_backup(backup_path, self.cipher) as reader, tarfile.open(fileobj=reader, mode="r|") as tar:
+            tar.extractall(work_dir, filter="data")
+        entries = [entry for entry in Path(work_dir).iterdir() if entry.is_dir()]
+        if len(entries) != 1:
+            raise RuntimeError(f"Unexpected layout in directory archive: {backup_path}")
+        return str(entries[0])
+
+    def _stream_into(self, args: list[str], backup_path: str, env: dict):
+        """
+        Decompress a backup on the fly and pipe it into a database client's stdin.
+
+        The codec is detected from the file name (or magic bytes), so no
+        decompressed scratch copy is ever written; an encrypted backup is
+        decrypted on the way as well. Deduplicated backups are reassembled
+        from the chunk store chunk by chunk.
+
+        Args:
+            args (list[str]): Client command and arguments
+            backup_path (str): Path to backup file
+            env (dict): Environment for the client
+        """
+        with self.metrics.stage("restore", bytes_in=os.path.getsize(backup_path)) as restore_stage:
+            if is_dedup_backup(backup_path):
+                self.logger.debug(f"Restoring {backup_path} from the dedup chunk store")
+                bytes_restored = self.executor.feed(args, self.dedup_storage.open_reader(backup_path), env=env)
+            else:
+                codec = codec_for_path(backup_path)
+                self.logger.debug(f"Restoring {backup_path} with codec '{codec.name}'")
+                with open_backup(backup_path, self.cipher) as reader:
+                    bytes_restored = self.executor.feed(args, reader, env=env)
+            restore_stage.bytes_out = bytes_restored
+        self.logger.debug(f"Streamed {bytes_restored} bytes into {args[0]}")
+
+    def _stream_tables_into(self, args: list[str], backup_path: str, tables: list[str], env: dict):
+        """
+        Pipe only the header and the sections of some tables of a plain dump into a database client.
+
+        With the block index written at backup time, decompression starts at
+        the frame before each wanted section. Without one, the dump is
+        scanned once to find the sections and then decompressed again,
+        skipping everything else.
+
+        Raises:
+            RuntimeError: If a requested table is not in the dump
+        """
+        dialect = self.config.database.type.lower()
+        codec = codec_for_path(backup_path)
+        dedup = is_dedup_backup(backup_path)
+        encrypted = is_encrypted(backup_path)
+
+        def open_at(f, offset: int):
+            if dedup:
+                return self.dedup_storage.open_reader(backup_path)  # Indexes of dedup backups have one frame
+            f.seek(offset)
+            if encrypted:
+                return codec.open_reader(self.cipher.open_reader(f))  # So do scanned indexes of encrypted ones
+            return codec.open_reader(f)
+
+        with open(backup_path, "rb") as f:
+            index = None if dedup or encrypted else BlockIndex.load(index_path(backup_path))
+            if index is None:
+                self.logger.info(f"No block index for {backup_path}, scanning the dump for the requested tables")
+                with self.metrics.stage("scan"):
+                    index = scan_dump(open_at(f, 0), dialect, codec.name)
+            missing = index.missing(tables)
+            if missing:
+                raise RuntimeError(f"Tables not in {backup_path}: {', '.join(missing)}")
+
+            ranges = index.select(tables)
+            self.logger.info(f"Restoring {', '.join(tables)}: {sum(end - start for start, end in ranges)} "
+                             f"of {index.sections[-1].offset + index.sections[-1].length} dump bytes")
+            with self.metrics.stage("restore", bytes_in=os.path.getsize(backup_path)) as restore_stage:
+                reader = ChunkReader(read_ranges(lambda offset: open_at(f, offset), index, ranges))
+                restore_stage.bytes_out = self.executor.feed(args, reader, env=env)
+
+    @property
+    def dedup_storage(self) -> DedupStorage:
+        """
+        Chunk store holding deduplicated backups, opened on first use.
+        """
+        if self._dedup_storage is None:
+            self._dedup_storage = DedupStorage.from_config(self.config, self.logger)
+        return self._dedup_storage
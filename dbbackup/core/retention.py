@@ -0,0 +1,257 @@
+"""
+Apply grandfather-father-son retention and prune expired backups locally and in S3.
+"""
+
+import os
+import logging
+import tarfile
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Hashable, TypeVar
+from dbbackup.core.archiver import LogArchiver
+from dbbackup.core.block_index import index_path
+from dbbackup.core.catalog import BackupCatalog, CatalogEntry
+from dbbackup.core.encryption import BackupCipher, is_encrypted
+from dbbackup.core.integrity import SUPPORTED_ALGORITHMS, manifest_path
+from dbbackup.core.listing import BackupIndex
+from dbbackup.core.storages.dedup import DedupStorage, is_dedup_backup, referenced_chunks
+from dbbackup.core.storages.local import LocalStorage
+from dbbackup.core.storages.s3 import CHUNK_GRACE_SECONDS, S3Storage
+from dbbackup.utils.timeutils import parse_timestamped_filename
+
+T = TypeVar("T")
+
+# Period a backup falls into for each retention tier
+_PERIODS: dict[str, Callable[[datetime], Hashable]] = {
+    "daily": lambda created: created.date(),
+    "weekly": lambda created: created.isocalendar()[:2],
+    "monthly": lambda created: (created.year, created.month),
+    "yearly": lambda created: created.year,
+}
+
+
+@dataclass
+class RetentionPolicy:
+    """
+    Number of backups to keep per tier for each database.
+
+    The newest backup of each of the last ``daily`` days, ``weekly`` ISO
+    weeks, ``monthly`` months and ``yearly`` years is kept, plus the
+    ``keep_last`` newest backups regardless of age.
+    """
+    keep_last: int = 1
+    daily: int = 7
+    weekly: int = 4
+    monthly: int = 12
+    yearly: int = 0
+
+    @classmethod
+    def from_config(cls, retention_config) -> "RetentionPolicy":
+        """
+        Create a policy from the ``retention`` configuration section.
+        """
+        return cls(
+            keep_last=retention_config.keep_last,
+            daily=retention_config.daily,
+            weekly=retention_config.weekly,
+            monthly=retention_config.monthly,
+            yearly=retention_config.yearly,
+        )
+
+    def split(self, backups: list[T], created_at: Callable[[T], datetime]) -> tuple[list[T], list[T]]:
+        """
+        Split the backups of one database into those to keep and those to prune.
+
+        A single pass over the backups, newest first, fills all tiers at
+        once: a backup is kept when it is the first one seen in a period of
+        a tier that still has room.
+
+        Args:
+            backups (list[T]): Backups of one database, in any order
+            created_at (Callable[[T], datetime]): Returns the creation time of a backup
+
+        Returns:
+            tuple[list[T], list[T]]: Backups to keep and backups to prune, newest first
+        """
+        limits = {"daily": self.daily, "weekly": self.weekly, "monthly": self.monthly, "yearly": self.yearly}
+        seen: dict[str, set] = {tier: set() for tier in _PERIODS}
+        keep, prune = [], []
+        for index, backup in enumerate(sorted(backups, key=created_at, reverse=True)):
+            created = created_at(backup)
+            kept = index < self.keep_last
+            for tier, period_of in _PERIODS.items():
+                period = period_of(created)
+                if period not in seen[tier] and len(seen[tier]) < limits[tier]:
+                    seen[tier].add(period)
+                    kept = True
+            (keep if kept else prune).append(backup)
+        return keep, prune
+
+
+class BackupPruner:
+    """
+    Class to delete backups that fall outside the retention policy.
+    """
+
+    def __init__(self, config, logger: logging.Logger):
+        """
+        Initialize BackupPruner.
+
+        Args:
+            config: Application configuration object
+            logger (logging.Logger): Logger instance
+        """
+        self.config = config
+        self.logger = logger
+        self.policy = RetentionPolicy.from_config(config.retention)
+        self.local_storage = LocalStorage(config.paths.backup_dir, logger)
+        self.s3_storage = S3Storage.from_config(config.aws, logger) if config.aws is not None else None
+        self.catalog = BackupCatalog.for_backup_dir(config.paths.backup_dir, logger)
+
+    def run(self, databases: list[str] | None = None) -> list[CatalogEntry]:
+        """
+        Prune expired backups of the given databases, or of every database.
+
+        The catalog and the S3 listing are merged by file name, so each
+        backup is judged once and removed from the backup directory and the
+        bucket of the aws section. Copies in other destinations are left to
+        the retention rules of those destinations.
+        S3 keys are deleted in batches of up to 1000 per request. In dry-run
+        mode the plan is only logged. When every database is pruned with
+        ``pitr.enabled``, archived binlogs or WAL older than the oldest kept
+        backup are expired as well.
+
+        Args:
+            databases (list[str] | None): Databases to prune, None for all
+
+        Returns:
+            list[CatalogEntry]: Backups selected for pruning
+        """
+        backups = self._collect(databases)
+        kept, pruned = [], []
+        for database, entries in sorted(backups.items()):
+            keep, prune = self.policy.split(entries, lambda entry: entry.created_at)
+            self.logger.info(f"Retention for '{database}': keeping {len(keep)}, pruning {len(prune)} backup(s)")
+            kept.extend(keep)
+            pruned.extend(prune)
+
+        if self.config.runtime.dry_run:
+            for entry in pruned:
+                self.logger.info(f"[DRY-RUN] Would prune {entry.filename}")
+            return pruned
+
+        if pruned:
+            self._delete(pruned)
+        # Logs are shared by every database of the server, so only a full prune knows the oldest kept backup
+        if databases is None and self.config.pitr.enabled:
+            self._expire_logs(kept)
+        return pruned
+
+    def _delete(self, pruned: list[CatalogEntry]):
+        """
+        Delete pruned backups locally and in S3 and forget those that are gone everywhere.
+        """
+        local_paths = [path for entry in pruned if entry.local_path for path in _local_files(entry.local_path)]
+        removed_paths = set(self.local_storage.delete_backups(local_paths))
+        s3_keys = [entry.s3_key for entry in pruned if entry.s3_key]
+        removed_keys = set(self.s3_storage.delete_backups(s3_keys)) if s3_keys and self.s3_storage else set()
+
+        # Only forget backups that are gone everywhere, so a failed delete is retried on the next prune
+        removed = [entry.id for entry in pruned if entry.id is not None
+                   and (not entry.local_path or entry.local_path in removed_paths)
+                   and (not entry.s3_key or entry.s3_key in removed_keys)]
+        self.catalog.remove_many(removed)
+        BackupIndex(self.config, self.logger).forget(sorted(removed_keys))
+        self.logger.info(f"Pruned {len(removed_paths)} local file(s) and {len(removed_keys)} S3 object(s)")
+
+        if any(is_dedup_backup(entry.filename) for entry in pruned):
+            self._collect_chunks()
+
+    def _collect(self, databases: list[str] | None) -> dict[str, list[CatalogEntry]]:
+        """
+        Merge the catalog and the S3 listing into the backups of each database.
+        """
+        self.catalog.import_directory(self.config.paths.backup_dir, self.config.app.app_name)
+        by_filename = {entry.filename: entry for entry in self.catalog.list_backups()
+                       if databases is None or entry.database in databases}
+
+        objects = []
+        if self.s3_storage is not None:
+            prefixes = ([f"{database}/" for database in databases] if databases
+                        else self.s3_storage.list_database_prefixes())
+            objects = self.s3_storage.list_backup_objects(prefixes=prefixes)
+        for obj in objects:
+            filename = Path(obj.key).name
+            entry = by_filename.get(filename)
+            if entry is not None:
+                entry.s3_key = obj.key
+                continue
+            parsed = parse_timestamped_filename(filename, self.config.app.app_name)
+            if parsed is None:
+                continue  # Not one of our backups
+            database, created_at, _ = parsed
+            by_filename[filename] = CatalogEntry(database=database, created_at=created_at, filename=filename,
+                                                 size=obj.size, s3_key=obj.key, etag=obj.etag)
+
+        backups: dict[str, list[CatalogEntry]] = {}
+        for entry in by_filename.values():
+            backups.setdefault(entry.database, []).append(entry)
+        return backups
+
+    def _collect_chunks(self):
+        """
+        Remove chunks that no remaining dedup manifest references.
+
+        Local chunks are checked against the local manifests. Chunks under
+        S3's ``.chunks/`` prefix are checked against every manifest in the
+        bucket, so those of other hosts sharing it are honoured, and against
+        the local manifests and recently reused local chunks, whose backups
+        may not have been uploaded yet.
+        """
+        manifests = [path for path in self.local_storage.list_backups() if is_dedup_backup(path)]
+        store = DedupStorage.from_config(self.config, self.logger)
+        store.collect_garbage(manifests)
+        if self.s3_storage is not None:
+            self.s3_storage.collect_chunks(referenced_chunks(manifests) | store.recent_chunks(CHUNK_GRACE_SECONDS))
+
+
+    def _expire_logs(self, kept: list[CatalogEntry]):
+        """
+        Delete archived binlogs or WAL that come before the oldest kept backup.
+
+        The first log needed is read from the oldest kept backup that records
+        start coordinates; backups without any cannot be rolled forward and
+        are skipped, as are databases scheduled on another server. If a
+        backup's coordinates cannot be read, for example because it only
+        exists in S3, every archived log is kept.
+        """
+        db = self.config.database
+        elsewhere = {schedule.database for schedule in self.config.daemon.schedules
+                     if (schedule.host or db.host, schedule.port or db.port) != (db.host, db.port)}
+        archiver = LogArchiver(self.config, self.logger)
+        archiver.s3_storage = self.s3_storage
+        for entry in sorted(kept, key=lambda entry: entry.created_at):
+            if entry.database in elsewhere:
+                continue
+            try:
+                if not entry.local_path or not os.path.exists(entry.local_path):
+                    raise ValueError(f"{entry.filename} is not in the backup directory")
+                cipher = BackupCipher.from_config(self.config.encryption) if is_encrypted(entry.local_path) else None
+                dedup_storage = (DedupStorage.from_config(self.config, self.logger)
+                                 if is_dedup_backup(entry.local_path) else None)
+                first_needed = archiver.first_needed_log(entry.local_path, cipher, dedup_storage)
+            except (OSError, ValueError, tarfile.TarError) as e:
+                self.logger.warning(f"Archived logs kept, start coordinates of {entry.filename} unknown: {e}")
+                return
+            if first_needed is not None:
+                archiver.expire(first_needed)
+                return
+
+
+def _local_files(backup_path: str) -> list[str]:
+    """
+    Return a backup file together with its checksum manifests and block index.
+    """
+    sidecars = [manifest_path(backup_path, algorithm) for algorithm in SUPPORTED_ALGORITHMS]
+    return [backup_path] + [str(path) for path in sidecars + [index_path(backup_path)] if path.exists()]
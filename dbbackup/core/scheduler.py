@@ -0,0 +1,201 @@
+"""
+Run backup jobs concurrently on a bounded worker pool with per-job failure isolation.
+"""
+
+import asyncio
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+
+
+@dataclass
+class JobResult:
+    """
+    Outcome of a single scheduled job.
+    """
+    name: str
+    status: str
+    duration: float
+    output: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.status == "success"
+
+
+@dataclass
+class RunSummary:
+    """
+    Aggregated outcome of a scheduler run.
+    """
+    results: list[JobResult] = field(default_factory=list)
+    duration: float = 0.0
+
+    @property
+    def succeeded(self) -> list[JobResult]:
+        return [r for r in self.results if r.succeeded]
+
+    @property
+    def failed(self) -> list[JobResult]:
+        return [r for r in self.results if not r.succeeded]
+
+
+class JobScheduler:
+    """
+    Execute independent jobs on a bounded thread pool.
+
+    A job is any callable taking the job name. It succeeds when it returns a
+    non-None value and fails when it returns None or raises; a failure never
+    affects the other jobs.
+    """
+
+    def __init__(self, logger: logging.Logger, max_workers: int = 1):
+        """
+        Initialize JobScheduler.
+
+        Args:
+            logger (logging.Logger): Logger instance
+            max_workers (int): Maximum number of jobs running at once
+        """
+        self.logger = logger
+        self.max_workers = max(1, max_workers)
+
+    def run(self, names: list[str], job: Callable[[str], Optional[str]]) -> RunSummary:
+        """
+        Run a job for every name and wait for all of them to finish.
+
+        Args:
+            names (list[str]): Job names (e.g. database names)
+            job (Callable[[str], Optional[str]]): Callable executed once per name
+
+        Returns:
+            RunSummary: Per-job results in the order of ``names`` and total wall time;
+                a name listed more than once runs once
+        """
+        started = time.monotonic()
+        names = _unique(self.logger, names)
+        workers = min(self.max_workers, len(names)) or 1
+        self.logger.info(f"Running {len(names)} job(s) with {workers} worker(s)")
+
+        results: dict[str, JobResult] = {}
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dbbackup-job") as pool:
+            futures = {pool.submit(self._run_job, name, job): name for name in names}
+            for future in as_completed(futures):
+                result = future.result()
+                results[futures[future]] = result
+                _log_result(self.logger, result)
+
+        return _summarize(self.logger, [results[name] for name in names], started)
+
+    def _run_job(self, name: str, job: Callable[[str], Optional[str]]) -> JobResult:
+        """
+        Run a single job, converting any exception into a failed result.
+        """
+        started = time.monotonic()
+        try:
+            output = job(name)
+        except Exception as e:
+            return JobResult(name, "failed", time.monotonic() - started, error=str(e))
+        if output is None:
+            return JobResult(name, "failed", time.monotonic() - started, error="job reported failure")
+        return JobResult(name, "success", time.monotonic() - started, output=output)
+
+
+class AsyncJobScheduler:
+    """
+    Execute independent coroutine jobs on a single event loop.
+
+    Concurrency is bounded by a semaphore instead of a thread per job, so
+    one process can drive many dumps and uploads at once. A job that exceeds
+    ``timeout`` is cancelled and reported as failed; like JobScheduler, a
+    failure never affects the other jobs.
+    """
+
+    def __init__(self, logger: logging.Logger, max_concurrency: int = 1, timeout: float | None = None):
+        """
+        Initialize AsyncJobScheduler.
+
+        Args:
+            logger (logging.Logger): Logger instance
+            max_concurrency (int): Maximum number of jobs running at once
+            timeout (float | None): Seconds after which a job is cancelled, None for no limit
+        """
+        self.logger = logger
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout
+
+    def run(self, names: list[str], job: Callable[[str], Awaitable[Optional[str]]]) -> RunSummary:
+        """
+        Run a coroutine job for every name on a new event loop and wait for all of them.
+
+        Args:
+            names (list[str]): Job names (e.g. database names)
+            job (Callable[[str], Awaitable[Optional[str]]]): Coroutine function executed once per name
+
+        Returns:
+            RunSummary: Per-job results in the order of ``names`` and total wall time;
+                a name listed more than once runs once
+        """
+        return asyncio.run(self.run_async(names, job))
+
+    async def run_async(self, names: list[str], job: Callable[[str], Awaitable[Optional[str]]]) -> RunSummary:
+        """
+        Run a coroutine job for every name on the running event loop.
+        """
+        started = time.monotonic()
+        names = _unique(self.logger, names)
+        self.logger.info(f"Running {len(names)} job(s) with up to {self.max_concurrency} concurrent job(s)")
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        results = await asyncio.gather(*(self._run_job(name, job, semaphore) for name in names))
+        return _summarize(self.logger, list(results), started)
+
+    async def _run_job(self, name: str, job: Callable[[str], Awaitable[Optional[str]]],
+                       semaphore: asyncio.Semaphore) -> JobResult:
+        """
+        Run a single job, converting timeouts and exceptions into a failed result.
+        """
+        async with semaphore:
+            started = time.monotonic()
+            try:
+                output = await asyncio.wait_for(job(name), timeout=self.timeout)
+            except asyncio.TimeoutError:
+                result = JobResult(name, "failed", time.monotonic() - started,
+                                   error=f"timed out after {self.timeout}s")
+            except Exception as e:
+                result = JobResult(name, "failed", time.monotonic() - started, error=str(e))
+            else:
+                if output is None:
+                    result = JobResult(name, "failed", time.monotonic() - started, error="job reported failure")
+                else:
+                    result = JobResult(name, "success", time.monotonic() - started, output=output)
+        _log_result(self.logger, result)
+        return result
+
+
+def _unique(logger: logging.Logger, names: list[str]) -> list[str]:
+    """
+    Drop repeated job names, keeping the first occurrence; results are keyed by name.
+    """
+    unique = list(dict.fromkeys(names))
+    if len(unique) < len(names):
+        logger.warning(f"Ignoring {len(names) - len(unique)} duplicate job name(s)")
+    return unique
+
+
+def _log_result(logger: logging.Logger, result: JobResult):
+    if result.succeeded:
+        logger.info(f"Job '{result.name}' finished in {result.duration:.2f}s")
+    else:
+        logger.error(f"Job '{result.name}' failed after {result.duration:.2f}s: {result.error}")
+
+
+def _summarize(logger: logging.Logger, results: list[JobResult], started: float) -> RunSummary:
+    summary = RunSummary(results=results, duration=time.monotonic() - started)
+    logger.info(
+        f"Jobs completed in {summary.duration:.2f}s: "
+        f"{len(summary.succeeded)} succeeded, {len(summary.failed)} failed"
+    )
+    return summary
@@ -2,10 +2,27 @@
 Storage handlers package for DBBackup tool.
 
 This package provides convenient imports for storage backends, allowing
-users to easily switch between local filesystem storage and AWS S3 storage.
+users to store backups on the local filesystem, AWS S3 or S3-compatible
+object stores, SFTP servers and NFS shares. The handlers are imported on
+first access, so importing one storage module does not load the SDKs of
+the others.
 """
 
-from dbbackup.core.storages.local import LocalStorage
-from dbbackup.core.storages.s3 import S3Storage
+import importlib
 
-__all__ = ["LocalStorage", "S3Storage"]
\ No newline at end of file
+# Exported name -> module defining it
+_EXPORTS = {
+    "LocalStorage": "dbbackup.core.storages.local",
+    "S3Storage": "dbbackup.core.storages.s3",
+    "SFTPStorage": "dbbackup.core.storages.sftp",
+    "StorageFanout": "dbbackup.core.storages.backends",
+    "register_backend": "dbbackup.core.storages.backends",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(_EXPORTS[name]), name)
\ No newline at end of file
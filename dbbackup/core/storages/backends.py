@@ -0,0 +1,387 @@
+"""
+Storage backend interface, backend registry and parallel fan-out of backups to several destinations.
+"""
+
+import contextvars
+import logging
+import os
+import posixpath
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Optional, Protocol
+from dbbackup.core.metrics import MetricsRecorder
+from dbbackup.core.pipeline import BackupWriter, TeeWriter
+from dbbackup.core.storages.local import LocalStorage
+
+# Name of the backup directory among the destinations; it always holds a copy
+PRIMARY_DESTINATION = "local"
+MOUNTS_PATH = Path("/proc/self/mounts")
+NFS_TYPES = ("nfs", "nfs4")
+
+
+class StorageBackend(Protocol):
+    """
+    A place backups are copied to. Implemented by the backend adapters below.
+
+    ``target_key`` is the S3-style key of the backup, ``db/YYYY/MM/file``;
+    each backend decides how much of it to use as the path.
+    """
+
+    def save_backup(self, source_file: str, target_key: str, metadata: dict | None = None) -> bool: ...
+
+    def open_writer(self, target_key: str) -> BackupWriter: ...
+
+
+class LocalBackend:
+    """
+    Store backups in a directory, flat by file name or laid out like the S3 keys.
+    """
+
+    def __init__(self, storage: LocalStorage, nested: bool = False):
+        """
+        Initialize LocalBackend.
+
+        Args:
+            storage (LocalStorage): Storage handler of the directory
+            nested (bool): True to store under ``db/YYYY/MM/``, False to store by file name
+        """
+        self.storage = storage
+        self.nested = nested
+
+    def save_backup(self, source_file: str, target_key: str, metadata: dict | None = None) -> bool:
+        return self.storage.save_backup(source_file, self._relative_path(target_key))
+
+    def open_writer(self, target_key: str) -> BackupWriter:
+        return self.storage.open_writer(self._relative_path(target_key))
+
+    def _relative_path(self, target_key: str) -> str:
+        return target_key if self.nested else posixpath.basename(target_key)
+
+
+class NFSBackend(LocalBackend):
+    """
+    Store backups on an NFS mount, laid out like the S3 keys.
+
+    Nothing is written while the share is not mounted, since the files would
+    silently land on the local disk below the mount point instead.
+    """
+
+    def __init__(self, directory: str, logger: logging.Logger, metrics: MetricsRecorder | None = None,
+                 mounts_path: Path = MOUNTS_PATH):
+        """
+        Initialize NFSBackend.
+
+        Args:
+            directory (str): Directory on the mounted share
+            logger (logging.Logger): Logger instance
+            metrics (MetricsRecorder | None): Recorder receiving the 'store_nfs' stage
+            mounts_path (Path): Mount table to check the share against
+        """
+        self.directory = directory
+        self.logger = logger
+        self.metrics = metrics
+        self.mounts_path = mounts_path
+        self.nested = True
+        self._storage: Optional[LocalStorage] = None
+
+    @property
+    def storage(self) -> LocalStorage:
+        """
+        Storage handler of the share, created once the share is found mounted.
+        """
+        fstype = mount_type(self.directory, self.mounts_path)
+        if fstype not in NFS_TYPES:
+            raise OSError(f"{self.directory} is not on a mounted NFS share (filesystem: {fstype or 'unknown'})")
+        if self._storage is None:
+            self._storage = LocalStorage(self.directory, self.logger, self.metrics, stage="store_nfs")
+        return self._storage
+
+    def save_backup(self, source_file: str, target_key: str, metadata: dict | None = None) -> bool:
+        try:
+            storage = self.storage
+        except OSError as e:
+            self.logger.error(f"Failed to save backup to NFS: {e}")
+            return False
+        return storage.save_backup(source_file, target_key)
+
+
+class S3Backend:
+    """
+    Store backups as objects of an S3 or S3-compatible bucket.
+    """
+
+    def __init__(self, storage):
+        """
+        Initialize S3Backend.
+
+        Args:
+            storage (S3Storage): Storage handler of the bucket
+        """
+        self.storage = storage
+
+    def save_backup(self, source_file: str, target_key: str, metadata: dict | None = None) -> bool:
+        return self.storage.upload_backup(source_file, target_key, metadata=metadata)
+
+    def open_writer(self, target_key: str) -> BackupWriter:
+        return self.storage.open_writer(target_key)
+
+
+def mount_type(path: str, mounts_path: Path = MOUNTS_PATH) -> Optional[str]:
+    """
+    Return the filesystem type of the mount holding ``path``.
+
+    Args:
+        path (str): Path, which need not exist yet
+        mounts_path (Path): Mount table in ``/proc/mounts`` format
+
+    Returns:
+        Optional[str]: Filesystem type such as 'nfs4', or None if the mount table cannot be read
+    """
+    real_path = os.path.realpath(path)
+    best, fstype = "", None
+    try:
+        lines = mounts_path.read_text().splitlines()
+    except OSError:
+        return None
+    for line in lines:
+        fields = line.split()
+        if len(fields) < 3:
+            continue
+        mount_point = fields[1].replace("\\040", " ")
+        inside = real_path == mount_point or real_path.startswith(mount_point.rstrip("/") + "/")
+        if inside and len(mount_point) >= len(best):
+            best, fstype = mount_point, fields[2]
+    return fstype
+
+
+# Factory arguments: destination config, application config, logger, metrics recorder and
+# the storage of the aws section (None without one)
+BackendFactory = Callable[..., StorageBackend]
+BACKENDS: dict[str, BackendFactory] = {}
+
+
+def register_backend(type_name: str, factory: BackendFactory):
+    """
+    Register a backend factory under a destination type, replacing any factory with the same type.
+
+    Args:
+        type_name (str): Value of ``type`` in a destination configuration
+        factory (BackendFactory): Callable building the backend
+    """
+    BACKENDS[type_name] = factory
+
+
+def _local_backend(destination, config, logger, metrics, s3_storage):
+    return LocalBackend(LocalStorage(destination.path, logger, metrics))
+
+
+def _nfs_backend(destination, config, logger, metrics, s3_storage):
+    return NFSBackend(destination.path, logger, metrics)
+
+
+def _s3_backend(destination, config, logger, metrics, s3_storage):
+    from dbbackup.core.storages.s3 import S3Storage, transfer_settings
+    from dbbackup.core.storages.s3_transfer import S3TransferSettings
+
+    overrides = {name: value for name, value in (("endpoint_url", destination.endpoint_url),
+                                                 ("region", destination.region),
+                                                 ("profile", destination.profile)) if value is not None}
+    if destination.type == "minio":
+        overrides["addressing_style"] = "path"
+    if s3_storage is not None and not overrides and destination.bucket in (None, s3_storage.bucket_name):
+        return S3Backend(s3_storage)  # The bucket of the aws section, with its job journal
+    settings = transfer_settings(config.aws, **overrides) if config.aws else S3TransferSettings(**overrides)
+    bucket = destination.bucket or config.aws.s3_bucket
+    return S3Backend(S3Storage(bucket, logger, settings.region, settings=settings, metrics=metrics))
+
+
+def _sftp_backend(destination, config, logger, metrics, s3_storage):
+    from dbbackup.core.storages.sftp import SFTPStorage
+
+    password = os.environ.get(destination.password_env) if destination.password_env else None
+    return SFTPStorage(destination.host, destination.path, logger, port=destination.port, user=destination.user,
+                       key_file=destination.key_file, password=password, known_hosts=destination.known_hosts,
+                       metrics=metrics)
+
+
+register_backend("local", _local_backend)
+register_backend("nfs", _nfs_backend)
+register_backend("s3", _s3_backend)
+register_backend("minio", _s3_backend)
+register_backend("sftp", _sftp_backend)
+
+
+class Destination:
+    """
+    A storage backend with its own queue of pending copies and worker limit.
+    """
+
+    def __init__(self, name: str, backend: StorageBackend, concurrency: int = 1, required: bool = True):
+        """
+        Initialize Destination.
+
+        Args:
+            name (str): Destination name used in logs
+            backend (StorageBackend): Backend storing the copies
+            concurrency (int): Copies made at the same time
+            required (bool): Whether a backup fails when this destination fails
+        """
+        self.name = name
+        self.backend = backend
+        self.concurrency = concurrency
+        self.required = required
+        self._pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f"dbbackup-{name}")
+
+    def submit(self, source_file: str, target_key: str, metadata: dict | None = None) -> Future:
+        """
+        Queue a copy of a backup file.
+
+        The copy runs in a copy of the caller's context, so metrics keep their database label.
+
+        Returns:
+            Future: Resolves to True if the copy was stored
+        """
+        context = contextvars.copy_context()
+        return self._pool.submit(context.run, self.backend.save_backup, source_file, target_key, metadata)
+
+    def close(self):
+        """
+        Wait for the queued copies and stop the workers.
+        """
+        self._pool.shutdown(wait=True)
+
+
+class StorageFanout:
+    """
+    Store every backup in the backup directory and fan it out to the configured destinations.
+
+    Each destination has its own queue and ``concurrency`` workers, so
+    copies to a slow destination queue up behind each other while the
+    other destinations, and the jobs that only wait for them, keep going.
+    The copy in the backup directory, which the catalog, restores and
+    retention work from, is made by the calling job while the others run.
+    """
+
+    def __init__(self, primary: LocalStorage, destinations: list[Destination], logger: logging.Logger,
+                 s3_storage=None):
+        """
+        Initialize StorageFanout.
+
+        Args:
+            primary (LocalStorage): Storage of the backup directory
+            destinations (list[Destination]): Further destinations, in the order they are logged
+            logger (logging.Logger): Logger instance
+            s3_storage (S3Storage | None): Storage of the aws section, whose keys the catalog records
+        """
+        self.primary = primary
+        self.destinations = destinations
+        self.logger = logger
+        self.s3_storage = s3_storage
+
+    @classmethod
+    def from_config(cls, config, logger: logging.Logger, metrics: MetricsRecorder, primary: LocalStorage,
+                    s3_storage=None) -> "StorageFanout":
+        """
+        Build the destinations listed under ``destinations``.
+
+        Without that section, backups go to the backup directory and, if the
+        ``aws`` section is present, its bucket.
+
+        Args:
+            config: Application configuration
+            logger (logging.Logger): Logger instance
+            metrics (MetricsRecorder): Recorder receiving the storage stages
+            primary (LocalStorage): Storage of the backup directory
+            s3_storage (S3Storage | None): Storage of the aws section
+
+        Returns:
+            StorageFanout: Fan-out over every destination
+        """
+        destinations = []
+        if config.destinations is None:
+            if s3_storage is not None:
+                destinations.append(Destination("s3", S3Backend(s3_storage), config.aws.max_concurrency))
+        else:
+            for destination in config.destinations:
+                backend = BACKENDS[destination.type](destination, config, logger, metrics, s3_storage)
+                destinations.append(Destination(destination.name, backend, destination.concurrency,
+                                                destination.required))
+        return cls(primary, destinations, logger, s3_storage)
+
+    @property
+    def s3_destination(self) -> Optional[Destination]:
+        """
+        The destination storing backups in the bucket of the aws section, if any.
+        """
+        return next((destination for destination in self.destinations
+                     if isinstance(destination.backend, S3Backend) and destination.backend.storage is self.s3_storage),
+                    None)
+
+    def store(self, source_file: str, target_key: str, metadata: dict | None = None) -> Optional[list[str]]:
+        """
+        Copy a backup file to every destination in parallel.
+
+        Args:
+            source_file (str): Path to the backup file, left in place
+            target_key (str): S3-style key of the backup; the backup directory uses its file name
+            metadata (dict | None): Optional user metadata for object stores
+
+        Returns:
+            Optional[list[str]]: Names of the destinations holding the backup, or None if the
+            backup directory or a required destination failed
+        """
+        futures = {destination: destination.submit(source_file, target_key, metadata)
+                   for destination in self.destinations}
+        stored = [PRIMARY_DESTINATION] if self.primary.save_backup(source_file, posixpath.basename(target_key)) else []
+        failed = [] if stored else [PRIMARY_DESTINATION]
+        for destination, future in futures.items():
+            try:
+                saved = future.result()
+            except Exception as e:
+                self.logger.error(f"Copy to destination '{destination.name}' failed: {e}")
+                saved = False
+            if saved:
+                stored.append(destination.name)
+            elif destination.required:
+                failed.append(destination.name)
+            else:
+                self.logger.warning(f"Optional destination '{destination.name}' did not store {target_key}")
+        if failed:
+            self.logger.error(f"{target_key} was not stored in: {', '.join(failed)}")
+            return None
+        return stored
+
+    def open_writers(self, target_key: str) -> TeeWriter:
+        """
+        Open a streaming writer on every destination, the backup directory first.
+
+        As in :meth:`store`, a destination that is not ``required`` is
+        dropped from the backup, with a warning, when its writer fails to
+        open, write or commit.
+
+        Args:
+            target_key (str): S3-style key of the backup
+
+        Returns:
+            TeeWriter: Tee over the writers, in the order of :attr:`destinations`
+        """
+        factories = [lambda: self.primary.open_writer(posixpath.basename(target_key))]
+        factories += [lambda backend=destination.backend: backend.open_writer(target_key)
+                      for destination in self.destinations]
+        return TeeWriter.open(factories, self.logger,
+                              required=[True] + [destination.required for destination in self.destinations],
+                              names=[PRIMARY_DESTINATION] + [destination.name for destination in self.destinations])
+
+    def s3_writer(self, tee: TeeWriter) -> Optional[BackupWriter]:
+        """
+        Return the writer of the aws bucket among the writers of :meth:`open_writers`, unless it was dropped.
+        """
+        destination = self.s3_destination
+        return tee.writers[self.destinations.index(destination) + 1] if destination is not None else None
+
+    def close(self):
+        """
+        Wait for queued copies and stop every destination's workers.
+        """
+        for destination in self.destinations:
+            destination.close()
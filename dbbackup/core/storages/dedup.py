@@ -0,0 +1,575 @@
+"""
+Deduplicating chunk store for plain-text dumps.
+
+A dump stream is split into content-defined chunks. Each unique chunk is
+compressed and stored once under its SHA-256 digest, and every backup is a
+small JSON manifest listing its chunks in order. Tables that did not change
+between two runs produce the same chunks, so only the changed regions of a
+dump take up new space.
+
+Chunking uses FastCDC from the optional ``pyfastcdc`` package when it is
+installed, and a pure-Python line-based chunker otherwise.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, Optional
+from dbbackup.core.compressor import get_codec
+from dbbackup.core.integrity import checksums_match, format_checksum, new_hash
+
+DEDUP_EXTENSION = ".dedup"
+MANIFEST_VERSION = 1
+# Key prefix of the chunk store in S3; hidden so it is never listed as a database
+S3_CHUNK_PREFIX = ".chunks/"
+_PENDING_UPLOADS = ".pending-uploads"
+KB = 1024
+CHUNKERS = ("auto", "fastcdc", "lines")
+
+
+class ContentDefinedChunker:
+    """
+    Split a byte stream into chunks whose boundaries depend only on content.
+
+    Boundaries are placed after a newline, decided by the CRC32 of the line
+    just completed. The cut probability grows with the line length so the
+    average chunk size is ``avg_size`` whatever the lines look like. Because
+    a boundary depends only on the line before it, inserting or deleting rows
+    only changes the chunks around the edit. Lines longer than ``max_size``
+    are cut at ``max_size``.
+
+    Every line costs a few Python operations, which limits this chunker to
+    roughly 50-100 MB/s; :class:`FastCDCChunker` is used instead when
+    ``pyfastcdc`` is installed.
+    """
+
+    def __init__(self, min_size: int = 256 * KB, avg_size: int = 1024 * KB, max_size: int = 4096 * KB):
+        """
+        Initialize ContentDefinedChunker.
+
+        Args:
+            min_size (int): Smallest chunk size in bytes (except for the last chunk)
+            avg_size (int): Target average chunk size in bytes
+            max_size (int): Largest chunk size in bytes
+
+        Raises:
+            ValueError: If the sizes are not ordered min < avg < max
+        """
+        if not 0 < min_size < avg_size < max_size:
+            raise ValueError("Chunk sizes must satisfy 0 < min_size < avg_size < max_size")
+        self.min_size = min_size
+        self.avg_size = avg_size
+        self.max_size = max_size
+        # A line of n bytes ends a chunk when crc32(line) < n * _scale
+        self._scale = (1 << 32) / (avg_size - min_size)
+        self._buffer = bytearray()
+        self._scanned = 0
+
+    def feed(self, data: bytes) -> Iterator[bytes]:
+        """
+        Add data to the stream.
+
+        Yields:
+            bytes: Every chunk completed by the new data
+        """
+        buffer = self._buffer
+        buffer += data
+        start = self._scanned
+        while True:
+            newline = buffer.find(b"\n", start)
+            if newline < 0 or newline >= self.max_size:
+                break
+            end = newline + 1
+            if end >= self.min_size and zlib.crc32(buffer[start:end]) < (end - start) * self._scale:
+                yield bytes(buffer[:end])
+                del buffer[:end]
+                start = 0
+            else:
+                start = end
+        while len(buffer) >= self.max_size:
+            # No boundary before max_size: hard cut, the next chunk starts mid-line
+            yield bytes(buffer[:self.max_size])
+            del buffer[:self.max_size]
+            start = 0
+        self._scanned = min(start, len(buffer))
+
+    def flush(self) -> Iterator[bytes]:
+        """
+        End the stream.
+
+        Yields:
+            bytes: The final, possibly short, chunk if anything is buffered
+        """
+        chunk = bytes(self._buffer)
+        self._buffer = bytearray()
+        self._scanned = 0
+        if chunk:
+            yield chunk
+
+
+class FastCDCChunker:
+    """
+    Split a byte stream into content-defined chunks with FastCDC.
+
+    The gear hash runs in C (the optional ``pyfastcdc`` package), so chunking
+    keeps up with memory bandwidth instead of looping over lines in Python.
+    Boundaries may fall mid-line. A boundary depends only on the bytes before
+    it, so the chunk that ends with the buffered data is cut again once more
+    data arrives.
+    """
+
+    def __init__(self, min_size: int = 256 * KB, avg_size: int = 1024 * KB, max_size: int = 4096 * KB):
+        """
+        Initialize FastCDCChunker.
+
+        Args:
+            min_size (int): Smallest chunk size in bytes (except for the last chunk)
+            avg_size (int): Target average chunk size in bytes
+            max_size (int): Largest chunk size in bytes, at most 16 MiB
+
+        Raises:
+            ValueError: If the sizes are not ordered min < avg < max, are outside
+                FastCDC's limits or ``pyfastcdc`` is not installed
+        """
+        if not 0 < min_size < avg_size < max_size:
+            raise ValueError("Chunk sizes must satisfy 0 < min_size < avg_size < max_size")
+        try:
+            from pyfastcdc import FastCDC
+        except ImportError:
+            raise ValueError("The fastcdc chunker requires the optional 'pyfastcdc' package")
+        # FastCDC only looks for a cut after min_size bytes, so its chunks average avg_size + min_size
+        self._cdc = FastCDC(avg_size - min_size, min_size=min_size, max_size=max_size)
+        self.max_size = max_size
+        self._buffer = bytearray()
+
+    def feed(self, data: bytes) -> Iterator[bytes]:
+        """
+        Add data to the stream.
+
+        Yields:
+            bytes: Every chunk completed by the new data
+        """
+        self._buffer += data
+        if len(self._buffer) >= self.max_size:  # At least the first chunk is final
+            yield from self._cut(final=False)
+
+    def flush(self) -> Iterator[bytes]:
+        """
+        End the stream.
+
+        Yields:
+            bytes: The remaining chunks
+        """
+        yield from self._cut(final=True)
+
+    def _cut(self, final: bool) -> Iterator[bytes]:
+        data = bytes(self._buffer)
+        cuts = [(chunk.offset, chunk.length) for chunk in self._cdc.cut_buf(data)]
+        if not final:
+            cuts.pop()
+        consumed = cuts[-1][0] + cuts[-1][1] if cuts else 0
+        del self._buffer[:consumed]
+        for offset, length in cuts:
+            yield data[offset:offset + length]
+
+
+def is_fastcdc_available() -> bool:
+    """
+    Return True if the ``pyfastcdc`` package is installed.
+    """
+    try:
+        import pyfastcdc  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class DedupBackupWriter:
+    """
+    Streaming writer that stores a dump as deduplicated chunks plus a manifest.
+
+    The manifest is written on commit, so a backup only becomes visible once
+    all of its chunks are stored. Chunks stored by an aborted backup are left
+    for :meth:`DedupStorage.collect_garbage`, since a concurrent backup may
+    already reference them. With ``pending`` set, each new chunk is recorded
+    for upload as soon as it is stored, so chunks of a backup that crashes
+    before its upload are uploaded by a later one.
+    """
+
+    def __init__(self, store: "DedupStorage", manifest_path: Path, database: str, created_at: datetime,
+                 algorithm: str = "sha256", pending: bool = False):
+        """
+        Initialize DedupBackupWriter.
+
+        Args:
+            store (DedupStorage): Chunk store receiving the chunks
+            manifest_path (Path): Final path of the backup manifest
+            database (str): Database name recorded in the manifest
+            created_at (datetime): Backup time recorded in the manifest
+            algorithm (str): Checksum algorithm for the whole dump stream
+            pending (bool): Record new chunks as pending uploads
+        """
+        self.store = store
+        self.manifest_path = manifest_path
+        self.database = database
+        self.created_at = created_at
+        self.algorithm = algorithm
+        self.chunker = store.new_chunker()
+        self.chunks: list[tuple[str, int]] = []
+        self.new_chunks: list[tuple[str, Path]] = []
+        self.bytes_in = 0
+        self.bytes_stored = 0
+        self.pending = pending
+        self._hash = new_hash(algorithm)
+
+    def write(self, data: bytes):
+        self._hash.update(data)
+        self.bytes_in += len(data)
+        for chunk in self.chunker.feed(data):
+            self._store(chunk)
+
+    def commit(self):
+        """
+        Store the last chunk and write the manifest atomically.
+        """
+        for chunk in self.chunker.flush():
+            self._store(chunk)
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "database": self.database,
+            "created_at": self.created_at.isoformat(timespec="seconds"),
+            "codec": self.store.codec.name,
+            "size": self.bytes_in,
+            "checksum": format_checksum(self.algorithm, self._hash.hexdigest()),
+            "chunks": self.chunks,
+        }
+        partial_path = self.manifest_path.with_name(f".{self.manifest_path.name}.partial")
+        partial_path.write_text(json.dumps(manifest))
+        os.replace(partial_path, self.manifest_path)
+        self.store.logger.info(
+            f"Dedup backup saved: {self.manifest_path} ({len(self.chunks)} chunks, "
+            f"{len(self.new_chunks)} new, {self.bytes_stored} of {self.bytes_in} bytes stored)"
+        )
+
+    def abort(self):
+        self.store.logger.warning(f"Dedup backup discarded: {self.manifest_path}")
+
+    def _store(self, chunk: bytes):
+        digest = hashlib.sha256(chunk).hexdigest()
+        self.chunks.append((digest, len(chunk)))
+        stored = self.store.put_chunk(digest, chunk)
+        if stored is not None:
+            if self.pending:
+                self.store.mark_pending([stored])
+            self.new_chunks.append((digest, stored))
+            self.bytes_stored += stored.stat().st_size
+
+
+class DedupReader:
+    """
+    Read-only stream returning the original dump from a manifest's chunks.
+
+    Every chunk is checked against its digest and the whole stream against
+    the manifest checksum, so a damaged store raises instead of restoring
+    wrong data.
+    """
+
+    def __init__(self, store: "DedupStorage", manifest: dict):
+        self.store = store
+        self.manifest = manifest
+        self._chunks = iter(manifest["chunks"])
+        self._buffer = b""
+        self._offset = 0
+        algorithm = manifest["checksum"].partition(":")[0]
+        self._hash = new_hash(algorithm)
+        self._algorithm = algorithm
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        """
+        Read up to ``size`` bytes (everything when ``size`` is negative).
+
+        Raises:
+            ValueError: If a chunk or the whole stream does not match its checksum
+            FileNotFoundError: If a chunk is missing from the store
+        """
+        parts = []
+        remaining = size
+        while remaining != 0:
+            if self._offset >= len(self._buffer) and not self._next_chunk():
+                break
+            end = len(self._buffer) if remaining < 0 else min(len(self._buffer), self._offset + remaining)
+            parts.append(self._buffer[self._offset:end])
+            if remaining > 0:
+                remaining -= end - self._offset
+            self._offset = end
+        return b"".join(parts)
+
+    def _next_chunk(self) -> bool:
+        entry = next(self._chunks, None)
+        if entry is None:
+            actual = format_checksum(self._algorithm, self._hash.hexdigest())
+            if not checksums_match(self.manifest["checksum"], actual):
+                raise ValueError(f"Dedup backup checksum mismatch: {actual}")
+            return False
+        digest, size = entry
+        data = self.store.get_chunk(digest, self.manifest["codec"])
+        if len(data) != size or hashlib.sha256(data).hexdigest() != digest:
+            raise ValueError(f"Dedup chunk {digest} is corrupted")
+        self._hash.update(data)
+        self._buffer = data
+        self._offset = 0
+        return True
+
+
+class DedupStorage:
+    """
+    Content-addressed chunk store shared by all deduplicated backups.
+
+    Chunks live under ``store_dir/<first two hex digits>/<digest><codec extension>``.
+    """
+
+    def __init__(self, store_dir: str, logger: logging.Logger, codec: str = "gzip", level: int | None = None,
+                 min_chunk_size: int = 256 * KB, avg_chunk_size: int = 1024 * KB,
+                 max_chunk_size: int = 4096 * KB, chunker: str = "auto"):
+        """
+        Initialize DedupStorage.
+
+        Args:
+            store_dir (str): Directory holding the chunks
+            logger (logging.Logger): Logger instance
+            codec (str): Codec used to compress each chunk
+            level (int | None): Compression level, or None for the codec default
+            min_chunk_size (int): Smallest chunk size in bytes
+            avg_chunk_size (int): Target average chunk size in bytes
+            max_chunk_size (int): Largest chunk size in bytes
+            chunker (str): 'fastcdc', 'lines', or 'auto' for fastcdc when ``pyfastcdc`` is installed.
+                Switching chunkers moves every boundary, so the next backup stores all chunks anew
+
+        Raises:
+            ValueError: If the chunker is unknown or unavailable, or the chunk sizes are invalid for it
+        """
+        self.store_dir = Path(store_dir)
+        self.logger = logger
+        self.codec = get_codec(codec)
+        self.level = level
+        self.chunk_sizes = (min_chunk_size, avg_chunk_size, max_chunk_size)
+        if chunker not in CHUNKERS:
+            raise ValueError(f"Unsupported chunker '{chunker}'. Use {', '.join(CHUNKERS)}.")
+        if chunker == "auto":
+            chunker = "fastcdc" if is_fastcdc_available() else "lines"
+        self._chunker_class = FastCDCChunker if chunker == "fastcdc" else ContentDefinedChunker
+        self.new_chunker()  # Validate the sizes early
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self._pending_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config, logger: logging.Logger) -> "DedupStorage":
+        """
+        Create a DedupStorage from the ``dedup`` and ``compression`` configuration sections.
+
+        The store defaults to the hidden ``.chunks`` directory inside ``backup_dir``.
+        """
+        dedup = config.dedup
+        return cls(
+            dedup.store_dir or str(Path(config.paths.backup_dir) / ".chunks"),
+            logger,
+            codec=config.compression.method,
+            level=config.compression.level,
+            min_chunk_size=dedup.min_chunk_kb * KB,
+            avg_chunk_size=dedup.avg_chunk_kb * KB,
+            max_chunk_size=dedup.max_chunk_kb * KB,
+            chunker=dedup.chunker,
+        )
+
+    def new_chunker(self) -> ContentDefinedChunker | FastCDCChunker:
+        return self._chunker_class(*self.chunk_sizes)
+
+    def open_writer(self, manifest_path: Path, database: str, created_at: datetime,
+                    algorithm: str = "sha256", pending: bool = False) -> DedupBackupWriter:
+        """
+        Open a streaming writer for a new deduplicated backup.
+
+        Args:
+            manifest_path (Path): Final path of the backup manifest
+            database (str): Database name
+            created_at (datetime): Backup time
+            algorithm (str): Checksum algorithm for the dump stream
+            pending (bool): Record every new chunk as a pending upload as soon as it is stored
+
+        Returns:
+            DedupBackupWriter: Writer that must be committed or aborted
+        """
+        return DedupBackupWriter(self, Path(manifest_path), database, created_at, algorithm, pending)
+
+    def open_reader(self, manifest_path: str) -> DedupReader:
+        """
+        Open the original dump of a deduplicated backup for streaming.
+
+        Args:
+            manifest_path (str): Path to the backup manifest
+
+        Returns:
+            DedupReader: Stream of the reassembled dump
+        """
+        return DedupReader(self, read_dedup_manifest(manifest_path))
+
+    def chunk_path(self, digest: str, codec_name: str | None = None) -> Path:
+        extension = get_codec(codec_name).extension if codec_name else self.codec.extension
+        return self.store_dir / digest[:2] / f"{digest}{extension}"
+
+    def chunk_key(self, path: Path) -> str:
+        """
+        Return the S3 key mirroring a stored chunk.
+        """
+        return f"{S3_CHUNK_PREFIX}{path.parent.name}/{path.name}"
+
+    def mark_pending(self, paths: list[Path]):
+        """
+        Record chunks that still have to be uploaded.
+        """
+        with self._pending_lock, open(self.store_dir / _PENDING_UPLOADS, "a") as f:
+            f.writelines(f"{path}\n" for path in paths)
+
+    def pending_uploads(self) -> list[Path]:
+        """
+        Return the recorded chunks that are still in the store and not yet uploaded.
+        """
+        with self._pending_lock:
+            paths = self._read_pending()
+        return [path for path in sorted(paths) if path.exists()]
+
+    def clear_pending(self, paths: list[Path]):
+        """
+        Forget pending chunks once they are uploaded, keeping any recorded since.
+        """
+        done = set(paths)
+        pending_file = self.store_dir / _PENDING_UPLOADS
+        with self._pending_lock:
+            remaining = self._read_pending() - done
+            if remaining:
+                partial_path = pending_file.with_name(f"{_PENDING_UPLOADS}.partial")
+                partial_path.write_text("".join(f"{path}\n" for path in sorted(remaining)))
+                os.replace(partial_path, pending_file)
+            else:
+                pending_file.unlink(missing_ok=True)
+
+    def _read_pending(self) -> set[Path]:
+        pending_file = self.store_dir / _PENDING_UPLOADS
+        if not pending_file.exists():
+            return set()
+        return {Path(line) for line in pending_file.read_text().splitlines() if line}
+
+    def put_chunk(self, digest: str, data: bytes) -> Optional[Path]:
+        """
+        Compress and store a chunk unless it is already in the store.
+
+        Returns:
+            Optional[Path]: Path of the newly stored chunk, or None if it already existed
+        """
+        path = self.chunk_path(digest)
+        if path.exists():
+            try:
+                # Restart the grace period so garbage collection spares a chunk an unfinished backup reuses
+                os.utime(path)
+                return None
+            except FileNotFoundError:
+                pass  # Collected in the meantime, store it again
+        path.parent.mkdir(exist_ok=True)
+        compressor = self.codec.compressobj(self.level, 1)
+        partial_path = path.with_name(f".{path.name}.{os.getpid()}.partial")
+        with open(partial_path, "wb") as f:
+            f.write(compressor.compress(data))
+            f.write(compressor.flush())
+        os.replace(partial_path, path)
+        return path
+
+    def get_chunk(self, digest: str, codec_name: str) -> bytes:
+        """
+        Read and decompress a stored chunk.
+        """
+        codec = get_codec(codec_name)
+        with open(self.chunk_path(digest, codec_name), "rb") as f:
+            return codec.open_reader(f).read()
+
+    def collect_garbage(self, manifest_paths: list[str], grace_seconds: int = 3600) -> int:
+        """
+        Delete chunks no manifest references anymore.
+
+        Chunks stored or reused within ``grace_seconds`` are kept so a backup
+        still being written never loses the chunks it references.
+
+        Args:
+            manifest_paths (list[str]): Manifests of every backup that is kept
+            grace_seconds (int): Minimum age of a chunk before it may be deleted
+
+        Returns:
+            int: Number of deleted chunks
+        """
+        referenced = referenced_chunks(manifest_paths)
+
+        cutoff = time.time() - grace_seconds
+        deleted = 0
+        for path in self.store_dir.glob("*/*"):
+            digest = path.name.split(".", 1)[0]
+            if path.name.startswith(".") or digest in referenced or path.stat().st_mtime > cutoff:
+                continue
+            path.unlink(missing_ok=True)
+            deleted += 1
+        if deleted:
+            self.logger.info(f"Removed {deleted} unreferenced chunk(s) from {self.store_dir}")
+        return deleted
+
+    def recent_chunks(self, grace_seconds: int) -> set[str]:
+        """
+        Return the digests of chunks stored or reused within the last ``grace_seconds``.
+        """
+        cutoff = time.time() - grace_seconds
+        return {path.name.split(".", 1)[0] for path in self.store_dir.glob("*/*")
+                if not path.name.startswith(".") and path.stat().st_mtime > cutoff}
+
+
+def read_dedup_manifest(manifest_path: str) -> dict:
+    """
+    Load a deduplicated backup manifest.
+
+    Raises:
+        ValueError: If the file is not a supported manifest
+    """
+    with open(manifest_path, "rb") as f:
+        return parse_dedup_manifest(f.read(), manifest_path)
+
+
+def parse_dedup_manifest(data: bytes, source: str) -> dict:
+    """
+    Decode a deduplicated backup manifest read from ``source``.
+
+    Raises:
+        ValueError: If the data is not a supported manifest
+    """
+    manifest = json.loads(data)
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"Unsupported dedup manifest version in {source}")
+    return manifest
+
+
+def referenced_chunks(manifest_paths: list[str]) -> set[str]:
+    """
+    Return the digests of every chunk the given manifests reference.
+    """
+    referenced = set()
+    for manifest_path in manifest_paths:
+        referenced.update(digest for digest, _ in read_dedup_manifest(manifest_path)["chunks"])
+    return referenced
+
+
+def is_dedup_backup(path: str) -> bool:
+    return str(path).endswith(DEDUP_EXTENSION)
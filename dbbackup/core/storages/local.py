@@ -2,53 +2,261 @@
 Handle local filesystem storage operations for backups.
 """
 
+import errno
+import fcntl
+import os
+import time
 from pathlib import Path
 import shutil
 import logging
+from dbbackup.core.metrics import MetricsRecorder
 from dbbackup.utils.paths import ensure_directory, validate_file_exists
 
+# Linux ioctl sharing the extents of one file with another (btrfs, XFS with reflink=1)
+FICLONE = 0x40049409
+# Errors meaning a placement method is not available here, after which the next one is tried
+_UNSUPPORTED = {errno.EXDEV, errno.EPERM, errno.EACCES, errno.EMLINK, errno.ENOTSUP, errno.EOPNOTSUPP,
+                errno.EINVAL, errno.ENOSYS, errno.ENOTTY, errno.EBADF, errno.ETXTBSY}
+
+
+def place_file(source: Path, target: Path) -> str:
+    """
+    Place a copy of a file at ``target`` with the least I/O the filesystems allow.
+
+    On the same filesystem the file is hard-linked, so no data is written and
+    ``source`` stays usable. Otherwise it is reflinked, or copied in the kernel
+    with ``copy_file_range`` or ``sendfile``, before falling back to a plain
+    copy. The copy is written to a hidden ``.partial`` name, synced to disk and
+    renamed over ``target``, so readers never see a partial file.
+
+    Args:
+        source (Path): File to place
+        target (Path): Final path of the copy
+
+    Returns:
+        str: Method used: hardlink, reflink, copy_file_range, sendfile or copy
+
+    Raises:
+        OSError: If the file could not be placed; ``target`` is then unchanged
+    """
+    partial = target.with_name(f".{target.name}.partial")
+    partial.unlink(missing_ok=True)
+    try:
+        try:
+            os.link(source, partial)
+            method = "hardlink"
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED:
+                raise
+            method = _copy_file(source, partial)
+            shutil.copystat(source, partial)
+        _fsync_path(partial)
+        os.replace(partial, target)
+        _fsync_path(target.parent)
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+    return method
+
+
+def _copy_file(source: Path, target: Path) -> str:
+    with open(source, "rb") as src, open(target, "wb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            return "reflink"
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED:
+                raise
+        size = os.fstat(src.fileno()).st_size
+        for method in ("copy_file_range", "sendfile"):
+            if hasattr(os, method) and _kernel_copy(method, src.fileno(), dst.fileno(), size):
+                return method
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+        return "copy"
+
+
+def _kernel_copy(method: str, src: int, dst: int, size: int) -> bool:
+    """
+    Copy ``size`` bytes without passing them through user space; False if ``method`` is not supported.
+    """
+    offset = 0
+    while offset < size:
+        try:
+            if method == "copy_file_range":
+                sent = os.copy_file_range(src, dst, size - offset, offset, offset)
+            else:
+                sent = os.sendfile(dst, src, offset, size - offset)
+        except OSError as e:
+            if offset == 0 and e.errno in _UNSUPPORTED:
+                return False
+            raise
+        if sent == 0:
+            raise OSError(errno.EIO, f"Source file ended after {offset} of {size} bytes")
+        offset += sent
+    return True
+
+
+def _fsync_path(path: Path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class LocalBackupWriter:
+    """
+    Streaming writer that places a backup in the backup directory.
+
+    Data goes to a hidden ``.partial`` file that is synced to disk and renamed
+    to its final name on commit, so a backup is only ever visible once it is
+    complete.
+    """
+
+    def __init__(self, target_path: Path, logger: logging.Logger, metrics: MetricsRecorder | None = None,
+                 stage: str = "store_local"):
+        """
+        Initialize LocalBackupWriter.
+
+        Args:
+            target_path (Path): Final path of the backup file
+            logger (logging.Logger): Logger instance
+            metrics (MetricsRecorder | None): Recorder receiving the storage stage
+            stage (str): Name of the recorded stage
+        """
+        self.target_path = target_path
+        self.partial_path = target_path.with_name(f".{target_path.name}.partial")
+        self.logger = logger
+        self.metrics = metrics or MetricsRecorder()
+        self.stage = stage
+        self.bytes_written = 0
+        self._seconds = 0.0
+        self._file = open(self.partial_path, "wb")
+
+    def write(self, data: bytes):
+        started = time.perf_counter()
+        self._file.write(data)
+        self._seconds += time.perf_counter() - started
+        self.bytes_written += len(data)
+
+    def commit(self):
+        """
+        Flush the data to disk and move the file to its final name.
+        """
+        started = time.perf_counter()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self.partial_path, self.target_path)
+        _fsync_path(self.target_path.parent)
+        self._seconds += time.perf_counter() - started
+        self.metrics.record(self.stage, self._seconds, self.bytes_written, self.bytes_written)
+        self.logger.info(f"Backup saved locally: {self.target_path}")
+
+    def abort(self):
+        """
+        Discard the partially written file.
+        """
+        self._file.close()
+        self.partial_path.unlink(missing_ok=True)
+        self.logger.warning(f"Local backup discarded: {self.target_path}")
+
 
 class LocalStorage:
     """
     Local filesystem storage handler for database backups.
     """
 
-    def __init__(self, backup_dir: str, logger: logging.Logger):
+    def __init__(self, backup_dir: str, logger: logging.Logger, metrics: MetricsRecorder | None = None,
+                 stage: str = "store_local"):
         """
         Initialize LocalStorage.
 
         Args:
             backup_dir (str): Path to backup directory
             logger (logging.Logger): Logger instance
+            metrics (MetricsRecorder | None): Recorder receiving the storage stage
+            stage (str): Name of the recorded stage
         """
         self.backup_dir = Path(backup_dir)
         self.logger = logger
+        self.metrics = metrics or MetricsRecorder()
+        self.stage = stage
         ensure_directory(self.backup_dir, logger)  # Ensure backup folder exists
 
-    def save_backup(self, source_file: str, target_filename: str):
+    def save_backup(self, source_file: str, target_filename: str) -> bool:
         """
         Save a backup file to the local backup directory.
 
+        The file is hard-linked, reflinked or copied in the kernel where
+        possible (see :func:`place_file`) and ``source_file`` is left in place.
+
         Args:
             source_file (str): Path to the source file
-            target_filename (str): Desired filename in backup directory
+            target_filename (str): Desired filename in backup directory, which may include subdirectories
+
+        Returns:
+            bool: True if the backup was saved
         """
         target_path = self.backup_dir / target_filename
         if not validate_file_exists(source_file, self.logger):
-            return
+            return False
         try:
-            shutil.copy2(source_file, target_path)
-            self.logger.info(f"Backup saved locally: {target_path}")
+            size = os.path.getsize(source_file)
+            target_path.parent.mkdir(parents=True, exist_ok=True)
+            with self.metrics.stage(self.stage, bytes_in=size, bytes_out=size):
+                method = place_file(Path(source_file), target_path)
+            self.logger.info(f"Backup saved locally ({method}): {target_path}")
+            return True
         except Exception as e:
             self.logger.error(f"Failed to save backup locally: {e}")
+            return False
+
+    def open_writer(self, target_filename: str) -> LocalBackupWriter:
+        """
+        Open a streaming writer for a new backup file.
+
+        Args:
+            target_filename (str): Desired filename in backup directory, which may include subdirectories
+
+        Returns:
+            LocalBackupWriter: Writer that must be committed or aborted
+        """
+        target_path = self.backup_dir / target_filename
+        target_path.parent.mkdir(parents=True, exist_ok=True)
+        return LocalBackupWriter(target_path, self.logger, self.metrics, self.stage)
 
     def list_backups(self) -> list[str]:
         """
         List all backup files in the local backup directory.
 
+        Hidden files, such as backups still being written, are skipped.
+
         Returns:
             list[str]: List of backup file paths
         """
-        files = [str(f) for f in self.backup_dir.glob("*") if f.is_file()]
+        files = [str(f) for f in self.backup_dir.glob("*") if f.is_file() and not f.name.startswith(".")]
         self.logger.debug(f"Local backups found: {files}")
-        return files
\ No newline at end of file
+        return files
+
+    def delete_backups(self, paths: list[str]) -> list[str]:
+        """
+        Delete backup files from the local backup directory.
+
+        Files that are already gone count as deleted.
+
+        Args:
+            paths (list[str]): Paths of the files to delete
+
+        Returns:
+            list[str]: Paths that no longer exist
+        """
+        deleted = []
+        for path in paths:
+            try:
+                Path(path).unlink(missing_ok=True)
+                deleted.append(path)
+                self.logger.debug(f"Local backup deleted: {path}")
+            except OSError as e:
+                self.logger.error(f"Failed to delete local backup {path}: {e}")
+        return deleted
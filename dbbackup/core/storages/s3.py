@@ -2,18 +2,257 @@
 Handle AWS S3 storage operations for database backups.
 """
 
-import boto3
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
 from botocore.exceptions import BotoCoreError, ClientError
 from pathlib import Path
 import logging
+from dbbackup.core.integrity import multipart_etag
+from dbbackup.core.journal import JobJournal
+from dbbackup.core.metrics import MetricsRecorder
+from dbbackup.core.storages.dedup import S3_CHUNK_PREFIX, is_dedup_backup, parse_dedup_manifest
+from dbbackup.core.storages.s3_transfer import (
+    MB,
+    BandwidthThrottle,
+    S3TransferSettings,
+    get_part_executor,
+    get_s3_client,
+    get_throttle,
+    get_transfer_manager,
+)
+
+# S3 rejects multipart parts smaller than 5 MiB (except the last one)
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+# S3 rejects parts larger than 5 GiB and uploads of more than 10,000 parts
+MAX_PART_SIZE = 5 * 1024 ** 3
+MAX_PARTS = 10_000
+
+# Streamed uploads double their part size after every this many parts
+PART_SIZE_STEP = 1_000
+
+# Maximum number of keys a single DeleteObjects request accepts
+DELETE_BATCH_SIZE = 1000
+
+# Minimum age of an unreferenced dedup chunk before it is deleted; chunks are
+# uploaded before their manifest, and reusing a chunk does not refresh it in S3
+CHUNK_GRACE_SECONDS = 24 * 3600
+
+
+@dataclass
+class MultipartUpload:
+    """
+    A multipart upload that was started but neither completed nor aborted.
+    """
+    key: str
+    upload_id: str
+    initiated: datetime
+
+
+@dataclass
+class BackupObject:
+    """
+    A backup object stored in S3.
+    """
+    key: str
+    size: int
+    last_modified: datetime
+    etag: str
+
+
+def transfer_settings(aws_config, **overrides) -> S3TransferSettings:
+    """
+    Build transfer settings from the ``aws`` configuration section.
+
+    Args:
+        aws_config: AWS configuration object
+        **overrides: Settings replacing the configured ones, such as ``endpoint_url``
+
+    Returns:
+        S3TransferSettings: Connection, multipart and retry settings
+    """
+    settings = dict(
+        region=aws_config.region,
+        endpoint_url=aws_config.endpoint_url,
+        multipart_threshold=aws_config.multipart_threshold_mb * MB,
+        multipart_chunksize=aws_config.multipart_chunksize_mb * MB,
+        max_concurrency=aws_config.max_concurrency,
+        max_bandwidth=int(aws_config.max_bandwidth_mb * MB) if aws_config.max_bandwidth_mb else None,
+        max_attempts=aws_config.max_attempts,
+        retry_mode=aws_config.retry_mode,
+    )
+    settings.update(overrides)
+    return S3TransferSettings(**settings)
+
+
+def part_size_for(size: int, part_size: int) -> int:
+    """
+    Return the part size for a multipart upload of a file of known size.
+
+    Args:
+        size (int): Size of the uploaded file in bytes
+        part_size (int): Configured part size
+
+    Returns:
+        int: The configured part size, raised to the S3 minimum and to what
+            keeps the upload within 10,000 parts
+
+    Raises:
+        ValueError: If the file does not fit in 10,000 parts of at most 5 GiB
+    """
+    part_size = max(part_size, MIN_PART_SIZE, -(-size // MAX_PARTS))
+    if part_size > MAX_PART_SIZE:
+        raise ValueError(f"{size} bytes exceed the S3 limit of {MAX_PARTS} parts of {MAX_PART_SIZE} bytes")
+    return part_size
+
+
+class S3MultipartWriter:
+    """
+    Streaming writer that uploads a backup to S3 as a multipart upload.
+
+    Full parts are uploaded on the shared part pool while the stream keeps
+    flowing. At most ``max_in_flight`` parts plus the one being filled are
+    held in memory. The size of the stream is not known up front, so the
+    part size doubles after every 1,000 parts (up to 5 GiB), so the 10,000
+    parts S3 allows cover streams of several TiB even from 5 MiB parts.
+    """
+
+    def __init__(self, client, bucket_name: str, key: str, logger: logging.Logger,
+                 part_size: int = MIN_PART_SIZE, executor: Executor | None = None,
+                 max_in_flight: int = 1, throttle: BandwidthThrottle | None = None,
+                 metrics: MetricsRecorder | None = None, journal: JobJournal | None = None):
+        """
+        Initialize S3MultipartWriter and start the multipart upload.
+
+        The 'upload_s3' stage covers the wall time from creating the upload
+        to completing it, since parts upload in the background meanwhile.
+
+        Args:
+            client: boto3 S3 client
+            bucket_name (str): Name of the S3 bucket
+            key (str): Target object key
+            logger (logging.Logger): Logger instance
+            part_size (int): Size of the first 1,000 uploaded parts in bytes
+            executor (Executor | None): Pool uploading parts, None to upload inline
+            max_in_flight (int): Maximum number of parts uploading at once
+            throttle (BandwidthThrottle | None): Optional shared bandwidth limit
+            metrics (MetricsRecorder | None): Recorder receiving the 'upload_s3' stage
+            journal (JobJournal | None): Journal recording the upload ID, so an
+                interrupted upload can be aborted by garbage collection
+        """
+        self.s3 = client
+        self.bucket_name = bucket_name
+        self.key = key
+        self.logger = logger
+        self.part_size = min(max(part_size, MIN_PART_SIZE), MAX_PART_SIZE)
+        self.executor = executor
+        self.throttle = throttle
+        self._slots = threading.BoundedSemaphore(max(1, max_in_flight))
+        self._buffer = bytearray()
+        self._futures: list[Future] = []
+        self._part_count = 0
+        self.etag: str | None = None
+        self.metrics = metrics or MetricsRecorder()
+        self.bytes_written = 0
+        self._started = time.perf_counter()
+        self.journal = journal
+        response = self.s3.create_multipart_upload(Bucket=bucket_name, Key=key)
+        self.upload_id = response["UploadId"]
+        if self.journal is not None:
+            self.journal.start_upload(self.upload_id, key, self.part_size)
+
+    def write(self, data: bytes):
+        self._buffer += data
+        self.bytes_written += len(data)
+        while len(self._buffer) >= self.part_size:
+            part = bytes(self._buffer[:self.part_size])
+            del self._buffer[:len(part)]
+            self._submit_part(part)
+
+    def commit(self):
+        """
+        Upload the remaining buffered data and complete the multipart upload.
+        """
+        if self._buffer or not self._part_count:
+            self._submit_part(bytes(self._buffer))
+            self._buffer.clear()
+        parts = [future.result() for future in self._futures]
+        self.s3.complete_multipart_upload(
+            Bucket=self.bucket_name,
+            Key=self.key,
+            UploadId=self.upload_id,
+            MultipartUpload={"Parts": parts},
+        )
+        self.etag = multipart_etag([part["ETag"] for part in parts])
+        if self.journal is not None:
+            self.journal.finish_upload(self.upload_id)
+        self.metrics.record("upload_s3", time.perf_counter() - self._started, self.bytes_written, self.bytes_written)
+        self.logger.info(f"Backup uploaded to S3: s3://{self.bucket_name}/{self.key}")
+
+    def abort(self):
+        """
+        Abort the multipart upload so S3 discards the uploaded parts.
+        """
+        for future in self._futures:
+            future.cancel()
+        wait(self._futures)
+        try:
+            self.s3.abort_multipart_upload(Bucket=self.bucket_name, Key=self.key, UploadId=self.upload_id)
+            if self.journal is not None:
+                self.journal.finish_upload(self.upload_id)
+            self.logger.warning(f"S3 upload aborted: s3://{self.bucket_name}/{self.key}")
+        except (BotoCoreError, ClientError) as e:
+            self.logger.error(f"Failed to abort S3 upload {self.upload_id}: {e}")
+
+    def _submit_part(self, body: bytes):
+        # Surface failures of earlier parts instead of streaming into a doomed upload
+        for future in self._futures:
+            if future.done() and future.exception():
+                raise future.exception()
+        if self._part_count == MAX_PARTS:
+            raise ValueError(f"Streamed upload of {self.key} exceeds the S3 limit of {MAX_PARTS} parts")
+        self._part_count += 1
+        if self._part_count % PART_SIZE_STEP == 0:
+            self.part_size = min(self.part_size * 2, MAX_PART_SIZE)
+        if self.executor is None:
+            future = Future()
+            future.set_result(self._upload_part(self._part_count, body))
+        else:
+            self._slots.acquire()
+            future = self.executor.submit(self._upload_part, self._part_count, body)
+            future.add_done_callback(lambda _: self._slots.release())
+        self._futures.append(future)
+
+    def _upload_part(self, part_number: int, body: bytes) -> dict:
+        if self.throttle:
+            self.throttle.consume(len(body))
+        response = self.s3.upload_part(
+            Bucket=self.bucket_name,
+            Key=self.key,
+            UploadId=self.upload_id,
+            PartNumber=part_number,
+            Body=body,
+        )
+        self.logger.debug(f"Uploaded part {part_number} ({len(body)} bytes) of s3://{self.bucket_name}/{self.key}")
+        return {"PartNumber": part_number, "ETag": response["ETag"]}
 
 
 class S3Storage:
     """
     AWS S3 storage handler for database backups.
+
+    The S3 client and transfer manager are fetched on first use, so
+    creating a handler costs nothing for runs that never reach S3.
     """
 
-    def __init__(self, bucket_name: str, logger: logging.Logger, aws_region: str = "us-east-1"):
+    def __init__(self, bucket_name: str, logger: logging.Logger, aws_region: str = "us-east-1",
+                 settings: S3TransferSettings | None = None, metrics: MetricsRecorder | None = None,
+                 journal: JobJournal | None = None):
         """
         Initialize S3Storage.
 
@@ -21,29 +260,188 @@ class S3Storage:
             bucket_name (str): Name of the S3 bucket
             logger (logging.Logger): Logger instance
             aws_region (str): AWS region
+            settings (S3TransferSettings | None): Transfer tuning; defaults to the region's defaults
+            metrics (MetricsRecorder | None): Recorder receiving the 'upload_s3' stage
+            journal (JobJournal | None): Journal making multipart uploads resumable
         """
         self.bucket_name = bucket_name
         self.logger = logger
-        self.s3 = boto3.client("s3", region_name=aws_region)
+        self.metrics = metrics or MetricsRecorder()
+        self.journal = journal
+        self.settings = settings or S3TransferSettings(region=aws_region)
+        self._s3 = None
+        self._transfer = None
+
+    @property
+    def s3(self):
+        """
+        Shared boto3 S3 client, created on first access.
+        """
+        if self._s3 is None:
+            self._s3 = get_s3_client(self.settings)
+        return self._s3
+
+    @s3.setter
+    def s3(self, client):
+        self._s3 = client
 
-    def upload_backup(self, source_file: str, target_key: str):
+    @property
+    def transfer(self):
+        """
+        Shared managed transfer for file uploads and downloads, created on first access.
+        """
+        if self._transfer is None:
+            self._transfer = get_transfer_manager(self.settings)
+        return self._transfer
+
+    @transfer.setter
+    def transfer(self, transfer):
+        self._transfer = transfer
+
+    @classmethod
+    def from_config(cls, aws_config, logger: logging.Logger, metrics: MetricsRecorder | None = None,
+                    journal: JobJournal | None = None) -> "S3Storage":
+        """
+        Create an S3Storage from the ``aws`` configuration section.
+
+        Args:
+            aws_config: AWS configuration object
+            logger (logging.Logger): Logger instance
+            metrics (MetricsRecorder | None): Recorder receiving the 'upload_s3' stage
+            journal (JobJournal | None): Journal making multipart uploads resumable
+
+        Returns:
+            S3Storage: Storage handler sharing the process-wide client
+        """
+        settings = transfer_settings(aws_config)
+        return cls(aws_config.s3_bucket, logger, aws_config.region, settings=settings, metrics=metrics,
+                   journal=journal)
+
+    def upload_backup(self, source_file: str, target_key: str, metadata: dict | None = None) -> bool:
         """
         Upload a local backup file to S3.
 
+        With a journal, files above the multipart threshold are uploaded part
+        by part and every completed part is journaled, so uploading the same
+        file to the same key again continues an interrupted upload.
+
         Args:
             source_file (str): Path to the local backup file
             target_key (str): Desired S3 object key
+            metadata (dict | None): Optional user metadata stored with the object
+
+        Returns:
+            bool: True if the upload succeeded
         """
         path = Path(source_file)
         if not path.exists() or not path.is_file():
             self.logger.error(f"Backup file does not exist: {source_file}")
-            return
+            return False
 
         try:
-            self.s3.upload_file(str(path), self.bucket_name, target_key)
+            extra_args = {"Metadata": metadata} if metadata else None
+            size = path.stat().st_size
+            with self.metrics.stage("upload_s3", bytes_in=size, bytes_out=size):
+                if self.journal is not None and size >= self.settings.multipart_threshold:
+                    self._upload_resumable(path, target_key, metadata)
+                else:
+                    self.transfer.upload_file(str(path), self.bucket_name, target_key, extra_args=extra_args)
             self.logger.info(f"Backup uploaded to S3: s3://{self.bucket_name}/{target_key}")
-        except (BotoCoreError, ClientError) as e:
+            return True
+        except (BotoCoreError, ClientError, ValueError) as e:
             self.logger.error(f"S3 upload failed: {e}")
+            return False
+
+    def upload_backups(self, uploads: list[tuple[str, str]]) -> bool:
+        """
+        Upload several local files concurrently.
+
+        Args:
+            uploads (list[tuple[str, str]]): (source file, target key) pairs
+
+        Returns:
+            bool: True if every upload succeeded
+        """
+        if not uploads:
+            return True
+        workers = min(len(uploads), self.settings.max_concurrency)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dbbackup-s3-upload") as pool:
+            # Each upload runs in a copy of the caller's context so metrics keep their database label
+            futures = [pool.submit(contextvars.copy_context().run, self.upload_backup, *upload) for upload in uploads]
+            return all(future.result() for future in futures)
+
+    def open_writer(self, target_key: str) -> S3MultipartWriter:
+        """
+        Open a streaming multipart writer for a new backup object.
+
+        Args:
+            target_key (str): Desired S3 object key
+
+        Returns:
+            S3MultipartWriter: Writer that must be committed or aborted
+        """
+        return S3MultipartWriter(
+            self.s3,
+            self.bucket_name,
+            target_key,
+            self.logger,
+            part_size=self.settings.multipart_chunksize,
+            executor=get_part_executor(self.settings),
+            max_in_flight=self.settings.max_concurrency,
+            throttle=get_throttle(self.settings),
+            metrics=self.metrics,
+            journal=self.journal,
+        )
+
+    def download_backup(self, key: str, target_file: str) -> bool:
+        """
+        Download a backup object to a local file.
+
+        Args:
+            key (str): S3 object key
+            target_file (str): Local destination path
+
+        Returns:
+            bool: True if the download succeeded
+        """
+        try:
+            self.transfer.download_file(self.bucket_name, key, target_file)
+            self.logger.info(f"Backup downloaded from S3: s3://{self.bucket_name}/{key}")
+            return True
+        except (BotoCoreError, ClientError) as e:
+            self.logger.error(f"S3 download failed for {key}: {e}")
+            return False
+
+    def read_object(self, key: str) -> bytes:
+        """
+        Read a small object, such as a dedup manifest, into memory.
+
+        Args:
+            key (str): S3 object key
+
+        Returns:
+            bytes: Object content
+
+        Raises:
+            BotoCoreError, ClientError: If the object cannot be read
+        """
+        return self.s3.get_object(Bucket=self.bucket_name, Key=key)["Body"].read()
+
+    def head_backup(self, key: str) -> dict | None:
+        """
+        Fetch the size, ETag and user metadata of a backup object without downloading it.
+
+        Args:
+            key (str): S3 object key
+
+        Returns:
+            dict | None: head_object response, or None if the object is missing or unreachable
+        """
+        try:
+            return self.s3.head_object(Bucket=self.bucket_name, Key=key)
+        except (BotoCoreError, ClientError) as e:
+            self.logger.error(f"S3 head failed for {key}: {e}")
+            return None
 
     def list_backups(self, prefix: str = "") -> list[str]:
         """
@@ -55,12 +453,249 @@ class S3Storage:
         Returns:
             list[str]: List of S3 object keys
         """
+        return [obj.key for obj in self.list_backup_objects(prefix)]
+
+    def list_backup_objects(self, prefix: str = "", prefixes: list[str] | None = None,
+                            include_hidden: bool = False,
+                            start_after: dict[str, str] | None = None,
+                            strict: bool = False) -> list[BackupObject]:
+        """
+        List backup objects with size, modification time and ETag.
+
+        Every page of the listing is followed, so buckets with more than
+        1000 keys are listed completely. When several prefixes are given
+        they are listed in parallel.
+
+        Args:
+            prefix (str): Key prefix to list
+            prefixes (list[str] | None): Several key prefixes to list concurrently instead of ``prefix``
+            include_hidden (bool): Also return keys starting with '.', such as archived logs
+            start_after (dict[str, str] | None): Per prefix, the key after which listing starts,
+                so only keys sorting after it are returned
+            strict (bool): Raise listing errors instead of logging them and returning no objects
+
+        Returns:
+            list[BackupObject]: Objects sorted by key
+        """
+        start_after = start_after or {}
         try:
-            response = self.s3.list_objects_v2(Bucket=self.bucket_name, Prefix=prefix)
-            objects = response.get("Contents", [])
-            keys = [obj["Key"] for obj in objects]
-            self.logger.debug(f"S3 backups found: {keys}")
-            return keys
+            if prefixes is None:
+                objects = self._list_prefix(prefix, include_hidden, start_after.get(prefix, ""))
+            else:
+                workers = min(len(prefixes), self.settings.max_concurrency) or 1
+                with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dbbackup-s3-list") as pool:
+                    pages = pool.map(lambda p: self._list_prefix(p, include_hidden, start_after.get(p, "")), prefixes)
+                    objects = [obj for page in pages for obj in page]
         except (BotoCoreError, ClientError) as e:
+            if strict:
+                raise
             self.logger.error(f"S3 list backups failed: {e}")
-            return []
\ No newline at end of file
+            return []
+        objects.sort(key=lambda obj: obj.key)
+        self.logger.debug(f"S3 backups found: {len(objects)} object(s)")
+        return objects
+
+    def delete_backups(self, keys: list[str]) -> list[str]:
+        """
+        Delete backup objects with batched DeleteObjects requests.
+
+        Args:
+            keys (list[str]): S3 object keys to delete
+
+        Returns:
+            list[str]: Keys that were deleted
+        """
+        deleted = []
+        for start in range(0, len(keys), DELETE_BATCH_SIZE):
+            batch = keys[start:start + DELETE_BATCH_SIZE]
+            try:
+                response = self.s3.delete_objects(
+                    Bucket=self.bucket_name,
+                    Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True},
+                )
+            except (BotoCoreError, ClientError) as e:
+                self.logger.error(f"S3 delete failed for {len(batch)} object(s): {e}")
+                continue
+            errors = response.get("Errors", [])
+            for error in errors:
+                self.logger.error(f"S3 delete failed for {error['Key']}: {error.get('Message', error.get('Code'))}")
+            failed = {error["Key"] for error in errors}
+            deleted.extend(key for key in batch if key not in failed)
+        self.logger.debug(f"S3 objects deleted: {len(deleted)} of {len(keys)}")
+        return deleted
+
+    def collect_chunks(self, referenced: set[str], grace_seconds: int = CHUNK_GRACE_SECONDS) -> int:
+        """
+        Delete dedup chunks under ``.chunks/`` that no manifest in the bucket references.
+
+        The references are counted over every ``.dedup`` manifest in the
+        bucket, whichever host uploaded it, plus ``referenced``. Nothing is
+        deleted if the bucket cannot be listed or a manifest cannot be read.
+
+        Args:
+            referenced (set[str]): Digests also in use, such as those of local manifests
+            grace_seconds (int): Minimum age of a chunk before it may be deleted
+
+        Returns:
+            int: Number of deleted chunks
+        """
+        referenced = set(referenced)
+        try:
+            for obj in self.list_backup_objects(strict=True):
+                if is_dedup_backup(obj.key):
+                    manifest = parse_dedup_manifest(self.read_object(obj.key), f"s3://{self.bucket_name}/{obj.key}")
+                    referenced.update(digest for digest, _ in manifest["chunks"])
+            chunks = self.list_backup_objects(S3_CHUNK_PREFIX, include_hidden=True, strict=True)
+        except (BotoCoreError, ClientError, ValueError) as e:
+            self.logger.error(f"S3 chunk collection skipped: {e}")
+            return 0
+
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=grace_seconds)
+        unreferenced = [obj.key for obj in chunks
+                        if Path(obj.key).name.split(".", 1)[0] not in referenced and obj.last_modified < cutoff]
+        deleted = self.delete_backups(unreferenced) if unreferenced else []
+        if deleted:
+            self.logger.info(f"Removed {len(deleted)} unreferenced chunk(s) from "
+                             f"s3://{self.bucket_name}/{S3_CHUNK_PREFIX}")
+        return len(deleted)
+
+    def list_multipart_uploads(self) -> list[MultipartUpload]:
+        """
+        List the multipart uploads of the bucket that were never completed or aborted.
+
+        Returns:
+            list[MultipartUpload]: Unfinished uploads, empty if they cannot be listed
+        """
+        paginator = self.s3.get_paginator("list_multipart_uploads")
+        uploads = []
+        try:
+            for page in paginator.paginate(Bucket=self.bucket_name):
+                uploads.extend(MultipartUpload(upload["Key"], upload["UploadId"], upload["Initiated"])
+                               for upload in page.get("Uploads", []))
+        except (BotoCoreError, ClientError) as e:
+            self.logger.error(f"S3 list multipart uploads failed: {e}")
+        return uploads
+
+    def abort_upload(self, key: str, upload_id: str) -> bool:
+        """
+        Abort a multipart upload so S3 discards its parts.
+
+        Returns:
+            bool: True if the upload was aborted or no longer exists
+        """
+        try:
+            self.s3.abort_multipart_upload(Bucket=self.bucket_name, Key=key, UploadId=upload_id)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") != "NoSuchUpload":
+                self.logger.error(f"Failed to abort S3 upload {upload_id} of {key}: {e}")
+                return False
+        except BotoCoreError as e:
+            self.logger.error(f"Failed to abort S3 upload {upload_id} of {key}: {e}")
+            return False
+        if self.journal is not None:
+            self.journal.finish_upload(upload_id)
+        return True
+
+    def list_database_prefixes(self, strict: bool = False) -> list[str]:
+        """
+        List the top-level ``db_name/`` prefixes of the bucket.
+
+        Hidden prefixes such as the dedup chunk store are skipped.
+
+        Args:
+            strict (bool): Raise listing errors instead of logging them and returning the prefixes listed so far
+
+        Returns:
+            list[str]: Prefixes such as ``['mydb1/', 'mydb2/']``
+        """
+        paginator = self.s3.get_paginator("list_objects_v2")
+        prefixes = []
+        try:
+            for page in paginator.paginate(Bucket=self.bucket_name, Delimiter="/"):
+                prefixes.extend(p["Prefix"] for p in page.get("CommonPrefixes", []) if not p["Prefix"].startswith("."))
+        except (BotoCoreError, ClientError) as e:
+            if strict:
+                raise
+            self.logger.error(f"S3 list prefixes failed: {e}")
+        return prefixes
+
+    def _upload_resumable(self, path: Path, target_key: str, metadata: dict | None):
+        """
+        Upload a file as a journaled multipart upload, skipping parts an earlier attempt completed.
+
+        Parts count as completed only if S3 still lists them with the ETag
+        the journal recorded.
+        """
+        stat = path.stat()
+        upload = self.journal.find_upload(target_key, str(path), stat.st_size, stat.st_mtime_ns)
+        done: dict[int, str] = {}
+        if upload is not None:
+            try:
+                listed = self._list_parts(target_key, upload.upload_id)
+                done = {number: etag for number, etag in upload.parts.items() if listed.get(number) == etag}
+                upload_id, part_size = upload.upload_id, upload.part_size
+            except ClientError as e:
+                self.logger.warning(f"Interrupted S3 upload of {target_key} cannot be resumed: {e}")
+                self.journal.finish_upload(upload.upload_id)
+                upload = None
+        if upload is None:
+            part_size = part_size_for(stat.st_size, self.settings.multipart_chunksize)
+            extra = {"Metadata": metadata} if metadata else {}
+            upload_id = self.s3.create_multipart_upload(Bucket=self.bucket_name, Key=target_key, **extra)["UploadId"]
+            self.journal.start_upload(upload_id, target_key, part_size, str(path), stat.st_size, stat.st_mtime_ns)
+
+        part_count = max(1, -(-stat.st_size // part_size))
+        if done:
+            self.logger.info(f"Resuming S3 upload of {target_key}: {len(done)} of {part_count} parts already uploaded")
+        throttle = get_throttle(self.settings)
+
+        def upload_part(part_number: int) -> str:
+            with open(path, "rb") as f:
+                body = os.pread(f.fileno(), part_size, (part_number - 1) * part_size)
+            if throttle:
+                throttle.consume(len(body))
+            etag = self.s3.upload_part(Bucket=self.bucket_name, Key=target_key, UploadId=upload_id,
+                                       PartNumber=part_number, Body=body)["ETag"]
+            self.journal.add_part(upload_id, part_number, etag)
+            return etag
+
+        executor = get_part_executor(self.settings)
+        futures = {number: executor.submit(upload_part, number)
+                   for number in range(1, part_count + 1) if number not in done}
+        try:
+            done.update({number: future.result() for number, future in futures.items()})
+        except BaseException:
+            for future in futures.values():
+                future.cancel()
+            self.journal.release_upload(upload_id)  # The next attempt resumes it
+            raise
+        self.s3.complete_multipart_upload(
+            Bucket=self.bucket_name,
+            Key=target_key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": [{"PartNumber": number, "ETag": done[number]} for number in sorted(done)]},
+        )
+        self.journal.finish_upload(upload_id)
+
+    def _list_parts(self, key: str, upload_id: str) -> dict[int, str]:
+        paginator = self.s3.get_paginator("list_parts")
+        parts = {}
+        for page in paginator.paginate(Bucket=self.bucket_name, Key=key, UploadId=upload_id):
+            parts.update({part["PartNumber"]: part["ETag"] for part in page.get("Parts", [])})
+        return parts
+
+    def _list_prefix(self, prefix: str, include_hidden: bool = False, start_after: str = "") -> list[BackupObject]:
+        paginator = self.s3.get_paginator("list_objects_v2")
+        extra = {"StartAfter": start_after} if start_after else {}
+        objects = []
+        for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix, **extra):
+            for obj in page.get("Contents", []):
+                if obj["Key"].startswith(".") and not include_hidden:
+                    continue  # Hidden keys, like the dedup chunk store, are not backups
+                objects.append(BackupObject(
+                    key=obj["Key"],
+                    size=obj["Size"],
+                    last_modified=obj["LastModified"],
+                    etag=obj["ETag"].strip('"'),
+                ))
+        return objects
@@ -0,0 +1,163 @@
+"""
+Share S3 clients, transfer managers and upload bandwidth across the whole process.
+
+Every storage handler created with the same settings reuses one boto3
+client (and its connection pool) and one transfer manager instead of
+building its own. boto3 is imported when the first client is created,
+not when this module is imported.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+MB = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class S3TransferSettings:
+    """
+    Connection, multipart and retry settings for S3 transfers.
+    """
+    region: str = "us-east-1"
+    endpoint_url: Optional[str] = None
+    multipart_threshold: int = 64 * MB
+    multipart_chunksize: int = 64 * MB
+    max_concurrency: int = 10
+    max_bandwidth: Optional[int] = None  # Bytes per second, None for unlimited
+    max_attempts: int = 5
+    retry_mode: str = "standard"
+    profile: Optional[str] = None  # Named profile of the shared AWS credentials file
+    addressing_style: str = "auto"  # 'path' for S3-compatible servers such as MinIO
+
+
+class BandwidthThrottle:
+    """
+    Token bucket limiting the combined throughput of all callers.
+    """
+
+    def __init__(self, bytes_per_second: int):
+        self.rate = bytes_per_second
+        self._allowance = float(bytes_per_second)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, amount: int):
+        """
+        Block until ``amount`` bytes may be sent.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._allowance = min(self.rate, self._allowance + (now - self._last) * self.rate)
+            self._last = now
+            self._allowance -= amount
+            delay = -self._allowance / self.rate if self._allowance < 0 else 0.0
+        if delay:
+            time.sleep(delay)
+
+
+_lock = threading.Lock()
+_clients: dict[S3TransferSettings, object] = {}
+_transfers: dict[S3TransferSettings, "S3Transfer"] = {}
+_part_pools: dict[S3TransferSettings, ThreadPoolExecutor] = {}
+_throttles: dict[S3TransferSettings, BandwidthThrottle] = {}
+
+
+def get_s3_client(settings: S3TransferSettings):
+    """
+    Return the process-wide S3 client for the given settings.
+
+    Args:
+        settings (S3TransferSettings): Transfer settings
+
+    Returns:
+        botocore.client.S3: Shared, thread-safe S3 client
+    """
+    with _lock:
+        client = _clients.get(settings)
+        if client is None:
+            import boto3
+            from botocore.config import Config as BotoConfig
+
+            boto_config = BotoConfig(
+                retries={"max_attempts": settings.max_attempts, "mode": settings.retry_mode},
+                max_pool_connections=max(10, settings.max_concurrency * 2),
+                s3={"addressing_style": settings.addressing_style},
+            )
+            client = boto3.Session(profile_name=settings.profile).client(
+                "s3",
+                region_name=settings.region,
+                endpoint_url=settings.endpoint_url,
+                config=boto_config,
+            )
+            _clients[settings] = client
+        return client
+
+
+def get_transfer_manager(settings: S3TransferSettings) -> "S3Transfer":
+    """
+    Return the process-wide managed transfer for the given settings.
+
+    Args:
+        settings (S3TransferSettings): Transfer settings
+
+    Returns:
+        S3Transfer: Shared transfer manager for file uploads and downloads
+    """
+    client = get_s3_client(settings)
+    with _lock:
+        transfer = _transfers.get(settings)
+        if transfer is None:
+            from boto3.s3.transfer import S3Transfer, TransferConfig
+
+            transfer_config = TransferConfig(
+                multipart_threshold=settings.multipart_threshold,
+                multipart_chunksize=settings.multipart_chunksize,
+                max_concurrency=settings.max_concurrency,
+                max_bandwidth=settings.max_bandwidth,
+                use_threads=True,
+            )
+            transfer = S3Transfer(client=client, config=transfer_config)
+            _transfers[settings] = transfer
+        return transfer
+
+
+def get_part_executor(settings: S3TransferSettings) -> ThreadPoolExecutor:
+    """
+    Return the process-wide thread pool uploading streamed multipart parts.
+    """
+    with _lock:
+        pool = _part_pools.get(settings)
+        if pool is None:
+            pool = ThreadPoolExecutor(max_workers=settings.max_concurrency, thread_name_prefix="dbbackup-s3")
+            _part_pools[settings] = pool
+        return pool
+
+
+def get_throttle(settings: S3TransferSettings) -> Optional[BandwidthThrottle]:
+    """
+    Return the process-wide bandwidth throttle, or None when bandwidth is unlimited.
+    """
+    if not settings.max_bandwidth:
+        return None
+    with _lock:
+        throttle = _throttles.get(settings)
+        if throttle is None:
+            throttle = BandwidthThrottle(settings.max_bandwidth)
+            _throttles[settings] = throttle
+        return throttle
+
+
+def reset_transfer_cache():
+    """
+    Drop all shared clients, transfer managers and pools (used by tests).
+    """
+    with _lock:
+        for pool in _part_pools.values():
+            pool.shutdown(wait=False)
+        _clients.clear()
+        _transfers.clear()
+        _part_pools.clear()
+        _throttles.clear()
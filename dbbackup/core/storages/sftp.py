@@ -0,0 +1,221 @@
+"""
+Handle SFTP storage operations for database backups.
+"""
+
+import logging
+import os
+import posixpath
+import threading
+import time
+from dbbackup.core.metrics import MetricsRecorder
+
+# Bytes read from the local file per SFTP write request batch
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def _paramiko():
+    try:
+        import paramiko
+    except ImportError:
+        raise ValueError("SFTP destinations require the optional 'paramiko' package")
+    return paramiko
+
+
+class SFTPBackupWriter:
+    """
+    Streaming writer that uploads a backup to an SFTP server.
+
+    Data goes to a hidden ``.partial`` file that is renamed to its final
+    name on commit, so the server only ever shows complete backups.
+    """
+
+    def __init__(self, sftp, remote_path: str, logger: logging.Logger, metrics: MetricsRecorder | None = None):
+        """
+        Initialize SFTPBackupWriter.
+
+        Args:
+            sftp: Open paramiko SFTP client, owned and closed by the writer
+            remote_path (str): Final path of the backup on the server
+            logger (logging.Logger): Logger instance
+            metrics (MetricsRecorder | None): Recorder receiving the 'upload_sftp' stage
+        """
+        self.sftp = sftp
+        self.remote_path = remote_path
+        self.partial_path = _partial_path(remote_path)
+        self.logger = logger
+        self.metrics = metrics or MetricsRecorder()
+        self.bytes_written = 0
+        self._started = time.perf_counter()
+        self._file = sftp.open(self.partial_path, "wb")
+        self._file.set_pipelined(True)  # Do not wait for the server to acknowledge each write
+
+    def write(self, data: bytes):
+        self._file.write(data)
+        self.bytes_written += len(data)
+
+    def commit(self):
+        """
+        Close the remote file and move it to its final name.
+        """
+        try:
+            self._file.close()
+            self.sftp.posix_rename(self.partial_path, self.remote_path)
+        finally:
+            self.sftp.close()
+        self.metrics.record("upload_sftp", time.perf_counter() - self._started, self.bytes_written,
+                            self.bytes_written)
+        self.logger.info(f"Backup uploaded over SFTP: {self.remote_path}")
+
+    def abort(self):
+        """
+        Discard the partially uploaded file.
+        """
+        try:
+            self._file.close()
+            self.sftp.remove(self.partial_path)
+        except (OSError, EOFError) as e:
+            self.logger.error(f"Failed to remove partial SFTP upload {self.partial_path}: {e}")
+        finally:
+            self.sftp.close()
+        self.logger.warning(f"SFTP upload discarded: {self.remote_path}")
+
+
+class SFTPStorage:
+    """
+    SFTP storage handler for database backups.
+
+    One SSH connection is opened on first use and shared; every upload runs
+    on its own SFTP channel, so several uploads proceed at once.
+    """
+
+    def __init__(self, host: str, remote_dir: str, logger: logging.Logger, port: int = 22, user: str | None = None,
+                 key_file: str | None = None, password: str | None = None, known_hosts: str | None = None,
+                 metrics: MetricsRecorder | None = None):
+        """
+        Initialize SFTPStorage.
+
+        Args:
+            host (str): SSH server
+            remote_dir (str): Directory on the server backups are stored under
+            logger (logging.Logger): Logger instance
+            port (int): SSH port
+            user (str | None): SSH user, None for the current user
+            key_file (str | None): Private key, None to use the SSH agent and default keys
+            password (str | None): Password or key passphrase
+            known_hosts (str | None): Known hosts file checked in addition to the system one;
+                unknown host keys are rejected
+            metrics (MetricsRecorder | None): Recorder receiving the 'upload_sftp' stage
+        """
+        self.host = host
+        self.remote_dir = remote_dir
+        self.logger = logger
+        self.port = port
+        self.user = user
+        self.key_file = key_file
+        self.password = password
+        self.known_hosts = known_hosts
+        self.metrics = metrics or MetricsRecorder()
+        self._ssh = None
+        self._lock = threading.Lock()
+
+    def save_backup(self, source_file: str, target_key: str, metadata: dict | None = None) -> bool:
+        """
+        Upload a local backup file.
+
+        Args:
+            source_file (str): Path to the local backup file
+            target_key (str): Path below ``remote_dir``, such as ``mydb/2025/06/backup.sql.gz``
+            metadata (dict | None): Ignored; SFTP servers keep no metadata with a file
+
+        Returns:
+            bool: True if the upload succeeded
+        """
+        if not os.path.isfile(source_file):
+            self.logger.error(f"Backup file does not exist: {source_file}")
+            return False
+        try:
+            writer = self.open_writer(target_key)
+        except Exception as e:
+            self.logger.error(f"SFTP upload to {self.host} failed: {e}")
+            return False
+        try:
+            with open(source_file, "rb") as f:
+                while chunk := f.read(COPY_CHUNK_SIZE):
+                    writer.write(chunk)
+            writer.commit()
+            return True
+        except Exception as e:
+            writer.abort()
+            self.logger.error(f"SFTP upload to {self.host} failed: {e}")
+            return False
+
+    def open_writer(self, target_key: str) -> SFTPBackupWriter:
+        """
+        Open a streaming writer for a new backup file, creating its directories.
+
+        Args:
+            target_key (str): Path below ``remote_dir``
+
+        Returns:
+            SFTPBackupWriter: Writer that must be committed or aborted
+        """
+        remote_path = posixpath.join(self.remote_dir, target_key)
+        sftp = self._open_sftp()
+        try:
+            _makedirs(sftp, posixpath.dirname(remote_path))
+            return SFTPBackupWriter(sftp, remote_path, self.logger, self.metrics)
+        except BaseException:
+            sftp.close()
+            raise
+
+    def close(self):
+        """
+        Close the shared SSH connection.
+        """
+        with self._lock:
+            if self._ssh is not None:
+                self._ssh.close()
+                self._ssh = None
+
+    def _open_sftp(self):
+        """
+        Open an SFTP channel, connecting or reconnecting the shared SSH connection as needed.
+        """
+        with self._lock:
+            transport = self._ssh.get_transport() if self._ssh is not None else None
+            if transport is None or not transport.is_active():
+                paramiko = _paramiko()
+                ssh = paramiko.SSHClient()
+                ssh.load_system_host_keys()
+                if self.known_hosts:
+                    ssh.load_host_keys(self.known_hosts)
+                ssh.set_missing_host_key_policy(paramiko.RejectPolicy())
+                ssh.connect(self.host, port=self.port, username=self.user, key_filename=self.key_file,
+                            password=self.password)
+                self._ssh = ssh
+                self.logger.debug(f"SSH connection to {self.host}:{self.port} opened")
+            return self._ssh.open_sftp()
+
+
+def _partial_path(remote_path: str) -> str:
+    directory, name = posixpath.split(remote_path)
+    return posixpath.join(directory, f".{name}.partial")
+
+
+def _makedirs(sftp, directory: str):
+    """
+    Create a remote directory and its missing parents.
+    """
+    missing = []
+    while directory not in ("", "/"):
+        try:
+            sftp.stat(directory)
+            break
+        except FileNotFoundError:
+            missing.append(directory)
+            directory = posixpath.dirname(directory)
+    for path in reversed(missing):
+        try:
+            sftp.mkdir(path)
+        except OSError:
+            sftp.stat(path)  # Created meanwhile by a concurrent upload
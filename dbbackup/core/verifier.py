@@ -1,13 +1,36 @@
 """
 Verify integrity of backup files for databases.
+
+Local backups are re-hashed with chunked reads and fully decompressed in
+the same pass. S3 backups are checked against the checksum and ETag
+recorded at backup time using only object metadata, never a download.
 """
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional
+from dbbackup.core.catalog import BackupCatalog
+from dbbackup.core.compressor import codec_for_path
+from dbbackup.core.encryption import BackupCipher, DecryptionError, is_encrypted
+from dbbackup.core.integrity import HashingReader, checksums_match, parse_checksum, read_manifest
+from dbbackup.core.storages.dedup import DedupStorage, is_dedup_backup
 from dbbackup.core.storages.local import LocalStorage
 from dbbackup.core.storages.s3 import S3Storage
 from dbbackup.utils.paths import validate_file_exists
 
+
+@dataclass
+class VerificationResult:
+    """
+    Outcome of verifying one backup.
+    """
+    target: str
+    storage: str
+    status: str  # 'ok', 'failed' or 'unverified'
+    detail: str = ""
+
+
 class BackupVerifier:
     """
     Class to verify backup files.
@@ -23,8 +46,12 @@ class BackupVerifier:
         self.config = config
         self.logger = logger
         self.local_storage = LocalStorage(config.paths.backup_dir, logger)
-        self.s3_storage = S3Storage(config.aws.s3_bucket, logger, config.aws.region)
-    def run(self, all_files: bool = False, backup_file: Optional[str] = None, target_db: Optional[str] = None):
+        self.s3_storage = S3Storage.from_config(config.aws, logger) if config.aws is not None else None
+        self.catalog = BackupCatalog.for_backup_dir(config.paths.backup_dir, logger)
+        self.cipher = BackupCipher.from_config(config.encryption)
+
+    def run(self, all_files: bool = False, backup_file: Optional[str] = None,
+            target_db: Optional[str] = None) -> list[VerificationResult]:
         """
         Verify backup files based on user input.
 
@@ -32,42 +59,157 @@ class BackupVerifier:
             all_files (bool): Verify all backups
             backup_file (str): Specific backup file to verify
             target_db (str): Specific database name
+
+        Returns:
+            list[VerificationResult]: One result per verified backup
         """
+        results: list[VerificationResult] = []
         if all_files:
             self.logger.info("Verifying all backups...")
+            self.catalog.import_directory(self.config.paths.backup_dir, self.config.app.app_name)
             local_backups = self.local_storage.list_backups()
-            s3_backups = self.s3_storage.list_backups()
-            self._verify_list(local_backups, "Local")
-            self._verify_list(s3_backups, "S3")
+            results += self._verify_list(local_backups, "Local")
+            if self.s3_storage is not None:
+                results += self._verify_list(self.s3_storage.list_backups(), "S3")
         else:
             if backup_file:
                 self.logger.info(f"Verifying backup file: {backup_file}")
                 if validate_file_exists(backup_file, self.logger):
-                    self.logger.info(f"Backup file verified: {backup_file}")
+                    results += self._verify_list([backup_file], "Local")
+                else:
+                    results.append(VerificationResult(backup_file, "Local", "failed", "file not found"))
             elif target_db:
                 self.logger.info(f"Verifying backups for database: {target_db}")
-                local_backups = [f for f in self.local_storage.list_backups() if target_db in f]
-                s3_backups = [f for f in self.s3_storage.list_backups() if target_db in f]
-                self._verify_list(local_backups, "Local")
-                self._verify_list(s3_backups, "S3")
+                local_backups = self._local_backups(target_db)
+                results += self._verify_list(local_backups, "Local")
+                if self.s3_storage is not None:
+                    results += self._verify_list(self.s3_storage.list_backups(prefix=f"{target_db}/"), "S3")
             else:
                 self.logger.error("No file or database specified for verification.")
-            
-    def _verify_list(self, file_list: list[str], storage_type: str):
+        return results
+
+    def _verify_list(self, file_list: list[str], storage_type: str) -> list[VerificationResult]:
         """
-        Internal helper to verify a list of files.
+        Internal helper to verify a list of files concurrently.
 
         Args:
-            file_list (list[str]): List of file paths
-            storage_type (str): Storage type name for logging
+            file_list (list[str]): List of file paths or S3 keys
+            storage_type (str): Storage type name ('Local' or 'S3')
+
+        Returns:
+            list[VerificationResult]: Results in the order of ``file_list``
         """
         if not file_list:
             self.logger.warning(f"No backups found in {storage_type} storage.")
-            return
+            return []
+
+        verify = self.verify_local_file if storage_type == "Local" else self.verify_s3_object
+        workers = min(self.config.verification.workers, len(file_list))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dbbackup-verify") as pool:
+            results = list(pool.map(verify, file_list))
+
+        for result in results:
+            if result.status == "ok":
+                self.logger.info(f"{storage_type} backup verified: {result.target}")
+            elif result.status == "unverified":
+                self.logger.warning(f"{storage_type} backup could not be verified: {result.target} ({result.detail})")
+            else:
+                self.logger.error(f"{storage_type} backup missing or corrupted: {result.target} ({result.detail})")
+        return results
+
+    def verify_local_file(self, backup_path: str) -> VerificationResult:
+        """
+        Re-hash a local backup and decompress it completely in a single read.
+
+        For deduplicated backups every chunk the manifest references is also
+        read back and checked against its digest. Encrypted backups are
+        decrypted in the same read, authenticating every chunk.
+
+        Args:
+            backup_path (str): Path to the backup file
 
-        for f in file_list:
-            path = Path(f)
-            if path.is_file():
-                self.logger.info(f"{storage_type} backup verified: {f}")
+        Returns:
+            VerificationResult: 'ok' if the data decompresses and matches its checksum
+        """
+        path = Path(backup_path)
+        if not path.is_file():
+            return VerificationResult(backup_path, "Local", "failed", "file not found")
+        encrypted = is_encrypted(backup_path)
+        if encrypted and self.cipher is None:
+            return VerificationResult(backup_path, "Local", "unverified", "encrypted and no encryption key configured")
+
+        entry = self.catalog.find(filename=path.name)
+        expected = (entry.checksum if entry else None) or read_manifest(backup_path)
+        algorithm = parse_checksum(expected)[0] if expected else self.config.verification.algorithm
+        codec = codec_for_path(backup_path)
+
+        try:
+            with open(path, "rb") as f:
+                hashed = HashingReader(f, algorithm)
+                reader = codec.open_reader(self.cipher.open_reader(hashed) if encrypted else hashed)
+                while reader.read(1024 * 1024):
+                    pass
+                hashed.drain()
+            if is_dedup_backup(backup_path):
+                reader = DedupStorage.from_config(self.config, self.logger).open_reader(backup_path)
+                while reader.read(1024 * 1024):
+                    pass
+        except DecryptionError as e:
+            result = VerificationResult(backup_path, "Local", "failed", f"decryption failed: {e}")
+        except Exception as e:
+            result = VerificationResult(backup_path, "Local", "failed", f"{codec.name} decompression failed: {e}")
+        else:
+            if expected is None:
+                result = VerificationResult(backup_path, "Local", "unverified", "no checksum recorded")
+            elif checksums_match(expected, hashed.checksum):
+                result = VerificationResult(backup_path, "Local", "ok", hashed.checksum)
             else:
-                self.logger.error(f"{storage_type} backup missing or corrupted: {f}")
\ No newline at end of file
+                result = VerificationResult(backup_path, "Local", "failed", f"checksum mismatch: {hashed.checksum}")
+
+        if entry is not None and result.status != "unverified":
+            self.catalog.mark_verified(entry.id, result.status)
+        return result
+
+    def verify_s3_object(self, key: str) -> VerificationResult:
+        """
+        Check an S3 backup against its recorded checksum, ETag and size without downloading it.
+
+        Args:
+            key (str): S3 object key
+
+        Returns:
+            VerificationResult: 'ok' if the object metadata matches the catalog
+        """
+        head = self.s3_storage.head_backup(key)
+        if head is None:
+            return VerificationResult(key, "S3", "failed", "object not found")
+
+        entry = self.catalog.find(s3_key=key)
+        if entry is None:
+            return VerificationResult(key, "S3", "unverified", "no catalog record to compare against")
+
+        etag = head.get("ETag", "").strip('"')
+        stored_checksum = head.get("Metadata", {}).get("checksum")
+        if entry.size and head.get("ContentLength") != entry.size:
+            result = VerificationResult(key, "S3", "failed", f"size {head.get('ContentLength')} != {entry.size}")
+        elif entry.checksum and stored_checksum and not checksums_match(entry.checksum, stored_checksum):
+            result = VerificationResult(key, "S3", "failed", "checksum metadata does not match the catalog")
+        elif entry.etag and etag != entry.etag:
+            result = VerificationResult(key, "S3", "failed", f"ETag {etag} != {entry.etag}")
+        elif not ((entry.checksum and stored_checksum) or entry.etag):
+            result = VerificationResult(key, "S3", "unverified", "no checksum or ETag recorded")
+        else:
+            result = VerificationResult(key, "S3", "ok", stored_checksum or etag)
+
+        if result.status != "unverified":
+            self.catalog.mark_verified(entry.id, result.status)
+        return result
+
+    def _local_backups(self, target_db: str) -> list[str]:
+        """
+        Return local backup paths of a database recorded in the catalog.
+        """
+        entries = self.catalog.list_backups(target_db)
+        if not entries and self.catalog.import_directory(self.config.paths.backup_dir, self.config.app.app_name):
+            entries = self.catalog.list_backups(target_db)
+        return [entry.local_path for entry in entries if entry.local_path]
@@ -0,0 +1,110 @@
+"""
+Parse five-field cron expressions and compute their next run time.
+"""
+
+from datetime import datetime, timedelta
+
+_ALIASES = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+_MONTH_NAMES = {name: number for number, name in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], start=1)}
+_DAY_NAMES = {name: number for number, name in enumerate(["sun", "mon", "tue", "wed", "thu", "fri", "sat"])}
+# (low, high, names) of minute, hour, day of month, month and day of week; 7 is Sunday too
+_FIELDS = [(0, 59, {}), (0, 23, {}), (1, 31, {}), (1, 12, _MONTH_NAMES), (0, 7, _DAY_NAMES)]
+# Longest gap between two matches (29 February with a weekday restriction), plus margin
+_SEARCH_YEARS = 30
+
+
+class CronSchedule:
+    """
+    A cron schedule such as ``30 2 * * 1-5`` or ``@daily``, in local time.
+
+    Fields support ``*``, values, names, ranges, lists and ``/`` steps. As in
+    cron, when both day of month and day of week are restricted, a day
+    matching either one matches.
+    """
+
+    def __init__(self, expression: str):
+        """
+        Parse a cron expression.
+
+        Args:
+            expression (str): Five fields, or an alias such as ``@daily``
+
+        Raises:
+            ValueError: If the expression is not valid
+        """
+        self.expression = expression
+        fields = _ALIASES.get(expression.strip().lower(), expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression '{expression}' must have 5 fields")
+        parsed = [_parse_field(text, *spec) for text, spec in zip(fields, _FIELDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = {day % 7 for day in weekdays}
+        self._any_day = fields[2].startswith("*")
+        self._any_weekday = fields[4].startswith("*")
+
+    def next_after(self, moment: datetime) -> datetime:
+        """
+        Return the first matching minute strictly after ``moment``.
+
+        Raises:
+            ValueError: If the schedule never matches, e.g. on 31 February
+        """
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * _SEARCH_YEARS)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                year, month = divmod(candidate.month, 12)
+                candidate = candidate.replace(year=candidate.year + year, month=month + 1, day=1, hour=0, minute=0)
+            elif not self._day_matches(candidate):
+                candidate = (candidate + timedelta(days=1)).replace(hour=0, minute=0)
+            elif candidate.hour not in self.hours:
+                candidate = (candidate + timedelta(hours=1)).replace(minute=0)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"Cron expression '{self.expression}' never matches")
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day = moment.day in self.days
+        weekday = (moment.weekday() + 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def __repr__(self) -> str:
+        return f"CronSchedule({self.expression!r})"
+
+
+def _parse_field(text: str, low: int, high: int, names: dict[str, int]) -> set[int]:
+    values = set()
+    for part in text.lower().split(","):
+        spec, _, step_text = part.partition("/")
+        step = int(step_text) if step_text else 1
+        if spec == "*":
+            start, end = low, high
+        else:
+            start_text, _, end_text = spec.partition("-")
+            start = _value(start_text, names)
+            end = _value(end_text, names) if end_text else (high if step_text else start)
+        if step < 1 or not low <= start <= end <= high:
+            raise ValueError(f"Invalid cron field '{text}'")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+def _value(text: str, names: dict[str, int]) -> int:
+    if text in names:
+        return names[text]
+    if not text.isdigit():
+        raise ValueError(f"Invalid cron value '{text}'")
+    return int(text)
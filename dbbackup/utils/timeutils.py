@@ -2,16 +2,21 @@
 Utility functions for generating timestamped filenames for backups.
 """
 
+import re
 from datetime import datetime
 from pathlib import Path
 import logging
 from typing import Optional
 
+TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+_TIMESTAMPED_NAME = re.compile(r"^(?P<db_name>.+)_(?P<timestamp>\d{8}_\d{6})\.(?P<extension>.+)$")
+
 def generate_timestamped_filename(
     prefix: str,
     db_name: str,
     extension: str = "sql",
-    logger: Optional[logging.Logger] = None
+    logger: Optional[logging.Logger] = None,
+    timestamp: Optional[datetime] = None
 ) -> str:
     """
     Generate a filename with the current timestamp.
@@ -21,11 +26,12 @@ def generate_timestamped_filename(
         db_name (str): Database name
         extension (str): File extension (default 'sql')
         logger (logging.Logger, optional): Logger instance
+        timestamp (datetime, optional): Timestamp to use instead of now
 
     Returns:
         str: Timestamped filename in format: prefix_dbname_YYYYmmdd_HHMMSS.ext
     """
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    timestamp = (timestamp or datetime.now()).strftime(TIMESTAMP_FORMAT)
     filename = f"{prefix}_{db_name}_{timestamp}.{extension}"
     if logger:
         logger.debug(f"Generated timestamped filename: {filename}")
@@ -41,4 +47,45 @@ def get_current_timestamp(fmt: str = "%Y-%m-%d %H:%M:%S") -> str:
     Returns:
         str: Formatted current timestamp
     """
-    return datetime.now().strftime(fmt)
\ No newline at end of file
+    return datetime.now().strftime(fmt)
+
+def parse_timestamped_filename(filename: str, prefix: str) -> Optional[tuple[str, datetime, str]]:
+    """
+    Split a filename produced by generate_timestamped_filename into its parts.
+
+    Args:
+        filename (str): File name or path
+        prefix (str): Prefix used when the name was generated
+
+    Returns:
+        Optional[tuple[str, datetime, str]]: Database name, timestamp and extension,
+        or None if the name does not match
+    """
+    name = Path(filename).name
+    if not name.startswith(f"{prefix}_"):
+        return None
+    match = _TIMESTAMPED_NAME.match(name[len(prefix) + 1:])
+    if not match:
+        return None
+    try:
+        timestamp = datetime.strptime(match["timestamp"], TIMESTAMP_FORMAT)
+    except ValueError:
+        return None
+    return match["db_name"], timestamp, match["extension"]
+
+def generate_backup_key(db_name: str, filename: str, timestamp: datetime) -> str:
+    """
+    Build the object key of a backup: ``db_name/YYYY/MM/filename``.
+
+    Grouping keys by database and month lets per-database listings touch
+    only their own prefix.
+
+    Args:
+        db_name (str): Database name
+        filename (str): Backup file name
+        timestamp (datetime): Backup timestamp
+
+    Returns:
+        str: Object key
+    """
+    return f"{db_name}/{timestamp:%Y}/{timestamp:%m}/{filename}"
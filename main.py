@@ -1,14 +1,123 @@
 """
 Entry point for the Database Backup & Restore Tool.
+
+Only the argument parser is imported up front. Each operation imports the
+modules it needs when it runs, so ``--help`` loads neither pydantic nor
+boto3, and operations that never talk to S3 do not load boto3.
 """
 
+import importlib
+import logging
+import signal
 import sys
+import threading
+import time
 from dbbackup.cli import parse_args
-from dbbackup.core.config_loader import load_config
-from dbbackup.core.logger import get_logger
-from dbbackup.core.backup import DatabaseBackup
-from dbbackup.core.restore import DatabaseRestore
-from dbbackup.core.verifier import BackupVerifier
+
+STARTED = time.perf_counter()
+
+
+def load(logger: logging.Logger, module: str, name: str):
+    """
+    Import an operation's class or function on first use and log how long the import took.
+
+    Args:
+        logger (logging.Logger): Logger receiving the timing at debug level
+        module (str): Module to import, e.g. 'dbbackup.core.backup'
+        name (str): Attribute of the module to return
+
+    Returns:
+        The attribute ``name`` of ``module``
+    """
+    started = time.perf_counter()
+    value = getattr(importlib.import_module(module), name)
+    logger.debug(f"Imported {module} in {(time.perf_counter() - started) * 1000:.1f} ms")
+    return value
+
+
+def backup(args, config, logger):
+    DatabaseBackup = load(logger, "dbbackup.core.backup", "DatabaseBackup")
+    summary = DatabaseBackup(config, logger).run(databases=args.databases)
+    if summary.failed:
+        failed = ", ".join(r.name for r in summary.failed)
+        logger.error(f"Backup failed for: {failed}")
+        sys.exit(1)
+
+
+def restore(args, config, logger):
+    if not args.database:
+        logger.error("Please specify a target database using --database")
+        return
+    DatabaseRestore = load(logger, "dbbackup.core.restore", "DatabaseRestore")
+    DatabaseRestore(config, logger).run(target_db=args.database, backup_file=args.file, until=args.until,
+                                        tables=args.tables)
+
+
+def verify(args, config, logger):
+    if not (args.all or args.file or args.database):
+        logger.error("Please specify --all, --file or --database for verification")
+        return
+    BackupVerifier = load(logger, "dbbackup.core.verifier", "BackupVerifier")
+    results = BackupVerifier(config, logger).run(all_files=args.all, backup_file=args.file, target_db=args.database)
+    if any(result.status == "failed" for result in results):
+        sys.exit(1)
+
+
+def list_backups(args, config, logger):
+    BackupIndex = load(logger, "dbbackup.core.listing", "BackupIndex")
+    from dbbackup.core.listing import format_table
+    backups = BackupIndex(config, logger).run(database=args.database, refresh=args.refresh)
+    if not backups:
+        logger.info("No backups found")
+        return
+    print("\n".join(format_table(backups)))
+
+
+def prune(args, config, logger):
+    BackupPruner = load(logger, "dbbackup.core.retention", "BackupPruner")
+    BackupPruner(config, logger).run(databases=args.databases)
+
+
+def archive(args, config, logger):
+    LogArchiver = load(logger, "dbbackup.core.archiver", "LogArchiver")
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    LogArchiver(config, logger).run(stop)
+
+
+def daemon(args, config, logger):
+    BackupDaemon = load(logger, "dbbackup.core.daemon", "BackupDaemon")
+    backup_daemon = BackupDaemon(config, logger)
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda signum, frame: backup_daemon.stop())
+    backup_daemon.run()
+
+
+def archive_wal(args, config, logger):
+    LogArchiver = load(logger, "dbbackup.core.archiver", "LogArchiver")
+    if not LogArchiver(config, logger).archive_file(args.archive_wal):
+        sys.exit(1)
+
+
+def restore_wal(args, config, logger):
+    LogArchiver = load(logger, "dbbackup.core.archiver", "LogArchiver")
+    name, target_path = args.restore_wal
+    if not LogArchiver(config, logger).fetch(name, target_path):
+        sys.exit(1)
+
+
+# CLI flag -> operation; the flags are mutually exclusive
+OPERATIONS = {
+    "backup": backup,
+    "restore": restore,
+    "verify": verify,
+    "list": list_backups,
+    "prune": prune,
+    "archive": archive,
+    "daemon": daemon,
+    "archive_wal": archive_wal,
+    "restore_wal": restore_wal,
+}
 
 
 def main():
@@ -20,6 +129,8 @@ def main():
         args = parse_args()
 
         # Load configuration
+        from dbbackup.core.config_loader import load_config
+        from dbbackup.core.logger import get_logger
         config = load_config("config/config.yaml")
 
         # Override config runtime options from CLI
@@ -27,40 +138,26 @@ def main():
             config.runtime.dry_run = True
         if args.verbose:
             config.runtime.verbose = True
+        if args.compression:
+            config.compression.method = args.compression
+        if args.compression_level is not None:
+            config.compression.level = args.compression_level
 
         # Initialize logger
         logger = get_logger(
             name="dbbackup",
             log_dir=config.paths.log_dir,
+            level=logging.DEBUG if config.runtime.verbose else logging.INFO,
             console=True
         )
+        logger.debug(f"Arguments parsed and configuration loaded in {(time.perf_counter() - STARTED) * 1000:.1f} ms")
 
-        # Execute operations
-        if args.backup:
-            db_backup = DatabaseBackup(config, logger)
-            db_backup.run(databases=args.databases)
-
-        if args.restore:
-            if not args.database:
-                logger.error("Please specify a target database using --database")
-            else:
-                db_restore = DatabaseRestore(config, logger)
-                db_restore.run(target_db=args.database, backup_file=args.file)
-
-        if args.verify:
-            verifier = BackupVerifier(config, logger)
-            if args.all:
-                verifier.run(all_files=True)
-            elif args.file or args.database:
-                backup_file = args.file if args.file is not None else ""
-                target_db = args.database if args.database is not None else ""
-                verifier.run(all_files=False, backup_file=backup_file)
-            else:
-                logger.error("Please specify --file or --database for verification")
-
-        # If no operation specified
-        if not any([args.backup, args.restore, args.verify]):
+        # Execute the selected operation
+        operation = next((OPERATIONS[name] for name in OPERATIONS if getattr(args, name)), None)
+        if operation is None:
             logger.info("No operation specified. Use --help for usage information.")
+            return
+        operation(args, config, logger)
 
     except Exception as e:
         print(f"Critical error: {e}", file=sys.stderr)
@@ -74,4 +171,4 @@ if __name__ == "__main__":
         print(f"Critical error: {e}", file=sys.stderr)
         sys.exit(1)
     finally:
-        print("Shutting down Database Backup Tool... Done.")
\ No newline at end of file
+        print("Shutting down Database Backup Tool... Done.")
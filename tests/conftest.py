@@ -3,6 +3,7 @@ Define fixtures for all tests
 """
 
 import pytest
+import yaml
 from dbbackup.core.config_loader import load_config
 from dbbackup.core.logger import get_logger
 
@@ -13,4 +14,32 @@ def config_and_logger():
     """
     config = load_config("config/config.yaml")
     logger = get_logger("test_logger", log_dir="logs_test", console=False)
-    return config, logger
\ No newline at end of file
+    return config, logger
+
+
+@pytest.fixture
+def app_config(tmp_path):
+    """
+    Fixture to provide a complete configuration rooted in a temporary directory
+    """
+    raw_config = {
+        "app": {"app_name": "dbbackup", "version": "1.0.0"},
+        "database": {
+            "type": "postgresql",
+            "host": "localhost",
+            "port": 5432,
+            "user": "dbuser",
+            "password": "dbpassword",
+            "default_databases": ["mydb1", "mydb2"],
+        },
+        "paths": {
+            "backup_dir": str(tmp_path / "backup"),
+            "log_dir": str(tmp_path / "logs"),
+            "temp_dir": str(tmp_path / "temp"),
+        },
+        "runtime": {"dry_run": False, "verbose": False, "max_concurrent_jobs": 2},
+        "aws": {"s3_bucket": "test-bucket", "region": "us-east-1"},
+    }
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(yaml.safe_dump(raw_config))
+    return load_config(str(config_path))
@@ -0,0 +1,216 @@
+"""
+Unit tests for dbbackup.core.archiver module and point-in-time restores.
+"""
+
+import gzip
+import io
+import logging
+import tarfile
+import pytest
+from datetime import datetime
+from unittest.mock import MagicMock
+from dbbackup.core.archiver import LogArchiver, read_binlog_position
+from dbbackup.core.restore import DatabaseRestore
+
+
+@pytest.fixture
+def logger():
+    """
+    Fixture to create a logger for testing.
+    """
+    logger = logging.getLogger("test_archiver")
+    logger.addHandler(logging.NullHandler())
+    return logger
+
+
+@pytest.fixture
+def archiver(app_config, logger):
+    """
+    Fixture to create a LogArchiver with a mocked S3 storage.
+    """
+    archiver = LogArchiver(app_config, logger)
+    archiver.s3_storage = MagicMock()
+    archiver.s3_storage.upload_backup.return_value = True
+    archiver.s3_storage.list_backup_objects.return_value = []
+    return archiver
+
+
+def test_archive_file_is_idempotent_and_never_overwrites(archiver, tmp_path):
+    """
+    Test archive_command semantics: same content succeeds again, different content is refused.
+    """
+    segment = tmp_path / "000000010000000000000003"
+    segment.write_bytes(b"wal" * 10000)
+
+    assert archiver.archive_file(str(segment))
+    archived = archiver.archive_dir / "000000010000000000000003.gz"
+    assert gzip.decompress(archived.read_bytes()) == b"wal" * 10000
+    key = archiver.s3_storage.upload_backup.call_args.args[1]
+    assert key == ".pitr/postgresql/000000010000000000000003.gz"
+    assert archiver.s3_storage.upload_backup.call_args.kwargs["metadata"]["checksum"].startswith("sha256:")
+
+    assert archiver.archive_file(str(segment))
+    segment.write_bytes(b"other")
+    assert not archiver.archive_file(str(segment))
+    assert gzip.decompress(archived.read_bytes()) == b"wal" * 10000
+    assert not list(archiver.archive_dir.glob(".*.partial"))
+
+
+def test_fetch_falls_back_to_s3(archiver, tmp_path):
+    """
+    Test restore_command semantics: local archive first, then S3, and a clean miss.
+    """
+    segment = tmp_path / "000000010000000000000004"
+    segment.write_bytes(b"local wal")
+    archiver.archive_file(str(segment))
+    assert archiver.fetch("000000010000000000000004", str(tmp_path / "RECOVERYXLOG"))
+    assert (tmp_path / "RECOVERYXLOG").read_bytes() == b"local wal"
+
+    remote = MagicMock(key=".pitr/postgresql/000000010000000000000005.gz")
+    archiver.s3_storage.list_backup_objects.return_value = [remote]
+    archiver.s3_storage.download_backup.side_effect = lambda key, path: open(path, "wb").write(
+        gzip.compress(b"remote wal")) > 0
+    assert archiver.fetch("000000010000000000000005", str(tmp_path / "RECOVERYXLOG"))
+    assert (tmp_path / "RECOVERYXLOG").read_bytes() == b"remote wal"
+    assert archiver.s3_storage.list_backup_objects.call_args.kwargs["include_hidden"] is True
+
+    assert not archiver.fetch("000000010000000000000006", str(tmp_path / "RECOVERYXLOG"))
+
+
+def test_ship_completed_skips_files_still_being_written(app_config, archiver):
+    """
+    Test only finished WAL segments and all but the newest binlog are shipped from the spool.
+    """
+    archiver.spool_dir.mkdir(parents=True)
+    (archiver.spool_dir / "000000010000000000000001").write_bytes(b"done")
+    (archiver.spool_dir / "000000010000000000000002.partial").write_bytes(b"open")
+    assert archiver.ship_completed() == 1
+    assert [p.name for p in archiver.spool_dir.iterdir()] == ["000000010000000000000002.partial"]
+
+    archiver.db_type = "mysql"
+    (archiver.spool_dir / "000000010000000000000002.partial").unlink()
+    for name in ("binlog.000007", "binlog.000008"):
+        (archiver.spool_dir / name).write_bytes(b"events")
+    assert archiver.ship_completed() == 1
+    assert [p.name for p in archiver.spool_dir.iterdir()] == ["binlog.000008"]
+
+
+def test_replay_mysql_rolls_forward_from_dump_position(app_config, archiver, tmp_path):
+    """
+    Test binlogs from the dump's coordinates are decoded up to the target time and applied.
+    """
+    dump = tmp_path / "dbbackup_mydb1_20250601_000000.sql.gz"
+    dump.write_bytes(gzip.compress(
+        b"-- MySQL dump\n-- CHANGE REPLICATION SOURCE TO SOURCE_LOG_FILE='binlog.000008', SOURCE_LOG_POS=157;\n"))
+    assert read_binlog_position(str(dump)) == ("binlog.000008", 157)
+
+    for name in ("binlog.000007", "binlog.000008", "binlog.000009"):
+        (tmp_path / name).write_bytes(name.encode())
+        archiver.archive_file(str(tmp_path / name))
+    archiver.executor = MagicMock()
+
+    archiver.replay_mysql("mydb1", str(dump), datetime(2025, 6, 1, 12, 30))
+
+    decode = archiver.executor.stream.call_args.args[0]
+    assert decode[:4] == ["mysqlbinlog", "--start-position=157", "--stop-datetime=2025-06-01 12:30:00",
+                          "--database=mydb1"]
+    assert [path.rsplit("/", 1)[1] for path in decode[4:]] == ["binlog.000008", "binlog.000009"]
+    assert archiver.executor.feed.call_args.args[0][0] == "mysql"
+
+
+def test_replay_mysql_rewrites_events_of_the_source_database(archiver, tmp_path):
+    """
+    Test a backup restored under another name replays its source database's events into the new one.
+    """
+    dump = tmp_path / "dbbackup_mydb1_20250601_000000.sql"
+    dump.write_bytes(b"-- CHANGE MASTER TO MASTER_LOG_FILE='binlog.000001', MASTER_LOG_POS=4;\n")
+    (tmp_path / "binlog.000001").write_bytes(b"events")
+    archiver.archive_file(str(tmp_path / "binlog.000001"))
+    archiver.executor = MagicMock()
+
+    archiver.replay_mysql("mydb1_copy", str(dump), datetime(2025, 6, 1), source_db="mydb1")
+
+    decode = archiver.executor.stream.call_args.args[0]
+    assert decode[3:5] == ["--rewrite-db=mydb1->mydb1_copy", "--database=mydb1_copy"]
+    assert archiver.executor.feed.call_args.args[0][-1] == "mydb1_copy"
+
+
+@pytest.mark.parametrize("name, source_db", [("dbbackup_mydb1_20250601_000000.sql", "mydb1"), ("dump.sql", None)])
+def test_restore_until_replays_the_source_database_or_refuses(app_config, logger, monkeypatch, tmp_path,
+                                                              name, source_db):
+    """
+    Test --until with an explicit backup file takes the source database from its name, and stops if it is unknown.
+    """
+    app_config.database.type = "mysql"
+    dump = tmp_path / name
+    dump.write_bytes(b"-- CHANGE MASTER TO MASTER_LOG_FILE='binlog.000001', MASTER_LOG_POS=4;\n")
+    archiver = MagicMock()
+    monkeypatch.setattr("dbbackup.core.restore.LogArchiver", lambda config, logger: archiver)
+    restore = DatabaseRestore(app_config, logger)
+    restore.executor = MagicMock()
+
+    restore.run("mydb1_copy", str(dump), until=datetime(2025, 6, 1))
+
+    if source_db is None:
+        restore.executor.feed.assert_not_called()
+        archiver.replay_mysql.assert_not_called()
+    else:
+        assert restore.executor.feed.call_args.args[0][-1] == "mydb1_copy"
+        assert archiver.replay_mysql.call_args.args == ("mydb1_copy", str(dump), datetime(2025, 6, 1), "mydb1", None)
+
+
+def test_replay_mysql_rejects_gaps(archiver, tmp_path):
+    """
+    Test a missing binlog in the middle of the range aborts instead of skipping transactions.
+    """
+    dump = tmp_path / "dump.sql"
+    dump.write_bytes(b"-- CHANGE MASTER TO MASTER_LOG_FILE='binlog.000001', MASTER_LOG_POS=4;\n")
+    for name in ("binlog.000001", "binlog.000003"):
+        (tmp_path / name).write_bytes(b"events")
+        archiver.archive_file(str(tmp_path / name))
+
+    with pytest.raises(RuntimeError, match="gap"):
+        archiver.replay_mysql("mydb1", str(dump), datetime(2025, 6, 1))
+
+
+def test_postgresql_until_requires_physical_backup(app_config, logger):
+    """
+    Test a PostgreSQL point-in-time restore from a logical dump is refused before touching the database.
+    """
+    restore = DatabaseRestore(app_config, logger)
+    restore.executor = MagicMock()
+    restore.run("mydb1", None, until=datetime(2025, 6, 1))
+    restore.executor.feed.assert_not_called()
+    restore.executor.run.assert_not_called()
+
+
+def test_base_backup_start_segment_expires_older_wal(archiver, tmp_path):
+    """
+    Test the WAL segment in a base backup's backup_label bounds WAL expiry, keeping timeline history files.
+    """
+    label = b"START WAL LOCATION: 0/5000028 (file 000000010000000000000005)\nCHECKPOINT LOCATION: 0/5000060\n"
+    base = io.BytesIO()
+    with tarfile.open(fileobj=base, mode="w") as tar:
+        info = tarfile.TarInfo("backup_label")
+        info.size = len(label)
+        tar.addfile(info, io.BytesIO(label))
+    backup = tmp_path / "instance_20250601_000000.base.tar.gz"
+    backup.write_bytes(gzip.compress(base.getvalue()))
+    logical = tmp_path / "dbbackup_mydb1_20250601_000000.sql.gz"
+    logical.write_bytes(gzip.compress(b"-- PostgreSQL database dump\n"))
+
+    assert archiver.first_needed_log(str(logical)) is None
+    first_needed = archiver.first_needed_log(str(backup))
+    assert first_needed == "000000010000000000000005"
+
+    for name in ("000000010000000000000004", "000000010000000000000005", "00000002.history"):
+        (tmp_path / name).write_bytes(b"wal")
+        archiver.archive_file(str(tmp_path / name))
+    remote = MagicMock(key=".pitr/postgresql/000000010000000000000003.gz")
+    archiver.s3_storage.list_backup_objects.return_value = [remote]
+    archiver.s3_storage.delete_backups.side_effect = lambda keys: keys
+
+    assert archiver.expire(first_needed) == 2
+    archiver.s3_storage.list_backup_objects.return_value = []
+    assert archiver.list_archived() == ["000000010000000000000005", "00000002.history"]
+    archiver.s3_storage.delete_backups.assert_called_once_with([".pitr/postgresql/000000010000000000000003.gz"])
@@ -50,4 +50,90 @@ def test_backup_single_database_invalid_type(config_and_logger):
 
     db_backup = DatabaseBackup(config, logger)
     # Should not raise but log error
-    db_backup._backup_single_database("mydb")
\ No newline at end of file
+    db_backup._backup_single_database("mydb")
+
+def test_backup_run_isolates_failed_database(app_config):
+    """
+    Test DatabaseBackup.run() reports per-database status and keeps going after a failure.
+    """
+    logger = get_logger("test_backup", log_dir="logs_test", console=False)
+    db_backup = DatabaseBackup(app_config, logger)
+
+    def fake_run(cmd, env=None):
+        if "bad_db" in cmd:
+            raise RuntimeError("pg_dump failed")
+        Path(cmd.split(" -f ")[-1]).write_text("-- dump")
+
+    db_backup.executor.run = fake_run
+    db_backup.s3_storage.upload_backup = MagicMock(return_value=True)
+
+    summary = db_backup.run(databases=["good_db", "bad_db"])
+    assert [r.status for r in summary.results] == ["success", "failed"]
+    assert summary.results[0].output.endswith(".sql.gz")
+    assert list(Path(app_config.paths.temp_dir).iterdir()) == []  # Per-job temp dirs cleaned
+
+
+def test_backup_postgresql_directory_format(app_config):
+    """
+    Test directory-format dumps run pg_dump with parallel jobs and are stored as an uncompressed tar.
+    """
+    logger = get_logger("test_backup", log_dir="logs_test", console=False)
+    app_config.database.dump.postgresql.format = "directory"
+    app_config.database.dump.postgresql.jobs = 4
+    db_backup = DatabaseBackup(app_config, logger)
+    commands = []
+
+    def fake_run(cmd, env=None):
+        commands.append(cmd)
+        dump_dir = Path(cmd.split(" -f ")[-1])
+        dump_dir.mkdir()
+        (dump_dir / "toc.dat").write_bytes(b"PGDMP")
+
+    db_backup.executor.run = fake_run
+    db_backup.s3_storage.upload_backup = MagicMock(return_value=True)
+
+    summary = db_backup.run(databases=["mydb"])
+
+    assert "-F d -j 4" in commands[0]
+    assert summary.results[0].output.endswith(".dir.tar")
+    assert (Path(app_config.paths.backup_dir) / summary.results[0].output).is_file()
+
+
+def test_backup_postgresql_custom_format_skips_codec(app_config):
+    """
+    Test custom-format dumps are not compressed a second time.
+    """
+    logger = get_logger("test_backup", log_dir="logs_test", console=False)
+    app_config.database.dump.postgresql.format = "custom"
+    db_backup = DatabaseBackup(app_config, logger)
+    args, _ = db_backup._dump_command("mydb")
+    assert args[args.index("-F") + 1] == "c"
+    assert db_backup._dump_codec() == "none"
+
+
+def test_backup_failed_compression_stores_dump_with_its_own_checksum(app_config):
+    """
+    Test a dump whose compression fails midway is stored as-is with the checksum and codec of that file.
+    """
+    import hashlib
+    from dbbackup.core.catalog import BackupCatalog
+
+    logger = get_logger("test_backup", log_dir="logs_test", console=False)
+    app_config.database.dump.postgresql.format = "plain"
+    db_backup = DatabaseBackup(app_config, logger)
+    db_backup.executor.run = lambda cmd, env=None: Path(cmd.split(" -f ")[-1]).write_bytes(b"CREATE TABLE t ();\n" * 1000)
+    db_backup.s3_storage.upload_backup = MagicMock(return_value=True)
+
+    def failing_compress_stream(source, sink, method=None, index=None, **kwargs):
+        sink.write(b"partial compressed output")
+        raise OSError("codec error")
+
+    db_backup.compressor.compress_stream = failing_compress_stream
+
+    summary = db_backup.run(databases=["mydb"])
+
+    stored = Path(app_config.paths.backup_dir) / summary.results[0].output
+    assert stored.suffix == ".sql"
+    entry = BackupCatalog.for_backup_dir(app_config.paths.backup_dir, logger).find(filename=stored.name)
+    assert entry.checksum == f"sha256:{hashlib.sha256(stored.read_bytes()).hexdigest()}"
+    assert entry.codec == "none"
@@ -0,0 +1,56 @@
+"""
+Unit tests for the benchmark harness: synthetic dumps, fake binaries and baseline comparison.
+"""
+
+import os
+import subprocess
+import zlib
+from benchmarks.run import FAKE_BIN_DIR, compare
+from benchmarks.synthetic import MB, generate_dump
+
+
+def test_generate_dump_size_and_entropy():
+    """
+    Test dumps reach the requested size and higher entropy compresses worse.
+    """
+    low = b"".join(generate_dump(2 * MB, entropy=0.0))
+    high = b"".join(generate_dump(2 * MB, entropy=1.0))
+    assert 2 * MB <= len(low) < 2.2 * MB
+    assert high.startswith(b"--\n-- PostgreSQL database dump") and high.endswith(b"\\.\n")
+    assert len(zlib.compress(high)) > 4 * len(zlib.compress(low))
+    assert b"".join(generate_dump(MB, entropy=1.0, seed=7)) == b"".join(generate_dump(MB, entropy=1.0, seed=7))
+
+
+def test_fake_dump_binary_streams_and_writes_files(tmp_path):
+    """
+    Test the fake mysqldump streams to stdout and honours --result-file.
+    """
+    env = {**os.environ, "DBBENCH_SIZE_MB": "1", "DBBENCH_ENTROPY": "0.5"}
+    streamed = subprocess.run([str(FAKE_BIN_DIR / "mysqldump"), "-h", "db", "mydb"],
+                              env=env, capture_output=True, check=True).stdout
+    assert streamed.startswith(b"-- MySQL dump") and b"INSERT INTO `bench_0` VALUES" in streamed
+
+    target = tmp_path / "out.sql"
+    subprocess.run([str(FAKE_BIN_DIR / "mysqldump"), f"--result-file={target}", "mydb"], env=env, check=True)
+    assert target.read_bytes() == streamed
+    subprocess.run([str(FAKE_BIN_DIR / "psql"), "-d", "mydb"], input=streamed, check=True)
+
+
+def test_compare_flags_throughput_and_memory_regressions():
+    """
+    Test results outside the tolerances are reported against the baseline.
+    """
+    baseline = {"results": {
+        "compress:zstd": {"mb_s": 100.0, "peak_rss_mb": 40.0},
+        "store_local": {"mb_s": 500.0, "peak_rss_mb": 40.0},
+    }}
+    results = [
+        {"case": "compress:zstd", "mb_s": 80.0, "peak_rss_mb": 41.0},
+        {"case": "store_local", "mb_s": 480.0, "peak_rss_mb": 60.0},
+        {"case": "upload_s3", "mb_s": 1.0, "peak_rss_mb": 500.0},
+    ]
+    regressions = compare(results, baseline, tolerance=0.15, memory_tolerance=0.25)
+    assert len(regressions) == 2
+    assert regressions[0].startswith("compress:zstd: 80.0 MB/s")
+    assert "peak RSS 60.0 MB" in regressions[1]
+    assert results[0]["baseline_mb_s"] == 100.0
@@ -0,0 +1,202 @@
+"""
+Unit tests for dbbackup.core.block_index module and selective table restores.
+"""
+
+import contextlib
+import io
+import logging
+import pytest
+from unittest.mock import MagicMock
+from dbbackup.core.block_index import (BlockIndex, BlockIndexBuilder, index_path, scan_dump,
+                                       select_toc_entries)
+from dbbackup.core.compressor import Compressor, get_codec
+from dbbackup.core.restore import DatabaseRestore
+
+MYSQL_DUMP = """-- MySQL dump 10.13
+/*!40101 SET NAMES utf8mb4 */;
+
+--
+-- Table structure for table `orders`
+--
+
+CREATE TABLE `orders` (`id` int);
+
+--
+-- Dumping data for table `orders`
+--
+
+INSERT INTO `orders` VALUES (1),(2);
+
+--
+-- Table structure for table `users`
+--
+
+CREATE TABLE `users` (`name` varchar(20));
+
+--
+-- Dumping data for table `users`
+--
+
+INSERT INTO `users` VALUES ('ann');
+"""
+
+PG_DUMP = """SET client_encoding = 'UTF8';
+
+--
+-- Name: orders; Type: TABLE; Schema: public; Owner: app
+--
+
+CREATE TABLE public.orders (id integer NOT NULL, user_id integer);
+
+--
+-- Name: orders_id_seq; Type: SEQUENCE; Schema: public; Owner: app
+--
+
+CREATE SEQUENCE public.orders_id_seq AS integer;
+
+--
+-- Name: orders_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: app
+--
+
+ALTER SEQUENCE public.orders_id_seq OWNED BY public.orders.id;
+
+--
+-- Name: users; Type: TABLE; Schema: public; Owner: app
+--
+
+CREATE TABLE public.users (id integer);
+
+--
+-- Data for Name: orders; Type: TABLE DATA; Schema: public; Owner: app
+--
+
+COPY public.orders (id, user_id) FROM stdin;
+1\t7
+-- Name: fake; Type: TABLE; Schema: public; Owner: app
+\\.
+
+--
+-- Name: orders_user_idx; Type: INDEX; Schema: public; Owner: app
+--
+
+CREATE INDEX orders_user_idx ON public.orders USING btree (user_id);
+"""
+
+
+@pytest.fixture
+def logger():
+    """
+    Fixture to create a logger for testing.
+    """
+    logger = logging.getLogger("test_block_index")
+    logger.addHandler(logging.NullHandler())
+    return logger
+
+
+def test_scanner_attributes_pg_objects_to_tables():
+    """
+    Test indexes and owned sequences belong to their table and COPY rows are never parsed as headers.
+    """
+    index = scan_dump(io.BytesIO(PG_DUMP.encode()), "postgresql", "none")
+
+    by_name = {(section.kind, section.name): section.table for section in index.sections}
+    assert by_name[("INDEX", "orders_user_idx")] == "orders"
+    assert by_name[("SEQUENCE", "orders_id_seq")] == "orders"
+    assert ("TABLE", "fake") not in by_name
+    assert index.missing(["orders", "public.users", "other.orders"]) == ["other.orders"]
+
+    selected = b"".join(PG_DUMP.encode()[start:end] for start, end in index.select(["orders"])).decode()
+    assert selected.startswith("SET client_encoding")
+    assert "CREATE SEQUENCE" in selected and "CREATE INDEX" in selected and "1\t7" in selected
+    assert "public.users" not in selected
+
+
+@pytest.mark.parametrize("method", ["gzip", "zstd"])
+def test_compressed_dump_restarts_frames_at_sections(app_config, logger, tmp_path, method):
+    """
+    Test the compressor starts a frame at section boundaries and each frame decompresses on its own.
+    """
+    dump = MYSQL_DUMP.encode()
+    dump += b"".join(f"--\n-- Table structure for table `t{n}`\n--\n\nCREATE TABLE `t{n}` (id int);\n".encode()
+                     for n in range(50))
+    source = tmp_path / "dbbackup_shop_20250601_000000.sql"
+    source.write_bytes(dump)
+    builder = BlockIndexBuilder("mysql", method, frame_bytes=200)
+
+    compressed = Compressor(logger).compress_file(str(source), method=method, index=builder)
+    index = builder.finish()
+    index.save(index_path(compressed))
+
+    loaded = BlockIndex.load(index_path(compressed))
+    assert len(loaded.frames) > 5
+    with open(compressed, "rb") as f:
+        for compressed_offset, start in loaded.frames:
+            f.seek(compressed_offset)
+            assert get_codec(method).open_reader(f).read(40) == dump[start:start + 40]
+
+
+def test_plain_restore_feeds_only_requested_tables(app_config, logger, tmp_path):
+    """
+    Test a selective restore of an indexed, compressed mysqldump sends the header and one table's sections.
+    """
+    app_config.database.type = "mysql"
+    source = tmp_path / "dbbackup_shop_20250601_000000.sql"
+    source.write_bytes(MYSQL_DUMP.encode())
+    builder = BlockIndexBuilder("mysql", "gzip", frame_bytes=1)
+    compressed = Compressor(logger).compress_file(str(source), method="gzip", index=builder)
+    builder.finish().save(index_path(compressed))
+
+    fed = []
+    restore = DatabaseRestore(app_config, logger)
+    restore.executor = MagicMock()
+    restore.executor.feed.side_effect = lambda args, reader, env=None: fed.append(reader.read()) or 0
+    restore.run("shop", compressed, tables=["users"])
+
+    sql = fed[0].decode()
+    assert sql.startswith("-- MySQL dump") and "CREATE TABLE `users`" in sql and "VALUES ('ann')" in sql
+    assert "orders" not in sql
+
+    index_path(compressed).unlink()  # Without the index the dump is scanned first
+    fed.clear()
+    restore.run("shop", compressed, tables=["users"])
+    assert fed[0].decode() == sql
+
+
+def test_pg_custom_archive_restores_filtered_list(app_config, logger, tmp_path):
+    """
+    Test a custom archive is restored with a pg_restore -L list holding only the requested table's entries.
+    """
+    backup = tmp_path / "dbbackup_mydb1_20250601_000000.dump"
+    backup.write_bytes(b"PGDMP")
+    toc = "\n".join([
+        ";",
+        "; Archive created at 2025-06-01 00:00:00 UTC",
+        "215; 1259 16390 TABLE public orders app",
+        "216; 1259 16395 SEQUENCE public orders_id_seq app",
+        "3360; 0 0 SEQUENCE OWNED BY public orders_id_seq app",
+        "217; 1259 16400 TABLE public users app",
+        "3350; 0 16390 TABLE DATA public orders app",
+        "3351; 0 16400 TABLE DATA public users app",
+        "3370; 0 0 SEQUENCE SET public orders_id_seq app",
+        "3200; 1259 16410 INDEX public orders_user_idx app",
+    ])
+    lists = []
+
+    def run(command, capture_output=False, env=None):
+        if " -l " in command:
+            return toc
+        lists.append(open(command.split("-L ")[1].split()[0]).read())
+
+    restore = DatabaseRestore(app_config, logger)
+    restore.executor = MagicMock()
+    restore.executor.run.side_effect = run
+    restore.executor.stream.side_effect = lambda args, env=None: contextlib.nullcontext(io.BytesIO(PG_DUMP.encode()))
+
+    restore.run("mydb1", str(backup), tables=["orders"])
+
+    entries = [line.split(" ", 3)[3] for line in lists[0].splitlines()]
+    assert entries == ["TABLE public orders app", "SEQUENCE public orders_id_seq app",
+                       "SEQUENCE OWNED BY public orders_id_seq app", "TABLE DATA public orders app",
+                       "SEQUENCE SET public orders_id_seq app", "INDEX public orders_user_idx app"]
+    assert select_toc_entries(toc, scan_dump(io.BytesIO(PG_DUMP.encode()), "postgresql", "none"), ["users"]) == [
+        "217; 1259 16400 TABLE public users app", "3351; 0 16400 TABLE DATA public users app"]
@@ -0,0 +1,59 @@
+"""
+Unit tests for dbbackup.core.catalog module.
+"""
+
+import logging
+import pytest
+from datetime import datetime
+from dbbackup.core.catalog import BackupCatalog, CatalogEntry
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    """
+    Fixture to provide an empty catalog in a temporary backup directory.
+    """
+    logger = logging.getLogger("test_catalog")
+    logger.addHandler(logging.NullHandler())
+    return BackupCatalog.for_backup_dir(str(tmp_path), logger)
+
+
+def test_latest_matches_exact_database(catalog):
+    """
+    Test latest() returns the newest backup of exactly the requested database.
+    """
+    catalog.record(CatalogEntry("mydb1", datetime(2025, 1, 1), "a.sql.gz", codec="gzip"))
+    catalog.record(CatalogEntry("mydb1", datetime(2025, 1, 3), "b.sql.gz", codec="gzip", size=42))
+    catalog.record(CatalogEntry("mydb10", datetime(2025, 1, 9), "c.sql.gz", codec="gzip"))
+
+    latest = catalog.latest("mydb1")
+    assert latest.filename == "b.sql.gz"
+    assert latest.size == 42
+    assert latest.created_at == datetime(2025, 1, 3)
+    assert catalog.latest("missing") is None
+    assert [e.filename for e in catalog.list_backups("mydb1")] == ["b.sql.gz", "a.sql.gz"]
+
+
+def test_import_directory_adopts_existing_backups(catalog, tmp_path):
+    """
+    Test existing backup files are imported once with parsed metadata.
+    """
+    (tmp_path / "dbbackup_mydb1_20250101_010101.sql.gz").write_bytes(b"\x1f\x8b...")
+    (tmp_path / "dbbackup_mydb10_20250102_010101.dump").write_bytes(b"PGDMP")
+    (tmp_path / "notes.txt").write_text("not a backup")
+
+    assert catalog.import_directory(str(tmp_path), "dbbackup") == 2
+    assert catalog.import_directory(str(tmp_path), "dbbackup") == 0
+
+    entry = catalog.latest("mydb1")
+    assert (entry.codec, entry.format) == ("gzip", "plain")
+    assert catalog.latest("mydb10").format == "custom"
+
+
+def test_remove_entry(catalog):
+    """
+    Test removing a catalog entry.
+    """
+    entry_id = catalog.record(CatalogEntry("mydb1", datetime(2025, 1, 1), "a.sql.gz"))
+    catalog.remove(entry_id)
+    assert catalog.list_backups() == []
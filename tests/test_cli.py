@@ -43,4 +43,31 @@ def test_parse_verify_arguments(monkeypatch):
     args = parse_args()
     assert args.verify is True
     assert args.file == "backup.sql"
-    assert args.dry_run is True
\ No newline at end of file
+    assert args.dry_run is True
+
+def test_parse_compression_arguments(monkeypatch):
+    """
+    Test CLI parsing for compression codec and level.
+    """
+    test_args = ["main.py", "--backup", "--compression", "XZ", "--compression-level", "9"]
+    monkeypatch.setattr(sys, "argv", test_args)
+    args = parse_args()
+    assert args.compression == "xz"
+    assert args.compression_level == 9
+
+
+@pytest.mark.parametrize("codec, message", [
+    ("brotli", "Unsupported compression method 'brotli'"),
+    ("zstd", "requires an optional package that is not installed"),
+])
+def test_parse_rejects_unknown_or_unavailable_codec(monkeypatch, capsys, codec, message):
+    """
+    Test an unknown codec, or one whose library is missing, is rejected while parsing.
+    """
+    from dbbackup.core.compressor import CODECS
+    monkeypatch.setattr(CODECS["zstd"], "is_available", lambda: False)
+    monkeypatch.setattr(sys, "argv", ["main.py", "--backup", "--compression", codec])
+    with pytest.raises(SystemExit) as exc:
+        parse_args()
+    assert exc.value.code == 2
+    assert message in capsys.readouterr().err
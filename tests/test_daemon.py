@@ -0,0 +1,149 @@
+"""
+Unit tests for dbbackup.core.daemon module and dbbackup.utils.cron.
+"""
+
+import json
+import logging
+import pytest
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+from pydantic import ValidationError
+from dbbackup.core.config_loader import DaemonConfig
+from dbbackup.core.daemon import BackupDaemon, ResourceGate
+from dbbackup.utils.cron import CronSchedule
+
+
+@pytest.fixture
+def logger():
+    """
+    Fixture to create a logger for testing.
+    """
+    logger = logging.getLogger("test_daemon")
+    logger.addHandler(logging.NullHandler())
+    return logger
+
+
+def make_daemon(app_config, logger, schedules, **settings):
+    app_config.daemon = DaemonConfig(schedules=schedules, **settings)
+    return BackupDaemon(app_config, logger)
+
+
+def pending_pool():
+    """
+    Return a pool stand-in whose submitted jobs never finish.
+    """
+    pool = MagicMock()
+    pool.submit.side_effect = lambda *args: Future()
+    return pool
+
+
+def test_cron_schedule_next_run():
+    """
+    Test weekday ranges, names, the day-of-month/day-of-week OR rule and leap days.
+    """
+    friday = datetime(2025, 6, 6, 3, 0)
+    assert CronSchedule("30 2 * * 1-5").next_after(friday) == datetime(2025, 6, 9, 2, 30)
+    assert CronSchedule("*/15 * * * *").next_after(friday) == datetime(2025, 6, 6, 3, 15)
+    assert CronSchedule("0 3 1 * sun").next_after(datetime(2025, 6, 2)) == datetime(2025, 6, 8, 3, 0)
+    assert CronSchedule("0 0 29 feb *").next_after(friday) == datetime(2028, 2, 29, 0, 0)
+    assert CronSchedule("@monthly").next_after(friday) == datetime(2025, 7, 1, 0, 0)
+    with pytest.raises(ValueError):
+        CronSchedule("61 * * * *")
+    with pytest.raises(ValidationError):
+        DaemonConfig(schedules=[{"database": "mydb1", "cron": "0 2 * *"}])
+
+
+def test_due_jobs_are_staggered_and_capped(app_config, logger):
+    """
+    Test offsets stay within the stagger window and queued jobs respect the global and per-host caps.
+    """
+    schedules = [{"database": f"db{i}", "cron": "0 2 * * *"} for i in range(3)]
+    schedules.append({"database": "reports", "cron": "0 2 * * *", "host": "db2.internal"})
+    daemon = make_daemon(app_config, logger, schedules, max_concurrent_jobs=2, max_jobs_per_host=1,
+                         stagger_seconds=600)
+    assert all(timedelta(0) <= job.offset < timedelta(seconds=600) for job in daemon.jobs)
+    assert len({job.offset for job in daemon.jobs}) > 1
+
+    pool = pending_pool()
+    due = max(job.due for job in daemon.jobs)
+    daemon.tick(pool, due)
+
+    started = [call.args[1] for call in pool.submit.call_args_list]
+    assert sorted(job.host for job in started) == ["db2.internal", "localhost"]
+    assert len(daemon._queue) == 2
+    assert all(job.due > due for job in daemon.jobs)
+
+
+def test_resource_gate_holds_back_jobs_under_io_pressure(app_config, logger, tmp_path):
+    """
+    Test no job starts while IO pressure is above the limit, and queued jobs start once it drops.
+    """
+    psi = tmp_path / "io"
+    psi.write_text("some avg10=35.20 avg60=12.00 avg300=4.00 total=1\nfull avg10=20.00 avg60=8.00 avg300=2.00 total=1\n")
+    daemon = make_daemon(app_config, logger, [{"database": "mydb1", "cron": "@hourly"}], max_io_pressure=20)
+    daemon.gate = ResourceGate(logger, max_io_pressure=20, psi_path=psi)
+    assert daemon.gate.io_pressure() == 35.2
+
+    pool = pending_pool()
+    daemon.tick(pool, daemon.jobs[0].due)
+    pool.submit.assert_not_called()
+    assert len(daemon._queue) == 1
+
+    psi.write_text("some avg10=2.00 avg60=12.00 avg300=4.00 total=1\n")
+    daemon.tick(pool, datetime.now())
+    pool.submit.assert_called_once()
+    assert ResourceGate(logger, max_io_pressure=20, psi_path=tmp_path / "missing").busy() is None
+
+
+def test_running_backup_skips_next_run_and_backups_stay_warm(app_config, logger):
+    """
+    Test a backup still running when due again is skipped, and jobs on one host share one DatabaseBackup.
+    """
+    daemon = make_daemon(app_config, logger, [{"database": "mydb1", "cron": "* * * * *"},
+                                              {"database": "mydb2", "cron": "* * * * *"},
+                                              {"database": "mydb3", "cron": "* * * * *", "port": 5433}],
+                         max_concurrent_jobs=3, max_jobs_per_host=3, stagger_seconds=0)
+    pool = pending_pool()
+    first = daemon.jobs[0].due
+    daemon.tick(pool, first)
+    daemon.tick(pool, first + timedelta(minutes=1))
+    assert pool.submit.call_count == 3 and daemon._queue == []
+
+    [mydb1, mydb2, mydb3] = daemon.jobs
+    assert daemon._backup_for(mydb1) is daemon._backup_for(mydb2)
+    other = daemon._backup_for(mydb3)
+    assert other is not daemon._backup_for(mydb1) and other.config.database.port == 5433
+    assert other.metrics is daemon.metrics and other.journal is daemon.journal
+    assert app_config.database.port == 5432
+
+    other.backup_database = MagicMock(return_value="s3://test-bucket/mydb3")
+    assert daemon._run_job(mydb3) == "s3://test-bucket/mydb3"
+    other.backup_database.assert_called_once_with("mydb3")
+
+
+def test_each_scheduled_run_exports_only_its_own_metrics(app_config, logger, tmp_path):
+    """
+    Test stage totals do not add up across runs and every run's report is named after its own start.
+    """
+    app_config.metrics.report_dir = str(tmp_path / "reports")
+    app_config.metrics.textfile_dir = str(tmp_path / "textfile")
+    daemon = make_daemon(app_config, logger, [{"database": "mydb1", "cron": "* * * * *"},
+                                              {"database": "mydb2", "cron": "* * * * *"}])
+    daemon.metrics.started_at = datetime(2000, 1, 1)
+    backup = daemon._backup_for(daemon.jobs[0])
+    backup.backup_database = MagicMock(side_effect=lambda database: daemon.metrics.record(
+        "dump", 1.0, bytes_out=100, database=database) or f"{database}.sql.gz")
+
+    reports_dir = tmp_path / "reports"
+    for job in (daemon.jobs[0], daemon.jobs[0], daemon.jobs[1]):
+        assert daemon._run_job(job)
+        [report] = reports_dir.iterdir()
+        assert report.name.startswith(f"backup_{job.database}_") and "20000101" not in report.name
+        stages = json.loads(report.read_text())["stages"]
+        assert [(stage["database"], stage["bytes_out"]) for stage in stages] == [(job.database, 100)]
+        report.unlink()
+
+    textfile = (tmp_path / "textfile" / "dbbackup_backup.prom").read_text()
+    assert 'dbbackup_stage_bytes_out{operation="backup",database="mydb1",stage="dump"} 100' in textfile
+    assert 'database="mydb2",stage="dump"} 100' in textfile
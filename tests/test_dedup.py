@@ -0,0 +1,252 @@
+"""
+Unit tests for dbbackup.core.storages.dedup module and the deduplicated backup path.
+"""
+
+import hashlib
+import logging
+import os
+import random
+import sys
+import pytest
+from datetime import datetime
+from unittest.mock import MagicMock
+from dbbackup.core.backup import DatabaseBackup
+from dbbackup.core.restore import DatabaseRestore
+from dbbackup.core.storages.dedup import KB, ContentDefinedChunker, DedupStorage, FastCDCChunker
+
+CHUNK_SIZES = dict(min_chunk_size=4 * KB, avg_chunk_size=16 * KB, max_chunk_size=64 * KB)
+
+
+@pytest.fixture
+def logger():
+    """
+    Fixture to create a logger for testing.
+    """
+    logger = logging.getLogger("test_dedup")
+    logger.addHandler(logging.NullHandler())
+    return logger
+
+
+def _rows(count: int, seed: int = 1) -> list[bytes]:
+    rng = random.Random(seed)
+    return [f"{i}\tname{rng.randint(0, 10**9)}\t{rng.random()}\n".encode() for i in range(count)]
+
+
+def _chunk(data: bytes, chunker, feed_size: int = 10000) -> list[bytes]:
+    chunks = []
+    for i in range(0, len(data), feed_size):
+        chunks.extend(chunker.feed(data[i:i + feed_size]))
+    return chunks + list(chunker.flush())
+
+
+def test_chunker_boundaries_are_content_defined():
+    """
+    Test chunks reassemble the stream and an edit only changes nearby chunks.
+    """
+    rows = _rows(20000)
+    original = _chunk(b"".join(rows), ContentDefinedChunker(4 * KB, 16 * KB, 64 * KB))
+    assert b"".join(original) == b"".join(rows)
+    assert all(len(chunk) <= 64 * KB for chunk in original)
+    assert all(chunk.endswith(b"\n") for chunk in original[:-1])
+
+    rows.insert(5000, b"new row\n")
+    edited = _chunk(b"".join(rows), ContentDefinedChunker(4 * KB, 16 * KB, 64 * KB), feed_size=7777)
+    changed = set(edited) - set(original)
+    assert len(changed) <= 2
+    assert len(edited) > 20
+
+
+def test_chunker_cuts_overlong_lines():
+    """
+    Test a line longer than max_size is split at max_size.
+    """
+    data = b"x" * (150 * KB) + b"\n"
+    chunks = _chunk(data, ContentDefinedChunker(4 * KB, 16 * KB, 64 * KB))
+    assert [len(chunk) for chunk in chunks] == [64 * KB, 64 * KB, 22 * KB + 1]
+
+
+def test_fastcdc_chunker_is_content_defined_whatever_the_feed_size():
+    """
+    Test FastCDC chunks do not depend on how the stream is fed and an edit only changes nearby chunks.
+    """
+    pytest.importorskip("pyfastcdc")
+    rows = _rows(20000)
+    original = _chunk(b"".join(rows), FastCDCChunker(4 * KB, 16 * KB, 64 * KB))
+    assert b"".join(original) == b"".join(rows)
+    assert all(4 * KB <= len(chunk) <= 64 * KB for chunk in original[:-1])
+    assert _chunk(b"".join(rows), FastCDCChunker(4 * KB, 16 * KB, 64 * KB), feed_size=1 << 20) == original
+
+    rows.insert(5000, b"new row\n")
+    edited = _chunk(b"".join(rows), FastCDCChunker(4 * KB, 16 * KB, 64 * KB), feed_size=7777)
+    assert len(set(edited) - set(original)) <= 2
+    assert len(edited) > 20
+
+
+def test_store_picks_the_chunker(tmp_path, logger, monkeypatch):
+    """
+    Test 'auto' falls back to the line chunker without pyfastcdc, while asking for fastcdc then fails.
+    """
+    assert isinstance(DedupStorage(str(tmp_path), logger, chunker="lines", **CHUNK_SIZES).new_chunker(),
+                      ContentDefinedChunker)
+    monkeypatch.setitem(sys.modules, "pyfastcdc", None)  # As if it were not installed
+    assert isinstance(DedupStorage(str(tmp_path), logger, **CHUNK_SIZES).new_chunker(), ContentDefinedChunker)
+    with pytest.raises(ValueError, match="pyfastcdc"):
+        DedupStorage(str(tmp_path), logger, chunker="fastcdc", **CHUNK_SIZES)
+
+
+def test_store_deduplicates_and_restores(tmp_path, logger):
+    """
+    Test a second, slightly changed backup only stores the changed chunks.
+    """
+    store = DedupStorage(str(tmp_path / "chunks"), logger, codec="gzip", **CHUNK_SIZES)
+    rows = _rows(20000)
+
+    first = store.open_writer(tmp_path / "first.sql.dedup", "mydb", datetime(2025, 1, 1))
+    first.write(b"".join(rows))
+    first.commit()
+
+    rows[10000] = b"changed row\n"
+    second = store.open_writer(tmp_path / "second.sql.dedup", "mydb", datetime(2025, 1, 2))
+    second.write(b"".join(rows))
+    second.commit()
+
+    assert len(second.new_chunks) <= 2
+    assert second.bytes_stored < first.bytes_stored / 10
+    assert store.open_reader(str(tmp_path / "second.sql.dedup")).read() == b"".join(rows)
+
+
+def test_reader_detects_corrupted_chunk(tmp_path, logger):
+    """
+    Test restoring from a damaged chunk raises instead of returning bad data.
+    """
+    store = DedupStorage(str(tmp_path / "chunks"), logger, codec="none", **CHUNK_SIZES)
+    writer = store.open_writer(tmp_path / "b.sql.dedup", "mydb", datetime(2025, 1, 1))
+    writer.write(b"".join(_rows(5000)))
+    writer.commit()
+
+    _, path = writer.new_chunks[0]
+    data = bytearray(path.read_bytes())
+    data[0] ^= 0xFF
+    path.write_bytes(bytes(data))
+
+    with pytest.raises(ValueError):
+        store.open_reader(str(tmp_path / "b.sql.dedup")).read()
+
+
+def test_collect_garbage_keeps_referenced_chunks(tmp_path, logger):
+    """
+    Test garbage collection deletes only chunks no kept manifest references.
+    """
+    store = DedupStorage(str(tmp_path / "chunks"), logger, codec="gzip", **CHUNK_SIZES)
+    kept = store.open_writer(tmp_path / "kept.sql.dedup", "mydb", datetime(2025, 1, 1))
+    kept.write(b"".join(_rows(5000, seed=1)))
+    kept.commit()
+    dropped = store.open_writer(tmp_path / "dropped.sql.dedup", "mydb", datetime(2025, 1, 2))
+    dropped.write(b"".join(_rows(5000, seed=2)))
+    dropped.commit()
+
+    assert store.collect_garbage([str(tmp_path / "kept.sql.dedup")]) == 0  # Still within the grace period
+    deleted = store.collect_garbage([str(tmp_path / "kept.sql.dedup")], grace_seconds=0)
+    assert deleted == len(dropped.new_chunks)
+    assert store.open_reader(str(tmp_path / "kept.sql.dedup")).read() == b"".join(_rows(5000, seed=1))
+
+
+def test_dedup_backup_uploads_only_new_chunks_and_restores(app_config, logger):
+    """
+    Test a deduplicated backup run end to end through backup and restore.
+    """
+    app_config.dedup.enabled = True
+    app_config.dedup.min_chunk_kb, app_config.dedup.avg_chunk_kb, app_config.dedup.max_chunk_kb = 4, 16, 64
+    dump_script = (
+        "import random, sys\n"
+        "rng = random.Random(1)\n"
+        "for i in range(20000):\n"
+        "    sys.stdout.write(f'{i}\\tname{rng.randint(0, 10**9)}\\t{rng.random()}\\n')\n"
+    )
+
+    db_backup = DatabaseBackup(app_config, logger)
+    db_backup._dump_command = lambda db_name: ([sys.executable, "-c", dump_script], os.environ.copy())
+    db_backup.s3_storage = MagicMock()
+    db_backup.s3_storage.upload_backups.return_value = True
+    db_backup.s3_storage.upload_backup.return_value = True
+
+    first = db_backup.run(databases=["mydb"]).results[0].output
+    first_uploads = db_backup.s3_storage.upload_backups.call_args.args[0]
+    second = db_backup.run(databases=["mydb"]).results[0].output
+    assert first.endswith(".sql.dedup")
+    assert first_uploads and all(key.startswith(".chunks/") for _, key in first_uploads)
+    assert db_backup.s3_storage.upload_backups.call_args.args[0] == []
+
+    entry = db_backup.catalog.latest("mydb")
+    assert (entry.codec, entry.format) == ("dedup", "plain")
+    manifest_path = os.path.join(app_config.paths.backup_dir, second)
+    assert entry.checksum == "sha256:" + hashlib.sha256(open(manifest_path, "rb").read()).hexdigest()
+
+    restore = DatabaseRestore(app_config, logger)
+    restore.executor = MagicMock()
+    restored = []
+    restore.executor.feed.side_effect = lambda args, source, env: restored.append(source.read()) or len(restored[-1])
+    restore.run("mydb", None)
+    assert restore.executor.feed.call_args.args[0][0] == "psql"
+    assert restored == [b"".join(_rows(20000))]
+
+
+def test_chunks_of_failed_dedup_backup_are_uploaded_by_the_next(app_config, logger):
+    """
+    Test chunks stored by a dump that failed midway are uploaded by the next successful backup.
+    """
+    app_config.dedup.enabled = True
+    app_config.dedup.min_chunk_kb, app_config.dedup.avg_chunk_kb, app_config.dedup.max_chunk_kb = 4, 16, 64
+    dump_script = (
+        "import random, sys\n"
+        "rng = random.Random(1)\n"
+        "for i in range(20000):\n"
+        "    sys.stdout.write(f'{i}\\tname{rng.randint(0, 10**9)}\\t{rng.random()}\\n')\n"
+    )
+
+    db_backup = DatabaseBackup(app_config, logger)
+    db_backup.s3_storage = MagicMock()
+    db_backup.s3_storage.upload_backups.return_value = True
+    db_backup.s3_storage.upload_backup.return_value = True
+
+    db_backup._dump_command = lambda db_name: ([sys.executable, "-c", dump_script + "sys.exit(1)\n"],
+                                               os.environ.copy())
+    assert db_backup.run(databases=["mydb"]).failed
+    db_backup.s3_storage.upload_backups.assert_not_called()
+
+    db_backup._dump_command = lambda db_name: ([sys.executable, "-c", dump_script], os.environ.copy())
+    assert not db_backup.run(databases=["mydb"]).failed
+
+    uploaded = {key for _, key in db_backup.s3_storage.upload_backups.call_args.args[0]}
+    stored = {db_backup.dedup_storage.chunk_key(path) for path in db_backup.dedup_storage.store_dir.glob("*/*")}
+    assert stored and uploaded == stored
+
+
+def test_chunks_of_backup_interrupted_before_upload_are_uploaded_by_the_next(app_config, logger):
+    """
+    Test chunks are recorded for upload when stored, so an upload that never completes loses none.
+    """
+    app_config.dedup.enabled = True
+    app_config.dedup.min_chunk_kb, app_config.dedup.avg_chunk_kb, app_config.dedup.max_chunk_kb = 4, 16, 64
+    dump_script = (
+        "import random, sys\n"
+        "rng = random.Random(1)\n"
+        "for i in range(20000):\n"
+        "    sys.stdout.write(f'{i}\\tname{rng.randint(0, 10**9)}\\t{rng.random()}\\n')\n"
+    )
+
+    db_backup = DatabaseBackup(app_config, logger)
+    db_backup._dump_command = lambda db_name: ([sys.executable, "-c", dump_script], os.environ.copy())
+    db_backup.s3_storage = MagicMock()
+    db_backup.s3_storage.upload_backups.side_effect = [RuntimeError("connection reset"), True, True]
+    db_backup.s3_storage.upload_backup.return_value = True
+
+    assert db_backup.run(databases=["mydb"]).failed
+    assert not db_backup.run(databases=["mydb"]).failed
+
+    uploaded = {key for _, key in db_backup.s3_storage.upload_backups.call_args.args[0]}
+    stored = {db_backup.dedup_storage.chunk_key(path) for path in db_backup.dedup_storage.store_dir.glob("*/*")}
+    assert stored and uploaded == stored
+    assert db_backup.dedup_storage.pending_uploads() == []
+    assert not db_backup.run(databases=["mydb"]).failed
+    assert db_backup.s3_storage.upload_backups.call_args.args[0] == []
@@ -0,0 +1,249 @@
+"""
+Unit tests for dbbackup.core.storages.backends module and multi-destination backups.
+"""
+
+import threading
+import pytest
+from pathlib import Path
+from unittest.mock import MagicMock
+from pydantic import ValidationError
+from dbbackup.core.backup import DatabaseBackup
+from dbbackup.core.config_loader import Config
+from dbbackup.core.logger import get_logger
+from dbbackup.core.metrics import MetricsRecorder
+from dbbackup.core.storages.backends import BACKENDS, NFSBackend, StorageFanout
+from dbbackup.core.storages.local import LocalStorage
+from dbbackup.core.storages.sftp import SFTPStorage
+
+KEY = "mydb1/2025/06/dbbackup_mydb1_20250601_020000.sql.gz"
+
+
+@pytest.fixture
+def logger():
+    """
+    Fixture to provide a logger for testing.
+    """
+    return get_logger("test_destinations", log_dir="logs_test", console=False)
+
+
+class MemoryBackend:
+    """
+    Backend keeping the keys it stored, optionally held until released or failing.
+    """
+
+    def __init__(self, release: threading.Event | None = None, fail: bool = False):
+        self.release = release
+        self.fail = fail
+        self.saved = []
+
+    def save_backup(self, source_file, target_key, metadata=None):
+        if self.release is not None:
+            self.release.wait(5)
+        self.saved.append(target_key)
+        return not self.fail
+
+    def open_writer(self, target_key):
+        raise NotImplementedError
+
+
+def with_destinations(app_config, destinations, backends, monkeypatch, aws=True):
+    """
+    Return the configuration with ``destinations`` of the test-only 'memory' type served by ``backends``.
+    """
+    monkeypatch.setitem(BACKENDS, "memory", lambda destination, *args: backends[destination.name])
+    raw = app_config.model_dump()
+    raw["destinations"] = destinations
+    if not aws:
+        raw["aws"] = None
+    return Config.model_validate(raw)
+
+
+def test_local_only_backup_copies_to_a_second_directory(app_config, logger, monkeypatch, tmp_path):
+    """
+    Test a configuration without S3 stores backups in the backup directory and a second directory only.
+    """
+    config = with_destinations(app_config, [{"name": "mirror", "type": "local", "path": str(tmp_path / "mirror")}],
+                               {}, monkeypatch, aws=False)
+    db_backup = DatabaseBackup(config, logger)
+    db_backup.executor = MagicMock()
+    db_backup.executor.run.side_effect = lambda command, env=None: Path(command.split()[-1]).write_text("-- dump")
+
+    name = db_backup.run(databases=["mydb1"]).results[0].output
+
+    assert db_backup.s3_storage is None
+    assert (Path(config.paths.backup_dir) / name).read_bytes() == (tmp_path / "mirror" / name).read_bytes()
+    entry = db_backup.catalog.latest("mydb1")
+    assert entry.filename == name and entry.s3_key is None
+
+
+def test_slow_destination_does_not_hold_back_fast_ones(app_config, logger, monkeypatch, tmp_path):
+    """
+    Test copies to a fast destination complete while a slow destination is still busy with earlier ones.
+    """
+    release = threading.Event()
+    slow, fast = MemoryBackend(release), MemoryBackend()
+    config = with_destinations(app_config, [{"name": "slow", "type": "memory", "concurrency": 1},
+                                            {"name": "fast", "type": "memory", "concurrency": 1}],
+                               {"slow": slow, "fast": fast}, monkeypatch)
+    fanout = StorageFanout.from_config(config, logger, MetricsRecorder(), LocalStorage(config.paths.backup_dir, logger))
+    sources = []
+    for day in ("01", "02"):
+        sources.append(tmp_path / f"dbbackup_mydb1_202506{day}_020000.sql.gz")
+        sources[-1].write_bytes(b"backup " + day.encode())
+    results = []
+    stores = [threading.Thread(target=lambda source=source: results.append(
+        fanout.store(str(source), f"mydb1/2025/06/{source.name}"))) for source in sources]
+
+    for store in stores:
+        store.start()
+    for _ in range(500):
+        if len(fast.saved) == 2:
+            break
+        release.wait(0.01)
+    assert len(fast.saved) == 2 and slow.saved == []
+    release.set()
+    for store in stores:
+        store.join()
+
+    assert results == [["local", "slow", "fast"]] * 2
+    assert sorted(slow.saved) == sorted(fast.saved)
+    fanout.close()
+
+
+def test_only_required_destinations_fail_a_backup(app_config, logger, monkeypatch, tmp_path):
+    """
+    Test a failing optional destination is skipped while a failing required one fails the copy.
+    """
+    source = tmp_path / "dbbackup_mydb1_20250601_020000.sql.gz"
+    source.write_bytes(b"backup")
+    backends = {"offsite": MemoryBackend(fail=True), "nas": MemoryBackend()}
+    config = with_destinations(app_config, [{"name": "offsite", "type": "memory", "required": False},
+                                            {"name": "nas", "type": "memory"}], backends, monkeypatch)
+    primary = LocalStorage(config.paths.backup_dir, logger)
+
+    assert StorageFanout.from_config(config, logger, MetricsRecorder(), primary).store(str(source), KEY) == [
+        "local", "nas"]
+
+    backends["nas"].fail = True
+    assert StorageFanout.from_config(config, logger, MetricsRecorder(), primary).store(str(source), KEY) is None
+
+
+class MemoryWriter:
+    """
+    Streaming writer collecting its data, optionally failing on a write.
+    """
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.data = b""
+        self.state = "open"
+
+    def write(self, data):
+        if self.fail:
+            raise OSError("share went away")
+        self.data += data
+
+    def commit(self):
+        self.state = "committed"
+
+    def abort(self):
+        self.state = "aborted"
+
+
+def test_streaming_drops_failing_optional_destinations(app_config, logger, monkeypatch, tmp_path):
+    """
+    Test a streamed backup drops optional destinations that fail to open or write and fails on required ones.
+    """
+    writers = {"nas": MemoryWriter(fail=True), "vault": MemoryWriter()}
+    backends = {name: MemoryBackend() for name in ("offsite", "nas", "vault")}
+    backends["offsite"].open_writer = MagicMock(side_effect=OSError("share not mounted"))
+    for name, writer in writers.items():
+        backends[name].open_writer = lambda target_key, writer=writer: writer
+    config = with_destinations(app_config, [{"name": "offsite", "type": "memory", "required": False},
+                                            {"name": "nas", "type": "memory", "required": False},
+                                            {"name": "vault", "type": "memory"}], backends, monkeypatch)
+    fanout = StorageFanout.from_config(config, logger, MetricsRecorder(), LocalStorage(config.paths.backup_dir, logger))
+
+    tee = fanout.open_writers(KEY)
+    for _ in range(10):
+        tee.write(b"backup")
+    tee.commit()
+
+    assert (Path(config.paths.backup_dir) / Path(KEY).name).read_bytes() == b"backup" * 10
+    assert writers["vault"].data == b"backup" * 10 and writers["vault"].state == "committed"
+    assert writers["nas"].state == "aborted"
+    assert tee.writers[1:] == [None, None, writers["vault"]]
+
+    writers["vault"] = MemoryWriter(fail=True)
+    backends["vault"].open_writer = lambda target_key: writers["vault"]
+    tee = fanout.open_writers(KEY)
+    with pytest.raises(OSError):
+        for _ in range(10):
+            tee.write(b"backup")
+        tee.commit()
+    tee.abort()
+    assert writers["vault"].state == "aborted"
+
+
+def test_nfs_destination_requires_a_mounted_share(logger, tmp_path):
+    """
+    Test NFS copies are laid out like S3 keys and refused while the share is not mounted.
+    """
+    share = tmp_path / "nas"
+    mounts = tmp_path / "mounts"
+    mounts.write_text("/dev/sda1 / ext4 rw 0 0\n")
+    source = tmp_path / "dbbackup_mydb1_20250601_020000.sql.gz"
+    source.write_bytes(b"backup")
+    backend = NFSBackend(str(share), logger, mounts_path=mounts)
+
+    assert not backend.save_backup(str(source), KEY)
+    assert not share.exists()
+
+    mounts.write_text(f"/dev/sda1 / ext4 rw 0 0\nnas:/exports {share} nfs4 rw 0 0\n")
+    assert backend.save_backup(str(source), KEY)
+    assert (share / KEY).read_bytes() == b"backup"
+
+
+def test_sftp_upload_is_renamed_into_place(logger, tmp_path):
+    """
+    Test an SFTP upload creates missing directories and only appears under its name once complete.
+    """
+    source = tmp_path / "dbbackup_mydb1_20250601_020000.sql.gz"
+    source.write_bytes(b"x" * 3_000_000)
+    sftp = MagicMock()
+
+    def stat(path):
+        if path not in ("/srv", "/srv/backups"):
+            raise FileNotFoundError(path)
+
+    sftp.stat.side_effect = stat
+    storage = SFTPStorage("backup.example.com", "/srv/backups", logger)
+    storage._open_sftp = lambda: sftp
+
+    assert storage.save_backup(str(source), KEY, metadata={"checksum": "sha256:0"})
+
+    assert [call.args[0] for call in sftp.mkdir.call_args_list] == [
+        "/srv/backups/mydb1", "/srv/backups/mydb1/2025", "/srv/backups/mydb1/2025/06"]
+    partial = "/srv/backups/mydb1/2025/06/.dbbackup_mydb1_20250601_020000.sql.gz.partial"
+    sftp.open.assert_called_once_with(partial, "wb")
+    assert b"".join(call.args[0] for call in sftp.open.return_value.write.call_args_list) == source.read_bytes()
+    sftp.posix_rename.assert_called_once_with(partial, f"/srv/backups/{KEY}")
+    sftp.close.assert_called_once()
+
+
+@pytest.mark.parametrize("destinations, aws, message", [
+    ([{"name": "local", "type": "local", "path": "/srv/copy"}], True, "reserved"),
+    ([{"name": "offsite", "type": "sftp", "path": "/srv"}], True, "needs host"),
+    ([{"name": "copy", "type": "tape"}], True, "Unsupported destination type"),
+    ([{"name": "s3", "type": "s3"}], False, "needs a bucket"),
+])
+def test_invalid_destinations_are_rejected(app_config, destinations, aws, message):
+    """
+    Test destination names must be unique and each type gets the settings it needs.
+    """
+    raw = app_config.model_dump()
+    raw["destinations"] = destinations
+    if not aws:
+        raw["aws"] = None
+    with pytest.raises(ValidationError, match=message):
+        Config.model_validate(raw)
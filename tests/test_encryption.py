@@ -0,0 +1,188 @@
+"""
+Unit tests for dbbackup.core.encryption module and encrypted backups.
+"""
+
+import gzip
+import hashlib
+import io
+import os
+import sys
+import pytest
+from pathlib import Path
+from unittest.mock import MagicMock
+from pydantic import ValidationError
+from dbbackup.core.backup import DatabaseBackup
+from dbbackup.core.config_loader import Config
+from dbbackup.core.encryption import BackupCipher, DecryptionError, load_key
+from dbbackup.core.logger import get_logger
+from dbbackup.core.restore import DatabaseRestore
+from dbbackup.core.verifier import BackupVerifier
+
+pytest.importorskip("cryptography")
+
+KEY = bytes(range(32))
+
+
+@pytest.fixture
+def logger():
+    """
+    Fixture to provide a logger for testing.
+    """
+    return get_logger("test_encryption", log_dir="logs_test", console=False)
+
+
+@pytest.fixture
+def encrypted_config(app_config, monkeypatch):
+    """
+    Fixture enabling encryption with a key from the environment.
+    """
+    monkeypatch.setenv("DBBACKUP_ENCRYPTION_KEY", KEY.hex())
+    app_config.encryption.enabled = True
+    app_config.encryption.chunk_kb = 4
+    return app_config
+
+
+def encrypt(cipher: BackupCipher, data: bytes, write_size: int = 1000) -> bytes:
+    sink = io.BytesIO()
+    writer = cipher.encryptor(sink)
+    for start in range(0, len(data), write_size):
+        writer.write(data[start:start + write_size])
+    writer.finish()
+    return sink.getvalue()
+
+
+def decrypt(cipher: BackupCipher, data: bytes) -> bytes:
+    return cipher.open_reader(io.BytesIO(data)).read()
+
+
+@pytest.mark.parametrize("algorithm", ["aes-256-gcm", "chacha20-poly1305"])
+@pytest.mark.parametrize("size", [0, 1, 4096, 3 * 4096, 3 * 4096 + 17])
+def test_round_trip_in_chunks(algorithm, size):
+    """
+    Test data of any length, including exact multiples of the chunk size, decrypts to itself.
+    """
+    cipher = BackupCipher(KEY, algorithm, chunk_size=4096)
+    data = os.urandom(size)
+
+    encrypted = encrypt(cipher, data)
+
+    assert len(encrypted) == 28 + size + (size // 4096 + 1) * 16
+    assert decrypt(cipher, encrypted) == data
+    assert decrypt(BackupCipher(KEY, "aes-256-gcm", chunk_size=64), encrypted) == data  # Settings come from the header
+
+
+def test_tampered_truncated_and_foreign_streams_are_rejected():
+    """
+    Test flipped bits, dropped or reordered chunks, trailing data and another key all fail authentication.
+    """
+    cipher = BackupCipher(KEY, chunk_size=4096)
+    encrypted = encrypt(cipher, os.urandom(3 * 4096 + 100))
+    header, frame = 28, 4096 + 16
+    chunks = [encrypted[header + i * frame:header + (i + 1) * frame] for i in range(4)]
+
+    flipped = bytearray(encrypted)
+    flipped[header + frame + 5] ^= 1
+    for forged in (bytes(flipped),
+                   encrypted[:header + 3 * frame],                                  # last chunk dropped
+                   encrypted[:-1],                                                  # last chunk cut short
+                   encrypted[:header] + chunks[1] + chunks[0] + chunks[2] + chunks[3],
+                   encrypted + b"x"):
+        with pytest.raises(DecryptionError):
+            decrypt(cipher, forged)
+    with pytest.raises(DecryptionError, match="different key"):
+        decrypt(BackupCipher(bytes(32)), encrypted)
+
+
+def test_key_loading(tmp_path, monkeypatch):
+    """
+    Test keys are read as raw bytes, hex or base64, and missing or short keys are refused.
+    """
+    raw_file = tmp_path / "raw.key"
+    raw_file.write_bytes(KEY)
+    hex_file = tmp_path / "hex.key"
+    hex_file.write_text(KEY.hex() + "\n")
+    monkeypatch.setenv("BACKUP_KEY", "AAECAwQFBgcICQoLDA0ODxAREhMUFRYXGBkaGxwdHh8=")
+
+    assert load_key(str(raw_file), "UNSET_KEY") == load_key(str(hex_file), "UNSET_KEY") == KEY
+    assert load_key(None, "BACKUP_KEY") == KEY
+    with pytest.raises(ValueError, match="No encryption key"):
+        load_key(None, "UNSET_KEY")
+    monkeypatch.setenv("BACKUP_KEY", "abcd")
+    with pytest.raises(ValueError, match="32 bytes"):
+        load_key(None, "BACKUP_KEY")
+
+
+def test_encryption_and_dedup_are_exclusive(app_config):
+    """
+    Test the configuration refuses encryption together with deduplication.
+    """
+    raw = app_config.model_dump()
+    raw["encryption"]["enabled"] = raw["dedup"]["enabled"] = True
+    with pytest.raises(ValidationError, match="dedup"):
+        Config.model_validate(raw)
+
+
+def test_encrypted_backup_verifies_and_restores(encrypted_config, logger):
+    """
+    Test a backup is stored encrypted, verified by decrypting it, and restored only from authenticated data.
+    """
+    payload = b"CREATE TABLE t (id int);\n" + b"INSERT INTO t VALUES (1);\n" * 2000
+    db_backup = DatabaseBackup(encrypted_config, logger)
+    db_backup.executor = MagicMock()
+    db_backup.executor.run.side_effect = lambda command, env=None: Path(command.split()[-1]).write_bytes(payload)
+    db_backup.s3_storage = MagicMock()
+    db_backup.s3_storage.list_multipart_uploads.return_value = []
+
+    name = db_backup.run(databases=["mydb1"]).results[0].output
+
+    assert name.endswith(".sql.gz.enc")
+    backup_path = Path(encrypted_config.paths.backup_dir) / name
+    stored = backup_path.read_bytes()
+    assert b"INSERT" not in stored and not stored.startswith(b"\x1f\x8b")
+    assert db_backup.catalog.latest("mydb1").checksum == "sha256:" + hashlib.sha256(stored).hexdigest()
+    assert BackupVerifier(encrypted_config, logger).verify_local_file(str(backup_path)).status == "ok"
+
+    fed = []
+
+    def feed(args, source, env=None):
+        fed.append(source.read())
+        return len(fed[-1])
+
+    restore = DatabaseRestore(encrypted_config, logger)
+    restore.executor = MagicMock()
+    restore.executor.feed.side_effect = feed
+    restore.cipher.decrypt_file = MagicMock(side_effect=AssertionError("plaintext copy written"))
+    restore.run("mydb1", str(backup_path))
+    assert fed == [payload]
+    assert "authenticate" in [s.stage for s in restore.metrics.stages()]
+
+    backup_path.write_bytes(stored[:-20] + bytes(20))
+    fed.clear()
+    restore.run("mydb1", str(backup_path))
+    assert fed == []
+    result = BackupVerifier(encrypted_config, logger).verify_local_file(str(backup_path))
+    assert result.status == "failed" and result.detail.startswith("decryption failed")
+
+
+def test_streaming_backup_is_encrypted_before_both_storages(encrypted_config, logger):
+    """
+    Test streaming mode encrypts the compressed stream once, for the local file and the upload alike.
+    """
+    encrypted_config.runtime.streaming = True
+    payload = "INSERT INTO t VALUES (1);\n" * 1000
+    db_backup = DatabaseBackup(encrypted_config, logger)
+    db_backup._dump_command = lambda db_name: (
+        [sys.executable, "-c", f"import sys; sys.stdout.write({payload!r})"], os.environ.copy()
+    )
+    s3_client = MagicMock()
+    s3_client.create_multipart_upload.return_value = {"UploadId": "upload-1"}
+    s3_client.upload_part.side_effect = lambda **kw: {"ETag": f'"{hashlib.md5(kw["Body"]).hexdigest()}"'}
+    db_backup.s3_storage.s3 = s3_client
+
+    name = db_backup.run(databases=["mydb"]).results[0].output
+
+    local_file = Path(encrypted_config.paths.backup_dir) / name
+    assert name.endswith(".sql.gz.enc")
+    assert s3_client.upload_part.call_args.kwargs["Body"] == local_file.read_bytes()
+    assert gzip.decompress(decrypt(db_backup.cipher, local_file.read_bytes())).decode() == payload
+    assert [s.stage for s in db_backup.metrics.stages() if s.stage == "encrypt"] == ["encrypt"]
@@ -4,8 +4,11 @@ Unit tests for dbbackup.core.executor module.
 
 import pytest
 from unittest.mock import patch, MagicMock
-from dbbackup.core.executor import CommandExecutor
+from dbbackup.core.executor import AsyncCommandExecutor, CommandExecutor
+import asyncio
+import io
 import logging
+import sys
 
 
 @pytest.fixture
@@ -48,4 +51,84 @@ def test_executor_run_failure(mock_subprocess, logger):
     mock_subprocess.side_effect = Exception("Execution failed")
 
     with pytest.raises(Exception):
-        executor.run("invalid_command")
\ No newline at end of file
+        executor.run("invalid_command")
+
+def test_executor_stream_yields_stdout(logger):
+    """
+    Test CommandExecutor.stream() yields the command's stdout.
+    """
+    executor = CommandExecutor(logger)
+    with executor.stream([sys.executable, "-c", "print('streamed')"]) as stdout:
+        assert stdout.read().strip() == b"streamed"
+
+
+def test_executor_stream_raises_on_failure(logger):
+    """
+    Test CommandExecutor.stream() raises RuntimeError on a non-zero exit code.
+    """
+    executor = CommandExecutor(logger)
+    with pytest.raises(RuntimeError):
+        with executor.stream([sys.executable, "-c", "import sys; sys.exit(2)"]) as stdout:
+            stdout.read()
+
+
+def test_executor_feed_streams_into_stdin(logger, tmp_path):
+    """
+    Test CommandExecutor.feed() pipes the source into the command's stdin.
+    """
+    target = tmp_path / "received.sql"
+    executor = CommandExecutor(logger)
+    script = f"import sys; open({str(target)!r}, 'wb').write(sys.stdin.buffer.read())"
+    written = executor.feed([sys.executable, "-c", script], io.BytesIO(b"x" * 300000), chunk_size=4096)
+    assert written == 300000
+    assert target.read_bytes() == b"x" * 300000
+
+
+def test_executor_feed_raises_when_command_exits_early(logger):
+    """
+    Test CommandExecutor.feed() reports a client that exits before reading all input.
+    """
+    executor = CommandExecutor(logger)
+    with pytest.raises(RuntimeError):
+        executor.feed([sys.executable, "-c", "import sys; sys.exit(1)"], io.BytesIO(b"x" * 10_000_000))
+
+
+def test_async_executor_stream_and_run(logger):
+    """
+    Test AsyncCommandExecutor streams stdout and captures output.
+    """
+    executor = AsyncCommandExecutor(logger)
+
+    async def scenario():
+        async with executor.stream([sys.executable, "-c", "print('streamed')"]) as stdout:
+            streamed = await stdout.read()
+        output = await executor.run([sys.executable, "-c", "print('captured')"], capture_output=True)
+        return streamed, output
+
+    assert asyncio.run(scenario()) == (b"streamed\n", "captured")
+
+
+def test_async_executor_raises_and_kills_on_cancel(logger):
+    """
+    Test AsyncCommandExecutor reports failures and kills a cancelled command.
+    """
+    executor = AsyncCommandExecutor(logger)
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await executor.run([sys.executable, "-c", "import sys; sys.exit(2)"])
+
+        processes = []
+        original_spawn = executor._spawn
+
+        async def spawn(*args, **kwargs):
+            processes.append(await original_spawn(*args, **kwargs))
+            return processes[-1]
+
+        executor._spawn = spawn
+        with pytest.raises(asyncio.TimeoutError):
+            async with executor.stream([sys.executable, "-c", "import time; time.sleep(30)"]) as stdout:
+                await asyncio.wait_for(stdout.read(), timeout=0.2)
+        return processes[0].returncode
+
+    assert asyncio.run(scenario()) is not None
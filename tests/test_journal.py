@@ -0,0 +1,188 @@
+"""
+Unit tests for dbbackup.core.journal module, resumable uploads and resumed backups.
+"""
+
+import logging
+import os
+import shlex
+import subprocess
+import time
+import pytest
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import MagicMock
+from botocore.exceptions import ClientError
+from dbbackup.core.backup import DatabaseBackup
+from dbbackup.core.journal import STAGE_COMPRESSED, JobJournal, JournalCollector
+from dbbackup.core.storages import s3
+from dbbackup.core.storages.s3 import S3Storage
+from dbbackup.core.storages.s3_transfer import MB, S3TransferSettings, get_s3_client, reset_transfer_cache
+
+moto = pytest.importorskip("moto")
+
+
+@pytest.fixture
+def logger():
+    """
+    Fixture to create a logger for testing.
+    """
+    logger = logging.getLogger("test_journal")
+    logger.addHandler(logging.NullHandler())
+    return logger
+
+
+@pytest.fixture
+def s3_bucket(monkeypatch):
+    """
+    Fixture providing an in-memory S3 stand-in with an empty bucket.
+    """
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    reset_transfer_cache()
+    with moto.mock_aws():
+        settings = S3TransferSettings(multipart_threshold=5 * MB, multipart_chunksize=5 * MB, max_concurrency=2)
+        get_s3_client(settings).create_bucket(Bucket="test-bucket")
+        yield settings
+    reset_transfer_cache()
+
+
+class FlakyClient:
+    """
+    S3 client whose first upload of a given part fails, like a dropped connection.
+    """
+    def __init__(self, client, failing_part):
+        self.client = client
+        self.failing_part = failing_part
+        self.uploaded_parts = []
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def upload_part(self, **kwargs):
+        if kwargs["PartNumber"] == self.failing_part:
+            self.failing_part = None
+            raise ClientError({"Error": {"Code": "RequestTimeout", "Message": "timed out"}}, "UploadPart")
+        self.uploaded_parts.append(kwargs["PartNumber"])
+        return self.client.upload_part(**kwargs)
+
+
+def dead_pid() -> int:
+    process = subprocess.Popen(["true"])
+    process.wait()
+    return process.pid
+
+
+def test_interrupted_upload_resumes_from_missing_parts(s3_bucket, logger, tmp_path):
+    """
+    Test a failed multipart upload keeps its completed parts and the retry only sends the missing one.
+    """
+    journal = JobJournal(str(tmp_path / "journal.sqlite3"), logger)
+    storage = S3Storage("test-bucket", logger, settings=s3_bucket, journal=journal)
+    storage.s3 = FlakyClient(storage.s3, failing_part=3)
+    source = tmp_path / "dbbackup_mydb1_20250601_000000.sql.gz"
+    source.write_bytes(os.urandom(11 * MB))
+
+    assert not storage.upload_backup(str(source), "mydb1/2025/06/dbbackup_mydb1_20250601_000000.sql.gz")
+    [upload] = journal.uploads()
+    assert sorted(upload.parts) == [1, 2]
+
+    storage.s3.uploaded_parts.clear()
+    assert storage.upload_backup(str(source), "mydb1/2025/06/dbbackup_mydb1_20250601_000000.sql.gz",
+                                 metadata={"checksum": "sha256:x"})
+    assert storage.s3.uploaded_parts == [3]
+    assert journal.uploads() == []
+    body = storage.s3.get_object(Bucket="test-bucket", Key="mydb1/2025/06/dbbackup_mydb1_20250601_000000.sql.gz")
+    assert body["Body"].read() == source.read_bytes()
+
+
+def test_resumable_upload_raises_part_size_to_stay_within_the_part_limit(s3_bucket, logger, tmp_path, monkeypatch):
+    """
+    Test a file too large for the configured part size is split into fewer, larger parts, as journaled.
+    """
+    monkeypatch.setattr(s3, "MAX_PARTS", 2)
+    journal = JobJournal(str(tmp_path / "journal.sqlite3"), logger)
+    storage = S3Storage("test-bucket", logger, settings=s3_bucket, journal=journal)
+    storage.s3 = FlakyClient(storage.s3, failing_part=2)
+    source = tmp_path / "dbbackup_mydb1_20250601_000000.sql.gz"
+    source.write_bytes(os.urandom(11 * MB))
+
+    assert not storage.upload_backup(str(source), "mydb1/2025/06/dbbackup_mydb1_20250601_000000.sql.gz")
+    [upload] = journal.uploads()
+    assert upload.part_size == 11 * MB // 2
+
+    assert storage.upload_backup(str(source), "mydb1/2025/06/dbbackup_mydb1_20250601_000000.sql.gz")
+    assert storage.s3.uploaded_parts == [1, 2]
+    body = storage.s3.get_object(Bucket="test-bucket", Key="mydb1/2025/06/dbbackup_mydb1_20250601_000000.sql.gz")
+    assert body["Body"].read() == source.read_bytes()
+
+
+def test_next_run_stores_kept_backup_instead_of_dumping(app_config, logger):
+    """
+    Test a backup that could not be uploaded is kept and stored by the next run without a new dump.
+    """
+    db_backup = DatabaseBackup(app_config, logger)
+    db_backup.executor = MagicMock()
+    db_backup.executor.run.side_effect = lambda command, env=None: Path(shlex.split(command)[-1]).write_text(
+        "CREATE TABLE t (id int);\n")
+    db_backup.s3_storage = MagicMock()
+    db_backup.s3_storage.list_multipart_uploads.return_value = []
+    db_backup.s3_storage.upload_backup.return_value = False
+
+    assert not db_backup.run(databases=["mydb1"]).results[0].succeeded
+    [job] = db_backup.journal.jobs()
+    assert job.stage == STAGE_COMPRESSED and Path(job.backup_path).is_file()
+
+    db_backup.executor.run.reset_mock()
+    db_backup.s3_storage.upload_backup.return_value = True
+    summary = db_backup.run(databases=["mydb1"])
+
+    assert summary.results[0].succeeded
+    db_backup.executor.run.assert_not_called()
+    assert db_backup.s3_storage.upload_backup.call_args.args[:2] == (job.backup_path, job.target_key)
+    assert db_backup.catalog.latest("mydb1").filename == Path(job.backup_path).name
+    assert db_backup.journal.jobs() == [] and not Path(job.work_dir).exists()
+
+
+def test_collector_removes_what_no_run_can_resume(s3_bucket, app_config, logger, tmp_path):
+    """
+    Test orphaned jobs, uploads and temp files are removed while a resumable job and its upload stay.
+    """
+    app_config.journal.max_age_hours = 1
+    journal = JobJournal.for_backup_dir(app_config.paths.backup_dir, logger)
+    storage = S3Storage("test-bucket", logger, settings=s3_bucket, journal=journal)
+    client = storage.s3
+    temp_dir = Path(app_config.paths.temp_dir)
+    pid = dead_pid()
+
+    crashed_dir, resumable_dir, stale_dir = (temp_dir / name for name in ("a_crashed1", "b_resume12", "c_stale123"))
+    for directory in (crashed_dir, resumable_dir, stale_dir):
+        directory.mkdir(parents=True)
+    old = time.time() - 2 * 3600
+    os.utime(stale_dir, (old, old))
+    partial = Path(app_config.paths.backup_dir) / ".dbbackup_mydb1_20250601_000000.sql.gz.partial"
+    partial.write_bytes(b"x")
+    os.utime(partial, (old, old))
+
+    for job_dir, stage in ((crashed_dir, "dump"), (resumable_dir, STAGE_COMPRESSED)):
+        job_id = journal.start_job("mydb1", datetime.now(), str(job_dir))
+        journal.update_job(job_id, stage=stage, backup_path=str(job_dir / "backup.sql.gz"), pid=pid)
+        journal.release_job(job_id)
+    uploads = {}
+    for name, source in (("resumable", str(resumable_dir / "backup.sql.gz")), ("streamed", None)):
+        uploads[name] = client.create_multipart_upload(Bucket="test-bucket", Key=f"mydb1/{name}")["UploadId"]
+        journal.start_upload(uploads[name], f"mydb1/{name}", 5 * MB, source=source)
+    # Unknown to the journal: one left by a crashed run of this tool, one by another tool sharing the bucket
+    for name, key in (("orphan", "mydb1/2025/06/dbbackup_mydb1_20250601_000000.sql.gz"), ("foreign", "exports/a.csv")):
+        uploads[name] = client.create_multipart_upload(Bucket="test-bucket", Key=key)["UploadId"]
+    with journal._connect() as conn:
+        conn.execute("UPDATE uploads SET pid = ?", (pid,))
+    journal._active.clear()
+
+    # moto reports every upload as initiated in 2010, so both unknown ones are old enough
+    assert JournalCollector(app_config, logger, journal, storage).run() == (1, 2, 2)
+
+    assert [job.work_dir for job in journal.jobs()] == [str(resumable_dir)]
+    assert not crashed_dir.exists() and not stale_dir.exists() and resumable_dir.exists() and not partial.exists()
+    remaining = [upload["UploadId"] for upload in client.list_multipart_uploads(Bucket="test-bucket")["Uploads"]]
+    assert sorted(remaining) == sorted([uploads["resumable"], uploads["foreign"]])
+    assert [upload.upload_id for upload in journal.uploads()] == [uploads["resumable"]]
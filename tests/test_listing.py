@@ -0,0 +1,247 @@
+"""
+Unit tests for dbbackup.core.listing module.
+"""
+
+import json
+import logging
+import os
+import pytest
+from datetime import datetime
+from botocore.exceptions import ClientError
+from unittest.mock import MagicMock
+from dbbackup.core.catalog import BackupCatalog, CatalogEntry
+from dbbackup.core.listing import LIST_CACHE_FILENAME, BackupIndex, format_table
+from dbbackup.core.retention import BackupPruner
+from dbbackup.core.storages.s3 import S3Storage
+from dbbackup.core.storages.s3_transfer import S3TransferSettings, get_s3_client, reset_transfer_cache
+from dbbackup.utils.timeutils import generate_backup_key, generate_timestamped_filename
+
+moto = pytest.importorskip("moto")
+
+# Backup directory mtime set by settle(), far enough in the past to be trusted
+SETTLED = 1_700_000_000
+
+
+@pytest.fixture
+def logger():
+    """
+    Fixture to create a logger for testing.
+    """
+    logger = logging.getLogger("test_listing")
+    logger.addHandler(logging.NullHandler())
+    return logger
+
+
+@pytest.fixture
+def s3_storage(monkeypatch, logger):
+    """
+    Fixture providing a storage handler whose calls can be inspected, backed by an in-memory bucket.
+    """
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    reset_transfer_cache()
+    with moto.mock_aws():
+        settings = S3TransferSettings()
+        get_s3_client(settings).create_bucket(Bucket="test-bucket")
+        yield MagicMock(wraps=S3Storage("test-bucket", logger, settings=settings))
+    reset_transfer_cache()
+
+
+def backup_name(database: str, day: int) -> tuple[str, str]:
+    """
+    Return the file name and S3 key of a backup taken at 02:00 on a day of June 2025.
+    """
+    timestamp = datetime(2025, 6, day, 2, 0)
+    filename = generate_timestamped_filename("dbbackup", database, "sql.gz", timestamp=timestamp)
+    return filename, generate_backup_key(database, filename, timestamp)
+
+
+def put_local(config, filename: str, size: int = 10):
+    backup_dir = config.paths.backup_dir
+    os.makedirs(backup_dir, exist_ok=True)
+    with open(os.path.join(backup_dir, filename), "wb") as f:
+        f.write(b"x" * size)
+
+
+def settle(config):
+    """
+    Backdate the backup directory's mtime, as if nothing had changed for a while.
+    """
+    os.utime(config.paths.backup_dir, (SETTLED, SETTLED))
+
+
+def age_cache(config, seconds: float):
+    """
+    Move the cached S3 listing times back, as if the listings had run that long ago.
+    """
+    cache_path = os.path.join(config.paths.temp_dir, LIST_CACHE_FILENAME)
+    with open(cache_path) as f:
+        state = json.load(f)
+    state["s3_listed_at"] -= seconds
+    state["s3_full_listed_at"] -= seconds
+    with open(cache_path, "w") as f:
+        json.dump(state, f)
+
+
+def test_merges_local_and_s3_backups(app_config, s3_storage, logger):
+    """
+    Test one view lists local, S3 and mirrored backups with their verification status.
+    """
+    mirrored, mirrored_key = backup_name("mydb1", 2)
+    local_only, _ = backup_name("mydb1", 1)
+    s3_only, s3_only_key = backup_name("mydb2", 3)
+    put_local(app_config, mirrored, size=100)
+    put_local(app_config, local_only, size=50)
+    s3_storage.s3.put_object(Bucket="test-bucket", Key=mirrored_key, Body=b"x" * 100)
+    s3_storage.s3.put_object(Bucket="test-bucket", Key=s3_only_key, Body=b"x" * 70)
+    catalog = BackupCatalog.for_backup_dir(app_config.paths.backup_dir, logger)
+    entry_id = catalog.record(CatalogEntry("mydb1", datetime(2025, 6, 2, 2, 0), mirrored, codec="gzip"))
+    catalog.mark_verified(entry_id, "ok")
+
+    backups = BackupIndex(app_config, logger, s3_storage=s3_storage).run()
+
+    assert [(b.filename, b.location, b.size, b.verify_status) for b in backups] == [
+        (mirrored, "local+s3", 100, "ok"),
+        (local_only, "local", 50, None),
+        (s3_only, "s3", 70, None),
+    ]
+    assert all(b.codec == "gzip" for b in backups)
+    assert BackupIndex(app_config, logger, s3_storage=s3_storage).run(database="mydb2")[0].filename == s3_only
+
+
+def test_cached_listing_touches_neither_s3_nor_the_directory(app_config, s3_storage, logger, monkeypatch):
+    """
+    Test a listing within the TTL of an unchanged directory is served from the cache.
+    """
+    filename, key = backup_name("mydb1", 1)
+    put_local(app_config, filename)
+    s3_storage.s3.put_object(Bucket="test-bucket", Key=key, Body=b"x")
+    settle(app_config)
+    first = BackupIndex(app_config, logger, s3_storage=s3_storage).run()
+
+    monkeypatch.setattr(BackupIndex, "_scan_local", MagicMock(side_effect=AssertionError("directory rescanned")))
+    second = BackupIndex(app_config, logger, s3_storage=s3_storage).run()
+
+    assert second == first
+    s3_storage.list_backup_objects.assert_called_once()
+
+
+def test_directory_changes_are_picked_up_within_the_ttl(app_config, s3_storage, logger):
+    """
+    Test adding and deleting local backups changes the directory mtime and refreshes the view without S3.
+    """
+    old, _ = backup_name("mydb1", 1)
+    new, _ = backup_name("mydb1", 2)
+    put_local(app_config, old)
+    settle(app_config)
+    BackupIndex(app_config, logger, s3_storage=s3_storage).run()
+
+    put_local(app_config, new)
+    os.remove(os.path.join(app_config.paths.backup_dir, old))
+    backups = BackupIndex(app_config, logger, s3_storage=s3_storage).run()
+
+    assert [b.filename for b in backups] == [new]
+    s3_storage.list_backup_objects.assert_called_once()
+
+
+def test_expired_ttl_lists_s3_after_the_last_known_key(app_config, s3_storage, logger):
+    """
+    Test an S3 refresh asks only for keys after the newest one already listed per database.
+    """
+    first, first_key = backup_name("mydb1", 1)
+    second, second_key = backup_name("mydb1", 2)
+    s3_storage.s3.put_object(Bucket="test-bucket", Key=first_key, Body=b"x")
+    BackupIndex(app_config, logger, s3_storage=s3_storage).run()
+
+    s3_storage.s3.put_object(Bucket="test-bucket", Key=second_key, Body=b"x")
+    age_cache(app_config, app_config.listing.cache_ttl)
+    backups = BackupIndex(app_config, logger, s3_storage=s3_storage).run()
+
+    assert [b.filename for b in backups] == [second, first]
+    assert s3_storage.list_backup_objects.call_args.kwargs["start_after"] == {"mydb1/": second_key}
+
+
+def test_refresh_drops_objects_deleted_from_s3(app_config, s3_storage, logger):
+    """
+    Test --refresh relists the bucket from scratch, so deleted objects disappear.
+    """
+    filename, key = backup_name("mydb1", 1)
+    s3_storage.s3.put_object(Bucket="test-bucket", Key=key, Body=b"x")
+    assert BackupIndex(app_config, logger, s3_storage=s3_storage).run()
+
+    s3_storage.s3.delete_object(Bucket="test-bucket", Key=key)
+    assert BackupIndex(app_config, logger, s3_storage=s3_storage).run()
+    assert BackupIndex(app_config, logger, s3_storage=s3_storage).run(refresh=True) == []
+
+
+def test_full_listing_every_few_ttls_drops_objects_deleted_elsewhere(app_config, s3_storage, logger):
+    """
+    Test objects deleted by other tools drop out once a full listing is due, without --refresh.
+    """
+    kept, kept_key = backup_name("mydb1", 2)
+    _, deleted_key = backup_name("mydb1", 1)
+    for key in (kept_key, deleted_key):
+        s3_storage.s3.put_object(Bucket="test-bucket", Key=key, Body=b"x")
+    BackupIndex(app_config, logger, s3_storage=s3_storage).run()
+    s3_storage.s3.delete_object(Bucket="test-bucket", Key=deleted_key)
+
+    age_cache(app_config, app_config.listing.cache_ttl)
+    assert len(BackupIndex(app_config, logger, s3_storage=s3_storage).run()) == 2
+
+    age_cache(app_config, app_config.listing.cache_ttl * app_config.listing.full_refresh_every)
+    assert [b.filename for b in BackupIndex(app_config, logger, s3_storage=s3_storage).run()] == [kept]
+    assert s3_storage.list_backup_objects.call_args.kwargs["start_after"] == {"mydb1/": kept_key}
+
+
+def test_failed_full_listing_keeps_the_cached_s3_backups(app_config, s3_storage, logger):
+    """
+    Test a full listing or --refresh that fails keeps the cached S3 backups and is retried on the next run.
+    """
+    filename, key = backup_name("mydb1", 1)
+    s3_storage.s3.put_object(Bucket="test-bucket", Key=key, Body=b"x")
+    assert len(BackupIndex(app_config, logger, s3_storage=s3_storage).run()) == 1
+
+    s3_storage.list_backup_objects.side_effect = ClientError({"Error": {"Code": "SlowDown"}}, "ListObjectsV2")
+    age_cache(app_config, app_config.listing.cache_ttl * app_config.listing.full_refresh_every)
+    assert [b.s3_key for b in BackupIndex(app_config, logger, s3_storage=s3_storage).run()] == [key]
+    assert [b.s3_key for b in BackupIndex(app_config, logger, s3_storage=s3_storage).run(refresh=True)] == [key]
+
+    s3_storage.list_backup_objects.side_effect = None
+    s3_storage.s3.delete_object(Bucket="test-bucket", Key=key)
+    assert BackupIndex(app_config, logger, s3_storage=s3_storage).run() == []
+
+
+def test_pruned_backups_leave_the_cached_list(app_config, s3_storage, logger):
+    """
+    Test --prune removes the S3 objects it deleted from the cached view.
+    """
+    app_config.retention.keep_last = 1
+    app_config.retention.daily = app_config.retention.weekly = app_config.retention.monthly = 0
+    names = []
+    for day in (1, 2, 3):
+        filename, key = backup_name("mydb1", day)
+        s3_storage.s3.put_object(Bucket="test-bucket", Key=key, Body=b"x")
+        names.append(filename)
+    assert len(BackupIndex(app_config, logger, s3_storage=s3_storage).run()) == 3
+
+    pruner = BackupPruner(app_config, logger)
+    pruner.s3_storage = s3_storage
+    assert len(pruner.run()) == 2
+
+    assert [b.filename for b in BackupIndex(app_config, logger, s3_storage=s3_storage).run()] == [names[2]]
+    index_listings = [c for c in s3_storage.list_backup_objects.call_args_list if "start_after" in c.kwargs]
+    assert len(index_listings) == 1  # Served from the cache, not relisted
+
+
+def test_format_table_shows_age_and_human_sizes(app_config, logger):
+    """
+    Test the table renders age, size, codec, location and verification status.
+    """
+    app_config.aws = None
+    filename, _ = backup_name("mydb1", 1)
+    put_local(app_config, filename, size=3 * 1024 * 1024)
+    backups = BackupIndex(app_config, logger).run()
+
+    header, row = format_table(backups, now=datetime(2025, 6, 3, 5, 30))
+    assert header.split()[:8] == ["DATABASE", "CREATED", "AGE", "SIZE", "CODEC", "STORED", "VERIFIED", "FILENAME"]
+    assert row.split() == ["mydb1", "2025-06-01", "02:00:00", "2d03h", "3.0", "MiB", "gzip", "local", "-", filename]
@@ -0,0 +1,98 @@
+"""
+Unit tests for dbbackup.core.storages.local module.
+"""
+
+import errno
+import logging
+import os
+import pytest
+from dbbackup.core.storages import local
+from dbbackup.core.storages.local import LocalStorage, place_file
+
+
+@pytest.fixture
+def logger():
+    """
+    Fixture to create a logger for testing.
+    """
+    logger = logging.getLogger("test_local_storage")
+    logger.addHandler(logging.NullHandler())
+    return logger
+
+
+@pytest.fixture
+def source(tmp_path):
+    """
+    Fixture providing a compressed backup waiting in the temp directory.
+    """
+    path = tmp_path / "temp" / "dbbackup_mydb1_20250601_000000.sql.gz"
+    path.parent.mkdir()
+    path.write_bytes(os.urandom(3 * 1024 * 1024 + 17))
+    os.utime(path, (1_700_000_000, 1_700_000_000))
+    return path
+
+
+def fail_with(code):
+    def fail(*args, **kwargs):
+        raise OSError(code, os.strerror(code))
+    return fail
+
+
+def test_same_filesystem_backup_is_hard_linked(source, logger, tmp_path):
+    """
+    Test a backup on the same filesystem is linked rather than copied and the source stays in place.
+    """
+    storage = LocalStorage(str(tmp_path / "backup"), logger)
+
+    assert storage.save_backup(str(source), source.name)
+
+    target = storage.backup_dir / source.name
+    assert os.path.samefile(source, target) and source.exists()
+    assert storage.list_backups() == [str(target)]
+    assert [stage.stage for stage in storage.metrics.stages()] == ["store_local"]
+
+
+def test_other_filesystem_backup_is_copied_in_kernel(source, monkeypatch, tmp_path):
+    """
+    Test a cross-device backup is reflinked or copied with copy_file_range, keeping content and mtime.
+    """
+    monkeypatch.setattr(local.os, "link", fail_with(errno.EXDEV))
+    target = tmp_path / "backup.sql.gz"
+
+    assert place_file(source, target) in ("reflink", "copy_file_range")
+
+    assert target.read_bytes() == source.read_bytes() and not os.path.samefile(source, target)
+    assert target.stat().st_mtime == 1_700_000_000
+    assert [path.name for path in tmp_path.iterdir() if path.name.startswith(".")] == []
+
+
+@pytest.mark.parametrize("unsupported, expected", [
+    (["link", "ioctl", "copy_file_range"], "sendfile"),
+    (["link", "ioctl", "copy_file_range", "sendfile"], "copy"),
+])
+def test_placement_falls_back_when_methods_are_unsupported(source, monkeypatch, tmp_path, unsupported, expected):
+    """
+    Test each unsupported placement method falls through to the next one.
+    """
+    for name in unsupported:
+        module = local.fcntl if name == "ioctl" else local.os
+        monkeypatch.setattr(module, name, fail_with(errno.EOPNOTSUPP if name != "link" else errno.EXDEV))
+    target = tmp_path / "backup.sql.gz"
+
+    assert place_file(source, target) == expected
+    assert target.read_bytes() == source.read_bytes()
+
+
+def test_failed_placement_keeps_previous_backup(source, logger, monkeypatch, tmp_path):
+    """
+    Test a copy that cannot be synced leaves neither a partial file nor a changed target.
+    """
+    storage = LocalStorage(str(tmp_path / "backup"), logger)
+    target = storage.backup_dir / source.name
+    target.write_bytes(b"previous")
+    monkeypatch.setattr(local.os, "fsync", fail_with(errno.EIO))
+
+    assert not storage.save_backup(str(source), source.name)
+
+    assert target.read_bytes() == b"previous"
+    assert [path.name for path in storage.backup_dir.iterdir()] == [source.name]
@@ -0,0 +1,105 @@
+"""
+Unit tests for dbbackup.core.metrics module and the metrics hooks.
+"""
+
+import hashlib
+import io
+import json
+import logging
+import sys
+import pytest
+from unittest.mock import MagicMock
+from dbbackup.core.backup import DatabaseBackup
+from dbbackup.core.compressor import Compressor
+from dbbackup.core.metrics import MetricsRecorder
+
+
+@pytest.fixture
+def logger():
+    """
+    Fixture to create a logger for testing.
+    """
+    logger = logging.getLogger("test_metrics")
+    logger.addHandler(logging.NullHandler())
+    return logger
+
+
+def test_recorder_aggregates_stages_per_database():
+    """
+    Test measurements are summed per database and stage, labelled by the current database.
+    """
+    recorder = MetricsRecorder("backup")
+    with recorder.database("mydb1"):
+        recorder.record("upload_s3", 1.0, 100, 100)
+        recorder.record("upload_s3", 3.0, 300, 300)
+        with recorder.stage("compress", bytes_in=1000) as stage:
+            stage.bytes_out = 250
+    recorder.record("dump", 2.0, bytes_out=500, database="mydb2")
+
+    stages = {(s.database, s.stage): s for s in recorder.stages()}
+    upload = stages[("mydb1", "upload_s3")]
+    assert (upload.seconds, upload.bytes_in, upload.count) == (4.0, 400, 2)
+    assert upload.throughput == 100.0
+    assert stages[("mydb1", "compress")].ratio == 4.0
+    assert stages[("mydb2", "dump")].throughput == 250.0
+
+
+def test_openmetrics_and_json_reports(tmp_path, logger):
+    """
+    Test the textfile and JSON report contain stage, job and resource metrics.
+    """
+    recorder = MetricsRecorder("backup")
+    recorder.record("compress", 2.0, 4000, 1000, database="mydb")
+    recorder.record_job("mydb", True, 5.0)
+
+    recorder.write_reports(logger, textfile_dir=str(tmp_path / "prom"), report_dir=str(tmp_path / "reports"))
+
+    text = (tmp_path / "prom" / "dbbackup_backup.prom").read_text()
+    assert '# TYPE dbbackup_stage_duration_seconds gauge' in text
+    assert 'dbbackup_stage_duration_seconds{operation="backup",database="mydb",stage="compress"} 2' in text
+    assert 'dbbackup_compression_ratio{operation="backup",database="mydb"} 4' in text
+    assert 'dbbackup_job_success{operation="backup",database="mydb"} 1' in text
+    assert "dbbackup_children_cpu_user_seconds" in text
+    assert text.endswith("# EOF\n")
+
+    report = json.loads(next((tmp_path / "reports").glob("backup_*.json")).read_text())
+    assert report["jobs"]["mydb"] == {"succeeded": True, "seconds": 5.0}
+    assert report["stages"][0]["throughput_mb_s"] == round(4000 / 2.0 / 1024 / 1024, 2)
+    assert report["resources"]["peak_rss_bytes"] > 0
+
+
+def test_compress_stream_records_compress_and_read_stages(logger):
+    """
+    Test Compressor.compress_stream separates codec time from source read time.
+    """
+    recorder = MetricsRecorder()
+    compressor = Compressor(logger, method="gzip", metrics=recorder)
+    with recorder.database("mydb"):
+        compressor.compress_stream(io.BytesIO(b"a" * 100000), io.BytesIO(), read_stage="dump")
+
+    stages = {s.stage: s for s in recorder.stages()}
+    assert stages["compress"].bytes_in == 100000
+    assert 0 < stages["compress"].bytes_out < 100000
+    assert stages["dump"].bytes_out == 100000
+
+
+def test_streaming_backup_exports_stage_metrics(app_config, logger, tmp_path):
+    """
+    Test a streaming backup run records dump, compress, store and upload stages and writes the textfile.
+    """
+    app_config.runtime.streaming = True
+    app_config.metrics.textfile_dir = str(tmp_path / "prom")
+    db_backup = DatabaseBackup(app_config, logger)
+    db_backup._dump_command = lambda db_name: ([sys.executable, "-c", "print('SELECT 1;' * 1000)"], None)
+    s3_client = MagicMock()
+    s3_client.create_multipart_upload.return_value = {"UploadId": "upload-1"}
+    s3_client.upload_part.side_effect = lambda **kw: {"ETag": f'"{hashlib.md5(kw["Body"]).hexdigest()}"'}
+    db_backup.s3_storage.s3 = s3_client
+
+    db_backup.run(databases=["mydb"])
+
+    assert {(s.database, s.stage) for s in db_backup.metrics.stages()} == {
+        ("mydb", "dump"), ("mydb", "compress"), ("mydb", "store_local"), ("mydb", "upload_s3"),
+    }
+    text = (tmp_path / "prom" / "dbbackup_backup.prom").read_text()
+    assert 'dbbackup_stage_bytes_in{operation="backup",database="mydb",stage="compress"} 9001' in text
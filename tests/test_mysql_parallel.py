@@ -0,0 +1,181 @@
+"""
+Unit tests for dbbackup.core.mysql_parallel module and tables-format MySQL backups.
+"""
+
+import logging
+import re
+import pytest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from unittest.mock import MagicMock
+from dbbackup.core.archiver import read_binlog_position
+from dbbackup.core.backup import DatabaseBackup
+from dbbackup.core.mysql_parallel import MySQLParallelDumper, key_ranges, split_secondary_indexes, sql_literal
+from dbbackup.core.restore import DatabaseRestore
+
+ORDERS_DDL = """CREATE TABLE `orders` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `user_id` varchar(20) NOT NULL,
+  `note` text,
+  PRIMARY KEY (`id`),
+  KEY `idx_user` (`user_id`),
+  FULLTEXT KEY `ft_note` (`note`)
+) ENGINE=InnoDB AUTO_INCREMENT=4 DEFAULT CHARSET=utf8mb4"""
+
+USERS_DDL = """CREATE TABLE `users` (
+  `name` varchar(20) NOT NULL,
+  PRIMARY KEY (`name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4"""
+
+ROWS = {
+    "orders": [(1, "ann", "it's\nnew"), (2, "bob", None), (3, "ann", "\\")],
+    "users": [("ann",), ("bob",)],
+}
+
+
+class FakeCursor:
+    """
+    Cursor answering the dumper's queries from canned metadata and rows.
+    """
+    def __init__(self):
+        self.result = []
+
+    def execute(self, sql, params=()):
+        if sql.startswith("SHOW BINARY LOG STATUS"):
+            self.result = [("binlog.000008", 157, "", "", "")]
+        elif "information_schema.TABLES" in sql:
+            self.result = [("orders", 3, "InnoDB"), ("users", 2, "InnoDB")]
+        elif sql.startswith("SHOW CREATE TABLE"):
+            self.result = [("", ORDERS_DDL if "orders" in sql else USERS_DDL)]
+        elif "information_schema.COLUMNS" in sql:
+            self.result = ([("id", "int", "PRI", "auto_increment"), ("user_id", "varchar", "MUL", ""),
+                            ("note", "text", "", "")] if params[1] == "orders" else [("name", "varchar", "PRI", "")])
+        elif sql.startswith("SELECT MIN"):
+            self.result = [(1, 3)]
+        elif sql.startswith("SELECT `"):
+            table = re.search(r"FROM `(\w+)`", sql)[1]
+            low, high = params or (0, 10)
+            self.result = [row for row in ROWS[table] if table != "orders" or low <= row[0] < high]
+        else:
+            self.result = []
+
+    def fetchone(self):
+        return self.result.pop(0) if self.result else None
+
+    def fetchall(self):
+        rows, self.result = self.result, []
+        return rows
+
+    def fetchmany(self, size):
+        rows, self.result = self.result[:size], self.result[size:]
+        return rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def cursor(self, buffered=False):
+        return FakeCursor()
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def logger():
+    """
+    Fixture to create a logger for testing.
+    """
+    logger = logging.getLogger("test_mysql_parallel")
+    logger.addHandler(logging.NullHandler())
+    return logger
+
+
+@pytest.fixture
+def tables_config(app_config):
+    """
+    Fixture to switch the test configuration to MySQL tables-format dumps.
+    """
+    app_config.database.type = "mysql"
+    app_config.database.dump.mysql.format = "tables"
+    app_config.database.dump.mysql.jobs = 2
+    app_config.database.dump.mysql.chunk_rows = 2
+    return app_config
+
+
+def test_sql_literal_escapes_like_mysqldump():
+    """
+    Test values returned by the connector are rendered as safe MySQL literals.
+    """
+    assert sql_literal("it's\n\\\0") == "'it\\'s\\n\\\\\\0'"
+    assert sql_literal(b"\x00\xff") == "X'00ff'"
+    assert sql_literal(None) == "NULL"
+    assert sql_literal(Decimal("1.50")) == "1.50"
+    assert sql_literal(timedelta(hours=-26, minutes=-3)) == "'-26:03:00'"
+    assert sql_literal(datetime(2025, 6, 1, 12, 0, 5)) == "'2025-06-01 12:00:05'"
+    assert sql_literal({"b", "a"}) == "'a,b'"
+
+
+def test_split_secondary_indexes_defers_keys_but_keeps_primary():
+    """
+    Test secondary indexes are moved into ALTER TABLE statements, one per FULLTEXT index.
+    """
+    reduced, statements = split_secondary_indexes("orders", ORDERS_DDL)
+    assert "idx_user" not in reduced and "ft_note" not in reduced
+    assert "  PRIMARY KEY (`id`)\n) ENGINE=InnoDB" in reduced
+    assert statements == ["ALTER TABLE `orders` ADD KEY `idx_user` (`user_id`);",
+                          "ALTER TABLE `orders` ADD FULLTEXT KEY `ft_note` (`note`);"]
+
+    with_fk = ORDERS_DDL.replace("  FULLTEXT KEY `ft_note` (`note`)",
+                                 "  CONSTRAINT `fk` FOREIGN KEY (`user_id`) REFERENCES `users` (`name`)")
+    assert split_secondary_indexes("orders", with_fk) == (with_fk, [])
+    assert key_ranges(1, 10, 3) == [(1, 5), (5, 9), (9, 11)]
+
+
+def test_tables_backup_round_trip(tables_config, logger, monkeypatch):
+    """
+    Test a tables dump is chunked by primary key, and restores fully or one table at a time.
+    """
+    monkeypatch.setattr(MySQLParallelDumper, "_connect", lambda self, db_name: FakeConnection())
+    db_backup = DatabaseBackup(tables_config, logger)
+    db_backup.s3_storage = MagicMock()
+    db_backup.s3_storage.upload_backup.return_value = True
+
+    summary = db_backup.run(databases=["shop"])
+
+    backup_path = str(Path(tables_config.paths.backup_dir) / summary.results[0].output)
+    assert backup_path.endswith(".tables.tar")
+    assert db_backup.catalog.latest("shop").format == "tables"
+    assert read_binlog_position(backup_path) == ("binlog.000008", 157)
+
+    fed = []
+    restore = DatabaseRestore(tables_config, logger)
+    restore.executor = MagicMock()
+    restore.executor.feed.side_effect = lambda args, source, env=None: fed.append(source.read().decode()) or 0
+    restore.run("shop", backup_path)
+
+    schemas, data, indexes = fed[:2], fed[2:5], fed[5:]
+    assert all("CREATE TABLE" in sql for sql in schemas) and not any("idx_user" in sql for sql in schemas)
+    assert sorted(sql.count("),\n(") + 1 for sql in data) == [1, 2, 2]
+    assert any("'it\\'s\\nnew'" in sql for sql in data)
+    assert "ADD KEY `idx_user`" in indexes[0]
+
+    fed.clear()
+    restore.run("shop", backup_path, tables=["users"])
+    assert len(fed) == 2 and "`users`" in fed[0] and "'ann'),\n('bob'" in fed[1]
+
+
+def test_single_table_restore_refuses_unknown_table(app_config, logger, tmp_path):
+    """
+    Test --tables on a mysqldump file fails for a table the dump does not define instead of replaying it.
+    """
+    app_config.database.type = "mysql"
+    backup = tmp_path / "dbbackup_shop_20250601_000000.sql"
+    backup.write_text("--\n-- Table structure for table `t`\n--\n\nCREATE TABLE t (id int);\n")
+    restore = DatabaseRestore(app_config, logger)
+    restore.executor = MagicMock()
+    with pytest.raises(RuntimeError, match="missing_table"):
+        restore.run("shop", str(backup), tables=["missing_table"])
+    restore.executor.feed.assert_not_called()
@@ -0,0 +1,127 @@
+"""
+Unit tests for physical backups (pg_basebackup, xtrabackup/mariabackup) and physical restores.
+"""
+
+import hashlib
+import io
+import logging
+import os
+import sys
+import tarfile
+import pytest
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import MagicMock
+from dbbackup.core.backup import DatabaseBackup
+from dbbackup.core.restore import DatabaseRestore
+
+
+@pytest.fixture
+def logger():
+    """
+    Fixture to create a logger for testing.
+    """
+    logger = logging.getLogger("test_physical")
+    logger.addHandler(logging.NullHandler())
+    return logger
+
+
+@pytest.fixture
+def physical_config(app_config, tmp_path):
+    """
+    Fixture to switch the test configuration to physical backups restoring into a temporary data directory.
+    """
+    app_config.database.backup_mode = "physical"
+    app_config.database.physical.data_dir = str(tmp_path / "pgdata")
+    return app_config
+
+
+def test_physical_commands_stream_to_stdout(physical_config, logger):
+    """
+    Test pg_basebackup and xtrabackup are asked for a single archive on stdout.
+    """
+    db_backup = DatabaseBackup(physical_config, logger)
+    args, env = db_backup._dump_command("instance")
+    assert args[0] == "pg_basebackup"
+    assert args[args.index("-D") + 1] == "-" and args[args.index("-F") + 1] == "t"
+    assert env["PGPASSWORD"] == "dbpassword"
+    assert db_backup._stream_target("instance")[2].endswith(".base.tar.gz")
+
+    physical_config.database.type = "mysql"
+    physical_config.database.physical.mysql_tool = "mariabackup"
+    args, env = db_backup._dump_command("instance")
+    assert args[:4] == ["mariabackup", "--backup", "--stream=xbstream", "--parallel=4"]
+    assert env["MYSQL_PWD"] == "dbpassword"
+
+
+def test_basebackup_round_trip_with_recovery_target(physical_config, logger, tmp_path):
+    """
+    Test a streamed base backup lands under the label and restores into the data directory set up for PITR.
+    """
+    archive = io.BytesIO()
+    with tarfile.open(fileobj=archive, mode="w") as tar:
+        for name, data in (("PG_VERSION", b"16\n"), ("global/pg_control", b"\0" * 512)):
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    base_tar = tmp_path / "base.tar"
+    base_tar.write_bytes(archive.getvalue())
+
+    db_backup = DatabaseBackup(physical_config, logger)
+    db_backup._dump_command = lambda db_name: (
+        [sys.executable, "-c", f"import sys; sys.stdout.buffer.write(open({str(base_tar)!r}, 'rb').read())"],
+        os.environ.copy(),
+    )
+    s3_client = MagicMock()
+    s3_client.create_multipart_upload.return_value = {"UploadId": "upload-1"}
+    s3_client.upload_part.side_effect = lambda **kw: {"ETag": f'"{hashlib.md5(kw["Body"]).hexdigest()}"'}
+    db_backup.s3_storage.s3 = s3_client
+
+    summary = db_backup.run(databases=["mydb1", "mydb2"])
+
+    assert [result.name for result in summary.results] == ["instance"]
+    entry = db_backup.catalog.latest("instance")
+    assert entry.filename.endswith(".base.tar.gz") and entry.format == "basebackup"
+
+    restore = DatabaseRestore(physical_config, logger)
+    restore.run("instance", entry.local_path, until=datetime(2030, 1, 1, 12, 0))
+
+    data_dir = Path(physical_config.database.physical.data_dir)
+    assert (data_dir / "PG_VERSION").read_bytes() == b"16\n"
+    assert data_dir.stat().st_mode & 0o777 == 0o700
+    assert (data_dir / "recovery.signal").exists()
+    settings = (data_dir / "postgresql.auto.conf").read_text()
+    assert "--restore-wal %f" in settings
+    assert "recovery_target_time = '2030-01-01 12:00:00'" in settings
+
+
+def test_xbstream_restore_extracts_and_prepares(physical_config, logger, tmp_path):
+    """
+    Test an xbstream backup is unpacked with xbstream and prepared with the configured tool.
+    """
+    physical_config.database.type = "mysql"
+    backup = tmp_path / "instance_20250601_000000.xbstream"
+    backup.write_bytes(b"XBSTCK01")
+    restore = DatabaseRestore(physical_config, logger)
+    restore.executor = MagicMock()
+
+    restore.run("instance", str(backup))
+
+    data_dir = physical_config.database.physical.data_dir
+    extract_args, stream = restore.executor.feed.call_args.args
+    assert extract_args == ["xbstream", "-x", "-C", data_dir]
+    restore.executor.run.assert_called_once_with(f"xtrabackup --prepare --target-dir={data_dir}")
+
+
+def test_physical_restore_refuses_non_empty_data_dir(physical_config, logger, tmp_path):
+    """
+    Test a physical restore never writes over an existing data directory.
+    """
+    data_dir = Path(physical_config.database.physical.data_dir)
+    data_dir.mkdir()
+    (data_dir / "PG_VERSION").write_text("15\n")
+    backup = tmp_path / "instance_20250601_000000.base.tar"
+    backup.write_bytes(b"")
+
+    assert not DatabaseRestore(physical_config, logger)._restore_physical(str(backup), "basebackup", None)
+    assert (data_dir / "PG_VERSION").read_text() == "15\n"
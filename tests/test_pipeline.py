@@ -0,0 +1,186 @@
+"""
+Unit tests for dbbackup.core.pipeline module and the streaming backup path.
+"""
+
+import gzip
+import hashlib
+import os
+import sys
+import pytest
+from pathlib import Path
+from unittest.mock import MagicMock
+from dbbackup.core.backup import DatabaseBackup
+from dbbackup.core.block_index import BlockIndex, BlockIndexBuilder, index_path
+from dbbackup.core.logger import get_logger
+from dbbackup.core.integrity import multipart_etag, read_manifest
+from dbbackup.core.pipeline import TeeWriter
+
+
+@pytest.fixture
+def logger():
+    """
+    Fixture to provide a logger for testing.
+    """
+    return get_logger("test_pipeline", log_dir="logs_test", console=False)
+
+
+def test_tee_writer_commits_all_writers(logger):
+    """
+    Test TeeWriter duplicates data and commits every writer.
+    """
+    first, second = MagicMock(), MagicMock()
+    tee = TeeWriter.open([lambda: first, lambda: second], logger)
+    tee.write(b"abc")
+    tee.commit()
+    first.write.assert_called_once_with(b"abc")
+    second.write.assert_called_once_with(b"abc")
+    first.commit.assert_called_once()
+    second.commit.assert_called_once()
+    assert tee.bytes_written == 3
+
+
+def test_tee_writer_aborts_opened_writers_on_open_failure(logger):
+    """
+    Test TeeWriter.open aborts writers opened before a failing factory.
+    """
+    opened = MagicMock()
+
+    def failing_factory():
+        raise RuntimeError("cannot open")
+
+    with pytest.raises(RuntimeError):
+        TeeWriter.open([lambda: opened, failing_factory], logger)
+    opened.abort.assert_called_once()
+
+
+def test_streaming_backup_writes_local_and_s3(app_config, logger):
+    """
+    Test streaming mode compresses the dump directly into local storage and a multipart upload.
+    """
+    app_config.runtime.streaming = True
+    db_backup = DatabaseBackup(app_config, logger)
+    payload = "INSERT INTO t VALUES (1);\n" * 1000
+    db_backup._dump_command = lambda db_name: (
+        [sys.executable, "-c", f"import sys; sys.stdout.write({payload!r})"], os.environ.copy()
+    )
+    s3_client = MagicMock()
+    s3_client.create_multipart_upload.return_value = {"UploadId": "upload-1"}
+    s3_client.upload_part.side_effect = lambda **kw: {"ETag": f'"{hashlib.md5(kw["Body"]).hexdigest()}"'}
+    db_backup.s3_storage.s3 = s3_client
+
+    summary = db_backup.run(databases=["mydb"])
+
+    target_name = summary.results[0].output
+    assert target_name.endswith(".sql.gz")
+    local_file = Path(app_config.paths.backup_dir) / target_name
+    assert gzip.decompress(local_file.read_bytes()).decode() == payload
+    uploaded = s3_client.upload_part.call_args.kwargs["Body"]
+    assert uploaded == local_file.read_bytes()
+    s3_client.complete_multipart_upload.assert_called_once()
+    assert not list(Path(app_config.paths.temp_dir).glob("*"))
+    entry = db_backup.catalog.latest("mydb")
+    assert (entry.filename, entry.codec, entry.size) == (target_name, "gzip", local_file.stat().st_size)
+    assert entry.s3_key.startswith("mydb/")
+    assert entry.checksum == "sha256:" + hashlib.sha256(local_file.read_bytes()).hexdigest()
+    assert entry.etag == multipart_etag([hashlib.md5(uploaded).hexdigest()])
+    assert read_manifest(str(local_file)) == entry.checksum
+
+
+def test_streaming_backup_aborts_on_dump_failure(app_config, logger):
+    """
+    Test a failing dump aborts the multipart upload and leaves no local file behind.
+    """
+    app_config.runtime.streaming = True
+    db_backup = DatabaseBackup(app_config, logger)
+    db_backup._dump_command = lambda db_name: ([sys.executable, "-c", "import sys; sys.exit(3)"], None)
+    s3_client = MagicMock()
+    s3_client.create_multipart_upload.return_value = {"UploadId": "upload-1"}
+    db_backup.s3_storage.s3 = s3_client
+
+    summary = db_backup.run(databases=["mydb"])
+
+    assert summary.results[0].status == "failed"
+    s3_client.abort_multipart_upload.assert_called_once()
+    assert db_backup.local_storage.list_backups() == []
+    assert not list(Path(app_config.paths.backup_dir).glob(".*.partial"))
+
+
+def test_asyncio_engine_streams_backup(app_config, logger):
+    """
+    Test the asyncio engine streams a dump through the staged pipeline into both storages.
+    """
+    app_config.runtime.engine = "asyncio"
+    db_backup = DatabaseBackup(app_config, logger)
+    payload = "INSERT INTO t VALUES (1);\n" * 100000
+    db_backup._dump_command = lambda db_name: (
+        [sys.executable, "-c", "import sys; sys.stdout.write('INSERT INTO t VALUES (1);\\n' * 100000)"],
+        os.environ.copy()
+    )
+    s3_client = MagicMock()
+    s3_client.create_multipart_upload.return_value = {"UploadId": "upload-1"}
+    s3_client.upload_part.side_effect = lambda **kw: {"ETag": f'"{hashlib.md5(kw["Body"]).hexdigest()}"'}
+    db_backup.s3_storage.s3 = s3_client
+
+    summary = db_backup.run(databases=["mydb1", "mydb2"])
+
+    assert [r.status for r in summary.results] == ["success", "success"]
+    for result in summary.results:
+        local_file = Path(app_config.paths.backup_dir) / result.output
+        assert gzip.decompress(local_file.read_bytes()).decode() == payload
+        entry = db_backup.catalog.latest(result.name)
+        assert entry.size == local_file.stat().st_size
+        assert read_manifest(str(local_file)) == entry.checksum
+    assert s3_client.complete_multipart_upload.call_count == 2
+
+
+def test_asyncio_engine_writes_block_index(app_config, logger):
+    """
+    Test the asyncio engine restarts codec frames at table sections and saves the block index.
+    """
+    app_config.runtime.engine = "asyncio"
+    db_backup = DatabaseBackup(app_config, logger)
+    dump_script = (
+        "import sys\n"
+        "for n in range(50):\n"
+        "    sys.stdout.write(f'--\\n-- Name: t{n}; Type: TABLE; Schema: public; Owner: app\\n--\\n\\n'\n"
+        "                     f'CREATE TABLE public.t{n} (id integer);\\n\\n')\n"
+    )
+    db_backup._dump_command = lambda db_name: ([sys.executable, "-c", dump_script], os.environ.copy())
+    db_backup._index_builder = lambda: BlockIndexBuilder("postgresql", "gzip", frame_bytes=200)
+    s3_client = MagicMock()
+    s3_client.create_multipart_upload.return_value = {"UploadId": "upload-1"}
+    s3_client.upload_part.side_effect = lambda **kw: {"ETag": f'"{hashlib.md5(kw["Body"]).hexdigest()}"'}
+    db_backup.s3_storage.s3 = s3_client
+
+    summary = db_backup.run(databases=["mydb"])
+
+    local_file = Path(app_config.paths.backup_dir) / summary.results[0].output
+    dump = gzip.decompress(local_file.read_bytes())
+    index = BlockIndex.load(index_path(str(local_file)))
+    assert len(index.frames) > 5
+    assert {section.table for section in index.sections} >= {"t0", "t49"}
+    with open(local_file, "rb") as f:
+        for compressed_offset, start in index.frames:
+            f.seek(compressed_offset)
+            assert gzip.GzipFile(fileobj=f).read(40) == dump[start:start + 40]
+
+
+def test_asyncio_engine_timeout_aborts_destinations(app_config, logger):
+    """
+    Test a job exceeding runtime.job_timeout is cancelled and its destinations aborted.
+    """
+    app_config.runtime.engine = "asyncio"
+    app_config.runtime.job_timeout = 0.5
+    db_backup = DatabaseBackup(app_config, logger)
+    db_backup._dump_command = lambda db_name: ([sys.executable, "-c", "import time; time.sleep(30)"], None)
+    s3_client = MagicMock()
+    s3_client.create_multipart_upload.return_value = {"UploadId": "upload-1"}
+    db_backup.s3_storage.s3 = s3_client
+
+    summary = db_backup.run(databases=["mydb"])
+
+    assert summary.results[0].status == "failed"
+    assert "timed out" in summary.results[0].error
+    assert summary.duration < 10
+    s3_client.abort_multipart_upload.assert_called_once()
+    assert not list(Path(app_config.paths.backup_dir).glob(".*.partial"))
@@ -2,11 +2,14 @@
 Unit tests for dbbackup.core.restore module.
 """
 
+import gzip
+import tarfile
 import pytest
 from unittest.mock import MagicMock
 from dbbackup.core.restore import DatabaseRestore
 from dbbackup.core.config_loader import load_config
 from dbbackup.core.logger import get_logger
+from pathlib import Path
 
 
 @pytest.fixture
@@ -48,4 +51,92 @@ def test_restore_no_file(config_and_logger):
     db_restore = DatabaseRestore(config, logger)
 
     # Should log an error but not raise
-    db_restore.run(target_db="test_db", backup_file="nonexistent.sql")
\ No newline at end of file
+    db_restore.run(target_db="test_db", backup_file="nonexistent.sql")
+
+def test_restore_streams_decompressed_backup(app_config, tmp_path):
+    """
+    Test a compressed backup is decompressed on the fly into the client's stdin.
+    """
+    logger = get_logger("test_restore", log_dir="logs_test", console=False)
+    backup = tmp_path / "dbbackup_mydb_20250101_000000.sql.gz"
+    backup.write_bytes(gzip.compress(b"CREATE TABLE t (id int);\n"))
+    db_restore = DatabaseRestore(app_config, logger)
+
+    received = {}
+
+    def fake_feed(args, source, env=None):
+        received["args"] = args
+        received["data"] = source.read()
+        return len(received["data"])
+
+    db_restore.executor.feed = fake_feed
+    db_restore.run(target_db="mydb", backup_file=str(backup))
+
+    assert received["args"][0] == "psql"
+    assert received["args"][-1] == "mydb"
+    assert received["data"] == b"CREATE TABLE t (id int);\n"
+
+
+def test_restore_custom_format_uses_parallel_pg_restore(app_config, tmp_path):
+    """
+    Test custom-format archives are restored in place with pg_restore -j.
+    """
+    logger = get_logger("test_restore", log_dir="logs_test", console=False)
+    app_config.database.dump.postgresql.jobs = 4
+    backup = tmp_path / "dbbackup_mydb_20250101_000000.dump"
+    backup.write_bytes(b"PGDMP...")
+    db_restore = DatabaseRestore(app_config, logger)
+    mock_run = MagicMock()
+    db_restore.executor.run = mock_run
+
+    db_restore.run(target_db="mydb", backup_file=str(backup))
+
+    command = mock_run.call_args[0][0]
+    assert command.startswith("pg_restore")
+    assert "-j 4" in command
+    assert command.endswith(str(backup))
+
+
+def test_restore_directory_archive_is_unpacked(app_config, tmp_path):
+    """
+    Test directory-format archives are unpacked and restored with pg_restore -F d.
+    """
+    logger = get_logger("test_restore", log_dir="logs_test", console=False)
+    dump_dir = tmp_path / "dbbackup_mydb_20250101_000000.dir"
+    dump_dir.mkdir()
+    (dump_dir / "toc.dat").write_bytes(b"PGDMP")
+    backup = tmp_path / "dbbackup_mydb_20250101_000000.dir.tar"
+    with tarfile.open(backup, "w") as tar:
+        tar.add(dump_dir, arcname=dump_dir.name)
+    db_restore = DatabaseRestore(app_config, logger)
+    seen = {}
+
+    def fake_run(cmd, env=None):
+        seen["cmd"] = cmd
+        seen["toc"] = (Path(cmd.split()[-1]) / "toc.dat").read_bytes()
+
+    db_restore.executor.run = fake_run
+    db_restore.run(target_db="mydb", backup_file=str(backup))
+
+    assert "-F d" in seen["cmd"]
+    assert seen["toc"] == b"PGDMP"
+    assert list(Path(app_config.paths.temp_dir).iterdir()) == []
+
+
+def test_restore_picks_latest_backup_of_exact_database(app_config):
+    """
+    Test the latest backup is looked up in the catalog without matching similarly named databases.
+    """
+    logger = get_logger("test_restore", log_dir="logs_test", console=False)
+    backup_dir = Path(app_config.paths.backup_dir)
+    backup_dir.mkdir(parents=True, exist_ok=True)
+    for name in ["dbbackup_mydb1_20250101_000000.sql", "dbbackup_mydb1_20250102_000000.sql",
+                 "dbbackup_mydb10_20250109_000000.sql"]:
+        (backup_dir / name).write_text("SELECT 1;\n")
+    db_restore = DatabaseRestore(app_config, logger)
+    db_restore.executor.feed = MagicMock(return_value=0)
+    db_restore._stream_into = MagicMock()
+
+    db_restore.run(target_db="mydb1", backup_file=None)
+
+    assert db_restore._stream_into.call_args[0][1].endswith("dbbackup_mydb1_20250102_000000.sql")
@@ -0,0 +1,172 @@
+"""
+Unit tests for dbbackup.core.retention module and batched S3 deletes.
+"""
+
+import gzip
+import logging
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+from dbbackup.core.catalog import BackupCatalog
+from dbbackup.core.retention import BackupPruner, RetentionPolicy
+from dbbackup.core.storages.s3 import BackupObject, S3Storage
+from dbbackup.utils.timeutils import generate_backup_key, generate_timestamped_filename
+
+
+@pytest.fixture
+def logger():
+    """
+    Fixture to create a logger for testing.
+    """
+    logger = logging.getLogger("test_retention")
+    logger.addHandler(logging.NullHandler())
+    return logger
+
+
+def test_policy_keeps_newest_backup_per_period():
+    """
+    Test a year of daily backups is reduced to the daily, weekly and monthly representatives.
+    """
+    start = datetime(2025, 1, 1, 2, 0)
+    backups = [start + timedelta(days=day) for day in range(365)]
+    policy = RetentionPolicy(keep_last=1, daily=7, weekly=4, monthly=6, yearly=2)
+
+    keep, prune = policy.split(backups, lambda created: created)
+
+    daily = [datetime(2025, 12, day, 2, 0) for day in range(31, 24, -1)]
+    weekly = [datetime(2025, 12, 21, 2, 0), datetime(2025, 12, 14, 2, 0)]  # Sundays closing earlier ISO weeks
+    monthly = [datetime(2025, month, day, 2, 0) for month, day in ((11, 30), (10, 31), (9, 30), (8, 31), (7, 31))]
+    assert keep == daily + weekly + monthly
+    assert len(prune) == 365 - len(keep)
+
+
+def test_policy_keep_last_overrides_tiers():
+    """
+    Test keep_last keeps recent backups even when they share a day.
+    """
+    backups = [datetime(2025, 3, 1, hour) for hour in range(6)]
+    keep, prune = RetentionPolicy(keep_last=3, daily=1, weekly=0, monthly=0).split(backups, lambda c: c)
+    assert keep == [datetime(2025, 3, 1, hour) for hour in (5, 4, 3)]
+    assert len(prune) == 3
+
+
+def test_delete_backups_batches_keys(logger):
+    """
+    Test S3 deletes go out in DeleteObjects batches of at most 1000 keys and report failed keys.
+    """
+    storage = S3Storage("test-bucket", logger)
+    storage.s3 = MagicMock()
+    storage.s3.delete_objects.side_effect = [
+        {},
+        {"Errors": [{"Key": "db/key1500", "Code": "AccessDenied", "Message": "Access Denied"}]},
+        {},
+    ]
+    keys = [f"db/key{i}" for i in range(2500)]
+
+    deleted = storage.delete_backups(keys)
+
+    batches = [call.kwargs["Delete"]["Objects"] for call in storage.s3.delete_objects.call_args_list]
+    assert [len(batch) for batch in batches] == [1000, 1000, 500]
+    assert storage.s3.delete_objects.call_args.kwargs["Delete"]["Quiet"] is True
+    assert len(deleted) == 2499 and "db/key1500" not in deleted
+
+
+def test_pruner_removes_local_files_s3_objects_and_catalog_entries(app_config, logger, tmp_path):
+    """
+    Test one prune run deletes expired backups everywhere and keeps the catalog in sync.
+    """
+    app_config.retention.daily, app_config.retention.weekly, app_config.retention.monthly = 3, 0, 0
+    backup_dir = tmp_path / "backup"
+    backup_dir.mkdir()
+    created = [datetime(2025, 5, day, 1, 0) for day in range(1, 7)]
+    names = [generate_timestamped_filename("dbbackup", "mydb1", "sql.gz", timestamp=c) for c in created]
+    for name in names[2:]:
+        (backup_dir / name).write_bytes(b"backup")
+        (backup_dir / f".{name}.sha256").write_text(f"abc  {name}\n")
+
+    pruner = BackupPruner(app_config, logger)
+    pruner.s3_storage = MagicMock()
+    pruner.s3_storage.list_database_prefixes.return_value = ["mydb1/"]
+    pruner.s3_storage.list_backup_objects.return_value = [
+        BackupObject(generate_backup_key("mydb1", name, c), 6, c, "etag") for name, c in zip(names, created)
+    ]
+    pruner.s3_storage.delete_backups.side_effect = lambda keys: keys
+
+    pruned = pruner.run()
+
+    assert sorted(entry.filename for entry in pruned) == sorted(names[:3])
+    assert pruner.s3_storage.delete_backups.call_args.args[0] == [
+        generate_backup_key("mydb1", name, c) for name, c in reversed(list(zip(names[:3], created[:3])))
+    ]
+    assert sorted(p.name for p in backup_dir.iterdir() if not p.name.startswith(".catalog")) == sorted(
+        names[3:] + [f".{name}.sha256" for name in names[3:]])
+    catalog = BackupCatalog.for_backup_dir(str(backup_dir), logger)
+    assert [entry.filename for entry in catalog.list_backups("mydb1")] == list(reversed(names[3:]))
+
+
+def test_pruner_dry_run_deletes_nothing(app_config, logger, tmp_path):
+    """
+    Test dry-run mode only reports the backups it would prune.
+    """
+    app_config.runtime.dry_run = True
+    app_config.retention.daily, app_config.retention.weekly, app_config.retention.monthly = 1, 0, 0
+    backup_dir = tmp_path / "backup"
+    backup_dir.mkdir()
+    for day in (1, 2):
+        name = generate_timestamped_filename("dbbackup", "mydb1", "sql", timestamp=datetime(2025, 5, day))
+        (backup_dir / name).write_bytes(b"backup")
+
+    pruner = BackupPruner(app_config, logger)
+    pruner.s3_storage = MagicMock()
+    pruner.s3_storage.list_database_prefixes.return_value = []
+    pruner.s3_storage.list_backup_objects.return_value = []
+
+    assert len(pruner.run()) == 1
+    assert len(list(backup_dir.glob("dbbackup_*"))) == 2
+    pruner.s3_storage.delete_backups.assert_not_called()
+
+
+@pytest.mark.parametrize("oldest_kept_in_s3_only", [False, True])
+def test_pruner_expires_archived_binlogs_before_the_oldest_kept_backup(app_config, logger, tmp_path,
+                                                                       oldest_kept_in_s3_only):
+    """
+    Test a full prune deletes archived binlogs the oldest kept dump no longer needs, locally and in S3.
+    """
+    app_config.database.type = "mysql"
+    app_config.pitr.enabled = True
+    app_config.retention.daily, app_config.retention.weekly, app_config.retention.monthly = 2, 0, 0
+    backup_dir = tmp_path / "backup"
+    archive_dir = backup_dir / ".pitr"
+    archive_dir.mkdir(parents=True)
+    created = [datetime(2025, 5, day, 1, 0) for day in (1, 2, 3)]
+    names = [generate_timestamped_filename("dbbackup", "mydb1", "sql.gz", timestamp=c) for c in created]
+    for name, binlog in zip(names, ("binlog.000002", "binlog.000005", "binlog.000006")):
+        if name == names[1] and oldest_kept_in_s3_only:
+            continue
+        (backup_dir / name).write_bytes(gzip.compress(
+            f"-- CHANGE REPLICATION SOURCE TO SOURCE_LOG_FILE='{binlog}', SOURCE_LOG_POS=4;\n".encode()))
+    for number in range(2, 8):
+        (archive_dir / f"binlog.{number:06d}.gz").write_bytes(b"events")
+        (archive_dir / f".binlog.{number:06d}.gz.sha256").write_text("abc\n")
+    archived = [BackupObject(f".pitr/mysql/binlog.{number:06d}.gz", 6, created[0], "etag") for number in range(2, 8)]
+    backups = [BackupObject(generate_backup_key("mydb1", name, c), 6, c, "etag") for name, c in zip(names, created)]
+
+    pruner = BackupPruner(app_config, logger)
+    pruner.s3_storage = MagicMock()
+    pruner.s3_storage.list_database_prefixes.return_value = ["mydb1/"]
+    pruner.s3_storage.list_backup_objects.side_effect = lambda prefix="", **kw: (
+        archived if prefix.startswith(".pitr/") else backups)
+    pruner.s3_storage.delete_backups.side_effect = lambda keys: keys
+
+    pruned = pruner.run()
+
+    assert [entry.filename for entry in pruned] == [names[0]]
+    remaining = sorted(p.name for p in archive_dir.iterdir())
+    deleted_keys = [key for call in pruner.s3_storage.delete_backups.call_args_list
+                    for key in call.args[0] if key.startswith(".pitr/")]
+    if oldest_kept_in_s3_only:
+        assert len(remaining) == 12 and deleted_keys == []
+    else:
+        assert remaining == sorted([f"binlog.{n:06d}.gz" for n in range(5, 8)]
+                                   + [f".binlog.{n:06d}.gz.sha256" for n in range(5, 8)])
+        assert deleted_keys == [f".pitr/mysql/binlog.{n:06d}.gz" for n in range(2, 5)]
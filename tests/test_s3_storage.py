@@ -0,0 +1,155 @@
+"""
+Unit tests for dbbackup.core.storages.s3 and s3_transfer modules.
+"""
+
+import logging
+import time
+import pytest
+from unittest.mock import MagicMock
+from dbbackup.core.storages import s3
+from dbbackup.core.storages.s3 import MIN_PART_SIZE, S3MultipartWriter, S3Storage
+from dbbackup.core.storages.s3_transfer import (
+    MB,
+    BandwidthThrottle,
+    S3TransferSettings,
+    get_s3_client,
+    reset_transfer_cache,
+)
+
+moto = pytest.importorskip("moto")
+
+
+@pytest.fixture
+def logger():
+    """
+    Fixture to create a logger for testing.
+    """
+    logger = logging.getLogger("test_s3_storage")
+    logger.addHandler(logging.NullHandler())
+    return logger
+
+
+@pytest.fixture
+def s3_bucket(monkeypatch):
+    """
+    Fixture providing an in-memory S3 stand-in with an empty bucket.
+    """
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    reset_transfer_cache()
+    with moto.mock_aws():
+        settings = S3TransferSettings(multipart_threshold=5 * MB, multipart_chunksize=5 * MB, max_concurrency=4)
+        get_s3_client(settings).create_bucket(Bucket="test-bucket")
+        yield settings
+    reset_transfer_cache()
+
+
+def test_storages_share_one_client(s3_bucket, logger):
+    """
+    Test storage handlers with the same settings reuse the client and transfer manager.
+    """
+    first = S3Storage("test-bucket", logger, settings=s3_bucket)
+    second = S3Storage("test-bucket", logger, settings=s3_bucket)
+    assert first.s3 is second.s3
+    assert first.transfer is second.transfer
+
+
+def test_upload_backup_uses_multipart_transfer(s3_bucket, logger, tmp_path):
+    """
+    Test a file larger than the threshold is uploaded through the shared transfer manager.
+    """
+    source = tmp_path / "backup.sql.gz"
+    source.write_bytes(b"x" * (11 * MB))
+    storage = S3Storage("test-bucket", logger, settings=s3_bucket)
+
+    assert storage.upload_backup(str(source), "mydb/backup.sql.gz") is True
+    head = storage.s3.head_object(Bucket="test-bucket", Key="mydb/backup.sql.gz")
+    assert head["ContentLength"] == 11 * MB
+    assert head["ETag"].endswith('-3"')  # Three 5 MiB-sized parts
+
+
+def test_streamed_parts_upload_in_parallel_and_in_order(s3_bucket, logger):
+    """
+    Test the multipart writer assembles concurrently uploaded parts in order.
+    """
+    storage = S3Storage("test-bucket", logger, settings=s3_bucket)
+    writer = storage.open_writer("mydb/streamed.sql.gz")
+    chunks = [bytes([i]) * MB for i in range(12)]
+    for chunk in chunks:
+        writer.write(chunk)
+    writer.commit()
+
+    body = storage.s3.get_object(Bucket="test-bucket", Key="mydb/streamed.sql.gz")["Body"].read()
+    assert body == b"".join(chunks)
+
+
+def test_streamed_part_size_grows_to_stay_within_the_part_limit(monkeypatch, logger):
+    """
+    Test the streaming writer doubles its part size every few parts and fails clearly past the last part.
+    """
+    monkeypatch.setattr(s3, "PART_SIZE_STEP", 2)
+    monkeypatch.setattr(s3, "MAX_PARTS", 5)
+    client = MagicMock()
+    client.create_multipart_upload.return_value = {"UploadId": "upload-1"}
+    client.upload_part.return_value = {"ETag": '"etag"'}
+    writer = S3MultipartWriter(client, "test-bucket", "mydb/streamed.sql.gz", logger)
+
+    writer.write(b"x" * (9 * MIN_PART_SIZE))
+    sizes = [len(call.kwargs["Body"]) for call in client.upload_part.call_args_list]
+    assert sizes == [MIN_PART_SIZE, MIN_PART_SIZE, 2 * MIN_PART_SIZE, 2 * MIN_PART_SIZE]
+
+    writer.write(b"x" * (4 * MIN_PART_SIZE))
+    with pytest.raises(ValueError, match="limit of 5 parts"):
+        writer.write(b"x" * (4 * MIN_PART_SIZE))
+
+
+def test_bandwidth_throttle_limits_rate():
+    """
+    Test the throttle delays callers that exceed the configured rate.
+    """
+    throttle = BandwidthThrottle(bytes_per_second=1000)
+    started = time.monotonic()
+    throttle.consume(1000)
+    throttle.consume(500)
+    assert time.monotonic() - started >= 0.45
+
+
+def test_list_backup_objects_paginates_and_returns_metadata(s3_bucket, logger):
+    """
+    Test listings follow pagination past 1000 keys and return structured records.
+    """
+    storage = S3Storage("test-bucket", logger, settings=s3_bucket)
+    for i in range(1005):
+        storage.s3.put_object(Bucket="test-bucket", Key=f"mydb1/2025/01/backup_{i:04d}.sql.gz", Body=b"x")
+    storage.s3.put_object(Bucket="test-bucket", Key="mydb10/2025/01/backup.sql.gz", Body=b"yy")
+
+    objects = storage.list_backup_objects(prefix="mydb1/")
+
+    assert len(objects) == 1005
+    assert objects[0].size == 1
+    assert objects[0].etag and objects[0].last_modified
+    assert storage.list_database_prefixes() == ["mydb1/", "mydb10/"]
+    both = storage.list_backup_objects(prefixes=["mydb1/", "mydb10/"])
+    assert len(both) == 1006
+    assert both[-1].key == "mydb10/2025/01/backup.sql.gz"
+
+
+def test_collect_chunks_keeps_chunks_any_manifest_references(s3_bucket, logger):
+    """
+    Test S3 chunk collection counts references over every manifest in the bucket and the given digests.
+    """
+    storage = S3Storage("test-bucket", logger, settings=s3_bucket)
+    manifest = b'{"version": 1, "chunks": [["aa11", 10]]}'
+    storage.s3.put_object(Bucket="test-bucket", Key="mydb1/2025/01/dbbackup_mydb1.sql.dedup", Body=manifest)
+    for digest in ("aa11", "bb22", "cc33"):
+        storage.s3.put_object(Bucket="test-bucket", Key=f".chunks/{digest[:2]}/{digest}.gz", Body=b"x")
+
+    assert storage.collect_chunks({"bb22"}) == 0  # Still within the grace period
+    assert storage.collect_chunks({"bb22"}, grace_seconds=0) == 1
+    assert storage.list_backups(".chunks/") == []
+    assert [obj.key for obj in storage.list_backup_objects(".chunks/", include_hidden=True)] == [
+        ".chunks/aa/aa11.gz", ".chunks/bb/bb22.gz"]
+
+    storage.s3.put_object(Bucket="test-bucket", Key="mydb1/2025/01/broken.sql.dedup", Body=b"{}")
+    assert storage.collect_chunks(set(), grace_seconds=0) == 0
+    assert len(storage.list_backup_objects(".chunks/", include_hidden=True)) == 2
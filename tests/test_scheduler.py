@@ -0,0 +1,115 @@
+"""
+Unit tests for dbbackup.core.scheduler module.
+"""
+
+import asyncio
+import threading
+import logging
+import pytest
+from dbbackup.core.scheduler import AsyncJobScheduler, JobScheduler
+
+
+@pytest.fixture
+def logger():
+    """
+    Fixture to create a logger for testing.
+    """
+    logger = logging.getLogger("test_scheduler")
+    logger.addHandler(logging.NullHandler())
+    return logger
+
+
+def test_scheduler_bounds_concurrency(logger):
+    """
+    Test that no more than max_workers jobs run at the same time.
+    """
+    lock = threading.Lock()
+    running = 0
+    peak = 0
+    release = threading.Event()
+
+    def job(name):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        release.wait(0.05)
+        with lock:
+            running -= 1
+        return name
+
+    summary = JobScheduler(logger, max_workers=2).run([f"db{i}" for i in range(6)], job)
+    assert peak == 2
+    assert [r.name for r in summary.results] == [f"db{i}" for i in range(6)]
+    assert all(r.succeeded for r in summary.results)
+
+
+def test_scheduler_isolates_failures(logger):
+    """
+    Test that a raising or failing job does not affect the others.
+    """
+    def job(name):
+        if name == "boom":
+            raise RuntimeError("dump failed")
+        if name == "none":
+            return None
+        return f"{name}.sql.gz"
+
+    summary = JobScheduler(logger, max_workers=3).run(["ok", "boom", "none"], job)
+    assert [r.name for r in summary.succeeded] == ["ok"]
+    assert {r.name for r in summary.failed} == {"boom", "none"}
+    assert summary.results[1].error == "dump failed"
+    assert summary.results[0].output == "ok.sql.gz"
+
+
+def test_async_scheduler_bounds_concurrency_and_times_out(logger):
+    """
+    Test the async scheduler limits concurrent jobs and cancels jobs exceeding the timeout.
+    """
+    running = 0
+    peak = 0
+    cancelled = []
+
+    async def job(name):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        try:
+            await asyncio.sleep(5 if name == "slow" else 0.01)
+        except asyncio.CancelledError:
+            cancelled.append(name)
+            raise
+        finally:
+            running -= 1
+        return None if name == "none" else name
+
+    names = ["db0", "db1", "slow", "none", "db4"]
+    summary = AsyncJobScheduler(logger, max_concurrency=2, timeout=0.5).run(names, job)
+    assert peak == 2
+    assert [r.name for r in summary.results] == names
+    assert [r.name for r in summary.succeeded] == ["db0", "db1", "db4"]
+    assert summary.results[2].error == "timed out after 0.5s"
+    assert cancelled == ["slow"]
+
+
+@pytest.mark.parametrize("scheduler", ["threads", "async"])
+def test_scheduler_runs_duplicate_names_once(logger, scheduler):
+    """
+    Test a database listed twice is backed up once and counted once.
+    """
+    calls = []
+
+    def job(name):
+        calls.append(name)
+        return f"{name}.sql.gz"
+
+    async def async_job(name):
+        return job(name)
+
+    if scheduler == "threads":
+        summary = JobScheduler(logger, max_workers=2).run(["db1", "db2", "db1"], job)
+    else:
+        summary = AsyncJobScheduler(logger, max_concurrency=2).run(["db1", "db2", "db1"], async_job)
+    assert sorted(calls) == ["db1", "db2"]
+    assert [r.name for r in summary.results] == ["db1", "db2"]
+    assert len(summary.succeeded) == 2
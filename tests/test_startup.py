@@ -0,0 +1,81 @@
+"""
+Tests keeping the CLI startup path free of heavy imports.
+"""
+
+import os
+import subprocess
+import sys
+import yaml
+from pathlib import Path
+from unittest.mock import MagicMock
+from dbbackup.core.storages import s3
+from dbbackup.core.storages.s3 import S3Storage
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+HEAVY_MODULES = ("boto3", "botocore", "pydantic")
+
+
+def run_python(code: str, cwd: Path) -> str:
+    """
+    Run code in a fresh interpreter and return its output.
+    """
+    result = subprocess.run([sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True, check=True,
+                            env={**os.environ, "PYTHONPATH": str(REPO_ROOT)})
+    return result.stdout + result.stderr
+
+
+def test_cli_module_imports_only_the_argument_parser():
+    """
+    Test importing the entry point, as ``--help`` does, loads neither pydantic nor the AWS SDK.
+    """
+    output = run_python(f"import sys, main; print([m for m in {HEAVY_MODULES!r} if m in sys.modules])", REPO_ROOT)
+    assert output.strip() == "[]"
+
+
+def test_list_runs_without_the_aws_sdk(tmp_path):
+    """
+    Test --list on a local-only setup loads only what it needs and reports the import time with --verbose.
+    """
+    (tmp_path / "config").mkdir()
+    (tmp_path / "config" / "config.yaml").write_text(yaml.safe_dump({
+        "app": {"app_name": "dbbackup", "version": "1.0.0"},
+        "database": {"type": "postgresql", "host": "localhost", "port": 5432, "user": "dbuser",
+                     "password": "dbpassword", "default_databases": ["mydb1"]},
+        "paths": {"backup_dir": str(tmp_path / "backup"), "log_dir": str(tmp_path / "logs"),
+                  "temp_dir": str(tmp_path / "temp")},
+        "runtime": {"dry_run": False, "verbose": False},
+    }))
+    output = run_python(
+        "import sys, main\n"
+        "sys.argv = ['main.py', '--list', '--verbose']\n"
+        "main.main()\n"
+        "print('loaded', [m for m in ('boto3', 'botocore') if m in sys.modules])",
+        tmp_path,
+    )
+    assert "loaded []" in output
+    assert "Imported dbbackup.core.listing in" in output
+
+
+def test_s3_client_is_created_on_first_use(monkeypatch):
+    """
+    Test S3Storage fetches the shared client only when it is first needed.
+    """
+    get_s3_client = MagicMock()
+    monkeypatch.setattr(s3, "get_s3_client", get_s3_client)
+    storage = S3Storage("test-bucket", MagicMock())
+    get_s3_client.assert_not_called()
+
+    assert storage.s3 is get_s3_client.return_value
+    assert storage.s3 is get_s3_client.return_value
+    get_s3_client.assert_called_once_with(storage.settings)
+
+
+def test_backup_without_s3_work_creates_no_client(app_config):
+    """
+    Test constructing the backup runner leaves the S3 client uncreated.
+    """
+    from dbbackup.core.backup import DatabaseBackup
+
+    db_backup = DatabaseBackup(app_config, MagicMock())
+    assert db_backup.s3_storage._s3 is None
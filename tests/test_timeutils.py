@@ -0,0 +1,36 @@
+"""
+Unit tests for dbbackup.utils.timeutils module.
+"""
+
+from datetime import datetime
+from dbbackup.utils.timeutils import (
+    generate_backup_key,
+    generate_timestamped_filename,
+    parse_timestamped_filename,
+)
+
+
+def test_timestamped_filename_round_trip():
+    """
+    Test generated names parse back even when prefix and database contain underscores.
+    """
+    created = datetime(2025, 3, 7, 1, 2, 3)
+    name = generate_timestamped_filename("dbbackup_tool", "my_db1", "sql.zst", timestamp=created)
+    assert name == "dbbackup_tool_my_db1_20250307_010203.sql.zst"
+    assert parse_timestamped_filename(name, "dbbackup_tool") == ("my_db1", created, "sql.zst")
+
+
+def test_parse_rejects_foreign_names():
+    """
+    Test names that were not generated with the prefix are rejected.
+    """
+    assert parse_timestamped_filename("other_mydb_20250307_010203.sql", "dbbackup") is None
+    assert parse_timestamped_filename("dbbackup_mydb.sql", "dbbackup") is None
+
+
+def test_backup_key_layout():
+    """
+    Test backup keys are grouped by database, year and month.
+    """
+    key = generate_backup_key("mydb", "dbbackup_mydb_20250307_010203.sql.gz", datetime(2025, 3, 7))
+    assert key == "mydb/2025/03/dbbackup_mydb_20250307_010203.sql.gz"
@@ -0,0 +1,98 @@
+"""
+Unit tests for dbbackup.core.verifier module.
+"""
+
+import gzip
+import hashlib
+import logging
+import pytest
+from datetime import datetime
+from unittest.mock import MagicMock
+from dbbackup.core.catalog import CatalogEntry
+from dbbackup.core.integrity import write_manifest
+from dbbackup.core.verifier import BackupVerifier
+
+
+@pytest.fixture
+def verifier(app_config):
+    """
+    Fixture to provide a BackupVerifier with a mocked S3 storage.
+    """
+    logger = logging.getLogger("test_verifier")
+    logger.addHandler(logging.NullHandler())
+    verifier = BackupVerifier(app_config, logger)
+    verifier.s3_storage = MagicMock()
+    return verifier
+
+
+def _write_backup(verifier, name: str, data: bytes) -> str:
+    path = verifier.local_storage.backup_dir / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_verify_local_backup_with_manifest(verifier):
+    """
+    Test a backup matching its manifest checksum is reported as verified.
+    """
+    data = gzip.compress(b"CREATE TABLE t (id int);\n" * 100)
+    path = _write_backup(verifier, "dbbackup_mydb1_20250101_010101.sql.gz", data)
+    write_manifest(path, f"sha256:{hashlib.sha256(data).hexdigest()}")
+
+    result = verifier.verify_local_file(path)
+    assert result.status == "ok"
+
+
+def test_verify_local_backup_detects_corruption(verifier):
+    """
+    Test a checksum mismatch and undecodable data both fail verification.
+    """
+    data = gzip.compress(b"INSERT INTO t VALUES (1);\n" * 100)
+    path = _write_backup(verifier, "dbbackup_mydb1_20250101_010101.sql.gz", data)
+    verifier.catalog.record(CatalogEntry("mydb1", datetime(2025, 1, 1), "dbbackup_mydb1_20250101_010101.sql.gz",
+                                         codec="gzip", checksum="sha256:" + "0" * 64, local_path=path))
+
+    result = verifier.verify_local_file(path)
+    assert result.status == "failed"
+    assert "checksum mismatch" in result.detail
+    assert verifier.catalog.latest("mydb1").verify_status == "failed"
+
+    truncated = _write_backup(verifier, "dbbackup_mydb2_20250101_010101.sql.gz", data[:len(data) // 2])
+    result = verifier.verify_local_file(truncated)
+    assert result.status == "failed"
+    assert "decompression failed" in result.detail
+
+
+def test_verify_s3_backup_uses_metadata_only(verifier):
+    """
+    Test S3 backups are verified from HEAD metadata against the catalog.
+    """
+    key = "mydb1/2025/01/dbbackup_mydb1_20250101_010101.sql.gz"
+    verifier.catalog.record(CatalogEntry("mydb1", datetime(2025, 1, 1), "dbbackup_mydb1_20250101_010101.sql.gz",
+                                         codec="gzip", size=10, checksum="sha256:abc", s3_key=key, etag="e-2"))
+    verifier.s3_storage.head_backup.return_value = {
+        "ContentLength": 10, "ETag": '"e-2"', "Metadata": {"checksum": "sha256:abc"},
+    }
+    assert verifier.verify_s3_object(key).status == "ok"
+
+    verifier.s3_storage.head_backup.return_value = {"ContentLength": 9, "ETag": '"e-2"', "Metadata": {}}
+    assert verifier.verify_s3_object(key).status == "failed"
+
+    verifier.s3_storage.head_backup.return_value = None
+    assert verifier.verify_s3_object(key).status == "failed"
+    verifier.s3_storage.download_backup.assert_not_called()
+
+
+def test_run_for_database_verifies_local_and_s3(verifier):
+    """
+    Test verification by database covers both storages.
+    """
+    data = gzip.compress(b"SELECT 1;\n")
+    path = _write_backup(verifier, "dbbackup_mydb1_20250101_010101.sql.gz", data)
+    write_manifest(path, f"sha256:{hashlib.sha256(data).hexdigest()}")
+    verifier.s3_storage.list_backups.return_value = ["mydb1/2025/01/unknown.sql.gz"]
+    verifier.s3_storage.head_backup.return_value = {"ContentLength": 1, "ETag": '"x"', "Metadata": {}}
+
+    results = verifier.run(target_db="mydb1")
+    assert [(r.storage, r.status) for r in results] == [("Local", "ok"), ("S3", "unverified")]
+    verifier.s3_storage.list_backups.assert_called_once_with(prefix="mydb1/")